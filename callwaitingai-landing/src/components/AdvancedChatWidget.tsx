@@ -1,11 +1,10 @@
 import { useState, useRef, useEffect } from 'react';
 import { MessageSquare, X, PhoneCall, PhoneOff, Send, Loader2, Volume2, VolumeX, Play, Pause, Activity, Mic } from 'lucide-react';
-import { chatService, ChatMessage } from '../lib/chat';
-import Vapi from '@vapi-ai/web';
+import { chatService } from '../lib/chat';
 import CallWaitingLogo from './CallWaitingLogo';
-import { VAPI_CONFIG, supabase } from '../lib/supabase';
 import { useAuth } from '../contexts/AuthContext';
-import { getVoiceById, DEFAULT_VOICE_ID } from '../config/vapiVoices';
+// Types only: the voice stack itself is imported when a call starts
+import type { VoiceCall, VoiceCallEvents } from '../lib/voice-call';
 
 interface Message {
   role: 'user' | 'assistant';
@@ -21,17 +20,8 @@ interface TranscriptEntry {
   isFinal: boolean;
 }
 
-interface Assistant {
-  id?: string;
-  business_name?: string;
-  system_prompt?: string;
-  vapi_voice_id?: string | null;
-  vapi_voice_provider?: string | null;
-}
-
 const AdvancedChatWidget = () => {
   const { user } = useAuth();
-  const [assistant, setAssistant] = useState<Assistant | null>(null);
   const [isOpen, setIsOpen] = useState(false);
   const [mode, setMode] = useState<'chat' | 'voice'>('chat');
 
@@ -59,8 +49,7 @@ const AdvancedChatWidget = () => {
   const recognitionRef = useRef<any>(null);
 
   // Voice state
-  const [vapiClient, setVapiClient] = useState<any>(null);
-  const [isVapiReady, setIsVapiReady] = useState(false);
+  const voiceCallRef = useRef<VoiceCall | null>(null);
   const [isCallActive, setIsCallActive] = useState(false);
   const [isConnecting, setIsConnecting] = useState(false);
   const [transcripts, setTranscripts] = useState<TranscriptEntry[]>([]);
@@ -77,9 +66,6 @@ const AdvancedChatWidget = () => {
   const lastSpeechTimeRef = useRef<number>(0);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
-  const audioContextRef = useRef<AudioContext | null>(null);
-  const analyserRef = useRef<AnalyserNode | null>(null);
-  const animationFrameRef = useRef<number>();
 
   // Listen for external widget open events
   useEffect(() => {
@@ -102,252 +88,133 @@ const AdvancedChatWidget = () => {
     return () => window.removeEventListener('openChatWidget', handleOpenWidget);
   }, [isCallActive, isConnecting]);
 
-  // Load assistant configuration from backend
-  useEffect(() => {
-    const loadAssistant = async () => {
-      if (!user) {
-        // For non-authenticated users, use default config
-        setAssistant(null);
-        return;
-      }
-
-      try {
-        const { data: assistantData, error } = await supabase
-          .from('assistants')
-          .select('id, business_name, system_prompt, vapi_voice_id, vapi_voice_provider')
-          .eq('user_id', user.id)
-          .maybeSingle();
-
-        if (error && error.code !== 'PGRST116') {
-          if (import.meta.env.DEV) console.warn('⚠️ Could not load assistant config:', error);
-          setAssistant(null);
-          return;
-        }
-
-        if (assistantData) {
-          setAssistant(assistantData);
-          if (import.meta.env.DEV) console.log('✅ Loaded assistant config from backend:', assistantData.business_name);
-        } else {
-          setAssistant(null);
-        }
-      } catch (err) {
-        if (import.meta.env.DEV) console.warn('⚠️ Error loading assistant:', err);
-        setAssistant(null);
-      }
-    };
-
-    loadAssistant();
-  }, [user]);
-
-  // Initialize Vapi
-  useEffect(() => {
-    // Use env variable if set, otherwise fallback to VAPI_CONFIG
-    const VAPI_PUBLIC_KEY = import.meta.env.VITE_VAPI_PUBLIC_KEY || VAPI_CONFIG.publicKey;
-
-    if (!VAPI_PUBLIC_KEY) {
-      console.error('❌ Vapi public key not configured');
-      setConnectionError('Voice system not configured');
-      return;
-    }
-
-    try {
-      if (import.meta.env.DEV) console.log('🚀 Initializing Vapi client...');
-      const client = new Vapi(VAPI_PUBLIC_KEY);
-
-      // Wait a moment for Vapi to fully initialize
-      setTimeout(() => {
-        setVapiClient(client);
-        setIsVapiReady(true);
-        if (import.meta.env.DEV) console.log('✅ Vapi client initialized and ready');
-      }, 500);
-
-      // Voice call events
-      client.on('call-start', () => {
-        if (import.meta.env.DEV) console.log('✅ Voice call started');
-        setIsCallActive(true);
-        setIsConnecting(false);
-        setIsListening(true);
-        setConnectionError('');
-      });
-
-      client.on('call-end', () => {
-        if (import.meta.env.DEV) console.log('📞 Voice call ended');
-        setIsCallActive(false);
-        setIsConnecting(false);
-        setIsListening(false);
-        setIsSpeaking(false);
-        stopAudioVisualization();
-      });
+  // Vapi events, wired up when the voice stack is loaded
+  const voiceEvents: VoiceCallEvents = {
+    onCallStart: () => {
+      if (import.meta.env.DEV) console.log('✅ Voice call started');
+      setIsCallActive(true);
+      setIsConnecting(false);
+      setIsListening(true);
+      setConnectionError('');
+    },
 
-      // Speech recognition events (user speaking)
-      client.on('speech-start', () => {
-        if (import.meta.env.DEV) console.log('🎤 User started speaking - AI WILL BE INTERRUPTED');
-        setIsListening(true);
-        setIsSpeaking(false);
-        setIsProcessing(false);
-        lastSpeechTimeRef.current = Date.now();
-        // Vapi automatically stops AI when user speaks (built-in interruption)
-      });
+    onCallEnd: () => {
+      if (import.meta.env.DEV) console.log('📞 Voice call ended');
+      setIsCallActive(false);
+      setIsConnecting(false);
+      setIsListening(false);
+      setIsSpeaking(false);
+    },
 
-      client.on('speech-end', () => {
-        if (import.meta.env.DEV) console.log('🎤 User stopped speaking');
-        setIsListening(false);
-        setIsProcessing(true); // Show processing indicator while AI generates response
+    // Speech recognition events (user speaking)
+    onSpeechStart: () => {
+      if (import.meta.env.DEV) console.log('🎤 User started speaking - AI WILL BE INTERRUPTED');
+      setIsListening(true);
+      setIsSpeaking(false);
+      setIsProcessing(false);
+      lastSpeechTimeRef.current = Date.now();
+      // Vapi automatically stops AI when user speaks (built-in interruption)
+    },
 
-        // Calculate response latency
-        const latency = Date.now() - lastSpeechTimeRef.current;
-        setResponseLatency(latency);
-      });
+    onSpeechEnd: () => {
+      if (import.meta.env.DEV) console.log('🎤 User stopped speaking');
+      setIsListening(false);
+      setIsProcessing(true); // Show processing indicator while AI generates response
 
-      // Transcription events with emotion detection
-      client.on('message', (message: any) => {
-        if (import.meta.env.DEV) console.log('📝 Vapi message:', message);
-
-        if (message.type === 'transcript' && message.transcriptType === 'partial') {
-          // User's speech (partial - real-time streaming)
-          if (message.transcript && message.role === 'user') {
-            setTranscripts(prev => {
-              const filtered = prev.filter(t => t.isFinal || t.type !== 'user');
-              return [...filtered, {
-                type: 'user',
-                text: message.transcript,
-                timestamp: Date.now(),
-                isFinal: false
-              }];
-            });
-
-            // Simple emotion detection from text patterns
-            detectEmotionFromText(message.transcript);
-          }
-        } else if (message.type === 'transcript' && message.transcriptType === 'final') {
-          // User's speech (final)
-          if (message.transcript && message.role === 'user') {
-            setTranscripts(prev => {
-              const filtered = prev.filter(t => !(t.type === 'user' && !t.isFinal));
-              return [...filtered, {
-                type: 'user',
-                text: message.transcript,
-                timestamp: Date.now(),
-                isFinal: true
-              }];
-            });
-
-            // Detect emotion from final transcript
-            detectEmotionFromText(message.transcript);
-          }
-        }
+      // Calculate response latency
+      const latency = Date.now() - lastSpeechTimeRef.current;
+      setResponseLatency(latency);
+    },
 
-        // Assistant response streaming
-        if (message.type === 'transcript' && message.role === 'assistant') {
-          setIsProcessing(false); // Response received, stop processing indicator
+    // Transcription events with emotion detection
+    onMessage: (message: any) => {
+      if (import.meta.env.DEV) console.log('📝 Vapi message:', message);
 
+      if (message.type === 'transcript' && message.transcriptType === 'partial') {
+        // User's speech (partial - real-time streaming)
+        if (message.transcript && message.role === 'user') {
           setTranscripts(prev => {
-            const filtered = prev.filter(t => t.isFinal || t.type !== 'assistant');
+            const filtered = prev.filter(t => t.isFinal || t.type !== 'user');
             return [...filtered, {
-              type: 'assistant',
+              type: 'user',
               text: message.transcript,
               timestamp: Date.now(),
-              isFinal: message.transcriptType === 'final'
+              isFinal: false
             }];
           });
-        }
-      });
 
-      // AI response events
-      client.on('message', (message: any) => {
-        // AI is speaking - but DON'T transcribe it to avoid echo
-        if (message.type === 'function-call' || message.type === 'speech-update') {
-          setIsSpeaking(true);
-          setIsListening(false);
+          // Simple emotion detection from text patterns
+          detectEmotionFromText(message.transcript);
         }
-      });
+      } else if (message.type === 'transcript' && message.transcriptType === 'final') {
+        // User's speech (final)
+        if (message.transcript && message.role === 'user') {
+          setTranscripts(prev => {
+            const filtered = prev.filter(t => !(t.type === 'user' && !t.isFinal));
+            return [...filtered, {
+              type: 'user',
+              text: message.transcript,
+              timestamp: Date.now(),
+              isFinal: true
+            }];
+          });
 
-      client.on('error', (error: any) => {
-        if (import.meta.env.DEV) console.error('❌ Vapi error:', error);
-        setIsCallActive(false);
-        setIsConnecting(false);
-        
-        // Provide user-friendly error messages
-        let errorMessage = 'Failed to connect. ';
-        if (
-          error.errorMsg?.includes('Meeting has ended') ||
-          error.type === 'daily-call-join-error' ||
-          error.type === 'start-method-error'
-        ) {
-          errorMessage += 'Connection issue. Please check your internet connection, microphone permissions, and try again.';
-        } else if (error.message?.includes('permission') || error.message?.includes('microphone')) {
-          errorMessage += 'Microphone access is required. Please allow microphone permissions and try again.';
-        } else {
-          errorMessage += error.message || error.errorMsg || 'Please try again.';
+          // Detect emotion from final transcript
+          detectEmotionFromText(message.transcript);
         }
-        
-        setConnectionError(errorMessage);
-        stopAudioVisualization();
-      });
-
-      // Mark as ready after successful initialization
-      
-    } catch (error: any) {
-      if (import.meta.env.DEV) console.error('❌ Failed to initialize Vapi client:', error);
-      setConnectionError('Failed to initialize voice system. Please refresh the page and try again.');
-      setIsVapiReady(false);
-    }
-
-    return () => {
-      if (vapiClient) {
-        vapiClient.stop();
       }
-      stopAudioVisualization();
-    };
-  }, []);
-
-  // Audio visualization
-  const startAudioVisualization = async () => {
-    try {
-      if (import.meta.env.DEV) console.log('🎵 Starting audio visualization...');
-      const stream = await navigator.mediaDevices.getUserMedia({
-        audio: {
-          echoCancellation: true,
-          noiseSuppression: true,
-          autoGainControl: true
-        }
-      });
-      if (import.meta.env.DEV) console.log('✅ Microphone access granted');
 
-      audioContextRef.current = new AudioContext();
-      const source = audioContextRef.current.createMediaStreamSource(stream);
-      analyserRef.current = audioContextRef.current.createAnalyser();
-      analyserRef.current.fftSize = 256;
-      source.connect(analyserRef.current);
+      // Assistant response streaming
+      if (message.type === 'transcript' && message.role === 'assistant') {
+        setIsProcessing(false); // Response received, stop processing indicator
+
+        setTranscripts(prev => {
+          const filtered = prev.filter(t => t.isFinal || t.type !== 'assistant');
+          return [...filtered, {
+            type: 'assistant',
+            text: message.transcript,
+            timestamp: Date.now(),
+            isFinal: message.transcriptType === 'final'
+          }];
+        });
+      }
 
-      updateAudioLevel();
-    } catch (error: any) {
-      if (import.meta.env.DEV) console.error('Failed to get audio stream:', error);
-      setConnectionError('Microphone access denied. Please allow microphone access and try again.');
-      throw error;
-    }
-  };
+      // AI is speaking - but DON'T transcribe it to avoid echo
+      if (message.type === 'function-call' || message.type === 'speech-update') {
+        setIsSpeaking(true);
+        setIsListening(false);
+      }
+    },
 
-  const updateAudioLevel = () => {
-    if (!analyserRef.current) return;
+    onError: (error: any) => {
+      if (import.meta.env.DEV) console.error('❌ Vapi error:', error);
+      setIsCallActive(false);
+      setIsConnecting(false);
 
-    const dataArray = new Uint8Array(analyserRef.current.frequencyBinCount);
-    analyserRef.current.getByteFrequencyData(dataArray);
+      // Provide user-friendly error messages
+      let errorMessage = 'Failed to connect. ';
+      if (
+        error.errorMsg?.includes('Meeting has ended') ||
+        error.type === 'daily-call-join-error' ||
+        error.type === 'start-method-error'
+      ) {
+        errorMessage += 'Connection issue. Please check your internet connection, microphone permissions, and try again.';
+      } else if (error.message?.includes('permission') || error.message?.includes('microphone')) {
+        errorMessage += 'Microphone access is required. Please allow microphone permissions and try again.';
+      } else {
+        errorMessage += error.message || error.errorMsg || 'Please try again.';
+      }
 
-    const average = dataArray.reduce((a, b) => a + b) / dataArray.length;
-    setAudioLevel(Math.min(100, (average / 255) * 100 * 2));
+      setConnectionError(errorMessage);
+    },
 
-    animationFrameRef.current = requestAnimationFrame(updateAudioLevel);
+    onAudioLevel: setAudioLevel,
   };
 
-  const stopAudioVisualization = () => {
-    if (animationFrameRef.current) {
-      cancelAnimationFrame(animationFrameRef.current);
-    }
-    if (audioContextRef.current) {
-      audioContextRef.current.close();
-    }
-  };
+  // End a running call when the widget unmounts
+  useEffect(() => {
+    return () => voiceCallRef.current?.stop();
+  }, []);
 
   // Scroll to bottom
   const scrollToBottom = () => {
@@ -605,22 +472,18 @@ const AdvancedChatWidget = () => {
     setIsLoading(true);
 
     try {
-      const chatMessages: ChatMessage[] = newMessages.map((msg) => ({
-        role: msg.role,
-        content: msg.content,
-      }));
-
-      const aiResponse = await chatService.sendMessage(chatMessages, sessionId);
-
+      // Only the new turn is sent; groq-chat keeps the session's history.
+      // Tokens are appended to the reply bubble as they stream in
       const assistantMessageId = `assistant-${Date.now()}`;
-      const assistantMessage: Message = {
-        role: 'assistant',
-        content: aiResponse,
-        timestamp: new Date(),
-        id: assistantMessageId,
-      };
-
-      setMessages([...newMessages, assistantMessage]);
+      const timestamp = new Date();
+      let streamed = '';
+      await chatService.streamMessage(userMessage, sessionId, (token) => {
+        streamed += token;
+        setMessages([
+          ...newMessages,
+          { role: 'assistant', content: streamed, timestamp, id: assistantMessageId },
+        ]);
+      });
 
       // TTS auto-play DISABLED - removed per user request
     } catch (error) {
@@ -643,12 +506,6 @@ const AdvancedChatWidget = () => {
   // Voice handlers - FIXED for better connection
   const startVoiceCall = async () => {
 
-    if (!vapiClient || !isVapiReady) {
-      setConnectionError('Voice system is not ready. Please wait a moment and try again.');
-      if (import.meta.env.DEV) console.error('❌ Vapi client not initialized or not ready');
-      return;
-    }
-
     if (isConnecting || isCallActive) {
       if (import.meta.env.DEV) console.log('⚠️ Call already in progress');
       return;
@@ -660,142 +517,21 @@ const AdvancedChatWidget = () => {
     setConnectionError('');
 
     try {
-      // Step 1: Request microphone permission
-      if (import.meta.env.DEV) console.log('🎤 Requesting microphone permission...');
-      const stream = await navigator.mediaDevices.getUserMedia({
-        audio: {
-          echoCancellation: true,
-          noiseSuppression: true,
-          autoGainControl: true
-        }
-      });
-      if (import.meta.env.DEV) console.log('✅ Microphone permission granted');
-
-      // Step 2: Setup audio visualization
-      if (!audioContextRef.current) {
-        audioContextRef.current = new AudioContext();
-        const source = audioContextRef.current.createMediaStreamSource(stream);
-        analyserRef.current = audioContextRef.current.createAnalyser();
-        analyserRef.current.fftSize = 256;
-        source.connect(analyserRef.current);
-        updateAudioLevel();
-      }
-
-      // Step 3: Start Vapi call with inline configuration
-      if (import.meta.env.DEV) console.log('🎙️ Starting Vapi call with inline configuration...');
-
-      // Create inline assistant configuration
-      // Use backend assistant config if available, otherwise use defaults
-      const assistantName = assistant?.business_name || 'Marcy AI';
-      const systemPrompt = assistant?.system_prompt || 
-        "You are Marcy, a professional AI receptionist for CallWaitingAI. Answer questions warmly and professionally. Keep responses concise and helpful.";
-      
-      const assistantConfig: any = {
-        name: assistantName,
-        model: {
-          provider: 'groq',
-          model: 'llama-3.3-70b-versatile',
-          messages: [
-            {
-              role: 'system',
-              content: systemPrompt,
-            },
-          ],
-          temperature: 0.7,
-          maxTokens: 500,
-        },
-        transcriber: {
-          provider: 'deepgram',
-          model: 'nova-2',
-          language: 'en-US',
-        },
-        firstMessage: `Hi! I'm ${assistantName.includes('AI') ? 'Marcy' : assistantName}, your AI assistant. How can I help you today?`,
-        silenceTimeoutSeconds: 30,
-        responseDelaySeconds: 0.4,
-        interruptionsEnabled: true,
-        backgroundSound: 'off',
-      };
-
-      // Configure voice from backend assistant config or use default
-      if (assistant?.vapi_voice_id) {
-        const selectedVoice = getVoiceById(assistant.vapi_voice_id);
-        if (selectedVoice) {
-          // For Vapi native voices, use simplified format
-          if (selectedVoice.provider === 'vapi') {
-            assistantConfig.voice = {
-              provider: 'vapi',
-              voiceId: selectedVoice.voiceId,
-            };
-          } else {
-            // For other providers, include provider field
-            assistantConfig.voice = {
-              provider: selectedVoice.provider,
-              voiceId: selectedVoice.voiceId,
-            };
-          }
-          if (import.meta.env.DEV) console.log('🎤 Using backend voice:', selectedVoice.name, `(${selectedVoice.provider})`);
-        } else {
-          if (import.meta.env.DEV) console.warn('⚠️ Voice not found, using default');
-          // Fall back to default Vapi voice
-          const defaultVoice = getVoiceById(DEFAULT_VOICE_ID);
-          if (defaultVoice) {
-            assistantConfig.voice = {
-              provider: 'vapi',
-              voiceId: defaultVoice.voiceId,
-            };
-          }
-        }
-      } else {
-        // No backend voice configured, use default Vapi native voice
-        const defaultVoice = getVoiceById(DEFAULT_VOICE_ID);
-        if (defaultVoice) {
-          assistantConfig.voice = {
-            provider: 'vapi',
-            voiceId: defaultVoice.voiceId,
-          };
-        }
-        if (import.meta.env.DEV) console.log('ℹ️ No backend voice configured, using default:', defaultVoice?.name || 'savannah');
+      // The Vapi SDK, voice catalogue and assistant settings load on the first call
+      const voice = await import('../lib/voice-call');
+      const publicKey = voice.voicePublicKey();
+      if (!publicKey) {
+        console.error('❌ Vapi public key not configured');
+        setConnectionError('Voice system not configured');
+        setIsConnecting(false);
+        return;
       }
-
-      // Add retry logic for connection issues
-      let callStarted = false;
-      let lastError: any = null;
-      const maxRetries = 3;
-
-      for (let attempt = 0; attempt < maxRetries; attempt++) {
-        try {
-          if (attempt > 0) {
-            if (import.meta.env.DEV) console.log(`🔄 Retry attempt ${attempt + 1}/${maxRetries}...`);
-            await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
-          }
-
-          await vapiClient.start(assistantConfig);
-          callStarted = true;
-          if (import.meta.env.DEV) console.log('✅ Vapi call started successfully with inline configuration');
-          break;
-        } catch (startError: any) {
-          lastError = startError;
-          if (import.meta.env.DEV) console.error(`❌ Start attempt ${attempt + 1} failed:`, startError);
-
-          // If it's a connection error, retry
-          const isConnectionError =
-            startError.message?.toLowerCase().includes('connection') ||
-            startError.message?.toLowerCase().includes('network') ||
-            startError.message?.toLowerCase().includes('timeout') ||
-            startError.message?.toLowerCase().includes('meeting has ended') ||
-            startError.type === 'daily-call-join-error';
-
-          if (!isConnectionError || attempt === maxRetries - 1) {
-            // Non-retryable error or final attempt
-            throw startError;
-          }
-          // Otherwise continue to retry
-        }
+      if (!voiceCallRef.current) {
+        voiceCallRef.current = new voice.VoiceCall(publicKey, voiceEvents);
       }
 
-      if (!callStarted && lastError) {
-        throw lastError;
-      }
+      const assistant = await voice.loadVoiceAssistant(user?.id);
+      await voiceCallRef.current.start(assistant);
 
     } catch (error: any) {
       if (import.meta.env.DEV) console.error('❌ Failed to start voice call after retries:', error);
@@ -845,22 +581,18 @@ const AdvancedChatWidget = () => {
       setConnectionError(errorMessage);
       setIsConnecting(false);
       setIsCallActive(false);
-      stopAudioVisualization();
     }
   };
 
   const stopVoiceCall = () => {
     if (import.meta.env.DEV) console.log('🛑 Stopping voice call...');
 
-    if (vapiClient) {
-      vapiClient.stop();
-    }
+    voiceCallRef.current?.stop();
 
     setIsCallActive(false);
     setIsConnecting(false);
     setIsSpeaking(false);
     setIsListening(false);
-    stopAudioVisualization();
   };
 
   // Modern avatar orb (replaces microphone icon)
@@ -1037,7 +769,7 @@ const AdvancedChatWidget = () => {
                     </div>
                   ))}
 
-                  {isLoading && (
+                  {isLoading && messages[messages.length - 1]?.role === 'user' && (
                     <div className="flex justify-start">
                       <div className="bg-white rounded-2xl px-4 py-3 shadow-sm border border-gray-200">
                         <div className="flex items-center space-x-2 text-gray-500">
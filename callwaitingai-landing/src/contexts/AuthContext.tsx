@@ -1,14 +1,23 @@
 import React, { createContext, useContext, useEffect, useState } from 'react';
 import { User } from '@supabase/supabase-js';
 import { supabase } from '../lib/supabase';
+import {
+  cachedSessionProfile,
+  clearSessionProfile,
+  fetchSessionProfile,
+  type SessionProfile,
+} from '../lib/session-profile';
+import type { UserTier } from '../lib/userTier';
 
 interface AuthContextType {
   user: User | null;
   userProfile: any | null;
+  userTier: UserTier;
   loading: boolean;
   signIn: (email: string, password: string) => Promise<any>;
   signUp: (email: string, password: string, fullName: string) => Promise<any>;
   signOut: () => Promise<void>;
+  refreshProfile: () => Promise<void>;
 }
 
 const AuthContext = createContext<AuthContextType | undefined>(undefined);
@@ -16,8 +25,31 @@ const AuthContext = createContext<AuthContextType | undefined>(undefined);
 export function AuthProvider({ children }: { children: React.ReactNode }) {
   const [user, setUser] = useState<User | null>(null);
   const [userProfile, setUserProfile] = useState<any | null>(null);
+  const [userTier, setUserTier] = useState<UserTier>('free');
   const [loading, setLoading] = useState(true);
 
+  function applyProfile(value: SessionProfile | null) {
+    setUserProfile(value?.profile ?? null);
+    setUserTier(value?.tier ?? 'free');
+  }
+
+  // Profile and tier come from one RPC (lib/session-profile). A stored copy is
+  // shown at once and refreshed in the background once stale; without one, or
+  // with `force`, this waits for the server.
+  async function loadProfile(userId: string, force = false) {
+    const cached = cachedSessionProfile(userId);
+    if (cached) applyProfile(cached.value);
+    if (cached && !cached.stale && !force) return;
+
+    const refresh = fetchSessionProfile(userId)
+      .then(applyProfile)
+      .catch((error) => {
+        if (import.meta.env.DEV) console.error('Error loading user profile:', error);
+        if (!cached) applyProfile(null);
+      });
+    if (!cached || force) await refresh;
+  }
+
   useEffect(() => {
     async function loadUser() {
       try {
@@ -33,19 +65,9 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         setUser(session?.user || null);
 
         if (session?.user) {
-          const { data: profile, error: profileError } = await supabase
-            .from('users')
-            .select('*')
-            .eq('id', session.user.id)
-            .maybeSingle();
-
-          if (profileError) {
-            if (import.meta.env.DEV) console.error('Error loading user profile:', profileError);
-          }
-
-          setUserProfile(profile);
+          await loadProfile(session.user.id);
         } else {
-          setUserProfile(null);
+          applyProfile(null);
         }
       } catch (error: any) {
         // Silently handle AuthSessionMissingError - this is normal for logged-out users
@@ -55,7 +77,7 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
           if (import.meta.env.DEV) console.error('Unexpected error in loadUser:', error);
         }
         setUser(null);
-        setUserProfile(null);
+        applyProfile(null);
       } finally {
         setLoading(false);
       }
@@ -64,18 +86,16 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
     loadUser();
 
     const { data: { subscription } } = supabase.auth.onAuthStateChange(
-      (_event, session) => {
+      (event, session) => {
         setUser(session?.user || null);
-        
+
+        // Token refreshes and repeated sign-in events reuse the cached profile
+        // or the request already in flight
         if (session?.user) {
-          supabase
-            .from('users')
-            .select('*')
-            .eq('id', session.user.id)
-            .maybeSingle()
-            .then(({ data }) => setUserProfile(data));
+          loadProfile(session.user.id, event === 'USER_UPDATED');
         } else {
-          setUserProfile(null);
+          clearSessionProfile();
+          applyProfile(null);
         }
       }
     );
@@ -86,23 +106,11 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
   async function signIn(email: string, password: string) {
     const result = await supabase.auth.signInWithPassword({ email, password });
 
-    // Ensure session is properly set after login
+    // Protected routes render once the profile is in; this joins the request
+    // the SIGNED_IN event already started
     if (result.data?.session) {
-      // Wait a moment for auth state to update
-      await new Promise(resolve => setTimeout(resolve, 100));
-
-      // Force refresh user state using getSession
-      const { data: { session } } = await supabase.auth.getSession();
-      setUser(session?.user || null);
-
-      if (session?.user) {
-        const { data: profile } = await supabase
-          .from('users')
-          .select('*')
-          .eq('id', session.user.id)
-          .maybeSingle();
-        setUserProfile(profile);
-      }
+      setUser(result.data.session.user);
+      await loadProfile(result.data.session.user.id);
     }
 
     return result;
@@ -156,6 +164,9 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
         });
 
       if (profileError) throw profileError;
+
+      // The SIGNED_IN event may have cached the profile before the row existed
+      if (authData.session) await loadProfile(authData.user.id, true);
     }
 
     return {
@@ -166,10 +177,16 @@ export function AuthProvider({ children }: { children: React.ReactNode }) {
 
   async function signOut() {
     await supabase.auth.signOut();
+    clearSessionProfile();
+  }
+
+  // After the profile was changed (Settings)
+  async function refreshProfile() {
+    if (user) await loadProfile(user.id, true);
   }
 
   return (
-    <AuthContext.Provider value={{ user, userProfile, loading, signIn, signUp, signOut }}>
+    <AuthContext.Provider value={{ user, userProfile, userTier, loading, signIn, signUp, signOut, refreshProfile }}>
       {children}
     </AuthContext.Provider>
   );
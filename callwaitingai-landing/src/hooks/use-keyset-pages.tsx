@@ -0,0 +1,153 @@
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
+import type { RealtimePostgresChangesPayload } from '@supabase/supabase-js';
+import { supabase } from '../lib/supabase';
+import { compareNewestFirst, OrderedRows, type KeyedRow } from '../lib/ordered-rows';
+import { useRealtimeMerge } from './use-realtime-merge';
+
+export type KeysetRow = KeyedRow;
+
+interface KeysetOptions {
+  table: string;
+  /** Column list for the list view; heavy columns are fetched on demand */
+  columns: string;
+  pageSize?: number;
+  /** Equality filters, e.g. { call_status: 'completed' } */
+  filters?: Record<string, string>;
+  /** Realtime channel whose changes are merged into the loaded rows */
+  realtimeChannel?: string;
+}
+
+const DEFAULT_PAGE_SIZE = 50;
+
+// PostgREST needs quotes around values containing reserved characters
+const quote = (value: string) => `"${value.replace(/"/g, '\\"')}"`;
+
+/**
+ * Newest-first rows of `table`, loaded a page at a time with a
+ * (created_at, id) cursor instead of OFFSET, so deep pages cost the same as
+ * the first one.
+ */
+export function useKeysetPages<T extends KeysetRow>({
+  table,
+  columns,
+  pageSize = DEFAULT_PAGE_SIZE,
+  filters = {},
+  realtimeChannel,
+}: KeysetOptions) {
+  const [rows, setRows] = useState<T[]>([]);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [hasMore, setHasMore] = useState(false);
+  const index = useRef(new OrderedRows<T>());
+  const hasMoreRef = useRef(false);
+  const filterKey = JSON.stringify(filters);
+  const columnList = useMemo(() => columns.split(',').map((column) => column.trim()), [columns]);
+
+  const fetchPage = useCallback(async (after?: KeysetRow) => {
+    let query = supabase
+      .from(table)
+      .select(columns)
+      .order('created_at', { ascending: false })
+      .order('id', { ascending: false })
+      .limit(pageSize);
+
+    for (const [column, value] of Object.entries(JSON.parse(filterKey) as Record<string, string>)) {
+      query = query.eq(column, value);
+    }
+    if (after) {
+      const createdAt = quote(after.created_at);
+      // Redundant with the or() below, but lets Postgres start the index scan at the cursor
+      query = query.lte('created_at', after.created_at);
+      query = query.or(`created_at.lt.${createdAt},and(created_at.eq.${createdAt},id.lt.${quote(after.id)})`);
+    }
+
+    const { data, error } = await query;
+    if (error) throw error;
+    return (data || []) as unknown as T[];
+  }, [table, columns, pageSize, filterKey]);
+
+  const publish = useCallback(() => {
+    setRows(index.current.toArray());
+  }, []);
+
+  const updateHasMore = useCallback((value: boolean) => {
+    hasMoreRef.current = value;
+    setHasMore(value);
+  }, []);
+
+  // First page; also used to pick up changes at the head of the list
+  const refresh = useCallback(async () => {
+    try {
+      const head = await fetchPage();
+      const oldest = head[head.length - 1];
+      const loadedOlder = oldest
+        ? index.current.toArray().filter((row) => compareNewestFirst(row, oldest) > 0)
+        : [];
+      index.current.reset([...head, ...loadedOlder]);
+      if (index.current.size === head.length) updateHasMore(head.length === pageSize);
+      publish();
+    } catch (error) {
+      if (import.meta.env.DEV) console.error(`Error loading ${table}:`, error);
+    } finally {
+      setLoading(false);
+    }
+  }, [fetchPage, publish, updateHasMore, pageSize, table]);
+
+  const loadMore = useCallback(async () => {
+    const last = index.current.oldest;
+    if (!last || loadingMore || !hasMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(last);
+      page.forEach((row) => index.current.upsert(row));
+      updateHasMore(page.length === pageSize);
+      publish();
+    } catch (error) {
+      if (import.meta.env.DEV) console.error(`Error loading more ${table}:`, error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [fetchPage, publish, updateHasMore, loadingMore, hasMore, pageSize, table]);
+
+  // Start over whenever the query changes
+  useEffect(() => {
+    index.current.reset([]);
+    publish();
+    setLoading(true);
+    refresh();
+  }, [refresh, publish]);
+
+  const updateRow = useCallback((id: string, changes: Partial<T>) => {
+    const row = index.current.get(id);
+    if (!row) return;
+    index.current.upsert({ ...row, ...changes });
+    publish();
+  }, [publish]);
+
+  const applyChange = useCallback((change: RealtimePostgresChangesPayload<T>) => {
+    if (change.eventType === 'DELETE') {
+      if (change.old.id) index.current.remove(change.old.id);
+      return;
+    }
+    const record = change.new as Record<string, unknown>;
+    const row = Object.fromEntries(columnList.map((column) => [column, record[column]])) as T;
+    const matches = Object.entries(JSON.parse(filterKey) as Record<string, string>)
+      .every(([column, value]) => String(record[column]) === value);
+    // Rows older than the loaded range arrive with the next page instead
+    const oldest = index.current.oldest;
+    const inRange = !hasMoreRef.current || !oldest || compareNewestFirst(row, oldest) <= 0;
+
+    if (matches && inRange) index.current.upsert(row);
+    else index.current.remove(row.id);
+  }, [columnList, filterKey]);
+
+  useRealtimeMerge<T>({
+    channel: realtimeChannel,
+    table,
+    apply: applyChange,
+    flush: publish,
+    reconcile: refresh,
+  });
+
+  return { rows, loading, loadingMore, hasMore, loadMore, refresh, updateRow };
+}
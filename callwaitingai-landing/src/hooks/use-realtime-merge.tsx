@@ -0,0 +1,77 @@
+import { useEffect, useRef } from 'react';
+import type { RealtimePostgresChangesPayload } from '@supabase/supabase-js';
+import { supabase } from '../lib/supabase';
+
+const DEFAULT_RECONCILE_DELAY_MS = 5000;
+
+interface RealtimeMergeOptions<T extends Record<string, any>> {
+  /** Channel name; nothing is subscribed while it is undefined */
+  channel?: string;
+  table: string;
+  /** Apply one INSERT/UPDATE/DELETE payload to in-memory state */
+  apply: (change: RealtimePostgresChangesPayload<T>) => void;
+  /** Publish the state changed by `apply`; called at most once per frame */
+  flush: () => void;
+  /** Refetch from the server once changes have stopped for `reconcileDelayMs` */
+  reconcile: () => void;
+  reconcileDelayMs?: number;
+}
+
+/**
+ * Merge postgres_changes events into local state instead of reloading on
+ * every event. A burst of changes costs one render per frame and a single
+ * debounced `reconcile()`, which also covers events missed while the
+ * channel was down.
+ */
+export function useRealtimeMerge<T extends Record<string, any>>({
+  channel,
+  table,
+  apply,
+  flush,
+  reconcile,
+  reconcileDelayMs = DEFAULT_RECONCILE_DELAY_MS,
+}: RealtimeMergeOptions<T>) {
+  // Latest callbacks, so the subscription does not restart when they change
+  const handlers = useRef({ apply, flush, reconcile });
+  handlers.current = { apply, flush, reconcile };
+
+  useEffect(() => {
+    if (!channel) return;
+    let frame: number | null = null;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+
+    const scheduleReconcile = () => {
+      if (timer) clearTimeout(timer);
+      timer = setTimeout(() => {
+        timer = null;
+        handlers.current.reconcile();
+      }, reconcileDelayMs);
+    };
+
+    const subscription = supabase
+      .channel(channel)
+      .on<T>('postgres_changes', {
+        event: '*',
+        schema: 'public',
+        table
+      }, (change) => {
+        handlers.current.apply(change);
+        if (frame === null) {
+          frame = requestAnimationFrame(() => {
+            frame = null;
+            handlers.current.flush();
+          });
+        }
+        scheduleReconcile();
+      })
+      .subscribe((status) => {
+        if (status === 'CHANNEL_ERROR' || status === 'TIMED_OUT') scheduleReconcile();
+      });
+
+    return () => {
+      if (frame !== null) cancelAnimationFrame(frame);
+      if (timer) clearTimeout(timer);
+      subscription.unsubscribe();
+    };
+  }, [channel, table, reconcileDelayMs]);
+}
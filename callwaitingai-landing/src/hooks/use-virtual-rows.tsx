@@ -0,0 +1,80 @@
+import { useCallback, useEffect, useMemo, useState, type UIEvent } from 'react';
+
+interface VirtualRowsOptions {
+  count: number;
+  /** Height in px of row `index` (rows must not change height on their own) */
+  rowHeight: (index: number) => number;
+  /** Rows rendered above and below the visible ones */
+  overscan?: number;
+  /** Called when the user scrolls within `loadMoreMargin` px of the end */
+  onEndReached?: () => void;
+  loadMoreMargin?: number;
+}
+
+/**
+ * Windowing for long lists inside a scroll container: only the rows in view
+ * (plus `overscan`) are mounted, and spacers of `paddingTop`/`paddingBottom`
+ * keep the scrollbar true to the full list.
+ */
+export function useVirtualRows({
+  count,
+  rowHeight,
+  overscan = 6,
+  onEndReached,
+  loadMoreMargin = 600,
+}: VirtualRowsOptions) {
+  // Callback ref, so a container mounted after a loading state is still observed
+  const [container, containerRef] = useState<HTMLDivElement | null>(null);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [viewportHeight, setViewportHeight] = useState(800);
+
+  // offsets[i] = top of row i; offsets[count] = total height
+  const offsets = useMemo(() => {
+    const result = new Array<number>(count + 1);
+    result[0] = 0;
+    for (let i = 0; i < count; i++) result[i + 1] = result[i] + rowHeight(i);
+    return result;
+  }, [count, rowHeight]);
+
+  useEffect(() => {
+    if (!container) return;
+    const observer = new ResizeObserver(() => setViewportHeight(container.clientHeight));
+    observer.observe(container);
+    setViewportHeight(container.clientHeight);
+    return () => observer.disconnect();
+  }, [container]);
+
+  const onScroll = useCallback((event: UIEvent<HTMLElement>) => {
+    setScrollTop(event.currentTarget.scrollTop);
+  }, []);
+
+  const totalHeight = offsets[count];
+
+  // First row whose bottom edge is below the top of the viewport
+  let low = 0;
+  let high = count;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (offsets[mid + 1] <= scrollTop) low = mid + 1;
+    else high = mid;
+  }
+  const start = Math.max(0, low - overscan);
+  let end = low;
+  while (end < count && offsets[end] < scrollTop + viewportHeight) end++;
+  end = Math.min(count, end + overscan);
+
+  useEffect(() => {
+    if (onEndReached && count > 0 && totalHeight - (scrollTop + viewportHeight) < loadMoreMargin) {
+      onEndReached();
+    }
+  }, [onEndReached, count, totalHeight, scrollTop, viewportHeight, loadMoreMargin]);
+
+  return {
+    containerRef,
+    onScroll,
+    start,
+    end,
+    paddingTop: offsets[start],
+    paddingBottom: totalHeight - offsets[end],
+  };
+}
@@ -14,13 +14,17 @@ if (!SUPABASE_ANON_KEY) {
 
 const SUPABASE_FUNCTION_URL = `${SUPABASE_URL}/functions/v1/groq-chat`;
 
-export interface ChatMessage {
-  role: 'user' | 'assistant' | 'system';
-  content: string;
-}
+// Short, focused replies; groq-chat clamps both to its own limits
+const GENERATION = {
+  max_tokens: 250,
+  temperature: 0.5,
+};
 
+// Only the visitor's new message is sent: groq-chat rebuilds the
+// conversation from what it stored for the session, and answers common
+// opening questions of a new session from its FAQ cache.
 export const chatService = {
-  async sendMessage(messages: ChatMessage[], sessionId?: string) {
+  async sendMessage(message: string, sessionId?: string) {
     try {
       // SPEED OPTIMIZATION: Add timeout and reduced tokens
       const controller = new AbortController();
@@ -33,10 +37,9 @@ export const chatService = {
           'Authorization': `Bearer ${SUPABASE_ANON_KEY}`,
         },
         body: JSON.stringify({
-          messages,
+          message,
           sessionId: sessionId || `landing-${Date.now()}`,
-          max_tokens: 250, // FASTER: Reduced for quicker responses
-          temperature: 0.5, // FASTER: More focused, less creative = faster
+          ...GENERATION,
         }),
         signal: controller.signal,
       });
@@ -58,4 +61,91 @@ export const chatService = {
       throw new Error('Failed to get response from AI assistant. Please try again.');
     }
   },
+
+  // Streams the reply as server-sent events; onToken gets each chunk as it
+  // arrives. Resolves with the full reply.
+  async streamMessage(
+    message: string,
+    sessionId: string | undefined,
+    onToken: (token: string) => void,
+  ) {
+    try {
+      const controller = new AbortController();
+      const timeout = setTimeout(() => controller.abort(), 25000); // 25s timeout
+
+      const response = await fetch(SUPABASE_FUNCTION_URL, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
+          'Authorization': `Bearer ${SUPABASE_ANON_KEY}`,
+        },
+        body: JSON.stringify({
+          message,
+          sessionId: sessionId || `landing-${Date.now()}`,
+          ...GENERATION,
+          stream: true,
+        }),
+        signal: controller.signal,
+      });
+
+      if (!response.ok) {
+        clearTimeout(timeout);
+        const errorData = await response.json().catch(() => ({}));
+        throw new Error(errorData.error?.message || `API error: ${response.status}`);
+      }
+
+      // A deployment without streaming support answers with plain JSON
+      if (!response.body || !response.headers.get('Content-Type')?.includes('text/event-stream')) {
+        clearTimeout(timeout);
+        const data = await response.json();
+        onToken(data.data.message);
+        return data.data.message as string;
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      let reply = '';
+
+      try {
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+
+          // Events are separated by a blank line
+          const events = buffered.split('\n\n');
+          buffered = events.pop() || '';
+          for (const event of events) {
+            const data = event
+              .split('\n')
+              .filter((line) => line.startsWith('data:'))
+              .map((line) => line.slice(5).trim())
+              .join('');
+            if (!data || data === '[DONE]') continue;
+
+            const parsed = JSON.parse(data);
+            if (parsed.error) throw new Error(parsed.error.message);
+            const token = parsed.choices?.[0]?.delta?.content;
+            if (token) {
+              reply += token;
+              onToken(token);
+            }
+          }
+        }
+      } finally {
+        clearTimeout(timeout);
+      }
+
+      if (!reply) throw new Error('Empty response');
+      return reply;
+    } catch (error: any) {
+      if (import.meta.env.DEV) console.error('Chat error:', error);
+      if (error.name === 'AbortError') {
+        throw new Error('Request timeout. Please try again.');
+      }
+      throw new Error('Failed to get response from AI assistant. Please try again.');
+    }
+  },
 };
@@ -0,0 +1,216 @@
+import { supabase, SUPABASE_CONFIG } from './supabase';
+
+// Knowledge base uploads run a few files at a time. Files of CHUNK_SIZE or
+// more go through Storage's resumable (TUS) endpoint in CHUNK_SIZE pieces, so
+// a dropped connection resumes where it stopped instead of starting over; the
+// upload URL and object path are kept in localStorage until the file is
+// complete. Every upload goes to a new object path and nothing is overwritten.
+// Each file is retried on its own, and the caller stores the rows of every
+// uploaded file with a single insert.
+
+export const KB_BUCKET = 'knowledge-base';
+// Files uploaded at once
+const CONCURRENCY = 4;
+// Storage's resumable endpoint takes 6 MB chunks
+export const CHUNK_SIZE = 6 * 1024 * 1024;
+const MAX_ATTEMPTS = 3;
+const RETRY_DELAY_MS = 500;
+
+export type UploadStatus = 'queued' | 'uploading' | 'done' | 'failed';
+
+export interface UploadProgress {
+  status: UploadStatus;
+  /** Bytes stored so far */
+  loaded: number;
+  error?: string;
+}
+
+export interface UploadedFile {
+  file: File;
+  path: string;
+}
+
+export interface UploadResult {
+  uploaded: UploadedFile[];
+  failed: File[];
+}
+
+class UploadError extends Error {
+  constructor(message: string, public status?: number) {
+    super(message);
+  }
+}
+
+// Network errors, rate limits and server errors are worth another attempt
+const retryable = (error: unknown) =>
+  !(error instanceof UploadError) || error.status === undefined || error.status === 429 || error.status >= 500;
+
+/** Identifies a selected file across renders and retries */
+export const uploadKey = (file: File) => `${file.name}:${file.size}:${file.lastModified}`;
+
+/** Storage path for a new upload of a file; retries of that upload reuse it */
+const newObjectPath = (assistantId: string, file: File) => `${assistantId}/${Date.now()}_${file.name}`;
+
+const encodePath = (path: string) => path.split('/').map(encodeURIComponent).join('/');
+
+const base64 = (value: string) => btoa(String.fromCharCode(...new TextEncoder().encode(value)));
+
+// Read for every request: the session refreshes the access token, and a long
+// batch of uploads can outlive it
+async function authHeaders(): Promise<Record<string, string>> {
+  const { data } = await supabase.auth.getSession();
+  return {
+    Authorization: `Bearer ${data.session?.access_token ?? SUPABASE_CONFIG.anonKey}`,
+    apikey: SUPABASE_CONFIG.anonKey,
+  };
+}
+
+async function check(response: Response, what: string) {
+  if (response.ok) return response;
+  let detail = response.statusText;
+  try {
+    const body = await response.json();
+    detail = body.message || body.error || detail;
+  } catch {
+    // Not JSON; keep the status text
+  }
+  throw new UploadError(`${what} failed: ${detail || `HTTP ${response.status}`}`, response.status);
+}
+
+// `retry`: an earlier attempt of this upload may have stored the object
+// without us seeing the response, so "already exists" means done
+async function uploadWhole(path: string, file: File, retry: boolean) {
+  const response = await fetch(`${SUPABASE_CONFIG.url}/storage/v1/object/${KB_BUCKET}/${encodePath(path)}`, {
+    method: 'POST',
+    headers: { ...(await authHeaders()), 'Content-Type': file.type || 'application/octet-stream' },
+    body: file,
+  });
+  if (retry && response.status === 409) return;
+  await check(response, `Uploading ${file.name}`);
+}
+
+/**
+ * Upload through the resumable endpoint. An upload of the same file into the
+ * same folder that was interrupted (even by a reload) continues where it
+ * stopped; returns the object path.
+ */
+async function uploadResumable(
+  assistantId: string,
+  file: File,
+  onLoaded: (loaded: number) => void,
+): Promise<string> {
+  const endpoint = `${SUPABASE_CONFIG.url}/storage/v1/upload/resumable`;
+  const tus = async () => ({ ...(await authHeaders()), 'Tus-Resumable': '1.0.0' });
+  const resumeKey = `kb-upload:${assistantId}:${uploadKey(file)}`;
+  let resume: { path: string; location: string } | null = null;
+  try {
+    resume = JSON.parse(localStorage.getItem(resumeKey) || 'null');
+  } catch {
+    // Unreadable entry; start over
+  }
+  const path = resume?.path ?? newObjectPath(assistantId, file);
+  let location = resume?.location ?? null;
+  let offset = 0;
+
+  if (location) {
+    const head = await fetch(location, { method: 'HEAD', headers: await tus() });
+    if (head.ok) {
+      offset = Number(head.headers.get('Upload-Offset') || 0);
+    } else {
+      location = null;
+    }
+  }
+
+  if (!location) {
+    const created = await check(await fetch(endpoint, {
+      method: 'POST',
+      headers: {
+        ...(await tus()),
+        'Upload-Length': String(file.size),
+        'Upload-Metadata': [
+          `bucketName ${base64(KB_BUCKET)}`,
+          `objectName ${base64(path)}`,
+          `contentType ${base64(file.type || 'application/octet-stream')}`,
+        ].join(','),
+      },
+    }), `Starting upload of ${file.name}`);
+    location = new URL(created.headers.get('Location') || '', endpoint).toString();
+    localStorage.setItem(resumeKey, JSON.stringify({ path, location }));
+  }
+
+  onLoaded(offset);
+  while (offset < file.size) {
+    const patched = await check(await fetch(location, {
+      method: 'PATCH',
+      headers: { ...(await tus()), 'Upload-Offset': String(offset), 'Content-Type': 'application/offset+octet-stream' },
+      body: file.slice(offset, offset + CHUNK_SIZE),
+    }), `Uploading ${file.name}`);
+    offset = Number(patched.headers.get('Upload-Offset') || offset + CHUNK_SIZE);
+    onLoaded(Math.min(offset, file.size));
+  }
+  localStorage.removeItem(resumeKey);
+  return path;
+}
+
+/**
+ * Upload files to the assistant's knowledge base folder, CONCURRENCY at a
+ * time. Failed files are retried up to MAX_ATTEMPTS times and then reported
+ * in `failed`; they do not stop the others.
+ */
+export async function uploadKnowledgeBaseFiles(
+  assistantId: string,
+  files: File[],
+  onProgress: (file: File, progress: UploadProgress) => void,
+): Promise<UploadResult> {
+  const uploaded: UploadedFile[] = [];
+  const failed: File[] = [];
+  files.forEach((file) => onProgress(file, { status: 'queued', loaded: 0 }));
+
+  const uploadOne = async (file: File) => {
+    let path = newObjectPath(assistantId, file);
+    const report = (loaded: number) => onProgress(file, { status: 'uploading', loaded });
+    for (let attempt = 1; ; attempt++) {
+      try {
+        report(0);
+        if (file.size >= CHUNK_SIZE) {
+          path = await uploadResumable(assistantId, file, report);
+        } else {
+          await uploadWhole(path, file, attempt > 1);
+        }
+        uploaded.push({ file, path });
+        onProgress(file, { status: 'done', loaded: file.size });
+        return;
+      } catch (error: any) {
+        if (attempt >= MAX_ATTEMPTS || !retryable(error)) {
+          failed.push(file);
+          onProgress(file, { status: 'failed', loaded: 0, error: error.message });
+          return;
+        }
+        await new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS * 2 ** (attempt - 1)));
+      }
+    }
+  };
+
+  let next = 0;
+  const worker = async () => {
+    while (next < files.length) {
+      await uploadOne(files[next++]);
+    }
+  };
+  await Promise.all(Array.from({ length: Math.min(CONCURRENCY, files.length) }, worker));
+  return { uploaded, failed };
+}
+
+/** One `knowledge_base_files` row per uploaded file, in a single insert */
+export async function saveKnowledgeBaseRows(assistantId: string, files: UploadedFile[]) {
+  const { error } = await supabase.from('knowledge_base_files').insert(
+    files.map(({ file, path }) => ({
+      assistant_id: assistantId,
+      file_name: file.name,
+      file_path: path,
+      file_type: file.name.split('.').pop(),
+      file_size: file.size,
+    })),
+  );
+  if (error) throw error;
+}
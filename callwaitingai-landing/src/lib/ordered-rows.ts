@@ -0,0 +1,76 @@
+export interface KeyedRow {
+  id: string;
+  created_at: string;
+}
+
+/**
+ * Newest first on (created_at, id), the order the list queries use
+ */
+export function compareNewestFirst(a: KeyedRow, b: KeyedRow) {
+  const byTime = Date.parse(b.created_at) - Date.parse(a.created_at);
+  if (byTime !== 0) return byTime;
+  return a.id === b.id ? 0 : a.id < b.id ? 1 : -1;
+}
+
+/**
+ * Rows kept in list order and indexed by id, so a realtime change is applied
+ * with a binary search instead of a refetch or a full re-sort.
+ */
+export class OrderedRows<T extends KeyedRow> {
+  private rows: T[] = [];
+  private byId = new Map<string, T>();
+
+  constructor(rows: T[] = []) {
+    this.reset(rows);
+  }
+
+  reset(rows: T[]) {
+    this.byId = new Map(rows.map((row) => [row.id, row]));
+    this.rows = [...this.byId.values()].sort(compareNewestFirst);
+  }
+
+  get size() {
+    return this.rows.length;
+  }
+
+  get oldest(): T | undefined {
+    return this.rows[this.rows.length - 1];
+  }
+
+  get(id: string) {
+    return this.byId.get(id);
+  }
+
+  // Index of the first row that does not sort before `row`
+  private position(row: KeyedRow) {
+    let low = 0;
+    let high = this.rows.length;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (compareNewestFirst(this.rows[mid], row) < 0) low = mid + 1;
+      else high = mid;
+    }
+    return low;
+  }
+
+  /** Insert `row`, or merge it into the row with the same id */
+  upsert(row: T) {
+    const existing = this.byId.get(row.id);
+    if (existing) this.rows.splice(this.position(existing), 1);
+    const merged = existing ? { ...existing, ...row } : row;
+    this.rows.splice(this.position(merged), 0, merged);
+    this.byId.set(merged.id, merged);
+  }
+
+  remove(id: string) {
+    const existing = this.byId.get(id);
+    if (!existing) return false;
+    this.rows.splice(this.position(existing), 1);
+    this.byId.delete(id);
+    return true;
+  }
+
+  toArray() {
+    return this.rows.slice();
+  }
+}
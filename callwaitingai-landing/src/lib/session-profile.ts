@@ -0,0 +1,88 @@
+import { supabase } from './supabase';
+import type { UserTier } from './userTier';
+
+// Profile and subscription tier of the signed-in user, from a single RPC
+// (get_session_profile, migration 20250208000000_session_profile.sql). The
+// result is kept in sessionStorage: a reload renders from the stored copy at
+// once and refreshes it in the background when it is older than FRESH_MS.
+// Callers asking at the same time share one request.
+
+export interface SessionProfile {
+  profile: Record<string, any> | null;
+  tier: UserTier;
+}
+
+interface StoredProfile extends SessionProfile {
+  userId: string;
+  fetchedAt: number;
+}
+
+const STORAGE_KEY = 'session-profile';
+// Served without asking the server again for this long
+const FRESH_MS = 5 * 60 * 1000;
+
+const inFlight = new Map<string, Promise<SessionProfile>>();
+// Bumped on sign out, so a request still in flight does not store its result
+let generation = 0;
+
+function read(userId: string): StoredProfile | null {
+  try {
+    const stored = JSON.parse(sessionStorage.getItem(STORAGE_KEY) || 'null');
+    return stored && stored.userId === userId ? stored : null;
+  } catch {
+    return null;
+  }
+}
+
+function write(userId: string, value: SessionProfile) {
+  try {
+    sessionStorage.setItem(STORAGE_KEY, JSON.stringify({ ...value, userId, fetchedAt: Date.now() }));
+  } catch {
+    // Storage full or disabled; the profile is simply fetched again next time
+  }
+}
+
+/** The stored profile of `userId`, possibly stale, or null */
+export function cachedSessionProfile(userId: string): { value: SessionProfile; stale: boolean } | null {
+  const stored = read(userId);
+  if (!stored) return null;
+  return {
+    value: { profile: stored.profile, tier: stored.tier },
+    stale: Date.now() - stored.fetchedAt > FRESH_MS,
+  };
+}
+
+/** Fetch the profile from the server, joining a request already in flight */
+export function fetchSessionProfile(userId: string): Promise<SessionProfile> {
+  const pending = inFlight.get(userId);
+  if (pending) return pending;
+
+  const started = generation;
+  const request = (async () => {
+    const { data, error } = await supabase.rpc('get_session_profile');
+    if (error) throw error;
+    const value: SessionProfile = { profile: data?.profile ?? null, tier: data?.tier ?? 'free' };
+    if (started === generation) write(userId, value);
+    return value;
+  })().finally(() => inFlight.delete(userId));
+
+  inFlight.set(userId, request);
+  return request;
+}
+
+/** The stored profile while fresh, otherwise the server's */
+export async function getSessionProfile(userId: string): Promise<SessionProfile> {
+  const cached = cachedSessionProfile(userId);
+  return cached && !cached.stale ? cached.value : fetchSessionProfile(userId);
+}
+
+/** Forget the stored profile (sign out) */
+export function clearSessionProfile() {
+  generation += 1;
+  inFlight.clear();
+  try {
+    sessionStorage.removeItem(STORAGE_KEY);
+  } catch {
+    // Nothing stored
+  }
+}
@@ -18,6 +18,12 @@ export const supabase = createClient(supabaseUrl, supabaseAnonKey, {
   },
 });
 
+// For requests the client does not cover (resumable Storage uploads)
+export const SUPABASE_CONFIG = {
+  url: supabaseUrl,
+  anonKey: supabaseAnonKey,
+};
+
 // Vapi Configuration - Working credentials
 export const VAPI_CONFIG = {
   publicKey: 'ddd720c5-6fb8-4174-b7a6-729d7b308cb9',
@@ -1,88 +1,24 @@
-import { supabase } from './supabase';
+import { getSessionProfile } from './session-profile';
 
 export type UserTier = 'free' | 'professional' | 'pro' | 'promax';
 
 /**
- * Determines user's subscription tier based on payment history
+ * Determines user's subscription tier from their latest successful payment.
+ * The tier comes with the session profile (get_session_profile), so this
+ * usually answers from the cache AuthContext already filled.
  * @param userId - User ID to check
- * @returns 'free' (Starter), 'professional', or 'pro'
+ * @returns 'free' (Starter), 'professional', 'pro' or 'promax'
  */
 export async function getUserTier(userId: string): Promise<UserTier> {
-  // Retry logic with exponential backoff (3 attempts)
-  const maxRetries = 3;
-  let lastError: any = null;
-
-  for (let attempt = 0; attempt < maxRetries; attempt++) {
-    try {
-      // Check payments table for most recent successful payment
-      // Production schema uses 'status' column (not payment_status), and 'amount' to determine tier
-      // Use .maybeSingle() instead of .single() to handle no rows gracefully
-      const { data: payment, error } = await supabase
-        .from('payments')
-        .select('amount, status')
-        .eq('user_id', userId)
-        .eq('status', 'successful')
-        .order('created_at', { ascending: false })
-        .limit(1)
-        .maybeSingle();
-
-      // If query succeeds (even with no payment), process result
-      if (!error) {
-        if (!payment) {
-          // No successful payment found = free tier
-          return 'free';
-        }
-
-        // Map amount to tier (based on pricing structure)
-        const amount = payment.amount;
-
-        if (amount >= 180) {
-          return 'promax'; // $180+ = ProMax tier (gets Minimax TTS)
-        } else if (amount >= 80) {
-          return 'pro'; // $80+ = Pro tier (gets Minimax TTS)
-        } else if (amount >= 49) {
-          return 'professional'; // $49+ = Professional tier (Vapi default)
-        }
-
-        // Default to free for smaller amounts
-        return 'free';
-      }
-
-      // If error is 406 (Not Acceptable) or no rows found, retry with delay
-      // PostgrestError doesn't have status property, check code or message instead
-      const isRetryableError = error.code === 'PGRST116' || 
-                               error.message?.includes('406') ||
-                               error.message?.includes('Not Acceptable');
-      
-      if (isRetryableError) {
-        lastError = error;
-        if (attempt < maxRetries - 1) {
-          // Exponential backoff: 250ms, 500ms, 1000ms
-          await new Promise(resolve => setTimeout(resolve, 250 * Math.pow(2, attempt)));
-          continue;
-        }
-      }
-
-      // For other errors or final attempt, return free tier
-      if (import.meta.env.DEV) {
-        console.warn('Payment query error (non-critical, using free tier):', error.message);
-      }
-      return 'free';
-    } catch (error) {
-      lastError = error;
-      if (attempt < maxRetries - 1) {
-        // Exponential backoff
-        await new Promise(resolve => setTimeout(resolve, 250 * Math.pow(2, attempt)));
-        continue;
-      }
+  try {
+    const { tier } = await getSessionProfile(userId);
+    return tier;
+  } catch (error) {
+    if (import.meta.env.DEV) {
+      console.warn('Error determining user tier (using free tier):', error);
     }
+    return 'free';
   }
-
-  // After all retries failed, default to free tier
-  if (import.meta.env.DEV && lastError) {
-    console.warn('Error determining user tier after retries (using free tier):', lastError);
-  }
-  return 'free';
 }
 
 /**
@@ -0,0 +1,227 @@
+// Voice calls for the chat widget.
+//
+// Everything the voice mode needs (the Vapi SDK, the voice catalogue, the
+// microphone level meter and the visitor's assistant settings) lives here, and
+// AdvancedChatWidget imports this module only when a call is started. Visitors
+// who only type never download the vapi-vendor chunk.
+
+import Vapi from '@vapi-ai/web';
+import { VAPI_CONFIG, supabase } from './supabase';
+import { getVoiceById, DEFAULT_VOICE_ID } from '../config/vapiVoices';
+
+export interface VoiceAssistant {
+  id?: string;
+  business_name?: string;
+  system_prompt?: string;
+  vapi_voice_id?: string | null;
+  vapi_voice_provider?: string | null;
+}
+
+export interface VoiceCallEvents {
+  onCallStart: () => void;
+  onCallEnd: () => void;
+  onSpeechStart: () => void;
+  onSpeechEnd: () => void;
+  onMessage: (message: any) => void;
+  onError: (error: any) => void;
+  /** Microphone level, 0-100, once per animation frame during a call */
+  onAudioLevel: (level: number) => void;
+}
+
+const MAX_START_ATTEMPTS = 3;
+
+const DEFAULT_SYSTEM_PROMPT =
+  "You are Marcy, a professional AI receptionist for CallWaitingAI. Answer questions warmly and professionally. Keep responses concise and helpful.";
+
+export const voicePublicKey = () => import.meta.env.VITE_VAPI_PUBLIC_KEY || VAPI_CONFIG.publicKey;
+
+/**
+ * The signed-in user's assistant settings, or null to use the defaults
+ */
+export async function loadVoiceAssistant(userId: string | undefined): Promise<VoiceAssistant | null> {
+  if (!userId) return null;
+  try {
+    const { data, error } = await supabase
+      .from('assistants')
+      .select('id, business_name, system_prompt, vapi_voice_id, vapi_voice_provider')
+      .eq('user_id', userId)
+      .maybeSingle();
+
+    if (error && error.code !== 'PGRST116') {
+      if (import.meta.env.DEV) console.warn('⚠️ Could not load assistant config:', error);
+      return null;
+    }
+    if (data && import.meta.env.DEV) console.log('✅ Loaded assistant config from backend:', data.business_name);
+    return data;
+  } catch (err) {
+    if (import.meta.env.DEV) console.warn('⚠️ Error loading assistant:', err);
+    return null;
+  }
+}
+
+function voiceConfig(assistant: VoiceAssistant | null) {
+  if (assistant?.vapi_voice_id) {
+    const selectedVoice = getVoiceById(assistant.vapi_voice_id);
+    if (selectedVoice) {
+      if (import.meta.env.DEV) console.log('🎤 Using backend voice:', selectedVoice.name, `(${selectedVoice.provider})`);
+      return { provider: selectedVoice.provider, voiceId: selectedVoice.voiceId };
+    }
+    if (import.meta.env.DEV) console.warn('⚠️ Voice not found, using default');
+  }
+  // No (known) backend voice configured, use default Vapi native voice
+  const defaultVoice = getVoiceById(DEFAULT_VOICE_ID);
+  if (!assistant?.vapi_voice_id && import.meta.env.DEV) {
+    console.log('ℹ️ No backend voice configured, using default:', defaultVoice?.name || 'savannah');
+  }
+  return defaultVoice ? { provider: 'vapi', voiceId: defaultVoice.voiceId } : undefined;
+}
+
+/**
+ * Inline assistant configuration for vapi.start(), from the backend assistant
+ * config if available, otherwise from the defaults
+ */
+export function buildAssistantConfig(assistant: VoiceAssistant | null) {
+  const assistantName = assistant?.business_name || 'Marcy AI';
+  const config: any = {
+    name: assistantName,
+    model: {
+      provider: 'groq',
+      model: 'llama-3.3-70b-versatile',
+      messages: [
+        {
+          role: 'system',
+          content: assistant?.system_prompt || DEFAULT_SYSTEM_PROMPT,
+        },
+      ],
+      temperature: 0.7,
+      maxTokens: 500,
+    },
+    transcriber: {
+      provider: 'deepgram',
+      model: 'nova-2',
+      language: 'en-US',
+    },
+    firstMessage: `Hi! I'm ${assistantName.includes('AI') ? 'Marcy' : assistantName}, your AI assistant. How can I help you today?`,
+    silenceTimeoutSeconds: 30,
+    responseDelaySeconds: 0.4,
+    interruptionsEnabled: true,
+    backgroundSound: 'off',
+  };
+  const voice = voiceConfig(assistant);
+  if (voice) config.voice = voice;
+  return config;
+}
+
+const isConnectionError = (error: any) =>
+  error.message?.toLowerCase().includes('connection') ||
+  error.message?.toLowerCase().includes('network') ||
+  error.message?.toLowerCase().includes('timeout') ||
+  error.message?.toLowerCase().includes('meeting has ended') ||
+  error.type === 'daily-call-join-error';
+
+/**
+ * One Vapi client plus the microphone level meter. Create it once and reuse
+ * it for every call of the widget.
+ */
+export class VoiceCall {
+  private readonly client: Vapi;
+  private audioContext: AudioContext | null = null;
+  private analyser: AnalyserNode | null = null;
+  private animationFrame: number | undefined;
+
+  constructor(publicKey: string, private readonly events: VoiceCallEvents) {
+    if (import.meta.env.DEV) console.log('🚀 Initializing Vapi client...');
+    this.client = new Vapi(publicKey);
+
+    this.client.on('call-start', () => events.onCallStart());
+    this.client.on('call-end', () => {
+      this.stopAudioLevel();
+      events.onCallEnd();
+    });
+    this.client.on('speech-start', () => events.onSpeechStart());
+    this.client.on('speech-end', () => events.onSpeechEnd());
+    this.client.on('message', (message: any) => events.onMessage(message));
+    this.client.on('error', (error: any) => {
+      this.stopAudioLevel();
+      events.onError(error);
+    });
+  }
+
+  /** Ask for the microphone, start the level meter and start the call, retrying connection errors */
+  async start(assistant: VoiceAssistant | null) {
+    try {
+      if (import.meta.env.DEV) console.log('🎤 Requesting microphone permission...');
+      const stream = await navigator.mediaDevices.getUserMedia({
+        audio: {
+          echoCancellation: true,
+          noiseSuppression: true,
+          autoGainControl: true
+        }
+      });
+      if (import.meta.env.DEV) console.log('✅ Microphone permission granted');
+      this.startAudioLevel(stream);
+
+      if (import.meta.env.DEV) console.log('🎙️ Starting Vapi call with inline configuration...');
+      const assistantConfig = buildAssistantConfig(assistant);
+
+      for (let attempt = 0; attempt < MAX_START_ATTEMPTS; attempt++) {
+        try {
+          if (attempt > 0) {
+            if (import.meta.env.DEV) console.log(`🔄 Retry attempt ${attempt + 1}/${MAX_START_ATTEMPTS}...`);
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+          }
+          await this.client.start(assistantConfig);
+          if (import.meta.env.DEV) console.log('✅ Vapi call started successfully with inline configuration');
+          return;
+        } catch (startError: any) {
+          if (import.meta.env.DEV) console.error(`❌ Start attempt ${attempt + 1} failed:`, startError);
+          if (!isConnectionError(startError) || attempt === MAX_START_ATTEMPTS - 1) {
+            throw startError;
+          }
+        }
+      }
+    } catch (error) {
+      this.stopAudioLevel();
+      throw error;
+    }
+  }
+
+  stop() {
+    this.client.stop();
+    this.stopAudioLevel();
+  }
+
+  private startAudioLevel(stream: MediaStream) {
+    if (this.audioContext) return;
+    this.audioContext = new AudioContext();
+    const source = this.audioContext.createMediaStreamSource(stream);
+    this.analyser = this.audioContext.createAnalyser();
+    this.analyser.fftSize = 256;
+    source.connect(this.analyser);
+    this.updateAudioLevel();
+  }
+
+  private updateAudioLevel = () => {
+    if (!this.analyser) return;
+
+    const dataArray = new Uint8Array(this.analyser.frequencyBinCount);
+    this.analyser.getByteFrequencyData(dataArray);
+
+    const average = dataArray.reduce((a, b) => a + b) / dataArray.length;
+    this.events.onAudioLevel(Math.min(100, (average / 255) * 100 * 2));
+
+    this.animationFrame = requestAnimationFrame(this.updateAudioLevel);
+  };
+
+  private stopAudioLevel() {
+    if (this.animationFrame) {
+      cancelAnimationFrame(this.animationFrame);
+      this.animationFrame = undefined;
+    }
+    if (this.audioContext) {
+      this.audioContext.close();
+      this.audioContext = null;
+      this.analyser = null;
+    }
+  }
+}
@@ -1,6 +1,9 @@
 import { useState, useEffect } from 'react';
 import { Save, Upload, Play, Loader2, AlertCircle, CheckCircle, Volume2, FileText, Globe } from 'lucide-react';
 import { supabase } from '../lib/supabase';
+import {
+  saveKnowledgeBaseRows, uploadKey, uploadKnowledgeBaseFiles, type UploadedFile, type UploadProgress,
+} from '../lib/kb-upload';
 import { useAuth } from '../contexts/AuthContext';
 import { VoiceCallTester } from '../components/VoiceCallTester';
 import { ALL_VAPI_VOICES, DEFAULT_VOICE_ID, type VapiVoice } from '../config/vapiVoices';
@@ -69,6 +72,9 @@ const AgentSetup = () => {
   const [assistant, setAssistant] = useState<Assistant | null>(null);
   const [knowledgeBaseFiles, setKnowledgeBaseFiles] = useState<File[]>([]);
   const [uploadingKb, setUploadingKb] = useState(false);
+  const [uploadProgress, setUploadProgress] = useState<Record<string, UploadProgress>>({});
+  // In Storage, but their knowledge_base_files rows failed to save; the next upload saves them
+  const [unsavedUploads, setUnsavedUploads] = useState<UploadedFile[]>([]);
 
   // Voice call tester state
   const [showCallTester, setShowCallTester] = useState(false);
@@ -177,8 +183,13 @@ const AgentSetup = () => {
     }
   };
 
-  const handleKnowledgeBaseUpload = async () => {
-    if (knowledgeBaseFiles.length === 0) {
+  // `only` retries a single failed file; otherwise every file not yet uploaded goes
+  const handleKnowledgeBaseUpload = async (only?: File) => {
+    const pending = only
+      ? [only]
+      : knowledgeBaseFiles.filter((file) => uploadProgress[uploadKey(file)]?.status !== 'done');
+
+    if (pending.length === 0 && unsavedUploads.length === 0) {
       setMessage({ type: 'error', text: 'Please select files to upload' });
       return;
     }
@@ -230,34 +241,37 @@ const AgentSetup = () => {
         setMessage({ type: 'info', text: 'Agent saved. Uploading files...' });
       }
 
-      // Now upload files
-      for (const file of knowledgeBaseFiles) {
-        const fileExt = file.name.split('.').pop();
-        const fileName = `${currentAssistant.id}/${Date.now()}_${file.name}`;
-
-        // Upload to Supabase Storage
-        const { error: uploadError } = await supabase.storage
-          .from('knowledge-base')
-          .upload(fileName, file);
-
-        if (uploadError) throw uploadError;
-
-        // Save file reference to database
-        const { error: dbError } = await supabase
-          .from('knowledge_base_files')
-          .insert([{
-            assistant_id: currentAssistant.id,
-            file_name: file.name,
-            file_path: fileName,
-            file_type: fileExt,
-            file_size: file.size,
-          }]);
-
-        if (dbError) throw dbError;
+      // Upload a few files at a time, then record them all with one insert
+      const { uploaded, failed } = pending.length > 0
+        ? await uploadKnowledgeBaseFiles(currentAssistant.id, pending, (file, progress) =>
+          setUploadProgress((prev) => ({ ...prev, [uploadKey(file)]: progress })),
+        )
+        : { uploaded: [], failed: [] };
+
+      const toSave = [...unsavedUploads, ...uploaded];
+      if (toSave.length > 0) {
+        try {
+          await saveKnowledgeBaseRows(currentAssistant.id, toSave);
+        } catch (error: any) {
+          setUnsavedUploads(toSave);
+          throw new Error(
+            `${toSave.length} file(s) were uploaded but could not be saved (${error.message}). ` +
+            'Click Upload Files to try saving them again.',
+          );
+        }
+        setUnsavedUploads([]);
+        const done = new Set(toSave.map(({ file }) => file));
+        setKnowledgeBaseFiles((files) => files.filter((file) => !done.has(file)));
       }
 
-      setMessage({ type: 'success', text: `${knowledgeBaseFiles.length} file(s) uploaded successfully!` });
-      setKnowledgeBaseFiles([]);
+      if (failed.length > 0) {
+        setMessage({
+          type: 'error',
+          text: `${toSave.length} file(s) uploaded, ${failed.length} failed. Retry the failed files below.`,
+        });
+      } else {
+        setMessage({ type: 'success', text: `${toSave.length} file(s) uploaded successfully!` });
+      }
     } catch (error: any) {
       if (import.meta.env.DEV) console.error('Error uploading knowledge base:', error);
       setMessage({ type: 'error', text: error.message });
@@ -619,7 +633,10 @@ const AgentSetup = () => {
                   type="file"
                   multiple
                   accept=".pdf,.txt,.doc,.docx"
-                  onChange={(e) => setKnowledgeBaseFiles(Array.from(e.target.files || []))}
+                  onChange={(e) => {
+                    setKnowledgeBaseFiles(Array.from(e.target.files || []));
+                    setUploadProgress({});
+                  }}
                   className="block w-full text-sm text-gray-500 file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:text-sm file:font-semibold file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100"
                   aria-label="Upload knowledge base files"
                 />
@@ -629,16 +646,43 @@ const AgentSetup = () => {
                 <div className="space-y-2">
                   <p className="text-sm font-medium text-gray-700">Selected files:</p>
                   <ul className="text-sm text-gray-600 space-y-1">
-                    {knowledgeBaseFiles.map((file, index) => (
-                      <li key={index} className="flex items-center gap-2">
-                        <FileText className="w-4 h-4" />
-                        {file.name} ({(file.size / 1024).toFixed(1)} KB)
-                      </li>
-                    ))}
+                    {knowledgeBaseFiles.map((file) => {
+                      const progress = uploadProgress[uploadKey(file)];
+                      const percent = progress && file.size > 0 ? Math.round((progress.loaded / file.size) * 100) : 0;
+                      return (
+                        <li key={uploadKey(file)} className="space-y-1">
+                          <div className="flex items-center gap-2">
+                            <FileText className="w-4 h-4 flex-shrink-0" />
+                            <span className="truncate">{file.name} ({(file.size / 1024).toFixed(1)} KB)</span>
+                            {progress?.status === 'uploading' && (
+                              <span className="ml-auto text-xs text-blue-600">{percent}%</span>
+                            )}
+                            {progress?.status === 'done' && (
+                              <CheckCircle className="ml-auto w-4 h-4 text-green-600" />
+                            )}
+                            {progress?.status === 'failed' && (
+                              <button
+                                onClick={() => handleKnowledgeBaseUpload(file)}
+                                disabled={uploadingKb}
+                                className="ml-auto text-xs font-medium text-red-600 hover:text-red-700 disabled:opacity-50"
+                                title={progress.error}
+                              >
+                                Retry
+                              </button>
+                            )}
+                          </div>
+                          {progress?.status === 'uploading' && (
+                            <div className="h-1 bg-gray-200 rounded">
+                              <div className="h-1 bg-blue-600 rounded" style={{ width: `${percent}%` }} />
+                            </div>
+                          )}
+                        </li>
+                      );
+                    })}
                   </ul>
 
                   <button
-                    onClick={handleKnowledgeBaseUpload}
+                    onClick={() => handleKnowledgeBaseUpload()}
                     disabled={uploadingKb}
                     className="flex items-center gap-2 px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition-colors disabled:opacity-50"
                   >
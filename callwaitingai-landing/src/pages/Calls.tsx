@@ -1,49 +1,68 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useCallback } from 'react';
 import { supabase } from '../lib/supabase';
-import { Phone, Clock, User, Calendar, Check, X } from 'lucide-react';
+import { useKeysetPages } from '../hooks/use-keyset-pages';
+import { useVirtualRows } from '../hooks/use-virtual-rows';
+import { Phone, Clock, User, Calendar, Check, X, ChevronDown, ChevronRight } from 'lucide-react';
+
+// List columns only; transcript and metadata are loaded when a row is expanded
+const CALL_COLUMNS = 'id, caller_phone, call_type, duration_seconds, call_status, created_at';
+const ROW_HEIGHT = 57;
+const DETAILS_HEIGHT = 260;
+
+interface CallRow {
+  id: string;
+  caller_phone: string | null;
+  call_type: string;
+  duration_seconds: number | null;
+  call_status: string;
+  created_at: string;
+}
+
+interface CallDetails {
+  transcript: string | null;
+  metadata: Record<string, any> | null;
+}
 
 export function Calls() {
-  const [calls, setCalls] = useState<any[]>([]);
-  const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all');
+  const [expanded, setExpanded] = useState<string | null>(null);
+  const [details, setDetails] = useState<Record<string, CallDetails>>({});
+  const { rows: calls, loading, loadingMore, hasMore, loadMore } = useKeysetPages<CallRow>({
+    table: 'call_logs',
+    columns: CALL_COLUMNS,
+    filters: filter === 'all' ? {} : { call_status: filter },
+    realtimeChannel: 'call_logs_changes',
+  });
 
-  useEffect(() => {
-    loadCalls();
-
-    // Subscribe to real-time updates
-    const subscription = supabase
-      .channel('call_logs_changes')
-      .on('postgres_changes', {
-        event: '*',
-        schema: 'public',
-        table: 'call_logs'
-      }, () => {
-        loadCalls();
-      })
-      .subscribe();
+  const rowHeight = useCallback(
+    (index: number) => ROW_HEIGHT + (calls[index]?.id === expanded ? DETAILS_HEIGHT : 0),
+    [calls, expanded]
+  );
+  const { containerRef, onScroll, start, end, paddingTop, paddingBottom } = useVirtualRows({
+    count: calls.length,
+    rowHeight,
+    onEndReached: hasMore ? loadMore : undefined,
+  });
 
-    return () => {
-      subscription.unsubscribe();
-    };
-  }, [filter]);
+  async function toggleCall(callId: string) {
+    if (expanded === callId) {
+      setExpanded(null);
+      return;
+    }
+    setExpanded(callId);
+    if (details[callId]) return;
 
-  async function loadCalls() {
     try {
-      let query = supabase
+      const { data, error } = await supabase
         .from('call_logs')
-        .select('*')
-        .order('created_at', { ascending: false });
-
-      if (filter !== 'all') {
-        query = query.eq('call_status', filter);
-      }
+        .select('transcript, metadata')
+        .eq('id', callId)
+        .single();
 
-      const { data } = await query;
-      setCalls(data || []);
+      if (error) throw error;
+      setDetails((current) => ({ ...current, [callId]: data }));
     } catch (error) {
-      console.error('Error loading calls:', error);
-    } finally {
-      setLoading(false);
+      console.error('Error loading call details:', error);
     }
   }
 
@@ -92,10 +111,10 @@ export function Calls() {
       </div>
 
       {/* Calls Table */}
-      <div className="bg-white rounded-2xl shadow-premium overflow-hidden hover:shadow-premium-lg hover:-translate-y-2 transition-all duration-500">
-        <div className="overflow-x-auto">
+      <div className="bg-white rounded-2xl shadow-premium overflow-hidden hover:shadow-premium-lg transition-all duration-500">
+        <div ref={containerRef} onScroll={onScroll} className="overflow-auto max-h-[70vh]" data-testid="calls-scroll">
           <table className="min-w-full divide-y divide-gray-200">
-            <thead className="bg-gray-50">
+            <thead className="bg-gray-50 sticky top-0 z-10">
               <tr>
                 <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                   Caller
@@ -116,10 +135,20 @@ export function Calls() {
             </thead>
             <tbody className="bg-white divide-y divide-gray-200">
               {calls.length > 0 ? (
-                calls.map((call) => (
-                  <tr key={call.id} className="hover:bg-gray-50 transition-colors">
+                <>
+                {paddingTop > 0 && <tr style={{ height: paddingTop }} />}
+                {calls.slice(start, end).map((call) => (
+                  <React.Fragment key={call.id}>
+                  <tr
+                    onClick={() => toggleCall(call.id)}
+                    className="hover:bg-gray-50 transition-colors cursor-pointer"
+                    style={{ height: ROW_HEIGHT }}
+                  >
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
+                        {expanded === call.id
+                          ? <ChevronDown className="h-4 w-4 text-gray-400 mr-1" />
+                          : <ChevronRight className="h-4 w-4 text-gray-400 mr-1" />}
                         <User className="h-5 w-5 text-gray-400 mr-2" />
                         <span className="text-sm font-medium text-gray-900">
                           {call.caller_phone || 'Unknown'}
@@ -157,7 +186,38 @@ export function Calls() {
                       </div>
                     </td>
                   </tr>
-                ))
+                  {expanded === call.id && (
+                    <tr style={{ height: DETAILS_HEIGHT }} className="bg-gray-50">
+                      <td colSpan={5} className="px-6 py-4 align-top">
+                        {details[call.id] ? (
+                          <div className="h-56 overflow-y-auto space-y-3">
+                            <div>
+                              <h4 className="text-xs font-medium text-gray-500 uppercase tracking-wider mb-1">Transcript</h4>
+                              <p className="text-sm text-gray-700 whitespace-pre-wrap">
+                                {details[call.id].transcript || 'No transcript available'}
+                              </p>
+                            </div>
+                            {details[call.id].metadata && Object.keys(details[call.id].metadata!).length > 0 && (
+                              <div>
+                                <h4 className="text-xs font-medium text-gray-500 uppercase tracking-wider mb-1">Metadata</h4>
+                                <pre className="text-xs text-gray-600 whitespace-pre-wrap break-all">
+                                  {JSON.stringify(details[call.id].metadata, null, 2)}
+                                </pre>
+                              </div>
+                            )}
+                          </div>
+                        ) : (
+                          <div className="flex items-center justify-center h-56">
+                            <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-[#1E3A5F]"></div>
+                          </div>
+                        )}
+                      </td>
+                    </tr>
+                  )}
+                  </React.Fragment>
+                ))}
+                {paddingBottom > 0 && <tr style={{ height: paddingBottom }} />}
+                </>
               ) : (
                 <tr>
                   <td colSpan={5} className="px-6 py-12 text-center">
@@ -168,6 +228,11 @@ export function Calls() {
               )}
             </tbody>
           </table>
+          {loadingMore && (
+            <div className="flex justify-center py-4">
+              <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-[#1E3A5F]"></div>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -27,71 +27,20 @@ export function Dashboard() {
 
   async function loadDashboardData() {
     try {
-      // Fetch call logs
-      const { data: calls } = await supabase
-        .from('call_logs')
-        .select('*')
-        .order('created_at', { ascending: false })
-        .limit(10);
-
-      // Fetch leads
-      const { data: leads } = await supabase
-        .from('leads')
-        .select('*')
-        .order('created_at', { ascending: false })
-        .limit(10);
-
-      // Fetch payments - handle both 'status' and 'payment_status' columns
-      let payments: any[] = [];
-      try {
-        // Try with 'status' column first (production schema)
-        const { data: paymentsData, error: statusError } = await supabase
-          .from('payments')
-          .select('*')
-          .eq('status', 'successful');
-        
-        if (!statusError && paymentsData) {
-          payments = paymentsData;
-        } else if (statusError?.code === 'PGRST116' || statusError?.message?.includes('column')) {
-          // Fallback to 'payment_status' column if 'status' doesn't exist
-          const { data: paymentsData2, error: paymentStatusError } = await supabase
-            .from('payments')
-            .select('*')
-            .eq('payment_status', 'successful');
-
-          if (!paymentStatusError && paymentsData2) {
-            payments = paymentsData2;
-          } else {
-            if (import.meta.env.DEV) console.warn('Could not fetch payments:', paymentStatusError);
-          }
-        } else {
-          if (import.meta.env.DEV) console.warn('Could not fetch payments:', statusError);
-        }
-      } catch (error) {
-        if (import.meta.env.DEV) console.error('Error fetching payments:', error);
-      }
-
-      const totalRevenue = payments?.reduce((sum, p) => sum + Number(p.amount || 0), 0) || 0;
-
-      // Calculate stats
-      const now = new Date();
-      const thisMonth = now.getMonth();
-      const thisYear = now.getFullYear();
-      
-      const callsThisMonth = calls?.filter(call => {
-        const callDate = new Date(call.created_at);
-        return callDate.getMonth() === thisMonth && callDate.getFullYear() === thisYear;
-      }).length || 0;
+      // Stat cards and recent activity in one round trip; the totals are kept
+      // up to date by triggers (migration 20250203000000_dashboard_stats.sql)
+      const { data, error } = await supabase.rpc('get_dashboard_stats', { recent_limit: 5 });
+      if (error) throw error;
 
       setStats({
-        totalCalls: calls?.length || 0,
-        totalLeads: leads?.length || 0,
-        totalRevenue,
-        callsThisMonth,
+        totalCalls: Number(data?.totalCalls || 0),
+        totalLeads: Number(data?.totalLeads || 0),
+        totalRevenue: Number(data?.totalRevenue || 0),
+        callsThisMonth: Number(data?.callsThisMonth || 0),
       });
 
-      setRecentCalls(calls || []);
-      setRecentLeads(leads || []);
+      setRecentCalls(data?.recentCalls || []);
+      setRecentLeads(data?.recentLeads || []);
     } catch (error) {
       if (import.meta.env.DEV) console.error('Error loading dashboard data:', error);
     } finally {
@@ -108,14 +57,14 @@ export function Dashboard() {
 
   if (loading) {
     return (
-      <div className="flex items-center justify-center min-h-96">
+      <div className="flex items-center justify-center min-h-96" data-testid="dashboard">
         <div className="animate-spin rounded-full h-12 w-12 border-b-2 border-[#1E3A5F]"></div>
       </div>
     );
   }
 
   return (
-    <div className="space-y-6">
+    <div className="space-y-6" data-testid="dashboard">
       {/* Header */}
       <div>
         <h1 className="text-3xl font-bold text-gray-900">Dashboard</h1>
@@ -1,10 +1,43 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { supabase } from '../lib/supabase';
+import { useKeysetPages } from '../hooks/use-keyset-pages';
+import { useVirtualRows } from '../hooks/use-virtual-rows';
 import { Users, Mail, Phone as PhoneIcon, Building, Plus, X, Check, Clock } from 'lucide-react';
 
+// Everything the cards show; metadata stays on the server
+const LEAD_COLUMNS = 'id, full_name, source, status, email, phone_number, company_name, message, created_at';
+const CARD_HEIGHT = 260;
+const ROW_GAP = 24;
+
+interface LeadRow {
+  id: string;
+  full_name: string;
+  source: string;
+  status: string;
+  email: string | null;
+  phone_number: string | null;
+  company_name: string | null;
+  message: string | null;
+  created_at: string;
+}
+
+// Matches grid-cols-1 md:grid-cols-2 lg:grid-cols-3
+function useGridColumns() {
+  const getColumns = () =>
+    window.matchMedia('(min-width: 1024px)').matches ? 3 :
+    window.matchMedia('(min-width: 768px)').matches ? 2 : 1;
+  const [columns, setColumns] = useState(getColumns);
+
+  useEffect(() => {
+    const onResize = () => setColumns(getColumns());
+    window.addEventListener('resize', onResize);
+    return () => window.removeEventListener('resize', onResize);
+  }, []);
+
+  return columns;
+}
+
 export function Leads() {
-  const [leads, setLeads] = useState<any[]>([]);
-  const [loading, setLoading] = useState(true);
   const [showAddModal, setShowAddModal] = useState(false);
   const [newLead, setNewLead] = useState({
     full_name: '',
@@ -13,41 +46,21 @@ export function Leads() {
     company_name: '',
     message: '',
   });
+  const { rows: leads, loading, loadingMore, hasMore, loadMore, refresh, updateRow } = useKeysetPages<LeadRow>({
+    table: 'leads',
+    columns: LEAD_COLUMNS,
+    realtimeChannel: 'leads_changes',
+  });
 
-  useEffect(() => {
-    loadLeads();
-
-    // Subscribe to real-time updates
-    const subscription = supabase
-      .channel('leads_changes')
-      .on('postgres_changes', {
-        event: '*',
-        schema: 'public',
-        table: 'leads'
-      }, () => {
-        loadLeads();
-      })
-      .subscribe();
-
-    return () => {
-      subscription.unsubscribe();
-    };
-  }, []);
-
-  async function loadLeads() {
-    try {
-      const { data } = await supabase
-        .from('leads')
-        .select('*')
-        .order('created_at', { ascending: false });
-      
-      setLeads(data || []);
-    } catch (error) {
-      if (import.meta.env.DEV) console.error('Error loading leads:', error);
-    } finally {
-      setLoading(false);
-    }
-  }
+  const columns = useGridColumns();
+  const gridRows = Math.ceil(leads.length / columns);
+  const rowHeight = useCallback(() => CARD_HEIGHT + ROW_GAP, []);
+  const { containerRef, onScroll, start, end, paddingTop, paddingBottom } = useVirtualRows({
+    count: gridRows,
+    rowHeight,
+    onEndReached: hasMore ? loadMore : undefined,
+  });
+  const visibleLeads = leads.slice(start * columns, end * columns);
 
   async function handleAddLead(e: React.FormEvent) {
     e.preventDefault();
@@ -72,13 +85,15 @@ export function Leads() {
         message: '',
       });
 
-      loadLeads();
+      refresh();
     } catch (error) {
       if (import.meta.env.DEV) console.error('Error adding lead:', error);
     }
   }
 
   async function updateLeadStatus(leadId: string, newStatus: string) {
+    const previous = leads.find((lead) => lead.id === leadId)?.status;
+    updateRow(leadId, { status: newStatus });
     try {
       const { error } = await supabase
         .from('leads')
@@ -86,8 +101,8 @@ export function Leads() {
         .eq('id', leadId);
 
       if (error) throw error;
-      loadLeads();
     } catch (error) {
+      if (previous) updateRow(leadId, { status: previous });
       if (import.meta.env.DEV) console.error('Error updating lead:', error);
     }
   }
@@ -118,10 +133,18 @@ export function Leads() {
       </div>
 
       {/* Leads Grid */}
-      <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+      <div ref={containerRef} onScroll={onScroll} className="overflow-y-auto max-h-[75vh]" data-testid="leads-scroll">
+      <div
+        className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-x-6"
+        style={{ paddingTop, paddingBottom }}
+      >
         {leads.length > 0 ? (
-          leads.map((lead) => (
-            <div key={lead.id} className="bg-white rounded-2xl shadow-premium p-6 hover:shadow-premium-lg hover:-translate-y-2 transition-all duration-500">
+          visibleLeads.map((lead) => (
+            <div
+              key={lead.id}
+              className="bg-white rounded-2xl shadow-premium p-6 overflow-hidden hover:shadow-premium-lg transition-all duration-500"
+              style={{ height: CARD_HEIGHT, marginBottom: ROW_GAP }}
+            >
               <div className="flex items-start justify-between mb-4">
                 <div className="flex items-center gap-3">
                   <div className="p-2 bg-blue-100 rounded-full">
@@ -189,6 +212,12 @@ export function Leads() {
           </div>
         )}
       </div>
+      {loadingMore && (
+        <div className="flex justify-center py-4">
+          <div className="animate-spin rounded-full h-6 w-6 border-b-2 border-[#1E3A5F]"></div>
+        </div>
+      )}
+      </div>
 
       {/* Add Lead Modal */}
       {showAddModal && (
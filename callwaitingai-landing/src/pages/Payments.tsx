@@ -1,5 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
+import type { RealtimePostgresChangesPayload } from '@supabase/supabase-js';
 import { supabase } from '../lib/supabase';
+import { useAuth } from '../contexts/AuthContext';
+import { OrderedRows } from '../lib/ordered-rows';
+import { useRealtimeMerge } from '../hooks/use-realtime-merge';
 import { CreditCard, DollarSign, Calendar, Check, X, Clock } from 'lucide-react';
 
 export function Payments() {
@@ -8,40 +12,53 @@ export function Payments() {
   const [showCreateModal, setShowCreateModal] = useState(false);
   const [planType, setPlanType] = useState('basic');
   const [creatingPayment, setCreatingPayment] = useState(false);
+  const index = useRef(new OrderedRows<any>());
+  const paid = useRef(false);
+  const { refreshProfile } = useAuth();
 
-  useEffect(() => {
-    loadPayments();
-
-    const subscription = supabase
-      .channel('payments_changes')
-      .on('postgres_changes', {
-        event: '*',
-        schema: 'public',
-        table: 'payments'
-      }, () => {
-        loadPayments();
-      })
-      .subscribe();
-
-    return () => {
-      subscription.unsubscribe();
-    };
-  }, []);
-
-  async function loadPayments() {
+  const loadPayments = useCallback(async () => {
     try {
       const { data } = await supabase
         .from('payments')
         .select('*')
         .order('created_at', { ascending: false });
       
-      setPayments(data || []);
+      index.current.reset(data || []);
+      setPayments(index.current.toArray());
     } catch (error) {
       console.error('Error loading payments:', error);
     } finally {
       setLoading(false);
     }
-  }
+  }, []);
+
+  useEffect(() => {
+    loadPayments();
+  }, [loadPayments]);
+
+  // Apply change payloads in place; a debounced reload catches anything missed
+  useRealtimeMerge<any>({
+    channel: 'payments_changes',
+    table: 'payments',
+    apply: (change: RealtimePostgresChangesPayload<any>) => {
+      if (change.eventType === 'DELETE') {
+        index.current.remove(change.old.id);
+      } else {
+        index.current.upsert(change.new);
+        // Deployed projects name the column payment_status or status (see get_session_profile())
+        if ((change.new.payment_status ?? change.new.status) === 'successful') paid.current = true;
+      }
+    },
+    flush: () => {
+      setPayments(index.current.toArray());
+      // The cached session profile still has the tier from before the payment
+      if (paid.current) {
+        paid.current = false;
+        refreshProfile();
+      }
+    },
+    reconcile: loadPayments,
+  });
 
   async function createPaymentLink() {
     setCreatingPayment(true);
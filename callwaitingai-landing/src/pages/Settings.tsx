@@ -4,7 +4,7 @@ import { supabase } from '../lib/supabase';
 import { Settings as SettingsIcon, User, Bell, Key, Save } from 'lucide-react';
 
 export function Settings() {
-  const { user, userProfile } = useAuth();
+  const { user, userProfile, refreshProfile } = useAuth();
   const [profile, setProfile] = useState({
     full_name: '',
     company_name: '',
@@ -35,6 +35,7 @@ export function Settings() {
         .eq('id', user?.id);
 
       if (error) throw error;
+      await refreshProfile();
 
       setMessage('Profile updated successfully!');
       setTimeout(() => setMessage(''), 3000);
@@ -1,65 +1,48 @@
 import asyncio
-from playwright import async_api
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
+from harness.pool import run_standalone
+from harness.waits import act, open_app
+
+async def run_test(context):
+    # Open a new page in the browser context provided by the runner
+    page = await context.new_page()
     
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # --> Assertions to verify final state
-        try:
-            await expect(page.locator('text=Login Successful').first).to_be_visible(timeout=30000)
-        except AssertionError:
-            raise AssertionError('Test case failed: Login should fail with incorrect password and display an error message indicating invalid credentials, but the success message was found instead.')
-        await asyncio.sleep(5)
+    # Navigate to the app and wait for its initial Supabase traffic to settle
+    await open_app(page)
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+    # Interact with the page elements to simulate user flow
+    # -> Open the Sign In page from the navigation bar.
+    frame = context.pages[-1]
+    # Click on 'Sign In' link to access login page
+    elem = frame.locator('xpath=html/body/div/div/nav/div/div/div[3]/a').nth(0)
+    await act(elem, "click", route="**/login")
+
+
+    # -> Input the seeded user's email and an incorrect password.
+    frame = context.pages[-1]
+    # Input email for login
+    elem = frame.locator('xpath=html/body/div/div/div/div/form/div/input').nth(0)
+    await act(elem, "fill", 'registered_user@example.com')
+
+
+    frame = context.pages[-1]
+    # Input password for login
+    elem = frame.locator('xpath=html/body/div/div/div/div/form/div[2]/input').nth(0)
+    await act(elem, "fill", 'WrongPassword123!')
+
+
+    frame = context.pages[-1]
+    # Click the 'Sign In' button to submit login form
+    elem = frame.locator('xpath=html/body/div/div/div/div/form/button').nth(0)
+    await act(elem, "click")
+
+
+    # --> Assertions to verify final state
+    try:
+        await expect(page.locator('text=Login Successful').first).to_be_visible(timeout=30000)
+    except AssertionError:
+        raise AssertionError('Test case failed: Login should fail with incorrect password and display an error message indicating invalid credentials, but the success message was found instead.')
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test))
@@ -1,74 +1,70 @@
 import asyncio
-from playwright import async_api
+from datetime import datetime, timedelta, timezone
 from playwright.async_api import expect
 
-async def run_test():
-    pw = None
-    browser = None
-    context = None
-    
-    try:
-        # Start a Playwright session in asynchronous mode
-        pw = await async_api.async_playwright().start()
-        
-        # Launch a Chromium browser in headless mode with custom arguments
-        browser = await pw.chromium.launch(
-            headless=True,
-            args=[
-                "--window-size=1280,720",         # Set the browser window size
-                "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
-                "--ipc=host",                     # Use host-level IPC for better stability
-                "--single-process"                # Run the browser in a single process mode
-            ],
-        )
-        
-        # Create a new browser context (like an incognito window)
-        context = await browser.new_context()
-        context.set_default_timeout(5000)
-        
-        # Open a new page in the browser context
-        page = await context.new_page()
-        
-        # Navigate to your target URL and wait until the network request is committed
-        await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
-        
-        # Wait for the main page to reach DOMContentLoaded state (optional for stability)
-        try:
-            await page.wait_for_load_state("domcontentloaded", timeout=3000)
-        except async_api.Error:
-            pass
-        
-        # Iterate through all iframes and wait for them to load as well
-        for frame in page.frames:
-            try:
-                await frame.wait_for_load_state("domcontentloaded", timeout=3000)
-            except async_api.Error:
-                pass
-        
-        # Interact with the page elements to simulate user flow
-        # -> Find and click login or dashboard navigation to proceed to dashboard
-        await page.mouse.wheel(0, await page.evaluate('() => window.innerHeight'))
-        
+from harness.pool import run_standalone
+from harness.waits import open_app
+
+# Seeded user whose cached session the runner injects into the context
+LOGIN_AS = "registered"
+
+# What the seeded stand-in should make the stat cards show
+EXPECTED_CARDS = {
+    "Total Calls": "37",
+    "Total Leads": "23",
+    "Total Revenue": "$349.96",
+    "Calls This Month": "14",
+}
 
-        # -> Try to find login or dashboard navigation by scrolling or checking for hidden elements
-        await page.mouse.wheel(0, await page.evaluate('() => window.innerHeight'))
-        
+def seed(standin):
+    """14 calls this month and 23 in earlier months, 23 leads, and
+    $349.96 of successful payments next to pending and failed ones."""
+    now = datetime.now(timezone.utc)
+    earlier = now.replace(day=1) - timedelta(days=20)
+    standin.load("call_logs", [
+        {"caller_phone": f"+1555010{i:04d}", "call_status": "completed",
+         "created_at": (now - timedelta(seconds=i)).isoformat()}
+        for i in range(14)
+    ] + [
+        {"caller_phone": f"+1555020{i:04d}", "call_status": "completed",
+         "created_at": (earlier - timedelta(days=i * 10)).isoformat()}
+        for i in range(23)
+    ])
+    standin.load("leads", [
+        {"full_name": f"Seeded Lead {i}", "email": f"seeded{i}@example.com",
+         "created_at": (now - timedelta(hours=i)).isoformat()}
+        for i in range(23)
+    ])
+    standin.load("payments", [
+        {"amount": amount, "payment_status": status, "created_at": (now - timedelta(days=i)).isoformat()}
+        for i, (amount, status) in enumerate([
+            (49.99, "successful"), (49.99, "successful"), (49.99, "successful"),
+            (199.99, "successful"), (99.99, "pending"), (99.99, "pending"), (49.99, "failed"),
+        ])
+    ])
 
-        # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Dashboard Overview - Comprehensive Stats').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError('Test case failed: Dashboard did not render stats cards, charts, call logs, lead data, and payment history as expected based on the backend data.')
-        await asyncio.sleep(5)
+# Seed for the private stand-in the runner gives this case (harness/runner.py)
+SEED_STAND_IN = seed
+
+async def run_test(context):
+    # Open a new page in the browser context provided by the runner
+    page = await context.new_page()
+    
+    # Open /dashboard already signed in as the seeded registered user (cached storage state)
+    await open_app(page, "/dashboard")
     
-    finally:
-        if context:
-            await context.close()
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
-            
-asyncio.run(run_test())
-    
\ No newline at end of file
+    # Interact with the page elements to simulate user flow
+    # --> Assertions to verify final state
+    # (render time and query count are enforced by the budget steps in the test plan)
+    frame = context.pages[-1]
+    try:
+        await expect(frame.locator('text=Total Calls').first).to_be_visible(timeout=1000)
+        for label, value in EXPECTED_CARDS.items():
+            card_value = frame.locator(f'p:text-is("{label}")').locator("xpath=following-sibling::p[1]")
+            await expect(card_value).to_have_text(value, timeout=1000)
+        await expect(frame.locator('text=+15550100000').first).to_be_visible(timeout=1000)
+    except AssertionError:
+        raise AssertionError('Test case failed: Dashboard did not render stats cards, charts, call logs, lead data, and payment history as expected based on the backend data.')
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test, login_as=LOGIN_AS, seed_stand_in=SEED_STAND_IN))
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from playwright.async_api import expect
+
+from harness import metrics
+from harness.auth import SEED_USERS
+from harness.pool import run_standalone
+from harness.standin import CORS_HEADERS
+from harness.waits import act, open_app
+
+# Seeded user whose cached session the runner injects into the context
+LOGIN_AS = "registered"
+
+BUCKET = "knowledge-base"
+SMALL_FILES = 48
+# Over the 6 MB chunk size, so they go through the resumable endpoint in two chunks
+LARGE_FILES = 2
+LARGE_FILE_BYTES = 7 * 1024 * 1024
+# Round trip to Storage for every request; sequential uploads pay it 50+ times
+STORAGE_LATENCY_MS = 80
+UPLOAD_BUDGET_MS = 4000
+# Uploads the case fails once with 503: the client must retry (and resume) them
+FLAKY = {"faq-03.txt", "faq-17.txt", "pricing-00.pdf"}
+
+# The private stand-in, kept by seed() for the assertions
+STAND_IN = {}
+
+def seed(standin):
+    """An assistant for the registered user, so files upload without saving first."""
+    standin.latency_ms = max(standin.latency_ms, STORAGE_LATENCY_MS)
+    standin.load("assistants", [{
+        "user_id": standin.user_id(SEED_USERS[LOGIN_AS][0]),
+        "business_name": "Bulk Upload Dental",
+        "business_industry": "Healthcare",
+        "business_hours": "Monday-Friday 9AM-5PM",
+        "timezone": "America/New_York",
+        "system_prompt": "You are Marcy.",
+        "vapi_voice_id": None,
+        "vapi_voice_provider": "vapi",
+    }])
+    STAND_IN["standin"] = standin
+
+# Seed for the private stand-in the runner gives this case (harness/runner.py)
+SEED_STAND_IN = seed
+
+def files():
+    small = [
+        {"name": f"faq-{i:02d}.txt", "mimeType": "text/plain",
+         "buffer": (f"Question {i}: what are your opening hours?\n" * 1200).encode()}
+        for i in range(SMALL_FILES)
+    ]
+    large = [
+        {"name": f"pricing-{i:02d}.pdf", "mimeType": "application/pdf", "buffer": bytes([i]) * LARGE_FILE_BYTES}
+        for i in range(LARGE_FILES)
+    ]
+    return small + large
+
+async def fail_once(context):
+    """Answer the first upload request of every FLAKY file with 503."""
+    failed = set()
+
+    async def maybe_fail(route):
+        request = route.request
+        name = next((name for name in FLAKY if name in request.url), None)
+        if name is None and request.method == "PATCH":
+            # Resumable chunks are addressed by upload id; the pdf is the only flaky large file
+            name = "pricing-00.pdf" if request.post_data_buffer[:1] == b"\x00" else None
+        if name in failed or name is None or request.method not in ("POST", "PATCH"):
+            await route.fallback()
+            return
+        failed.add(name)
+        await route.fulfill(status=503, headers=CORS_HEADERS,
+                            json={"statusCode": "503", "error": "Unavailable", "message": "Try again"})
+
+    await context.route("**/storage/v1/**", maybe_fail)
+    return failed
+
+async def run_test(context):
+    # Open a new page in the browser context provided by the runner
+    page = await context.new_page()
+    failed = await fail_once(context)
+
+    # Open /agent-setup signed in as the seeded registered user
+    await open_app(page, "/agent-setup")
+    selected = files()
+    await page.locator("#knowledge-base-upload").set_input_files(selected)
+    await expect(page.locator(f"text={selected[-1]['name']}").first).to_be_visible(timeout=5000)
+
+    # Upload all 50 files and wait for the summary
+    started = time.perf_counter()
+    await act(page.locator("text=Upload Files").first, "click")
+    await expect(page.locator(f"text={len(selected)} file(s) uploaded successfully!").first).to_be_visible(
+        timeout=30000
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.record(context, f"upload {len(selected)} files", elapsed_ms)
+
+    # --> Assertions to verify final state
+    standin = STAND_IN.get("standin")
+    if standin is None:
+        # Without the runner's private stand-in there is nothing to inspect
+        return
+    objects = {path.split("_", 1)[1]: stored for (bucket, path), stored in standin.objects.items()
+               if bucket == BUCKET}
+    missing = sorted({f["name"] for f in selected} - set(objects))
+    assert not missing, f"Test case failed: {len(missing)} files never reached Storage, e.g. {missing[:3]}"
+    for f in selected:
+        assert objects[f["name"]].body == f["buffer"], f"Test case failed: {f['name']} was stored corrupted."
+    assert failed == FLAKY, f"Test case failed: injected failures hit {sorted(failed)} instead of {sorted(FLAKY)}"
+
+    rows = standin.tables["knowledge_base_files"]
+    assert len(rows) == len(selected), f"Test case failed: {len(rows)} file rows stored for {len(selected)} files."
+    inserts = standin.request_count(kind="rest", resource="knowledge_base_files", method="POST")
+    assert inserts == 1, f"Test case failed: file rows were stored with {inserts} inserts instead of one."
+    chunks = standin.request_count(kind="storage", method="PATCH")
+    assert chunks >= LARGE_FILES * 2, f"Test case failed: large files were sent in {chunks} chunks."
+    assert standin.request_count(kind="storage", method="HEAD") >= 1, (
+        "Test case failed: the failed chunk was not resumed from the stored offset."
+    )
+    assert elapsed_ms <= UPLOAD_BUDGET_MS, (
+        f"Test case failed: uploading {len(selected)} files took {elapsed_ms:.0f} ms, "
+        f"over the {UPLOAD_BUDGET_MS} ms budget."
+    )
+
+if __name__ == "__main__":
+    asyncio.run(run_standalone(run_test, login_as=LOGIN_AS, seed_stand_in=SEED_STAND_IN))
@@ -0,0 +1,6 @@
+"""Execution harness for the generated TestSprite cases.
+
+The TC*.py files only define ``run_test(context)``; everything that is shared
+across cases (browser lifecycle, scheduling, result reporting) lives here so
+the cases stay small and can be regenerated without touching the runner.
+"""
@@ -0,0 +1,134 @@
+"""Signed-in storage state for dashboard-level cases.
+
+Cases that only need to *be* logged in declare ``LOGIN_AS = "<role>"``. The
+runner signs that seeded user in once per run through the Supabase Auth REST
+API, writes the resulting Playwright storage state (the supabase-js session
+in localStorage) to tmp/auth/<role>.json, and starts the case's context from
+it. The file is reused across runs until the session is close to expiring.
+
+Only TC002/TC003 drive the real Sign In form.
+
+Either way, the Supabase requests the app makes before the Dashboard first
+renders (the session profile, plus the sign in itself for TC002) are recorded
+by harness.metrics as ``dashboardFirstPaint`` and printed next to the case
+result.
+"""
+
+import asyncio
+import json
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+
+from harness.config import BASE_URL, SUPABASE_ANON_KEY, SUPABASE_URL, TMP_DIR
+
+# Keep in sync with scripts/seed-test-users.ts
+SEED_USERS = {
+    "registered": ("registered_user@example.com", "TestPassword123!"),
+    "admin": ("admin_user@example.com", "AdminPassword123!"),
+    "telegram": ("telegram_user@example.com", "TelegramTest123!"),
+    "rbac": ("rbac_user@example.com", "RBACTest123!"),
+}
+
+STATE_DIR = TMP_DIR / "auth"
+
+# Refuse to reuse a session that expires within this many seconds
+EXPIRY_MARGIN_S = 300
+
+
+class AuthError(RuntimeError):
+    pass
+
+
+def storage_key(supabase_url=SUPABASE_URL):
+    """localStorage key supabase-js v2 uses for the persisted session."""
+    project_ref = urlparse(supabase_url).hostname.split(".")[0]
+    return f"sb-{project_ref}-auth-token"
+
+
+def password_grant(email, password, supabase_url=SUPABASE_URL, anon_key=SUPABASE_ANON_KEY):
+    """Exchange credentials for a session via GoTrue (blocking)."""
+    request = urllib.request.Request(
+        f"{supabase_url}/auth/v1/token?grant_type=password",
+        data=json.dumps({"email": email, "password": password}).encode(),
+        headers={"apikey": anon_key, "Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=15) as response:
+            session = json.load(response)
+    except urllib.error.HTTPError as exc:
+        raise AuthError(f"Sign in failed for {email}: HTTP {exc.code} {exc.read()[:200]!r}") from exc
+    session.setdefault("expires_at", int(time.time()) + int(session.get("expires_in", 3600)))
+    return session
+
+
+def storage_state_for(session, base_url=BASE_URL, supabase_url=SUPABASE_URL):
+    """Playwright storage state that restores ``session`` in the frontend."""
+    return {
+        "cookies": [],
+        "origins": [{
+            "origin": base_url,
+            "localStorage": [{"name": storage_key(supabase_url), "value": json.dumps(session)}],
+        }],
+    }
+
+
+def _expires_at(state):
+    for origin in state.get("origins", []):
+        for item in origin.get("localStorage", []):
+            if item["name"].endswith("-auth-token"):
+                return json.loads(item["value"]).get("expires_at", 0)
+    return 0
+
+
+class SessionCache:
+    """Per-run cache of storage states, backed by tmp/auth/<role>.json.
+
+    Concurrent cases asking for the same role share a single sign-in.
+    ``grant`` swaps the sign-in call (e.g. for the stand-in's); with
+    ``state_dir=None`` nothing is written to disk.
+    """
+
+    def __init__(self, state_dir=STATE_DIR, users=SEED_USERS, grant=password_grant):
+        self.state_dir = state_dir
+        self.users = users
+        self.grant = grant
+        self._states = {}
+        self._locks = {}
+
+    def _load(self, role):
+        if self.state_dir is None:
+            return None
+        path = self.state_dir / f"{role}.json"
+        try:
+            with open(path, encoding="utf-8") as fh:
+                state = json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if _expires_at(state) - EXPIRY_MARGIN_S <= time.time():
+            return None
+        return state
+
+    def _save(self, role, state):
+        if self.state_dir is None:
+            return
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.state_dir / f"{role}.json", "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+
+    async def storage_state(self, role):
+        """Return a valid storage state for ``role``, signing in if needed."""
+        if role not in self.users:
+            raise AuthError(f"Unknown seeded user role: {role!r}")
+        lock = self._locks.setdefault(role, asyncio.Lock())
+        async with lock:
+            state = self._states.get(role) or self._load(role)
+            if state is None or _expires_at(state) - EXPIRY_MARGIN_S <= time.time():
+                email, password = self.users[role]
+                session = await asyncio.to_thread(self.grant, email, password)
+                state = storage_state_for(session)
+                self._save(role, state)
+            self._states[role] = state
+            return state
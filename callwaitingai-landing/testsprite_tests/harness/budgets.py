@@ -0,0 +1,131 @@
+"""Performance budgets declared in testsprite_frontend_test_plan.json.
+
+Besides ``action`` and ``assertion`` steps a plan entry may contain
+``budget`` steps::
+
+    {
+      "type": "budget",
+      "description": "Dashboard renders stats within 1500 ms",
+      "metric": "step.durationMs",
+      "step": "open /dashboard",
+      "max": 1500
+    }
+
+``metric`` is one of:
+
+* ``durationMs``                       - wall time of the whole case
+* ``step.durationMs`` + ``step``       - a timed ``open_app()``/``act()`` step
+* ``navigation.<field>`` + ``path``    - ``ttfbMs``, ``domContentLoadedMs``
+                                         or ``lcpMs`` of a page opened with
+                                         ``open_app(page, path)``
+* ``supabase.<kind>.<field>``          - ``rest``/``functions`` request
+                                         ``count``, ``totalMs`` or response
+                                         body ``bytes``
+* ``jsHeapUsedBytes``
+* ``dashboardFirstPaint.<field>``      - ``supabaseRequests`` started, or
+                                         ``ms`` elapsed, before the Dashboard
+                                         first rendered
+
+A budget whose metric was not measured counts as exceeded. Unknown metrics,
+and ``step``/``path`` budgets without one, are rejected when the plan is
+loaded.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class Budget:
+    description: str
+    metric: str
+    max: float
+    step: str | None = None
+    path: str | None = None
+
+
+# Fields measure() can report, by metric prefix (see harness/metrics.py)
+FIELDS = {
+    "step": {"durationMs"},
+    "navigation": {"ttfbMs", "domContentLoadedMs", "lcpMs"},
+    "dashboardFirstPaint": {"supabaseRequests", "ms"},
+    "supabase": {f"{kind}.{field}" for kind in ("rest", "functions") for field in ("count", "totalMs", "bytes")},
+}
+
+
+def check(budget):
+    """Raise ValueError if ``budget`` names a metric measure() cannot report."""
+    if budget.metric in ("durationMs", "jsHeapUsedBytes"):
+        return
+    head, _, field = budget.metric.partition(".")
+    if field not in FIELDS.get(head, ()):
+        raise ValueError(f"Unknown budget metric: {budget.metric!r}")
+    if head == "step" and not budget.step:
+        raise ValueError(f"Budget {budget.description!r} on {budget.metric} needs a \"step\"")
+    if head == "navigation" and not budget.path:
+        raise ValueError(f"Budget {budget.description!r} on {budget.metric} needs a \"path\"")
+
+
+def budgets_for(plan_entry):
+    """The budget steps of one test plan entry, checked with check()."""
+    budgets = [
+        Budget(
+            description=step.get("description", step["metric"]),
+            metric=step["metric"],
+            max=step["max"],
+            step=step.get("step"),
+            path=step.get("path"),
+        )
+        for step in plan_entry.get("steps", [])
+        if step.get("type") == "budget"
+    ]
+    for budget in budgets:
+        check(budget)
+    return budgets
+
+
+def measure(budget, performance, duration_ms):
+    """Return the measured value for ``budget`` or None if it was not recorded."""
+    performance = performance or {}
+    head, _, field = budget.metric.partition(".")
+    if budget.metric == "durationMs":
+        return duration_ms
+    if budget.metric == "jsHeapUsedBytes":
+        return performance.get("jsHeapUsedBytes")
+    if head == "step":
+        # The last matching step wins, so repeated steps report their final run
+        values = [s[field] for s in performance.get("steps", []) if s["name"] == budget.step]
+        return values[-1] if values else None
+    if head == "navigation":
+        values = [n[field] for n in performance.get("navigations", []) if n["path"] == budget.path]
+        return values[-1] if values else None
+    if head == "dashboardFirstPaint":
+        return (performance.get("dashboardFirstPaint") or {}).get(field)
+    if head == "supabase":
+        kind, _, field = field.partition(".")
+        return performance.get("supabase", {}).get(kind, {}).get(field)
+    raise ValueError(f"Unknown budget metric: {budget.metric!r}")
+
+
+def evaluate(budgets, performance, duration_ms):
+    """Check every budget; returns one result dict per budget."""
+    results = []
+    for budget in budgets:
+        actual = measure(budget, performance, duration_ms)
+        results.append({
+            "description": budget.description,
+            "metric": budget.metric,
+            "max": budget.max,
+            "actual": actual,
+            "passed": actual is not None and actual <= budget.max,
+        })
+    return results
+
+
+def describe_violations(results):
+    """Human-readable failure message for the budgets that were exceeded."""
+    lines = [
+        f"- {r['description']}: "
+        + ("not measured" if r["actual"] is None else f"{r['actual']} > {r['max']}")
+        for r in results if not r["passed"]
+    ]
+    return "Performance budget exceeded:\n" + "\n".join(lines) if lines else None
@@ -0,0 +1,180 @@
+"""Recorded responses for the edge functions that wrap third-party APIs.
+
+groq-chat (Groq), minimax-tts (MiniMax), create-vapi-assistant (Vapi) and
+create-payment-link (Flutterwave) wait on vendors with timeouts of up to 30 s.
+A case lists the ones it exercises in ``RECORDED_FUNCTIONS``; the runner then
+answers ``<SUPABASE_URL>/functions/v1/<name>`` from fixtures/<version>/ through
+``context.route`` and the case measures only our rendering path.
+
+``manifest.json`` lists the fixtures in match order. A fixture matches when
+every string in its ``contains`` appears (case-insensitively) in the request
+body; one without ``contains`` is the fallback for its function. A response
+file holds ``status``, ``body``, the recorded ``timing`` (``firstByteMs``,
+``chunkMs``) and optionally:
+
+* ``stream``: text chunks, served as OpenAI-style SSE when the request asks
+  for ``"stream": true`` or ``Accept: text/event-stream``;
+* ``audio``: a file served from a fake Storage URL that replaces
+  ``{audio_url}`` in the body.
+
+Latency profiles in the manifest scale the recorded timing (``scale``), add
+random ``jitterMs`` or override it per function. ``route.fulfill`` sends a
+body in one piece, so a stream arrives complete after
+``firstByteMs + chunkMs * len(stream)``.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from harness.config import SUITE_DIR, SUPABASE_URL
+
+FIXTURES_DIR = SUITE_DIR / "fixtures"
+DEFAULT_VERSION = os.environ.get("TESTSPRITE_FIXTURES", "v1")
+DEFAULT_PROFILE = "instant"
+
+# Fake public Storage URL the recorded audio is served from
+AUDIO_PREFIX = f"{SUPABASE_URL}/storage/v1/object/public/tts-fixtures/"
+
+# Same as supabase/functions/_shared/cors.ts
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+}
+
+
+class FixtureError(RuntimeError):
+    pass
+
+
+@dataclass
+class Fixture:
+    function: str
+    name: str
+    status: int
+    body: dict
+    timing: dict = field(default_factory=dict)
+    contains: list = field(default_factory=list)
+    stream: list | None = None
+    audio: Path | None = None
+
+    def matches(self, function, request_text):
+        return function == self.function and all(
+            needle.lower() in request_text for needle in self.contains
+        )
+
+
+class FixtureStore:
+    """Fixtures of one version, replayed with one latency profile."""
+
+    def __init__(self, version=DEFAULT_VERSION, profile=DEFAULT_PROFILE, root=FIXTURES_DIR, seed=None):
+        self.root = Path(root) / version
+        try:
+            with open(self.root / "manifest.json", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError as exc:
+            raise FixtureError(f"No fixture store at {self.root}") from exc
+        if profile not in manifest["profiles"]:
+            raise FixtureError(
+                f"Unknown latency profile {profile!r} (have: {', '.join(manifest['profiles'])})"
+            )
+        self.version = version
+        self.profile = manifest["profiles"][profile]
+        self.fixtures = [self._load(entry) for entry in manifest["fixtures"]]
+        self.served = []
+        self._rng = random.Random(seed)
+
+    def _load(self, entry):
+        with open(self.root / entry["response"], encoding="utf-8") as fh:
+            response = json.load(fh)
+        return Fixture(
+            function=entry["function"],
+            name=entry["name"],
+            contains=entry.get("contains", []),
+            status=response.get("status", 200),
+            body=response["body"],
+            timing=response.get("timing", {}),
+            stream=response.get("stream"),
+            audio=self.root / response["audio"] if "audio" in response else None,
+        )
+
+    def find(self, function, request_text):
+        request_text = (request_text or "").lower()
+        for fixture in self.fixtures:
+            if fixture.matches(function, request_text):
+                return fixture
+        return None
+
+    def delay_ms(self, fixture, streaming=False):
+        timing = {**fixture.timing, **self.profile.get("functions", {}).get(fixture.function, {})}
+        delay = timing.get("firstByteMs", 0)
+        if streaming and fixture.stream:
+            delay += timing.get("chunkMs", 0) * len(fixture.stream)
+        delay *= self.profile.get("scale", 1)
+        if self.profile.get("jitterMs"):
+            delay += self._rng.uniform(0, self.profile["jitterMs"])
+        return delay
+
+    def render(self, fixture, streaming=False):
+        """``(status, headers, body)`` to fulfil a request with."""
+        if streaming and fixture.stream:
+            events = [
+                f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]})}\n\n"
+                for chunk in fixture.stream
+            ]
+            body = "".join(events) + "data: [DONE]\n\n"
+            return fixture.status, {**CORS_HEADERS, "Content-Type": "text/event-stream"}, body.encode()
+        body = json.dumps(fixture.body)
+        if fixture.audio is not None:
+            body = body.replace("{audio_url}", AUDIO_PREFIX + fixture.audio.name)
+        return fixture.status, {**CORS_HEADERS, "Content-Type": "application/json"}, body.encode()
+
+    async def attach(self, context, functions):
+        """Serve ``functions`` (edge function names) from fixtures in ``context``."""
+        unknown = set(functions) - {fixture.function for fixture in self.fixtures}
+        if unknown:
+            raise FixtureError(f"No {self.version} fixtures for: {', '.join(sorted(unknown))}")
+        names = "|".join(re.escape(name) for name in functions)
+        pattern = re.compile("^" + re.escape(SUPABASE_URL) + rf"/functions/v1/({names})(\?|$)")
+
+        async def fulfil(route):
+            request = route.request
+            if request.method == "OPTIONS":
+                await route.fulfill(status=200, headers=CORS_HEADERS, body="ok")
+                return
+            function = pattern.match(request.url).group(1)
+            text = request.post_data or ""
+            fixture = self.find(function, text)
+            if fixture is None:
+                await route.fulfill(
+                    status=501,
+                    headers={**CORS_HEADERS, "Content-Type": "application/json"},
+                    body=json.dumps({"error": f"no recorded {self.version} fixture for {function}"}),
+                )
+                return
+            accept = (await request.all_headers()).get("accept", "")
+            streaming = '"stream": true' in text or '"stream":true' in text or "text/event-stream" in accept
+            self.served.append((function, fixture.name))
+            await asyncio.sleep(self.delay_ms(fixture, streaming) / 1000)
+            status, headers, body = self.render(fixture, streaming)
+            await route.fulfill(status=status, headers=headers, body=body)
+
+        await context.route(pattern, fulfil)
+        audio = {fixture.audio.name: fixture.audio for fixture in self.fixtures if fixture.audio}
+        if audio:
+            async def serve_audio(route):
+                path = audio.get(route.request.url[len(AUDIO_PREFIX):].split("?")[0])
+                if path is None:
+                    await route.fulfill(status=404, body="")
+                    return
+                await route.fulfill(
+                    status=200,
+                    headers={**CORS_HEADERS, "Content-Type": "audio/mpeg"},
+                    body=path.read_bytes(),
+                )
+
+            await context.route(AUDIO_PREFIX + "**", serve_audio)
@@ -0,0 +1,241 @@
+"""Run history of the suite in a local SQLite database.
+
+The runner appends every run it writes to tmp/test_results.json to
+tmp/history.sqlite3 (git-ignored), one row per case keyed by the case's
+``testId``. The shard planner and the runner read it to start the slowest
+cases first, and the CLI reports on it::
+
+    python -m harness.history slowest             # median duration, slowest first
+    python -m harness.history trend TC008         # durations of the last runs
+    python -m harness.history flaky               # cases that flip between pass/fail
+    python -m harness.history regressions         # last run vs. the ones before it
+    python -m harness.history gate                # same, exit 1 on any regression (CI)
+"""
+
+import argparse
+import sqlite3
+import statistics
+import subprocess
+import sys
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+from harness.config import SUITE_DIR, TMP_DIR
+
+HISTORY_PATH = TMP_DIR / "history.sqlite3"
+
+# Number of recent runs the statistics look at
+DEFAULT_WINDOW = 10
+
+# Runs before the latest one that form a case's baseline, and the runs the
+# scheduler averages over
+BASELINE_RUNS = 5
+
+# A case regressed when it is this much slower than its baseline median...
+REGRESSION_RATIO = 0.2
+# ...and by at least this many milliseconds
+REGRESSION_MIN_MS = 500
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded TEXT NOT NULL,
+    source TEXT NOT NULL,
+    git_sha TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    title TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration_ms INTEGER,
+    finished TEXT,
+    error TEXT,
+    PRIMARY KEY (run_id, test_id)
+);
+CREATE INDEX IF NOT EXISTS results_by_test ON results (test_id, run_id);
+"""
+
+
+def git_sha():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SUITE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sparkline(values):
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return "".join(SPARK_BLOCKS[round((v - low) / span * (len(SPARK_BLOCKS) - 1))] for v in values)
+
+
+class History:
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def record_run(self, records, test_ids, source="runner"):
+        """Store one run; ``records`` are runner result records, ``test_ids`` maps code -> testId."""
+        recorded = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+        with closing(self._connect()) as db, db:
+            run_id = db.execute(
+                "INSERT INTO runs (recorded, source, git_sha) VALUES (?, ?, ?)",
+                (recorded, source, git_sha()),
+            ).lastrowid
+            db.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, test_ids[r["caseCode"]], r["caseCode"], r["title"], r["testStatus"],
+                     r["durationMs"], r["finished"], r["testError"])
+                    for r in records
+                ],
+            )
+        return run_id
+
+    def _recent(self, window=DEFAULT_WINDOW):
+        """``{test_id: [row, ...]}`` oldest first, at most ``window`` runs per case."""
+        with closing(self._connect()) as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                """
+                SELECT * FROM (
+                    SELECT results.*, ROW_NUMBER() OVER (
+                        PARTITION BY test_id ORDER BY run_id DESC
+                    ) AS age
+                    FROM results
+                ) WHERE age <= ? ORDER BY test_id, run_id
+                """,
+                (window,),
+            ).fetchall()
+        recent = {}
+        for row in rows:
+            recent.setdefault(row["test_id"], []).append(row)
+        return recent
+
+    def durations(self, window=BASELINE_RUNS):
+        """``{code: median durationMs}`` over the last ``window`` runs of each case."""
+        return {
+            rows[-1]["code"]: statistics.median(r["duration_ms"] for r in rows)
+            for rows in self._recent(window).values()
+        }
+
+    def slowest(self, window=DEFAULT_WINDOW, limit=None):
+        rows = [
+            {
+                "code": rows[-1]["code"],
+                "title": rows[-1]["title"],
+                "runs": len(rows),
+                "medianMs": round(statistics.median(r["duration_ms"] for r in rows)),
+                "maxMs": max(r["duration_ms"] for r in rows),
+            }
+            for rows in self._recent(window).values()
+        ]
+        rows.sort(key=lambda row: row["medianMs"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def trend(self, code=None, window=DEFAULT_WINDOW):
+        return {
+            rows[-1]["code"]: [r["duration_ms"] for r in rows]
+            for rows in self._recent(window).values()
+            if code is None or rows[-1]["code"] == code.upper()
+        }
+
+    def flakiness(self, window=DEFAULT_WINDOW):
+        """Per case: failure rate and flip rate (status changes between consecutive runs)."""
+        report = []
+        for rows in self._recent(window).values():
+            statuses = [r["status"] for r in rows]
+            flips = sum(a != b for a, b in zip(statuses, statuses[1:]))
+            report.append({
+                "code": rows[-1]["code"],
+                "runs": len(statuses),
+                "failRate": round(statuses.count("FAILED") / len(statuses), 2),
+                "flipRate": round(flips / (len(statuses) - 1), 2) if len(statuses) > 1 else 0.0,
+            })
+        report.sort(key=lambda row: (-row["flipRate"], -row["failRate"], row["code"]))
+        return report
+
+    def regressions(self, window=BASELINE_RUNS, ratio=REGRESSION_RATIO, min_ms=REGRESSION_MIN_MS):
+        """Cases in the latest run that newly failed or got slower than their recent median."""
+        recent = self._recent(window + 1)
+        last_run = max((rows[-1]["run_id"] for rows in recent.values()), default=None)
+        found = []
+        for rows in recent.values():
+            if len(rows) < 2 or rows[-1]["run_id"] != last_run:
+                continue
+            *previous, latest = rows
+            if latest["status"] == "FAILED" and previous[-1]["status"] == "PASSED":
+                found.append({"code": latest["code"], "kind": "status",
+                              "detail": "PASSED -> FAILED"})
+            baseline = statistics.median(r["duration_ms"] for r in previous)
+            delta = latest["duration_ms"] - baseline
+            if delta >= min_ms and delta >= baseline * ratio:
+                found.append({"code": latest["code"], "kind": "duration",
+                              "detail": f"{latest['duration_ms']} ms vs median {round(baseline)} ms"})
+        return sorted(found, key=lambda row: row["code"])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=HISTORY_PATH,
+                        help="history database (default: tmp/history.sqlite3)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="number of recent runs to consider")
+    commands = parser.add_subparsers(dest="command", required=True)
+    slowest = commands.add_parser("slowest", help="cases by median duration")
+    slowest.add_argument("--limit", type=int, default=None)
+    trend = commands.add_parser("trend", help="durations of recent runs")
+    trend.add_argument("code", nargs="?", help="a single TC code")
+    commands.add_parser("flaky", help="failure and flip rates")
+    for name in ("regressions", "gate"):
+        command = commands.add_parser(name, help="latest run vs. its predecessors"
+                                      + (" (exit 1 on any)" if name == "gate" else ""))
+        command.add_argument("--ratio", type=float, default=REGRESSION_RATIO,
+                             help="relative slowdown that counts as a regression")
+        command.add_argument("--min-ms", type=int, default=REGRESSION_MIN_MS,
+                             help="absolute slowdown that counts as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    history = History(args.db)
+
+    if args.command == "slowest":
+        print(f"{'case':<8}{'runs':>6}{'median ms':>12}{'max ms':>10}  title")
+        for row in history.slowest(args.window, args.limit):
+            print(f"{row['code']:<8}{row['runs']:>6}{row['medianMs']:>12}{row['maxMs']:>10}  {row['title']}")
+    elif args.command == "trend":
+        for code, values in sorted(history.trend(args.code, args.window).items()):
+            print(f"{code:<8}{sparkline(values)}  {' '.join(str(v) for v in values)}")
+    elif args.command == "flaky":
+        print(f"{'case':<8}{'runs':>6}{'fail rate':>11}{'flip rate':>11}")
+        for row in history.flakiness(args.window):
+            print(f"{row['code']:<8}{row['runs']:>6}{row['failRate']:>11.2f}{row['flipRate']:>11.2f}")
+    else:
+        found = history.regressions(ratio=args.ratio, min_ms=args.min_ms)
+        for row in found:
+            print(f"{row['code']:<8}{row['kind']:<10}{row['detail']}")
+        if not found:
+            print("No regressions in the latest run")
+        if args.command == "gate" and found:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Per-case timing and browser-side performance capture.
+
+The runner attaches a ``CaseMetrics`` to every context it creates. The wait
+helpers report each ``open_app()``/``act()`` call as a step, ``open_app()``
+also samples the navigation timings of the page it loaded, and every
+Supabase request made by the context is counted, with its response body size.
+The Supabase requests a page starts before the Dashboard first renders are
+reported as ``dashboardFirstPaint``: what signing in (or restoring a session)
+costs before the user sees anything. ``CaseMetrics.as_dict()`` is stored under
+``performance`` in tmp/test_results.json.
+"""
+
+import asyncio
+import re
+import time
+import weakref
+from contextlib import asynccontextmanager, nullcontext
+
+# Records the LCP candidate as soon as the document starts, so late samples
+# still see it (PerformanceObserver with buffered=true)
+LCP_INIT_SCRIPT = """
+(() => {
+  window.__testspriteLcp = null;
+  try {
+    new PerformanceObserver((list) => {
+      const entries = list.getEntries();
+      const last = entries[entries.length - 1];
+      if (last) window.__testspriteLcp = last.renderTime || last.startTime;
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+  } catch (e) {}
+})();
+"""
+
+# Lists the Supabase requests the page starts (by wrapping fetch, which
+# supabase-js resolves at client creation) until [data-testid="dashboard"] is
+# first in the DOM. The MutationObserver runs right after React commits, before
+# the Dashboard's effects start its own requests.
+FIRST_PAINT_INIT_SCRIPT = """
+(() => {
+  window.__testspriteFirstPaint = null;
+  const started = [];
+  const supabasePath = /\/(rest|auth|functions|storage)\/v1\/([^?]*)/;
+  const fetch = window.fetch;
+  window.fetch = function (input, init) {
+    const url = input instanceof Request ? input.url : String(input);
+    const match = supabasePath.exec(url);
+    if (match && !window.__testspriteFirstPaint) {
+      started.push(`${(init && init.method) || (input instanceof Request ? input.method : 'GET')} ${match[1]}/${match[2]}`);
+    }
+    return fetch.apply(this, arguments);
+  };
+  const observer = new MutationObserver(() => {
+    if (document.querySelector('[data-testid="dashboard"]')) {
+      window.__testspriteFirstPaint = { ms: performance.now(), requests: started.slice() };
+      observer.disconnect();
+    }
+  });
+  observer.observe(document, { childList: true, subtree: true });
+})();
+"""
+
+NAVIGATION_SNAPSHOT = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  return {
+    ttfbMs: nav ? nav.responseStart - nav.startTime : null,
+    domContentLoadedMs: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    lcpMs: window.__testspriteLcp,
+    jsHeapUsedBytes: performance.memory ? performance.memory.usedJSHeapSize : null,
+  };
+}
+"""
+
+# Supabase request classes reported separately
+SUPABASE_KINDS = {
+    "rest": re.compile(r"/rest/v1/"),
+    "functions": re.compile(r"/functions/v1/"),
+}
+
+_recorders = weakref.WeakKeyDictionary()
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+class CaseMetrics:
+    """Timings collected for one case running in one BrowserContext."""
+
+    def __init__(self):
+        self.steps = []
+        self.navigations = []
+        self.requests = {kind: {"count": 0, "totalMs": 0.0, "bytes": 0} for kind in SUPABASE_KINDS}
+        self.js_heap_used_bytes = None
+        self.dashboard_first_paint = None
+        self._body_reads = set()
+
+    async def attach(self, context):
+        _recorders[context] = self
+        await context.add_init_script(LCP_INIT_SCRIPT)
+        await context.add_init_script(FIRST_PAINT_INIT_SCRIPT)
+        context.on("requestfinished", self._on_request_finished)
+
+    def _on_request_finished(self, request):
+        for kind, pattern in SUPABASE_KINDS.items():
+            if pattern.search(request.url):
+                bucket = self.requests[kind]
+                bucket["count"] += 1
+                bucket["totalMs"] += max(request.timing.get("responseEnd", 0), 0)
+                task = asyncio.ensure_future(self._add_body_size(request, bucket))
+                self._body_reads.add(task)
+                task.add_done_callback(self._body_reads.discard)
+                break
+
+    async def _add_body_size(self, request, bucket):
+        try:
+            response = await request.response()
+            if response is not None:
+                bucket["bytes"] += len(await response.body())
+        except Exception:
+            pass  # page closed or body evicted; the count still stands
+
+    @asynccontextmanager
+    async def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append({
+                "name": name,
+                "durationMs": _round((time.perf_counter() - started) * 1000),
+            })
+
+    def record(self, name, duration_ms):
+        """Record a duration the case measured itself (e.g. time to first token)."""
+        self.steps.append({"name": name, "durationMs": _round(duration_ms)})
+
+    async def sample(self, page, label):
+        """Record the navigation timings of the document currently in ``page``."""
+        try:
+            snapshot = await page.evaluate(NAVIGATION_SNAPSHOT)
+        except Exception:
+            return
+        self.js_heap_used_bytes = snapshot.pop("jsHeapUsedBytes")
+        self.navigations.append({"path": label, **{k: _round(v) for k, v in snapshot.items()}})
+        await self.sample_first_paint(page)
+
+    async def sample_first_paint(self, page):
+        """Keep the first Dashboard render seen in ``page``, if there was one."""
+        if self.dashboard_first_paint is not None:
+            return
+        try:
+            first_paint = await page.evaluate("() => window.__testspriteFirstPaint")
+        except Exception:
+            return
+        if first_paint:
+            self.dashboard_first_paint = {
+                "ms": _round(first_paint["ms"]),
+                "supabaseRequests": len(first_paint["requests"]),
+                "requests": first_paint["requests"],
+            }
+
+    async def finish(self, context):
+        """Collect pending body sizes and take a last heap sample from the pages still open in ``context``."""
+        if self._body_reads:
+            await asyncio.gather(*self._body_reads)
+        for page in context.pages:
+            await self.sample_first_paint(page)
+            try:
+                heap = await page.evaluate(
+                    "() => performance.memory ? performance.memory.usedJSHeapSize : null"
+                )
+            except Exception:
+                continue
+            if heap is not None:
+                self.js_heap_used_bytes = heap
+
+    def as_dict(self):
+        return {
+            "steps": self.steps,
+            "navigations": self.navigations,
+            "supabase": {
+                kind: {"count": bucket["count"], "totalMs": _round(bucket["totalMs"]), "bytes": bucket["bytes"]}
+                for kind, bucket in self.requests.items()
+            },
+            "jsHeapUsedBytes": self.js_heap_used_bytes,
+            "dashboardFirstPaint": self.dashboard_first_paint,
+        }
+
+
+def recorder_for(page):
+    """The CaseMetrics of the context owning ``page``, or None outside the runner.
+
+    ``page`` may also be the BrowserContext itself, for cases that open no page.
+    """
+    return _recorders.get(getattr(page, "context", page))
+
+
+def step(page, name):
+    """Time ``name`` as a step of the current case (no-op without a recorder)."""
+    recorder = recorder_for(page)
+    return recorder.step(name) if recorder else nullcontext()
+
+
+def record(page, name, duration_ms):
+    """Store ``duration_ms`` as step ``name`` of the current case (no-op without a recorder)."""
+    recorder = recorder_for(page)
+    if recorder:
+        recorder.record(name, duration_ms)
@@ -0,0 +1,109 @@
+"""Shared Chromium pool for the testsprite_tests cases.
+
+Launching Chromium is the most expensive part of a generated case, so the pool
+starts a fixed number of browsers once per run and hands every case a fresh
+BrowserContext (an isolated, incognito-like profile) on one of them.
+"""
+
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+
+from playwright import async_api
+
+from harness.auth import SessionCache
+from harness.fixtures import FixtureStore
+from harness.standin import PostgrestStandIn
+
+# Same flags the generated cases used to pass, minus "--single-process":
+# a single-process Chromium cannot safely host several contexts at once.
+BROWSER_ARGS = [
+    "--window-size=1280,720",         # Set the browser window size
+    "--disable-dev-shm-usage",        # Avoid using /dev/shm which can cause issues in containers
+    "--ipc=host",                     # Use host-level IPC for better stability
+]
+
+# Default action timeout applied to every context handed out by the pool
+DEFAULT_TIMEOUT_MS = 5000
+
+
+class BrowserPool:
+    """A fixed set of Chromium instances shared by every case in a run.
+
+    Contexts are spread round-robin across the browsers; the number of
+    contexts alive at the same time is controlled by the caller (see
+    ``harness.runner``), not by the pool.
+    """
+
+    def __init__(self, browsers=1, headless=True):
+        if browsers < 1:
+            raise ValueError("browsers must be >= 1")
+        self.size = browsers
+        self.headless = headless
+        self._pw = None
+        self._browsers = []
+        self._cycle = None
+
+    async def start(self):
+        self._pw = await async_api.async_playwright().start()
+        self._browsers = await asyncio.gather(*(
+            self._pw.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+            for _ in range(self.size)
+        ))
+        self._cycle = itertools.cycle(self._browsers)
+        return self
+
+    async def close(self):
+        await asyncio.gather(
+            *(browser.close() for browser in self._browsers),
+            return_exceptions=True,
+        )
+        self._browsers = []
+        if self._pw:
+            await self._pw.stop()
+            self._pw = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @asynccontextmanager
+    async def context(self, **options):
+        """Yield a new BrowserContext and close it (and its pages) afterwards."""
+        if not self._browsers:
+            raise RuntimeError("BrowserPool.start() has not been called")
+        browser = next(self._cycle)
+        context = await browser.new_context(**options)
+        context.set_default_timeout(DEFAULT_TIMEOUT_MS)
+        try:
+            yield context
+        finally:
+            await context.close()
+
+
+async def run_standalone(run_test, login_as=None, recorded_functions=(), seed_stand_in=None):
+    """Run a single case on a private one-browser pool.
+
+    Used by the ``if __name__ == "__main__"`` block of each TC file so a case
+    can still be executed on its own with ``python TC001_....py``.
+    ``login_as``, ``recorded_functions`` and ``seed_stand_in`` mirror the case's
+    ``LOGIN_AS``, ``RECORDED_FUNCTIONS`` and ``SEED_STAND_IN`` settings.
+    """
+    standin = None
+    sessions = SessionCache()
+    if seed_stand_in is not None:
+        standin = PostgrestStandIn(seed=0)
+        seed_stand_in(standin)
+        sessions = SessionCache(state_dir=None, grant=standin.password_grant)
+    options = {}
+    if login_as:
+        options["storage_state"] = await sessions.storage_state(login_as)
+    async with BrowserPool() as pool:
+        async with pool.context(**options) as context:
+            if standin is not None:
+                await standin.attach(context)
+            if recorded_functions:
+                await FixtureStore().attach(context, recorded_functions)
+            await run_test(context)
@@ -0,0 +1,140 @@
+"""Stand-in for Supabase Realtime ``postgres_changes``.
+
+The browser's Realtime WebSocket (``<SUPABASE_URL>/realtime/v1/websocket``)
+is answered in-process through Playwright's ``context.route_web_socket()``.
+It speaks enough of the Phoenix channel protocol for supabase-js: joins
+with ``postgres_changes`` bindings, heartbeats and leaves, in both the
+object (``vsn=1.0.0``) and array (``vsn=2.0.0``) encodings. Every row the
+stand-in writes is published to matching bindings with the payload shape of
+the real server (``record`` / ``old_record`` / ``columns``; the old record
+only carries the primary key, as with the default replica identity).
+"""
+
+import itertools
+import json
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+
+def _column_type(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int8"
+    if isinstance(value, float):
+        return "float8"
+    if isinstance(value, (dict, list)):
+        return "jsonb"
+    return "text"
+
+
+def _matches(binding, table, event_type, record):
+    if binding.get("schema", "public") not in ("*", "public"):
+        return False
+    if binding.get("table") not in (None, "*", table):
+        return False
+    if binding.get("event", "*") not in ("*", event_type):
+        return False
+    # Realtime filters are a single ``column=op.value``; only eq is emulated
+    column, _, condition = (binding.get("filter") or "").partition("=")
+    if column and condition.startswith("eq."):
+        return str((record or {}).get(column)) == condition[3:]
+    return True
+
+
+class _Socket:
+    """One browser WebSocket and the channels joined on it."""
+
+    def __init__(self, route, server):
+        self.route = route
+        self.server = server
+        self.channels = {}  # topic -> (join_ref, bindings)
+        query = parse_qs(urlsplit(route.url).query)
+        self.arrays = query.get("vsn", ["1.0.0"])[0].startswith("2")
+
+    def send(self, topic, event, payload, ref=None, join_ref=None):
+        if self.arrays:
+            message = [join_ref, ref, topic, event, payload]
+        else:
+            message = {"topic": topic, "event": event, "payload": payload, "ref": ref}
+            if join_ref is not None:
+                message["join_ref"] = join_ref
+        self.route.send(json.dumps(message))
+        self.server.messages_sent += 1
+
+    def receive(self, raw):
+        message = json.loads(raw)
+        if isinstance(message, list):
+            join_ref, ref, topic, event, payload = message
+        else:
+            join_ref, ref = message.get("join_ref"), message.get("ref")
+            topic, event, payload = message["topic"], message["event"], message.get("payload") or {}
+
+        reply = {}
+        if event == "phx_join":
+            bindings = [
+                {**binding, "id": next(self.server.binding_ids)}
+                for binding in (payload.get("config") or {}).get("postgres_changes") or []
+            ]
+            self.channels[topic] = (join_ref or ref, bindings)
+            reply = {"postgres_changes": bindings}
+        elif event == "phx_leave":
+            self.channels.pop(topic, None)
+        elif event == "access_token":
+            return
+        if ref is not None:
+            self.send(topic, "phx_reply", {"status": "ok", "response": reply}, ref, join_ref)
+
+    def publish(self, table, event_type, data):
+        for topic, (join_ref, bindings) in self.channels.items():
+            ids = [b["id"] for b in bindings
+                   if _matches(b, table, event_type, data.get("record") or data.get("old_record"))]
+            if ids:
+                self.send(topic, "postgres_changes", {"ids": ids, "data": data}, join_ref=join_ref)
+
+
+class RealtimeStandIn:
+    """Fan row changes out to the Realtime channels of attached browser contexts."""
+
+    def __init__(self):
+        self.binding_ids = itertools.count(1)
+        self.messages_sent = 0
+        self._sockets = []
+
+    @property
+    def connections(self):
+        return len(self._sockets)
+
+    def publish(self, table, event_type, record=None, old_record=None):
+        """Send an ``INSERT``/``UPDATE``/``DELETE`` of ``table`` to every matching binding."""
+        if not self._sockets:
+            return
+        sample = record if record is not None else old_record
+        data = {
+            "schema": "public",
+            "table": table,
+            "commit_timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": event_type,
+            "columns": [{"name": name, "type": _column_type(value)} for name, value in sample.items()],
+            "errors": None,
+        }
+        if event_type in ("INSERT", "UPDATE"):
+            data["record"] = record
+        if event_type in ("UPDATE", "DELETE"):
+            data["old_record"] = {"id": (old_record or record)["id"]}
+        for socket in list(self._sockets):
+            socket.publish(table, event_type, data)
+
+    async def attach(self, context, supabase_url):
+        """Answer the Realtime WebSocket of ``context`` from this stand-in."""
+        ws_url = re.sub(r"^http", "ws", supabase_url)
+        pattern = re.compile("^" + re.escape(ws_url) + r"/realtime/v1/websocket")
+
+        def connect(route):
+            socket = _Socket(route, self)
+            self._sockets.append(socket)
+            route.on_message(socket.receive)
+            route.on_close(lambda code, reason: self._sockets.remove(socket))
+
+        await context.route_web_socket(pattern, connect)
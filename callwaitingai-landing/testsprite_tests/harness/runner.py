@@ -0,0 +1,447 @@
+"""Run the generated TC*.py cases concurrently on a shared browser pool.
+
+Usage (from the testsprite_tests directory)::
+
+    python -m harness.runner                      # every case, 4 workers
+    python -m harness.runner --workers 8 --browsers 2
+    python -m harness.runner TC002 TC008          # a subset
+    python -m harness.runner --stand-in --latency-ms 40   # offline, fake Supabase
+    python -m harness.runner --shards 16                  # 16 processes, balanced by history
+    python -m harness.runner --shards 16 --resume         # only unfinished/failed cases
+    python -m harness.runner --shard 2/4                  # this machine's quarter (CI)
+    python -m harness.runner --merge                      # fold shard logs into results
+
+Each case gets its own BrowserContext; ``--workers`` bounds how many cases run
+at once and ``--browsers`` how many Chromium processes they are spread over.
+Every finished case is appended to a JSONL log in ``--run-dir`` (see
+harness/shards.py); the logs are merged into tmp/test_results.json using the
+existing schema.
+``--stand-in`` answers Supabase REST/Auth requests from harness.standin instead
+of the live project; cases that define ``SEED_STAND_IN`` always get a private,
+seeded stand-in. Edge functions a case lists in ``RECORDED_FUNCTIONS`` are
+served from harness.fixtures unless ``--live-functions`` is given.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import sys
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from harness.auth import SessionCache
+from harness.budgets import budgets_for, describe_violations, evaluate
+from harness.config import SUITE_DIR, TMP_DIR
+from harness.fixtures import DEFAULT_PROFILE, DEFAULT_VERSION, FixtureStore
+from harness.history import History
+from harness.metrics import CaseMetrics
+from harness.pool import BrowserPool
+from harness.shards import (
+    ShardLog,
+    clear_logs,
+    completed_codes,
+    historical_durations,
+    parse_shard,
+    plan_shards,
+    read_logs,
+)
+from harness.standin import PostgrestStandIn
+
+PLAN_PATH = SUITE_DIR / "testsprite_frontend_test_plan.json"
+RESULTS_PATH = TMP_DIR / "test_results.json"
+RUN_DIR = TMP_DIR / "shards"
+
+DEFAULT_WORKERS = 4
+DEFAULT_CASE_TIMEOUT_S = 120
+
+
+@dataclass
+class Case:
+    code: str
+    title: str
+    description: str
+    path: Path
+    budgets: list = field(default_factory=list)
+
+
+@dataclass
+class CaseResult:
+    case: Case
+    status: str
+    error: str | None
+    duration_s: float
+    performance: dict | None = None
+    budgets: list = field(default_factory=list)
+
+
+def load_plan(path=PLAN_PATH):
+    """Return the test plan entries keyed by their TC code."""
+    with open(path, encoding="utf-8") as fh:
+        return {entry["id"]: entry for entry in json.load(fh)}
+
+
+def discover(selected=None, suite_dir=SUITE_DIR):
+    """Collect the TC*.py files, optionally restricted to the given codes."""
+    plan = load_plan()
+    wanted = {code.upper() for code in selected} if selected else None
+    cases = []
+    for path in sorted(suite_dir.glob("TC[0-9][0-9][0-9]_*.py")):
+        code = path.stem.split("_", 1)[0]
+        if wanted is not None and code not in wanted:
+            continue
+        entry = plan.get(code, {})
+        title = entry.get("title") or path.stem.split("_", 1)[1].replace("_", " ")
+        try:
+            budgets = budgets_for(entry)
+        except ValueError as exc:
+            raise SystemExit(f"{code} in {PLAN_PATH.name}: {exc}")
+        cases.append(Case(
+            code=code,
+            title=f"{code}-{title}",
+            description=entry.get("description", ""),
+            path=path,
+            budgets=budgets,
+        ))
+    if wanted is not None:
+        missing = wanted - {case.code for case in cases}
+        if missing:
+            raise SystemExit(f"Unknown test case(s): {', '.join(sorted(missing))}")
+    return cases
+
+
+def load_case_module(path):
+    """Import a TC file; it must define a ``run_test(context)`` coroutine."""
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def context_options(module, sessions):
+    """BrowserContext options a case asks for through module-level settings."""
+    options = {}
+    login_as = getattr(module, "LOGIN_AS", None)
+    if login_as:
+        options["storage_state"] = await sessions.storage_state(login_as)
+    return options
+
+
+def case_stand_in(module, shared=None):
+    """The stand-in a case runs against.
+
+    A case defining ``SEED_STAND_IN(standin)`` gets a private stand-in filled by
+    that function (with the latency of ``shared``), so large seeds never leak
+    into other cases. Other cases use ``shared``, which may be None.
+    """
+    seed = getattr(module, "SEED_STAND_IN", None)
+    if seed is None:
+        return shared
+    standin = PostgrestStandIn(
+        shared.latency_ms if shared else 0, shared.jitter_ms if shared else 0, seed=0
+    )
+    seed(standin)
+    return standin
+
+
+async def run_case(pool, case, semaphore, timeout_s, sessions, standin=None, fixtures=None):
+    async with semaphore:
+        started = time.perf_counter()
+        recorder = CaseMetrics()
+        try:
+            module = load_case_module(case.path)
+            own_standin = case_stand_in(module, standin)
+            if own_standin is not standin:
+                sessions = SessionCache(state_dir=None, grant=own_standin.password_grant)
+            options = await context_options(module, sessions)
+            async with pool.context(**options) as context:
+                if own_standin is not None:
+                    await own_standin.attach(context)
+                recorded = getattr(module, "RECORDED_FUNCTIONS", ())
+                if recorded and fixtures is not None:
+                    await fixtures.attach(context, recorded)
+                await recorder.attach(context)
+                try:
+                    await asyncio.wait_for(module.run_test(context), timeout=timeout_s)
+                finally:
+                    await recorder.finish(context)
+        except asyncio.TimeoutError:
+            status, error = "FAILED", f"Test case timed out after {timeout_s}s"
+        except AssertionError as exc:
+            status, error = "FAILED", str(exc)
+        except Exception:
+            status, error = "FAILED", traceback.format_exc(limit=3)
+        else:
+            status, error = "PASSED", None
+        duration = time.perf_counter() - started
+        performance = recorder.as_dict()
+        budgets = evaluate(case.budgets, performance, round(duration * 1000))
+        violations = describe_violations(budgets)
+        if violations:
+            status = "FAILED"
+            error = f"{error}\n{violations}" if error else violations
+        first_paint = performance.get("dashboardFirstPaint")
+        bootstrap = (
+            f", {first_paint['supabaseRequests']} Supabase requests before the Dashboard painted"
+            if first_paint else ""
+        )
+        print(f"[{status}] {case.title} ({duration:.1f}s{bootstrap})", flush=True)
+        return CaseResult(case=case, status=status, error=error, duration_s=duration,
+                          performance=performance, budgets=budgets)
+
+
+async def run_suite(cases, workers=DEFAULT_WORKERS, browsers=1, headless=True,
+                    timeout_s=DEFAULT_CASE_TIMEOUT_S, standin=None, fixtures=None, on_result=None):
+    """Run ``cases`` with at most ``workers`` contexts open at once.
+
+    With a ``standin``, sessions are issued by it and never cached on disk.
+    ``on_result`` is called with each CaseResult as soon as its case finishes.
+    """
+    semaphore = asyncio.Semaphore(max(1, workers))
+    if standin is None:
+        sessions = SessionCache()
+    else:
+        sessions = SessionCache(state_dir=None, grant=standin.password_grant)
+
+    async def run_and_report(pool, case):
+        result = await run_case(pool, case, semaphore, timeout_s, sessions, standin, fixtures)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    async with BrowserPool(browsers=min(browsers, max(1, workers)), headless=headless) as pool:
+        return await asyncio.gather(*(run_and_report(pool, case) for case in cases))
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def result_record(result):
+    """JSON-ready form of a CaseResult, as written to the shard logs."""
+    case = result.case
+    return {
+        "caseCode": case.code,
+        "title": case.title,
+        "description": case.description,
+        "path": case.path.name,
+        "testStatus": result.status,
+        "testError": result.error,
+        "durationMs": round(result.duration_s * 1000),
+        "performance": result.performance,
+        "budgets": result.budgets,
+        "finished": utc_now(),
+    }
+
+
+def load_results(path=RESULTS_PATH):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return []
+
+
+def write_results(records, path=RESULTS_PATH):
+    """Merge result records into test_results.json, keeping unrelated entries.
+
+    Returns ``{code: testId}`` for the written cases.
+    """
+    entries = load_results(path)
+    by_code = {entry["title"].split("-", 1)[0]: entry for entry in entries}
+    test_ids = {}
+    for record in records:
+        code = record["caseCode"]
+        entry = by_code.get(code)
+        if entry is None:
+            entry = {
+                "testId": str(uuid.uuid4()),
+                "title": record["title"],
+                "description": record["description"],
+                "testType": "FRONTEND",
+                "createFrom": "runner",
+                "created": record["finished"],
+            }
+            entries.append(entry)
+            by_code[code] = entry
+        entry["code"] = (SUITE_DIR / record["path"]).read_text(encoding="utf-8")
+        for key in ("testStatus", "testError", "durationMs", "performance", "budgets"):
+            entry[key] = record[key]
+        entry["modified"] = record["finished"]
+        test_ids[code] = entry["testId"]
+
+    entries.sort(key=lambda entry: entry["title"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(entries, fh, indent=2)
+        fh.write("\n")
+    return test_ids
+
+
+def expected_durations(history):
+    """Per-case duration estimates: recent history, else the last results file."""
+    return {**historical_durations(load_results()), **history.durations()}
+
+
+def save_run(records, history, source):
+    """Write records to test_results.json and append them to the history."""
+    records = list(records)
+    test_ids = write_results(records)
+    history.record_run(records, test_ids, source=source)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", help="TC codes to run (default: all)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="maximum number of cases running concurrently")
+    parser.add_argument("--browsers", type=int, default=1,
+                        help="number of Chromium instances shared by the workers")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_CASE_TIMEOUT_S,
+                        help="per-case timeout in seconds")
+    parser.add_argument("--headed", action="store_true", help="show the browser windows")
+    parser.add_argument("--no-write", action="store_true",
+                        help="do not update tmp/test_results.json")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="serve Supabase REST/Auth from the in-process stand-in")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="extra random latency (0..N ms) the stand-in adds")
+    parser.add_argument("--live-functions", action="store_true",
+                        help="call the real edge functions instead of recorded fixtures")
+    parser.add_argument("--fixtures", default=DEFAULT_VERSION,
+                        help="fixture store version under fixtures/ (default: %(default)s)")
+    parser.add_argument("--fixture-profile", default=DEFAULT_PROFILE,
+                        help="latency profile from the fixture manifest (default: %(default)s)")
+    sharding = parser.add_argument_group("sharding")
+    sharding.add_argument("--shards", type=int, default=1,
+                          help="split the cases over this many local processes")
+    sharding.add_argument("--shard", metavar="I/N",
+                          help="run only shard I of N (one per machine); does not write results")
+    sharding.add_argument("--resume", action="store_true",
+                          help="skip cases whose last logged status in --run-dir is PASSED")
+    sharding.add_argument("--merge", action="store_true",
+                          help="only merge the shard logs in --run-dir into tmp/test_results.json")
+    sharding.add_argument("--run-dir", type=Path, default=RUN_DIR,
+                          help="directory holding the per-shard JSONL logs (default: tmp/shards)")
+    sharding.add_argument("--shard-log", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def child_options(args):
+    """Command-line options forwarded to shard processes."""
+    options = [
+        "--workers", str(args.workers),
+        "--browsers", str(args.browsers),
+        "--timeout", str(args.timeout),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--fixtures", args.fixtures,
+        "--fixture-profile", args.fixture_profile,
+    ]
+    for flag in ("headed", "stand_in", "live_functions"):
+        if getattr(args, flag):
+            options.append("--" + flag.replace("_", "-"))
+    return options
+
+
+async def run_shard_processes(shards, args):
+    """Run each shard in its own ``python -m harness.runner`` process."""
+    processes = []
+    for index, shard in enumerate(shards):
+        if not shard:
+            continue
+        log_path = args.run_dir / f"shard-{index + 1}-of-{len(shards)}.jsonl"
+        processes.append(await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "harness.runner", *(case.code for case in shard),
+            "--shard-log", str(log_path), *child_options(args),
+            cwd=SUITE_DIR,
+        ))
+    return [await process.wait() for process in processes]
+
+
+def run_in_process(cases, args, log, durations):
+    standin = PostgrestStandIn(args.latency_ms, args.jitter_ms, seed=0) if args.stand_in else None
+    fixtures = None if args.live_functions else FixtureStore(args.fixtures, args.fixture_profile, seed=0)
+    # Slowest first, so the long cases do not start last
+    cases = sorted(cases, key=lambda case: durations.get(case.code, 0), reverse=True)
+    asyncio.run(run_suite(
+        cases,
+        workers=args.workers,
+        browsers=args.browsers,
+        headless=not args.headed,
+        timeout_s=args.timeout,
+        standin=standin,
+        fixtures=fixtures,
+        on_result=lambda result: log.append(result_record(result)),
+    ))
+
+
+def report(codes, run_dir):
+    """Print the outcome of ``codes`` from the logs; return the exit status."""
+    records = read_logs(run_dir)
+    passed = sum(records[code]["testStatus"] == "PASSED" for code in codes if code in records)
+    unfinished = sorted(code for code in codes if code not in records)
+    print(f"\n{passed}/{len(codes)} passed")
+    if unfinished:
+        print(f"Unfinished: {', '.join(unfinished)} (rerun with --resume)")
+    return 0 if passed == len(codes) else 1
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    history = History()
+    if args.merge:
+        records = read_logs(args.run_dir)
+        save_run(records.values(), history, source="merge")
+        return report(sorted(records), args.run_dir)
+
+    cases = discover(args.cases)
+    selected = [case.code for case in cases]
+    started = time.perf_counter()
+
+    durations = expected_durations(history)
+    if args.shard_log:
+        # Spawned by --shards: the parent cleared the logs and merges them
+        run_in_process(cases, args, ShardLog(args.shard_log), durations)
+        return 0
+
+    if args.shard:
+        # Plan over every selected case before dropping finished ones, so
+        # all machines agree on the split
+        index, count = parse_shard(args.shard)
+        cases = plan_shards(cases, count, durations)[index]
+        selected = [case.code for case in cases]
+        log = ShardLog(args.run_dir / f"shard-{index + 1}-of-{count}.jsonl")
+        if not args.resume:
+            log.path.unlink(missing_ok=True)
+    else:
+        log = ShardLog(args.run_dir / "shard-1-of-1.jsonl")
+        if not args.resume:
+            clear_logs(args.run_dir)
+
+    if args.resume:
+        done = completed_codes(args.run_dir)
+        cases = [case for case in cases if case.code not in done]
+        print(f"Resuming: {len(cases)} case(s) left to run", flush=True)
+
+    if args.shards > 1 and not args.shard:
+        shards = plan_shards(cases, args.shards, durations)
+        asyncio.run(run_shard_processes(shards, args))
+    elif cases:
+        run_in_process(cases, args, log, durations)
+
+    print(f"\nFinished in {time.perf_counter() - started:.1f}s")
+    if not args.no_write and not args.shard:
+        records = read_logs(args.run_dir)
+        save_run((records[code] for code in selected if code in records), history, source="runner")
+    return report(selected, args.run_dir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Sharded, resumable runs.
+
+Cases are split into N shards by historical duration (longest first, each
+onto the currently lightest shard) so the shards finish at about the same
+time. Every shard appends one JSON line per finished case to its own log in
+the run directory (tmp/shards/ by default), so an interrupted run loses at
+most the cases that were in flight. ``--resume`` skips every case whose
+latest logged status is PASSED, and merging folds the logs into
+tmp/test_results.json.
+"""
+
+import json
+import statistics
+from datetime import datetime
+
+# Assumed duration of a case with no history
+DEFAULT_DURATION_MS = 60_000
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def historical_durations(entries):
+    """``{code: durationMs}`` from test_results.json entries.
+
+    Entries written by the runner carry ``durationMs``; older TestSprite
+    entries only have ``created``/``modified``, which bracket the run.
+    """
+    durations = {}
+    for entry in entries:
+        code = entry["title"].split("-", 1)[0]
+        if entry.get("durationMs") is not None:
+            durations[code] = entry["durationMs"]
+        elif entry.get("created") and entry.get("modified"):
+            elapsed = _parse_time(entry["modified"]) - _parse_time(entry["created"])
+            durations[code] = max(0, round(elapsed.total_seconds() * 1000))
+    return durations
+
+
+def plan_shards(cases, count, durations):
+    """Split ``cases`` into ``count`` lists with balanced expected duration.
+
+    Deterministic for the same inputs, so separate machines running
+    ``--shard I/N`` agree on the split without talking to each other.
+    """
+    fallback = statistics.median(durations.values()) if durations else DEFAULT_DURATION_MS
+    expected = {case.code: durations.get(case.code, fallback) for case in cases}
+    shards = [[] for _ in range(max(1, count))]
+    loads = [0] * len(shards)
+    for case in sorted(cases, key=lambda case: (-expected[case.code], case.code)):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(case)
+        loads[lightest] += expected[case.code]
+    return shards
+
+
+def parse_shard(value):
+    """``"2/4"`` -> ``(1, 4)`` (zero-based index, count)."""
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"shard {value!r} is not of the form I/N with 1 <= I <= N")
+    return index - 1, count
+
+
+class ShardLog:
+    """Append-only JSONL log of one shard's finished cases."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, record):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+
+
+def read_logs(run_dir):
+    """Latest record per case code across every shard log in ``run_dir``."""
+    records = {}
+    for path in sorted(run_dir.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line cut short by an interrupted shard
+                previous = records.get(record["caseCode"])
+                if previous is None or record["finished"] >= previous["finished"]:
+                    records[record["caseCode"]] = record
+    return records
+
+
+def completed_codes(run_dir):
+    return {code for code, record in read_logs(run_dir).items() if record["testStatus"] == "PASSED"}
+
+
+def clear_logs(run_dir):
+    for path in run_dir.glob("*.jsonl"):
+        path.unlink()
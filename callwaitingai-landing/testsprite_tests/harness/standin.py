@@ -0,0 +1,885 @@
+"""In-process stand-in for the Supabase REST, Auth and Storage endpoints.
+
+It implements the subset of PostgREST and GoTrue that the frontend and
+the edge functions use, backed by plain Python lists, with configurable
+injected latency. Benchmarks then measure our code, not WAN jitter.
+
+* Browser cases: ``await standin.attach(context)`` routes every
+  ``<SUPABASE_URL>/rest/v1``, ``/auth/v1`` and ``/storage/v1`` request of the context to
+  ``handle()`` without leaving the process
+  (``python -m harness.runner --stand-in``); row changes are pushed to the
+  context's Realtime channels by harness.realtime.
+* Edge functions / load tools: ``await standin.serve()`` exposes the same
+  handler over HTTP (needs ``aiohttp``); point ``SUPABASE_URL`` at ``standin.url``.
+
+Supported PostgREST features: ``select`` column lists, ``eq``/``neq``/``gt``/
+``gte``/``lt``/``lte``/``in``/``is`` filters on columns and JSON paths
+(``metadata->>session_id``), ``order``, ``limit``/``offset``/``Range``,
+``Prefer: return=representation``, ``count=exact`` and
+``resolution=merge-duplicates`` upserts, single-object responses, and
+``/rpc/<name>`` for the SQL functions mirrored at the end of this module
+or registered with ``@standin.rpc``. The AFTER INSERT triggers mirrored
+there run on every insert except ``load()``.
+
+Supported Storage features: object uploads (``POST``/``PUT
+/storage/v1/object/<bucket>/<path>``, ``x-upsert``) and resumable TUS
+uploads (``/storage/v1/upload/resumable``: create, ``HEAD`` for the offset,
+``PATCH`` chunks). Uploaded objects are kept in ``standin.objects``; buckets
+and storage policies are not modelled beyond requiring a user session.
+"""
+
+import asyncio
+import base64
+import copy
+import functools
+import hashlib
+import hmac
+import json
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from harness.auth import SEED_USERS
+from harness.config import SUPABASE_URL
+from harness.realtime import RealtimeStandIn
+
+JWT_SECRET = b"testsprite-stand-in"
+SERVICE_ROLE_KEY = "stand-in-service-role-key"
+SESSION_TTL_S = 3600
+
+# claim_webhook_events hands out events again after this long
+CLAIM_TIMEOUT_S = 300
+# ... and claim_notifications alerts
+NOTIFICATION_CLAIM_TIMEOUT_S = 120
+
+# Roles of the seeded users (scripts/seed-test-users.ts)
+SEED_ROLES = {"admin": "admin"}
+
+# Column defaults applied on insert, mirroring the migrations
+TABLE_DEFAULTS = {
+    "leads": {"source": "website", "status": "new", "metadata": {}},
+    "call_logs": {"call_status": "initiated", "call_type": "inbound", "metadata": {}},
+    "webhook_events": {"source": "vapi", "processed": False, "error_message": None},
+    "payments": {"currency": "USD", "payment_status": "pending", "metadata": {}},
+    "chat_messages": {"message_type": "text", "metadata": {}},
+    "notification_outbox": {"kind": "new_lead", "chat_id": None, "lead_id": None, "message": None,
+                            "attempts": 0, "claimed_at": None, "sent_at": None, "failed_at": None,
+                            "last_error": None, "telegram_message_id": None},
+}
+
+# Primary keys other than ``id``
+PRIMARY_KEYS = {
+    "tts_cache": ("key",),
+    "dashboard_stats": ("month", "slot"),
+    "chat_sessions": ("session_id",),
+    "faq_answer_cache": ("fingerprint", "question"),
+}
+
+# Unique constraints enforced on insert besides the primary key. Only those the
+# current migrations create (not the old/ schemas, which deployments may lack):
+# an ``on_conflict`` naming any other column set is refused, as Postgres does.
+UNIQUE_COLUMNS = {
+    "call_logs": ("vapi_call_id",),  # 20250201000000_webhook_event_queue.sql
+    "leads": ("vapi_call_id",),      # 20250201000000_webhook_event_queue.sql
+    "users": ("email",),             # 20250131000000_fix_auth_signup.sql
+}
+
+# Identity columns filled from a per-table counter
+IDENTITY_COLUMNS = {"webhook_events": "seq", "notification_outbox": "id"}
+
+# SQL functions and AFTER INSERT triggers mirrored in Python, see the end of
+# this module
+BUILTIN_RPCS = {}
+BUILTIN_TRIGGERS = defaultdict(list)
+
+
+def builtin_rpc(name):
+    def register(fn):
+        BUILTIN_RPCS[name] = fn
+        return fn
+    return register
+
+
+def builtin_trigger(table):
+    """Register ``fn(standin, record)`` to run after each row inserted into ``table``."""
+    def register(fn):
+        BUILTIN_TRIGGERS[table].append(fn)
+        return fn
+    return register
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, prefer, range, accept-profile, content-profile, x-supabase-api-version, x-upsert, tus-resumable, upload-length, upload-metadata, upload-offset",
+    "Access-Control-Allow-Methods": "GET, HEAD, POST, PATCH, PUT, DELETE, OPTIONS",
+    "Access-Control-Expose-Headers": "Content-Range, X-Total-Count, Location, Tus-Resumable, Upload-Offset, Upload-Length",
+}
+
+_JSON_PATH = re.compile(r"(->>|->)")
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_LOGIC_PARAMS = {"or", "and", "not.or", "not.and"}
+
+
+@dataclass
+class StandInResponse:
+    status: int
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+
+
+@dataclass
+class LoggedRequest:
+    method: str
+    kind: str          # "rest", "rpc", "auth" or "storage"
+    resource: str      # table, function, auth endpoint or storage bucket name
+    client: str | None # "sub" of the bearer token, if it was a user session
+    at: float
+
+
+@dataclass
+class StoredObject:
+    body: bytes
+    content_type: str
+    owner: str | None
+
+
+@dataclass
+class TusUpload:
+    bucket: str
+    path: str
+    content_type: str
+    length: int
+    upsert: bool
+    owner: str | None
+    data: bytearray = field(default_factory=bytearray)
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_jwt(claims, secret=JWT_SECRET):
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps(claims).encode())
+    signature = hmac.new(secret, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64(signature)}"
+
+
+def read_jwt(token):
+    """Claims of a token issued by the stand-in, or None."""
+    try:
+        header, payload, signature = token.split(".")
+        expected = hmac.new(JWT_SECRET, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(_b64(expected), signature):
+            return None
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (ValueError, json.JSONDecodeError):
+        return None
+
+
+def _text(value):
+    """PostgREST's text rendering of a stored value, used for comparisons."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+@functools.lru_cache(maxsize=None)
+def _path(column):
+    parts = _JSON_PATH.split(column)
+    return parts[0].strip(), tuple(zip(parts[1::2], (key.strip() for key in parts[2::2])))
+
+
+def resolve(row, column):
+    """Value of ``column`` in ``row``; supports ``a->b->>c`` JSON paths."""
+    name, steps = _path(column)
+    value = row.get(name)
+    for op, key in steps:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+        if op == "->>" and value is not None and not isinstance(value, str):
+            value = _text(value)
+    return value
+
+
+def _compare(actual, expected, op):
+    if actual is None:
+        return False
+    try:
+        a, b = float(actual), float(expected)
+    except (TypeError, ValueError):
+        a, b = _text(actual), expected
+    return {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}[op]
+
+
+def make_filter(column, expression):
+    """Build a row predicate from one PostgREST ``column=op.value`` pair."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    if op != "in" and len(raw) > 1 and raw[0] == raw[-1] == '"':
+        raw = raw[1:-1]
+
+    if op == "eq":
+        test = lambda row: _text(resolve(row, column)) == raw
+    elif op == "neq":
+        test = lambda row: _text(resolve(row, column)) not in (None, raw)
+    elif op in ("gt", "gte", "lt", "lte"):
+        test = lambda row: _compare(resolve(row, column), raw, op)
+    elif op == "in":
+        options = {item.strip().strip('"') for item in raw.strip("()").split(",")}
+        test = lambda row: _text(resolve(row, column)) in options
+    elif op == "is":
+        wanted = {"null": None, "true": True, "false": False}[raw.lower()]
+        test = lambda row: resolve(row, column) is wanted
+    elif op in ("like", "ilike"):
+        pattern = re.compile(
+            "^" + re.escape(raw).replace(r"\*", ".*").replace("%", ".*") + "$",
+            re.IGNORECASE if op == "ilike" else 0,
+        )
+        test = lambda row: (_text(resolve(row, column)) or "") and bool(pattern.match(_text(resolve(row, column))))
+    else:
+        raise PostgrestError(400, "PGRST100", f"unsupported operator {op!r}")
+    return (lambda row: not test(row)) if negate else test
+
+
+def _split_terms(text):
+    """Split ``a.eq.1,and(b.eq.2,c.lt.3)`` on the commas outside parentheses and quotes."""
+    terms, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            terms.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        terms.append(current)
+    return terms
+
+
+def make_logic_filter(operator, expression):
+    """Build a predicate from ``or=(...)`` / ``and=(...)`` (optionally ``not.``-prefixed, nested)."""
+    negate = operator.startswith("not.")
+    operator = operator[4:] if negate else operator
+    tests = []
+    for term in _split_terms(expression.strip()[1:-1]):
+        head, _, rest = term.partition("(")
+        if rest and head in ("or", "and", "not.or", "not.and"):
+            tests.append(make_logic_filter(head, "(" + rest))
+        else:
+            column, _, condition = term.partition(".")
+            tests.append(make_filter(column, condition))
+    combine = any if operator == "or" else all
+    test = lambda row: combine(t(row) for t in tests)
+    return (lambda row: not test(row)) if negate else test
+
+
+def _sort_key(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, _text(value) or "")
+
+
+def apply_order(rows, order):
+    for term in reversed([t for t in order.split(",") if t]):
+        column, *modifiers = term.split(".")
+        descending = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (descending and "nullslast" not in modifiers)
+        keyed = [(resolve(r, column), r) for r in rows]
+        present = [(value, r) for value, r in keyed if value is not None]
+        missing = [r for value, r in keyed if value is None]
+        present.sort(key=lambda pair: _sort_key(pair[0]), reverse=descending)
+        present = [r for _, r in present]
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def project(row, select):
+    if not select or select.strip() == "*":
+        return copy.deepcopy(row)
+    out = {}
+    for item in select.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        alias, _, column = item.rpartition(":")
+        column = column.split("::")[0]
+        out[alias or _JSON_PATH.split(column)[-1].strip()] = copy.deepcopy(resolve(row, column))
+    return out
+
+
+def _prefer(headers):
+    values = {}
+    for part in headers.get("prefer", "").split(","):
+        key, _, value = part.strip().partition("=")
+        if key:
+            values[key] = value
+    return values
+
+
+class PostgrestStandIn:
+    """Fake Supabase project holding tables in memory.
+
+    ``latency_ms`` (plus up to ``jitter_ms``) is awaited before every request
+    to model the round trip to the real project.
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, seed=None, users=SEED_USERS,
+                 supabase_url=SUPABASE_URL):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.supabase_url = supabase_url
+        self.tables = defaultdict(list)
+        self.objects = {}  # (bucket, path) -> StoredObject
+        self._tus_uploads = {}
+        self.requests = []
+        self.url = None
+        self._rpcs = dict(BUILTIN_RPCS)
+        self._identity = defaultdict(int)
+        self._accounts = {}
+        self._refresh_tokens = {}
+        self._rng = random.Random(seed)
+        self._runner = None
+        self.realtime = RealtimeStandIn()
+        for role, (email, password) in users.items():
+            self.add_user(email, password, role=SEED_ROLES.get(role, "client"),
+                          full_name=f"{role.title()} Test User")
+
+    # -- data ------------------------------------------------------------
+
+    def add_user(self, email, password, role="client", full_name=""):
+        """Create an auth account plus its ``users`` profile row."""
+        user_id = str(uuid.uuid4())
+        self._accounts[email] = {"password": password, "id": user_id,
+                                 "metadata": {"full_name": full_name}}
+        self.insert("users", {"id": user_id, "email": email, "full_name": full_name,
+                              "role": role, "is_active": True})
+        return user_id
+
+    def user_id(self, email):
+        return self._accounts[email]["id"]
+
+    def insert(self, table, rows, on_conflict=None, merge=False, ignore=False):
+        """Insert one row or a list of rows, returning the stored copies."""
+        stored = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            record = {**TABLE_DEFAULTS.get(table, {}), **row}
+            if table in IDENTITY_COLUMNS and IDENTITY_COLUMNS[table] not in record:
+                self._identity[table] += 1
+                record[IDENTITY_COLUMNS[table]] = self._identity[table]
+            record.setdefault("id", str(uuid.uuid4()))
+            record.setdefault("created_at", now_iso())
+            existing = self._find_conflict(table, record, on_conflict)
+            if existing is not None:
+                if ignore:
+                    continue
+                if not merge:
+                    raise PostgrestError(409, "23505", f"duplicate key value violates unique constraint on {table}")
+                existing.update({k: v for k, v in row.items() if k != "id"})
+                stored.append(existing)
+                self.realtime.publish(table, "UPDATE", existing)
+                continue
+            self.tables[table].append(record)
+            stored.append(record)
+            self.realtime.publish(table, "INSERT", record)
+            for trigger in BUILTIN_TRIGGERS[table]:
+                trigger(self, record)
+        return copy.deepcopy(stored)
+
+    def load(self, table, rows):
+        """Append many rows without constraint checks (seeding large tables)."""
+        defaults = TABLE_DEFAULTS.get(table, {})
+        for row in rows:
+            record = {**copy.deepcopy(defaults), **row}
+            record.setdefault("id", str(uuid.uuid4()))
+            record.setdefault("created_at", now_iso())
+            self.tables[table].append(record)
+
+    def _find_conflict(self, table, record, on_conflict):
+        keys = [list(PRIMARY_KEYS.get(table, ("id",)))] + [[c] for c in UNIQUE_COLUMNS.get(table, ())]
+        if on_conflict:
+            columns = [c.strip() for c in on_conflict.split(",")]
+            if sorted(columns) not in [sorted(key) for key in keys]:
+                raise PostgrestError(400, "42P10", "there is no unique or exclusion constraint "
+                                                   "matching the ON CONFLICT specification")
+            keys = [columns]
+        for key in keys:
+            if any(record.get(c) is None for c in key):
+                continue
+            for row in self.tables[table]:
+                if all(row.get(c) == record.get(c) for c in key):
+                    return row
+        return None
+
+    def rpc(self, name):
+        """Register ``fn(standin, params, claims)`` as ``/rest/v1/rpc/<name>``."""
+        def register(fn):
+            self._rpcs[name] = fn
+            return fn
+        return register
+
+    def request_count(self, kind=None, resource=None, method=None, client=None):
+        return sum(
+            1 for r in self.requests
+            if (kind is None or r.kind == kind)
+            and (resource is None or r.resource == resource)
+            and (method is None or r.method == method)
+            and (client is None or r.client == client)
+        )
+
+    # -- request handling --------------------------------------------------
+
+    async def handle(self, method, url, headers=None, body=None):
+        """Serve one request; ``headers`` keys are matched case-insensitively."""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        if method == "OPTIONS":
+            return StandInResponse(204, dict(CORS_HEADERS))
+        delay = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        claims = self._claims(headers)
+        if path.startswith("/storage/v1/"):
+            base_url = f"{parts.scheme}://{parts.netloc}"
+            return self._storage(method, path[len("/storage/v1/"):], headers, body or b"", claims, base_url)
+        payload = json.loads(body) if body else None
+        try:
+            if path.startswith("/rest/v1/rpc/"):
+                name = path[len("/rest/v1/rpc/"):]
+                self._log(method, "rpc", name, claims)
+                return self._rpc(name, params, payload, claims)
+            if path.startswith("/rest/v1/"):
+                table = path[len("/rest/v1/"):].strip("/")
+                self._log(method, "rest", table, claims)
+                return self._rest(method, table, params, headers, payload)
+            if path.startswith("/auth/v1/"):
+                endpoint = path[len("/auth/v1/"):].strip("/")
+                self._log(method, "auth", endpoint, claims)
+                return self._auth(method, endpoint, dict(params), payload, claims)
+        except PostgrestError as exc:
+            return self._json(exc.status, {"code": exc.code, "message": str(exc), "details": None, "hint": None})
+        return self._json(404, {"message": f"no stand-in route for {path}"})
+
+    def _log(self, method, kind, resource, claims):
+        self.requests.append(LoggedRequest(
+            method=method, kind=kind, resource=resource,
+            client=(claims or {}).get("sub"), at=time.monotonic(),
+        ))
+
+    def _claims(self, headers):
+        auth = headers.get("authorization", "")
+        return read_jwt(auth[7:]) if auth.lower().startswith("bearer ") else None
+
+    def _json(self, status, data, extra=None):
+        headers = {**CORS_HEADERS, "Content-Type": "application/json", **(extra or {})}
+        body = b"" if data is None else json.dumps(data).encode()
+        return StandInResponse(status, headers, body)
+
+    def _select(self, table, params):
+        filters = [
+            make_logic_filter(k, v) if k in _LOGIC_PARAMS else make_filter(k, v)
+            for k, v in params if k not in _RESERVED_PARAMS
+        ]
+        return [row for row in self.tables[table] if all(f(row) for f in filters)]
+
+    def _rest(self, method, table, params, headers, payload):
+        query = dict(params)
+        prefer = _prefer(headers)
+        single = "vnd.pgrst.object" in headers.get("accept", "")
+        representation = prefer.get("return") == "representation"
+
+        if method in ("GET", "HEAD"):
+            rows = self._select(table, params)
+            if "order" in query:
+                rows = apply_order(rows, query["order"])
+            total = len(rows)
+            start, end = 0, None
+            if "range" in headers:
+                first, _, last = headers["range"].partition("-")
+                start, end = int(first), int(last) + 1 if last else None
+            start += int(query.get("offset", 0))
+            if "limit" in query:
+                end = start + int(query["limit"]) if end is None else min(end, start + int(query["limit"]))
+            page = rows[start:end]
+            data = [project(row, query.get("select")) for row in page]
+            count = str(total) if prefer.get("count") in ("exact", "planned", "estimated") else "*"
+            content_range = f"{start}-{start + len(page) - 1}/{count}" if page else f"*/{count}"
+            if single:
+                if len(data) != 1:
+                    raise PostgrestError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned")
+                data = data[0]
+            response = self._json(200, data, {"Content-Range": content_range})
+            if method == "HEAD":
+                response.body = b""
+            return response
+
+        if method == "POST":
+            if isinstance(payload, list) and len({frozenset(row) for row in payload}) > 1:
+                raise PostgrestError(400, "PGRST102", "All object keys must match")
+            resolution = prefer.get("resolution")
+            rows = self.insert(
+                table, payload,
+                on_conflict=query.get("on_conflict"),
+                merge=resolution == "merge-duplicates",
+                ignore=resolution == "ignore-duplicates",
+            )
+            data = [project(row, query.get("select")) for row in rows]
+            if single and data:
+                data = data[0]
+            return self._json(201, data if representation else None)
+
+        if method in ("PATCH", "DELETE"):
+            matched = self._select(table, params)
+            if method == "PATCH":
+                for row in matched:
+                    row.update(payload or {})
+                    if "updated_at" in row:
+                        row["updated_at"] = now_iso()
+                    self.realtime.publish(table, "UPDATE", row)
+            else:
+                ids = {id(row) for row in matched}
+                self.tables[table] = [row for row in self.tables[table] if id(row) not in ids]
+                for row in matched:
+                    self.realtime.publish(table, "DELETE", old_record=row)
+            data = [project(row, query.get("select")) for row in matched]
+            if single and data:
+                data = data[0]
+            return self._json(200, data) if representation else self._json(204, None)
+
+        raise PostgrestError(405, "PGRST000", f"method {method} not supported")
+
+    def _rpc(self, name, params, payload, claims):
+        fn = self._rpcs.get(name)
+        if fn is None:
+            raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name}")
+        args = payload if payload is not None else dict(params)
+        return self._json(200, fn(self, args, claims))
+
+    # -- auth ----------------------------------------------------------------
+
+    def _user_json(self, email):
+        account = self._accounts[email]
+        return {
+            "id": account["id"],
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "email_confirmed_at": now_iso(),
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": account["metadata"],
+            "created_at": now_iso(),
+        }
+
+    def issue_session(self, email):
+        """A GoTrue-shaped session for an existing account."""
+        issued = int(time.time())
+        account = self._accounts[email]
+        refresh_token = uuid.uuid4().hex
+        self._refresh_tokens[refresh_token] = email
+        return {
+            "access_token": make_jwt({
+                "sub": account["id"], "email": email, "role": "authenticated",
+                "aud": "authenticated", "iat": issued, "exp": issued + SESSION_TTL_S,
+            }),
+            "token_type": "bearer",
+            "expires_in": SESSION_TTL_S,
+            "expires_at": issued + SESSION_TTL_S,
+            "refresh_token": refresh_token,
+            "user": self._user_json(email),
+        }
+
+    def password_grant(self, email, password):
+        """Same contract as ``harness.auth.password_grant`` but in-process."""
+        account = self._accounts.get(email)
+        if account is None or account["password"] != password:
+            raise PostgrestError(400, "invalid_credentials", "Invalid login credentials")
+        return self.issue_session(email)
+
+    def _auth(self, method, endpoint, query, payload, claims):
+        payload = payload or {}
+        try:
+            if endpoint == "token" and query.get("grant_type") == "password":
+                return self._json(200, self.password_grant(payload.get("email"), payload.get("password")))
+            if endpoint == "token" and query.get("grant_type") == "refresh_token":
+                email = self._refresh_tokens.pop(payload.get("refresh_token"), None)
+                if email is None:
+                    raise PostgrestError(400, "refresh_token_not_found", "Invalid Refresh Token")
+                return self._json(200, self.issue_session(email))
+        except PostgrestError as exc:
+            return self._json(exc.status, {"error": "invalid_grant", "error_code": exc.code,
+                                           "error_description": str(exc), "msg": str(exc)})
+        if endpoint == "signup" and method == "POST":
+            email = payload.get("email")
+            if email in self._accounts:
+                return self._json(422, {"error_code": "user_already_exists", "msg": "User already registered"})
+            self.add_user(email, payload.get("password"),
+                          full_name=(payload.get("data") or {}).get("full_name", ""))
+            return self._json(200, self.issue_session(email))
+        if endpoint == "user":
+            email = (claims or {}).get("email")
+            if email not in self._accounts:
+                return self._json(401, {"error_code": "bad_jwt", "msg": "invalid JWT"})
+            return self._json(200, self._user_json(email))
+        if endpoint in ("logout", "recover", "resend", "verify"):
+            return self._json(204 if endpoint == "logout" else 200, None if endpoint == "logout" else {})
+        return self._json(404, {"msg": f"auth endpoint {endpoint!r} not implemented by the stand-in"})
+
+    # -- storage ---------------------------------------------------------------
+
+    def _storage_error(self, status, error, message):
+        return self._json(status, {"statusCode": str(status), "error": error, "message": message})
+
+    def _store_object(self, bucket, path, body, content_type, upsert, owner):
+        if (bucket, path) in self.objects and not upsert:
+            return self._storage_error(409, "Duplicate", "The resource already exists")
+        self.objects[(bucket, path)] = StoredObject(bytes(body), content_type, owner)
+        return None
+
+    def _storage(self, method, endpoint, headers, body, claims, base_url):
+        """Object uploads and the TUS resumable upload protocol."""
+        owner = (claims or {}).get("sub")
+        upsert = headers.get("x-upsert", "").lower() == "true"
+
+        if endpoint.startswith("object/") and method in ("POST", "PUT"):
+            bucket, _, path = endpoint[len("object/"):].partition("/")
+            self._log(method, "storage", bucket, claims)
+            if owner is None:
+                return self._storage_error(403, "Unauthorized", "new row violates row-level security policy")
+            rejected = self._store_object(bucket, path, body, headers.get("content-type", ""),
+                                          upsert or method == "PUT", owner)
+            return rejected or self._json(200, {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())})
+
+        if endpoint.startswith("upload/resumable"):
+            tus = {"Tus-Resumable": "1.0.0"}
+            upload_id = endpoint[len("upload/resumable"):].strip("/")
+            if not upload_id:
+                if method != "POST":
+                    return self._storage_error(405, "Method Not Allowed", "Create uploads with POST")
+                metadata = {}
+                for item in headers.get("upload-metadata", "").split(","):
+                    key, _, value = item.strip().partition(" ")
+                    if key:
+                        metadata[key] = base64.b64decode(value).decode() if value else ""
+                upload = TusUpload(
+                    bucket=metadata.get("bucketName", ""), path=metadata.get("objectName", ""),
+                    content_type=metadata.get("contentType", ""), length=int(headers.get("upload-length", 0)),
+                    upsert=upsert, owner=owner,
+                )
+                self._log(method, "storage", upload.bucket, claims)
+                if owner is None:
+                    return self._storage_error(403, "Unauthorized", "new row violates row-level security policy")
+                upload_id = uuid.uuid4().hex
+                self._tus_uploads[upload_id] = upload
+                return self._json(201, None, {
+                    **tus, "Location": f"{base_url}/storage/v1/upload/resumable/{upload_id}", "Upload-Offset": "0",
+                })
+
+            upload = self._tus_uploads.get(upload_id)
+            self._log(method, "storage", upload.bucket if upload else "resumable", claims)
+            if upload is None or upload.owner != owner:
+                return self._storage_error(404, "Not Found", "Upload not found")
+            offset = {"Upload-Offset": str(len(upload.data)), "Upload-Length": str(upload.length)}
+            if method == "HEAD":
+                return StandInResponse(200, {**CORS_HEADERS, **tus, **offset, "Cache-Control": "no-store"})
+            if method != "PATCH":
+                return self._storage_error(405, "Method Not Allowed", f"{method} is not part of the TUS protocol")
+            if int(headers.get("upload-offset", -1)) != len(upload.data):
+                return self._storage_error(409, "Conflict", "Upload-Offset does not match the stored length")
+            if len(upload.data) + len(body) > upload.length:
+                return self._storage_error(413, "Payload too large", "Chunk exceeds Upload-Length")
+            upload.data.extend(body)
+            if len(upload.data) == upload.length:
+                del self._tus_uploads[upload_id]
+                rejected = self._store_object(upload.bucket, upload.path, upload.data, upload.content_type,
+                                              upload.upsert, owner)
+                if rejected:
+                    return rejected
+            return StandInResponse(204, {**CORS_HEADERS, **tus, "Upload-Offset": str(len(upload.data))})
+
+        self._log(method, "storage", endpoint.split("/")[0], claims)
+        return self._storage_error(404, "Not Found", f"storage endpoint {endpoint!r} not implemented by the stand-in")
+
+    # -- wiring ----------------------------------------------------------------
+
+    async def attach(self, context):
+        """Route the Supabase REST/Auth/Storage/Realtime traffic of a BrowserContext to this stand-in."""
+        pattern = re.compile("^" + re.escape(self.supabase_url) + r"/(rest|auth|storage)/v1/")
+
+        async def fulfil(route):
+            request = route.request
+            response = await self.handle(
+                request.method, request.url, await request.all_headers(), request.post_data_buffer
+            )
+            await route.fulfill(status=response.status, headers=response.headers, body=response.body)
+
+        await context.route(pattern, fulfil)
+        await self.realtime.attach(context, self.supabase_url)
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """Expose the stand-in over HTTP and return its base URL."""
+        from aiohttp import web  # only needed when serving over HTTP
+
+        async def dispatch(request):
+            response = await self.handle(request.method, str(request.url), dict(request.headers),
+                                         await request.read())
+            return web.Response(status=response.status, headers=response.headers, body=response.body)
+
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_route("*", "/{tail:.*}", dispatch)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+        return self.url
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# -- database functions --------------------------------------------------------
+
+
+@builtin_rpc("claim_webhook_events")
+def claim_webhook_events(standin, args, claims):
+    """supabase/migrations/20250201000000_webhook_event_queue.sql.
+
+    The stand-in serves one request at a time, which gives the same
+    exclusivity as ``FOR UPDATE SKIP LOCKED``.
+    """
+    batch_size = int(args.get("batch_size", 200))
+    now = datetime.now(timezone.utc)
+    expired = now.timestamp() - CLAIM_TIMEOUT_S
+    pending = [
+        row for row in standin.tables["webhook_events"]
+        if not row.get("processed") and row.get("source") == "vapi"
+        and (row.get("claimed_at") is None
+             or datetime.fromisoformat(row["claimed_at"]).timestamp() < expired)
+    ]
+    pending.sort(key=lambda row: row["seq"])
+    claimed = pending[:batch_size]
+    for row in claimed:
+        row["claimed_at"] = now.isoformat()
+    return copy.deepcopy(claimed)
+
+
+@builtin_rpc("get_dashboard_stats")
+def get_dashboard_stats(standin, args, claims):
+    """supabase/migrations/20250203000000_dashboard_stats.sql.
+
+    The migration keeps the totals in dashboard_stats with triggers; the
+    stand-in computes the same result from its tables.
+    """
+    limit = int(args.get("recent_limit", 5))
+    month = datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def in_month(row):
+        created = datetime.fromisoformat(row["created_at"]).astimezone(timezone.utc)
+        return created.strftime("%Y-%m") == month
+
+    def recent(table, columns):
+        rows = apply_order(standin.tables[table], "created_at.desc")[:limit]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    calls = standin.tables["call_logs"]
+    revenue = sum(
+        float(row.get("amount") or 0) for row in standin.tables["payments"]
+        if (row.get("payment_status") or row.get("status")) == "successful"
+    )
+    return {
+        "totalCalls": len(calls),
+        "totalLeads": len(standin.tables["leads"]),
+        "totalRevenue": round(revenue, 2),
+        "callsThisMonth": sum(1 for row in calls if in_month(row)),
+        "recentCalls": recent("call_logs", ("id", "caller_phone", "call_status", "created_at")),
+        "recentLeads": recent("leads", ("id", "full_name", "email", "phone_number", "status", "created_at")),
+    }
+
+
+def payment_tier(amount):
+    """public.payment_tier(), supabase/migrations/20250208000000_session_profile.sql."""
+    if amount >= 180:
+        return "promax"
+    if amount >= 80:
+        return "pro"
+    if amount >= 49:
+        return "professional"
+    return "free"
+
+
+@builtin_rpc("get_session_profile")
+def get_session_profile(standin, args, claims):
+    """supabase/migrations/20250208000000_session_profile.sql."""
+    user_id = (claims or {}).get("sub")
+    profile = next((row for row in standin.tables["users"] if row["id"] == user_id), None)
+    payments = apply_order([
+        row for row in standin.tables["payments"]
+        if row.get("user_id") == user_id and (row.get("payment_status") or row.get("status")) == "successful"
+    ], "created_at.desc")
+    return {
+        "profile": copy.deepcopy(profile),
+        "tier": payment_tier(float(payments[0].get("amount") or 0)) if payments else "free",
+    }
+
+
+@builtin_trigger("leads")
+def queue_lead_alert(standin, record):
+    """supabase/migrations/20250205000000_notification_outbox.sql."""
+    standin.insert("notification_outbox", {"kind": "new_lead", "lead_id": record["id"],
+                                           "next_attempt_at": record["created_at"]})
+
+
+@builtin_rpc("claim_notifications")
+def claim_notifications(standin, args, claims):
+    """supabase/migrations/20250205000000_notification_outbox.sql.
+
+    ``delivery_ms`` is a generated column there; the stand-in leaves it out.
+    """
+    batch_size = int(args.get("batch_size", 100))
+    now = datetime.now(timezone.utc)
+    expired = now.timestamp() - NOTIFICATION_CLAIM_TIMEOUT_S
+    due = [
+        row for row in standin.tables["notification_outbox"]
+        if row.get("sent_at") is None and row.get("failed_at") is None
+        and datetime.fromisoformat(row.get("next_attempt_at") or row["created_at"]) <= now
+        and (row.get("claimed_at") is None
+             or datetime.fromisoformat(row["claimed_at"]).timestamp() < expired)
+    ]
+    due.sort(key=lambda row: row["id"])
+    claimed = due[:batch_size]
+    for row in claimed:
+        row["claimed_at"] = now.isoformat()
+        row["attempts"] = row.get("attempts", 0) + 1
+    return copy.deepcopy(claimed)
@@ -0,0 +1,108 @@
+"""Stand-in for the Telegram Bot API's ``sendMessage``.
+
+Serves ``POST /bot<token>/sendMessage`` over HTTP (point the function's
+``TELEGRAM_API_URL`` at ``stand_in.url``) and enforces the limits Telegram
+documents for bots: one message per second in a private chat, 20 per minute
+in a group (negative chat ids) and 30 per second overall. A message over a
+limit is refused like the real API does, with 429 and
+``parameters.retry_after``; every accepted one is kept with its arrival
+time in ``messages``.
+"""
+
+import math
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+PRIVATE_CHAT_INTERVAL_S = 1.0
+GROUP_CHAT_LIMIT = (20, 60.0)  # messages per window of seconds
+GLOBAL_LIMIT = (30, 1.0)
+MAX_MESSAGE_LENGTH = 4096
+
+
+@dataclass
+class SentMessage:
+    message_id: int
+    chat_id: str
+    text: str
+    at: float  # time.time() on arrival
+
+
+class TelegramStandIn:
+    def __init__(self, token="stand-in-bot-token"):
+        self.token = token
+        self.messages = []
+        self.rejected = []  # (chat_id, reason) of every refused request
+        self.url = None
+        self._chat_sends = defaultdict(deque)
+        self._all_sends = deque()
+        self._runner = None
+
+    def _retry_after(self, chat_id, now):
+        """Seconds until ``chat_id`` may receive a message, or 0."""
+        def window_wait(sends, limit, window):
+            while sends and sends[0] <= now - window:
+                sends.popleft()
+            return sends[0] + window - now if len(sends) >= limit else 0
+
+        chat = self._chat_sends[chat_id]
+        if chat_id.startswith("-"):
+            chat_wait = window_wait(chat, *GROUP_CHAT_LIMIT)
+        else:
+            chat_wait = chat[-1] + PRIVATE_CHAT_INTERVAL_S - now if chat else 0
+        return max(chat_wait, window_wait(self._all_sends, *GLOBAL_LIMIT))
+
+    def send_message(self, token, payload):
+        """Answer one ``sendMessage`` call: ``(status, body)``."""
+        if token != self.token:
+            return 401, {"ok": False, "error_code": 401, "description": "Unauthorized"}
+        chat_id = str(payload.get("chat_id", ""))
+        text = payload.get("text") or ""
+        if not chat_id or not text or len(text) > MAX_MESSAGE_LENGTH:
+            self.rejected.append((chat_id, "bad request"))
+            return 400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is invalid"}
+
+        now = time.time()
+        wait = self._retry_after(chat_id, now)
+        if wait > 0:
+            retry_after = max(1, math.ceil(wait))
+            self.rejected.append((chat_id, "too many requests"))
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }
+
+        self._chat_sends[chat_id].append(now)
+        self._all_sends.append(now)
+        message = SentMessage(len(self.messages) + 1, chat_id, text, now)
+        self.messages.append(message)
+        return 200, {"ok": True, "result": {"message_id": message.message_id, "chat": {"id": chat_id},
+                                            "date": int(now), "text": text}}
+
+    async def serve(self, host="127.0.0.1", port=0):
+        """Expose the stand-in over HTTP and return its base URL."""
+        from aiohttp import web  # only needed when serving over HTTP
+
+        async def dispatch(request):
+            try:
+                payload = await request.json()
+            except ValueError:
+                payload = {}
+            status, body = self.send_message(request.match_info["token"], payload)
+            return web.json_response(body, status=status)
+
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", dispatch)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.url = f"http://{bound_host}:{bound_port}"
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,131 @@
+"""Event-driven waits for the generated cases.
+
+The cases used to sleep a fixed 3 s before every interaction and 5 s at the
+end. These helpers wait on concrete signals instead:
+
+* ``act()``     - Playwright actionability (visible, enabled, stable), then
+                  an optional React route change, then ``settle()``.
+* ``settle()``  - no Supabase REST / auth / edge-function request in flight
+                  for a short quiet window.
+* ``open_app()``- navigate to the app and settle.
+"""
+
+import asyncio
+import re
+import weakref
+
+from playwright import async_api
+
+from harness import metrics
+from harness.config import BASE_URL
+
+# Requests the pages make to Supabase (PostgREST, GoTrue, edge functions)
+SUPABASE_REQUEST = re.compile(r"/(rest|auth|functions|storage)/v1/")
+
+# How long the Supabase traffic has to stay quiet before a page counts as settled
+QUIET_MS = 150
+SETTLE_TIMEOUT_MS = 10000
+
+_trackers = weakref.WeakKeyDictionary()
+
+
+class SupabaseTraffic:
+    """Tracks in-flight Supabase requests issued by one page."""
+
+    def __init__(self, page):
+        self._inflight = set()
+        self._changed = asyncio.Event()
+        self._last_activity = asyncio.get_running_loop().time()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _touch(self):
+        self._last_activity = asyncio.get_running_loop().time()
+        self._changed.set()
+
+    def _on_request(self, request):
+        if SUPABASE_REQUEST.search(request.url):
+            self._inflight.add(request)
+            self._touch()
+
+    def _on_done(self, request):
+        if request in self._inflight:
+            self._inflight.discard(request)
+            self._touch()
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    async def idle(self, quiet_ms=QUIET_MS, timeout_ms=SETTLE_TIMEOUT_MS):
+        """Return once nothing has been in flight for ``quiet_ms``."""
+        loop = asyncio.get_running_loop()
+        quiet = quiet_ms / 1000
+        deadline = loop.time() + timeout_ms / 1000
+        while True:
+            now = loop.time()
+            if not self._inflight and now - self._last_activity >= quiet:
+                return
+            if now >= deadline:
+                raise async_api.TimeoutError(
+                    f"Supabase traffic did not settle within {timeout_ms}ms "
+                    f"({len(self._inflight)} request(s) still in flight)"
+                )
+            self._changed.clear()
+            wait = deadline - now if self._inflight else quiet - (now - self._last_activity)
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=max(wait, 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+def traffic(page):
+    """Return the SupabaseTraffic tracker for ``page``, attaching one if needed.
+
+    Attach before the page navigates, otherwise requests already in flight
+    are not seen.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = SupabaseTraffic(page)
+    return tracker
+
+
+async def settle(page, quiet_ms=QUIET_MS, timeout_ms=SETTLE_TIMEOUT_MS):
+    """Wait until the DOM is loaded and Supabase traffic has gone quiet."""
+    await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+    await traffic(page).idle(quiet_ms=quiet_ms, timeout_ms=timeout_ms)
+
+
+async def open_app(page, path="/", timeout_ms=SETTLE_TIMEOUT_MS):
+    """Navigate to ``path`` on the app under test and wait for it to settle."""
+    traffic(page)
+    async with metrics.step(page, f"open {path}"):
+        await page.goto(f"{BASE_URL}{path}", wait_until="domcontentloaded", timeout=timeout_ms)
+        await settle(page, timeout_ms=timeout_ms)
+    recorder = metrics.recorder_for(page)
+    if recorder:
+        await recorder.sample(page, path)
+
+
+async def act(locator, action, *args, route=None, timeout_ms=5000, **kwargs):
+    """Perform ``locator.<action>(*args)`` once the element is actionable.
+
+    ``route`` is an optional URL glob/regex (as accepted by
+    ``page.wait_for_url``) for the React route the action should lead to.
+    """
+    page = locator.page
+    traffic(page)
+    async with metrics.step(page, f"{action} {describe(locator)}"):
+        await locator.wait_for(state="visible", timeout=timeout_ms)
+        await getattr(locator, action)(*args, timeout=timeout_ms, **kwargs)
+        if route is not None:
+            await page.wait_for_url(route, timeout=timeout_ms)
+        await settle(page)
+
+
+def describe(locator):
+    """Short human-readable selector of ``locator`` for step names."""
+    match = re.search(r"selector='(.*)'>$", repr(locator))
+    return match.group(1) if match else repr(locator)
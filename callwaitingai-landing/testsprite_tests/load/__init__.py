@@ -0,0 +1,5 @@
+"""Load and replay tools for the Supabase edge functions.
+
+Unlike the browser cases these drive the functions directly over HTTP, so
+they need ``aiohttp`` but no browser.
+"""
@@ -0,0 +1,249 @@
+"""Bytes, LCP and time to interactive of the landing page on a throttled network.
+
+Loads ``/`` of a production build in fresh browser contexts with the network
+(and optionally the CPU) throttled through the DevTools protocol, opens the
+chat widget, and records the transferred bytes of every built chunk, the
+largest contentful paint and an estimate of time to interactive::
+
+    pnpm preview:test   # production build on :5173; the dev server has no chunks
+    python -m load.bundle_budget --profile slow-4g --runs 3
+
+Chunks are named as in ``dist/assets`` without the hash (``vapi-vendor.js``,
+``index.css``). The tool fails (exit 1) if a chunk is over its budget
+(``--budget NAME=KB``, otherwise ``--max-chunk-kb``), the total is over
+``--max-total-kb``, or LCP / TTI exceed ``--max-lcp-ms`` / ``--max-tti-ms``.
+``vapi-vendor.js`` has a budget of 0: the Vapi SDK may only be downloaded once a
+voice call is started, not for visitors who open the chat and type.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+
+from harness.config import BASE_URL
+from harness.metrics import LCP_INIT_SCRIPT
+from harness.pool import BrowserPool
+
+# DevTools throttling presets (Lighthouse's mobile slow 4G and Chrome's "Fast 3G")
+PROFILES = {
+    "slow-4g": {"latency": 150, "downloadKbps": 1638.4, "uploadKbps": 750},
+    "fast-3g": {"latency": 562.5, "downloadKbps": 1474.56, "uploadKbps": 675},
+    "none": None,
+}
+
+# Chunks with their own budget in KB; the rest get --max-chunk-kb
+DEFAULT_BUDGETS_KB = {"vapi-vendor.js": 0}
+
+# Lighthouse's TTI: the page must have been free of long tasks for this long
+QUIET_WINDOW_MS = 5000
+
+# Built assets are emitted as assets/<name>-<8 character hash>.<ext>
+_CHUNK = re.compile(r"/assets/(?P<name>.+)-[A-Za-z0-9_-]{8}\.(?P<ext>js|css)$")
+
+LONG_TASK_INIT_SCRIPT = """
+(() => {
+  window.__testspriteLongTaskEnds = [];
+  try {
+    new PerformanceObserver((list) => {
+      for (const task of list.getEntries()) {
+        window.__testspriteLongTaskEnds.push(task.startTime + task.duration);
+      }
+    }).observe({ type: 'longtask', buffered: true });
+  } catch (e) {}
+})();
+"""
+
+# TTI estimate: first contentful paint or DOMContentLoaded, whichever is
+# later, pushed back to the end of the last long task
+PAGE_TIMINGS = """
+() => {
+  const nav = performance.getEntriesByType('navigation')[0];
+  const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+  const lastLongTask = Math.max(0, ...window.__testspriteLongTaskEnds);
+  const dcl = nav ? nav.domContentLoadedEventEnd - nav.startTime : 0;
+  return {
+    lcpMs: window.__testspriteLcp,
+    fcpMs: fcp ? fcp.startTime : null,
+    ttiMs: Math.max(fcp ? fcp.startTime : 0, dcl, lastLongTask),
+  };
+}
+"""
+
+
+def chunk_name(url):
+    """``vapi-vendor.js`` for ``.../assets/vapi-vendor-AbC123xy.js``, None for anything else."""
+    match = _CHUNK.search(url.split("?", 1)[0])
+    return f"{match['name']}.{match['ext']}" if match else None
+
+
+async def throttle(context, page, profile, cpu_slowdown):
+    session = await context.new_cdp_session(page)
+    await session.send("Network.enable")
+    await session.send("Network.setCacheDisabled", {"cacheDisabled": True})
+    if profile is not None:
+        await session.send("Network.emulateNetworkConditions", {
+            "offline": False,
+            "latency": profile["latency"],
+            "downloadThroughput": profile["downloadKbps"] * 1024 / 8,
+            "uploadThroughput": profile["uploadKbps"] * 1024 / 8,
+        })
+    if cpu_slowdown > 1:
+        await session.send("Emulation.setCPUThrottlingRate", {"rate": cpu_slowdown})
+
+
+async def measure(pool, base_url, profile, cpu_slowdown, open_chat):
+    """One cold load of ``/``: transferred bytes per chunk and the page timings."""
+    chunks = {}
+    phase = {"name": "load"}
+    after_chat = set()
+    transfers = []
+
+    async def record(request):
+        name = chunk_name(request.url)
+        if name is None:
+            return
+        sizes = await request.sizes()
+        chunks[name] = chunks.get(name, 0) + sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        if phase["name"] == "chat":
+            after_chat.add(name)
+
+    async with pool.context() as context:
+        await context.add_init_script(LCP_INIT_SCRIPT)
+        await context.add_init_script(LONG_TASK_INIT_SCRIPT)
+        context.on("requestfinished", lambda request: transfers.append(asyncio.ensure_future(record(request))))
+        page = await context.new_page()
+        page.set_default_timeout(60000)
+        await throttle(context, page, profile, cpu_slowdown)
+
+        await page.goto(f"{base_url}/", wait_until="load")
+        launcher = page.locator('[aria-label="Open chat"]')
+        await launcher.wait_for(state="visible")
+        await page.wait_for_load_state("networkidle")
+        await page.wait_for_timeout(QUIET_WINDOW_MS)
+        timings = await page.evaluate(PAGE_TIMINGS)
+
+        if open_chat:
+            phase["name"] = "chat"
+            await launcher.click()
+            await page.locator('[aria-label="Close chat widget"]').wait_for(state="visible")
+            await page.wait_for_load_state("networkidle")
+
+        await asyncio.gather(*transfers)
+
+    return {"chunks": chunks, "afterChat": sorted(after_chat), **timings}
+
+
+def _median(values):
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 1) if values else None
+
+
+async def run(args):
+    profile = PROFILES[args.profile]
+    async with BrowserPool() as pool:
+        runs = [await measure(pool, args.base_url, profile, args.cpu_slowdown, not args.no_chat)
+                for _ in range(args.runs)]
+
+    # Bytes are the same on every cold load; the largest run is reported
+    chunks = {}
+    for result in runs:
+        for name, size in result["chunks"].items():
+            chunks[name] = max(chunks.get(name, 0), size)
+    budgets = {**DEFAULT_BUDGETS_KB, **dict(args.budget)}
+    return {
+        "baseUrl": args.base_url,
+        "profile": args.profile,
+        "cpuSlowdown": args.cpu_slowdown,
+        "runs": args.runs,
+        "chunks": dict(sorted(chunks.items(), key=lambda item: -item[1])),
+        "totalBytes": sum(chunks.values()),
+        "afterChat": sorted({name for result in runs for name in result["afterChat"]}),
+        "lcpMs": _median(result["lcpMs"] for result in runs),
+        "fcpMs": _median(result["fcpMs"] for result in runs),
+        "ttiMs": _median(result["ttiMs"] for result in runs),
+        "budgets": {
+            "chunkKb": budgets,
+            "maxChunkKb": args.max_chunk_kb,
+            "maxTotalKb": args.max_total_kb,
+            "maxLcpMs": args.max_lcp_ms,
+            "maxTtiMs": args.max_tti_ms,
+        },
+    }
+
+
+def failures(report):
+    budgets = report["budgets"]
+    if not report["chunks"]:
+        return [f"no built chunks were loaded from {report['baseUrl']}; serve a production build"]
+    problems = []
+    for name, size in report["chunks"].items():
+        limit = budgets["chunkKb"].get(name, budgets["maxChunkKb"])
+        if size > limit * 1024:
+            problems.append(f"{name} transferred {size / 1024:.1f} KB (budget {limit:g} KB)")
+    if report["totalBytes"] > budgets["maxTotalKb"] * 1024:
+        problems.append(f"total transferred {report['totalBytes'] / 1024:.1f} KB "
+                        f"(budget {budgets['maxTotalKb']:g} KB)")
+    for metric, limit in (("lcpMs", "maxLcpMs"), ("ttiMs", "maxTtiMs")):
+        if report[metric] is not None and report[metric] > budgets[limit]:
+            problems.append(f"{metric} {report[metric]:.0f} ms (budget {budgets[limit]:g} ms)")
+    return problems
+
+
+def print_report(report):
+    print(f"{report['baseUrl']}/ on {report['profile']} (CPU x{report['cpuSlowdown']:g}), "
+          f"median of {report['runs']} cold loads\n")
+    budgets = report["budgets"]
+    print(f"{'chunk':<32}{'KB':>10}{'budget':>10}")
+    for name, size in report["chunks"].items():
+        limit = budgets["chunkKb"].get(name, budgets["maxChunkKb"])
+        marker = " (chat)" if name in report["afterChat"] else ""
+        print(f"{name + marker:<32}{size / 1024:>10.1f}{limit:>10g}")
+    print(f"{'total':<32}{report['totalBytes'] / 1024:>10.1f}{budgets['maxTotalKb']:>10g}\n")
+    for metric, label, limit in (("fcpMs", "FCP", None), ("lcpMs", "LCP", "maxLcpMs"),
+                                 ("ttiMs", "TTI", "maxTtiMs")):
+        value = "-" if report[metric] is None else f"{report[metric]:.0f} ms"
+        budget = f" (budget {budgets[limit]:g} ms)" if limit else ""
+        print(f"{label}: {value}{budget}")
+    for problem in failures(report):
+        print(f"FAIL: {problem}")
+
+
+def _budget(value):
+    name, _, kb = value.partition("=")
+    if not name or not kb:
+        raise argparse.ArgumentTypeError("expected NAME=KB, e.g. vendor.js=120")
+    return name, float(kb)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=BASE_URL, help="production build to measure")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="slow-4g", help="network throttling")
+    parser.add_argument("--cpu-slowdown", type=float, default=1, help="CPU throttling factor, e.g. 4")
+    parser.add_argument("--runs", type=int, default=3, help="cold loads; timings are their median")
+    parser.add_argument("--no-chat", action="store_true", help="do not open the chat widget after loading")
+    parser.add_argument("--budget", type=_budget, action="append", default=[], metavar="NAME=KB",
+                        help="budget of one chunk (repeatable)")
+    parser.add_argument("--max-chunk-kb", type=float, default=200, help="budget of every other chunk")
+    parser.add_argument("--max-total-kb", type=float, default=500, help="budget of all chunks together")
+    parser.add_argument("--max-lcp-ms", type=float, default=4000, help="largest contentful paint budget")
+    parser.add_argument("--max-tti-ms", type=float, default=6000, help="time to interactive budget")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
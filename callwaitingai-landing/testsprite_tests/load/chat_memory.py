@@ -0,0 +1,282 @@
+"""Request and prompt size of groq-chat per turn, with and without server-side memory.
+
+Replays multi-turn conversations against groq-chat twice with Deno and the
+in-process Supabase stand-in: once as of ``--baseline-ref`` (by default the
+commit before ``supabase/functions/groq-chat/memory.ts`` was added, when the
+widget posted the whole history every turn) and once from the working tree,
+where the widget posts only the new message::
+
+    python -m load.chat_memory --conversations 8 --turns 50 --concurrency 4
+
+Groq is answered by a local stub that records the size of every prompt and
+takes ``--upstream-latency-ms`` plus ``--prefill-ms-per-kb`` for each KB of
+prompt, so longer prompts answer more slowly, as they do on the real API. For
+every turn the report gives the bytes the widget sent, the bytes of the prompt
+sent to Groq and the p50 latency of both versions.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import aiohttp
+
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.edge_rest import DEFAULT_STUB_PORT, UpstreamStub, checkout_functions, default_baseline_ref
+from load.stats import LatencyRecorder
+from load.vapi_webhook import DEFAULT_STAND_IN_PORT, spawn_function, wait_for_port
+
+MEMORY_MODULE = "supabase/functions/groq-chat/memory.ts"
+# The model groq-chat summarizes old turns with (SUMMARY_MODEL in memory.ts)
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+# Messages kept verbatim before groq-chat starts summarizing (WINDOW_MESSAGES + SUMMARY_BATCH)
+SUMMARY_THRESHOLD = 20
+WARMUP_TURNS = 2
+
+_TURN = re.compile(r"\[turn (\d+)\]")
+
+QUESTIONS = [
+    "What does CallWaitingAI do when I miss a call?",
+    "How much does the starter plan cost per month?",
+    "Can Marcy book appointments straight into my calendar?",
+    "Which languages can the assistant speak?",
+    "How long does it take to set everything up for a small clinic?",
+    "Do callers know they are talking to an AI?",
+    "Can I forward my existing business number to you?",
+    "What happens when a caller asks for a human?",
+    "Is there a contract or can I cancel any time?",
+    "How do I get notified about new leads?",
+]
+
+
+class GroqStub(UpstreamStub):
+    """Groq stub that records prompt sizes per conversation turn."""
+
+    def __init__(self, latency_ms=0, prefill_ms_per_kb=0, reply_chars=400):
+        super().__init__(latency_ms)
+        self.prefill_ms_per_kb = prefill_ms_per_kb
+        self.reply = ("Happy to help with that. " * (reply_chars // 25 + 1))[:reply_chars].strip()
+        self.reset()
+
+    def reset(self):
+        self.prompt_bytes = defaultdict(list)  # turn -> bytes of each chat prompt
+        self.summaries = 0
+
+    async def _groq(self, request):
+        body = await request.read()
+        payload = json.loads(body)
+        if payload.get("model") == SUMMARY_MODEL:
+            self.summaries += 1
+            content = "The visitor is comparing plans and asked about setup, pricing and lead alerts."
+        else:
+            match = _TURN.search(payload["messages"][-1]["content"])
+            if match:
+                self.prompt_bytes[int(match[1])].append(len(body))
+            content = self.reply
+        # Prompt processing time grows with the prompt
+        await asyncio.sleep(self.prefill_ms_per_kb * len(body) / 1024 / 1000)
+        return await self._answer({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+
+def visitor_messages(turns, conversation, seed=None):
+    """What the visitor types in one conversation; turn 3 leaves contact details."""
+    rng = random.Random(None if seed is None else f"{seed}-{conversation}")
+    messages = []
+    for turn in range(1, turns + 1):
+        text = rng.choice(QUESTIONS)
+        if turn == 3:
+            text = f"You can reach me at visitor{conversation}@example.com. {text}"
+        messages.append(f"[turn {turn}] {text}")
+    return messages
+
+
+async def converse(session, url, session_id, messages, full_history, recorder, request_bytes):
+    """Send one conversation turn by turn, as the widget of each version would."""
+    history = []
+    for turn, text in enumerate(messages, 1):
+        history.append({"role": "user", "content": text})
+        payload = {"messages": history, "sessionId": session_id} if full_history \
+            else {"message": text, "sessionId": session_id}
+        body = json.dumps(payload).encode()
+        started = time.perf_counter()
+        ok = False
+        reply = None
+        try:
+            async with session.post(url, data=body, headers={"Content-Type": "application/json"}) as response:
+                data = await response.json(content_type=None)
+                ok = response.status < 400
+                reply = (data.get("data") or {}).get("message")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            pass
+        if recorder is not None:
+            recorder.record(str(turn), (time.perf_counter() - started) * 1000, ok)
+            request_bytes[turn].append(len(body))
+        history.append({"role": "assistant", "content": reply or ""})
+
+
+async def run_version(functions, supabase_url, stub, args, version):
+    full_history = version == "before"
+    recorder = LatencyRecorder()
+    request_bytes = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def conversation(i):
+        async with semaphore:
+            await converse(session, function_url, f"chat-memory-{version}-{args.seed}-{i}",
+                           visitor_messages(args.turns, i, args.seed), full_history, recorder, request_bytes)
+
+    process, function_url = spawn_function(functions / "groq-chat" / "index.ts", supabase_url,
+                                           SERVICE_ROLE_KEY, {"GROQ_API_KEY": "stub"})
+    try:
+        await wait_for_port(function_url)
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+            # Warm the worker (module init, first connections) before measuring
+            await converse(session, function_url, f"chat-memory-{version}-warmup", visitor_messages(WARMUP_TURNS, -1),
+                           full_history, None, None)
+            stub.reset()
+            await asyncio.gather(*(conversation(i) for i in range(args.conversations)))
+            # Let the last background summaries finish
+            await asyncio.sleep(1)
+    finally:
+        process.terminate()
+        process.wait()
+
+    latency = recorder.summary()
+    per_turn = []
+    for turn in range(1, args.turns + 1):
+        sent, prompts = request_bytes[turn], stub.prompt_bytes[turn]
+        per_turn.append({
+            "turn": turn,
+            "requestBytes": round(sum(sent) / len(sent)) if sent else None,
+            "promptBytes": round(sum(prompts) / len(prompts)) if prompts else None,
+            "p50Ms": latency[str(turn)]["p50Ms"],
+            "p95Ms": latency[str(turn)]["p95Ms"],
+            "errors": latency[str(turn)]["errors"],
+        })
+    return {
+        "perTurn": per_turn,
+        "totals": {
+            "requestBytes": sum(sum(sent) for sent in request_bytes.values()),
+            "promptBytes": sum(sum(prompts) for prompts in stub.prompt_bytes.values()),
+            "summaryCalls": stub.summaries,
+            "p50Ms": latency["all"]["p50Ms"],
+            "p95Ms": latency["all"]["p95Ms"],
+            "errors": latency["all"]["errors"],
+        },
+    }
+
+
+async def run(args):
+    stub = GroqStub(args.upstream_latency_ms, args.prefill_ms_per_kb, args.reply_chars)
+    stub_url = await stub.serve(port=args.stub_port)
+    standin = PostgrestStandIn(args.latency_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+    baseline_ref = args.baseline_ref or default_baseline_ref(MEMORY_MODULE)
+
+    versions = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="chat-memory-") as tmp:
+            for name, ref in (("before", baseline_ref), ("after", None)):
+                functions = checkout_functions(ref, Path(tmp) / name, stub_url)
+                versions[name] = {"ref": ref or "working tree",
+                                  **await run_version(functions, supabase_url, stub, args, name)}
+    finally:
+        await standin.close()
+        await stub.close()
+
+    return {
+        "conversations": args.conversations,
+        "turns": args.turns,
+        "concurrency": args.concurrency,
+        "standIn": {"latencyMs": args.latency_ms},
+        "upstream": {"latencyMs": args.upstream_latency_ms, "prefillMsPerKb": args.prefill_ms_per_kb,
+                     "replyChars": args.reply_chars},
+        **versions,
+    }
+
+
+def failures(report):
+    after = report["after"]["totals"]
+    problems = []
+    if after["errors"]:
+        problems.append(f"after: {after['errors']} failed turns")
+    if report["turns"] * 2 > SUMMARY_THRESHOLD and not after["summaryCalls"]:
+        problems.append("after: no turns were summarized")
+    return problems
+
+
+def _kb(value):
+    return "-" if value is None else f"{value / 1024:.1f}"
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}"
+
+
+def print_report(report, every=5):
+    before, after = report["before"], report["after"]
+    print(f"before: {before['ref']}\nafter:  {after['ref']}")
+    print(f"{report['conversations']} conversations of {report['turns']} turns, concurrency "
+          f"{report['concurrency']}, {report['upstream']['latencyMs']:g} ms + "
+          f"{report['upstream']['prefillMsPerKb']:g} ms/KB Groq stub\n")
+    header = (f"{'turn':>6}{'sent KB before':>16}{'after':>8}{'prompt KB before':>18}{'after':>8}"
+              f"{'p50 ms before':>15}{'after':>8}")
+    print(header)
+    print("-" * len(header))
+    for old, new in zip(before["perTurn"], after["perTurn"]):
+        if old["turn"] != 1 and old["turn"] % every and old["turn"] != report["turns"]:
+            continue
+        print(f"{old['turn']:>6}{_kb(old['requestBytes']):>16}{_kb(new['requestBytes']):>8}"
+              f"{_kb(old['promptBytes']):>18}{_kb(new['promptBytes']):>8}"
+              f"{_ms(old['p50Ms']):>15}{_ms(new['p50Ms']):>8}")
+    print("-" * len(header))
+    print(f"{'total':>6}{_kb(before['totals']['requestBytes']):>16}{_kb(after['totals']['requestBytes']):>8}"
+          f"{_kb(before['totals']['promptBytes']):>18}{_kb(after['totals']['promptBytes']):>8}"
+          f"{_ms(before['totals']['p50Ms']):>15}{_ms(after['totals']['p50Ms']):>8}")
+    print(f"\nsummary calls after: {after['totals']['summaryCalls']}; "
+          f"failed turns before: {before['totals']['errors']}, after: {after['totals']['errors']}")
+    for problem in failures(report):
+        print(f"FAIL: {problem}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=8, help="conversations per version")
+    parser.add_argument("--turns", type=int, default=50, help="visitor messages per conversation")
+    parser.add_argument("--concurrency", type=int, default=4, help="conversations in progress at once")
+    parser.add_argument("--latency-ms", type=float, default=25,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--upstream-latency-ms", type=float, default=150, help="base latency of the Groq stub")
+    parser.add_argument("--prefill-ms-per-kb", type=float, default=2,
+                        help="extra Groq stub latency per KB of prompt")
+    parser.add_argument("--reply-chars", type=int, default=400, help="length of the stub's replies")
+    parser.add_argument("--baseline-ref", default=None,
+                        help="git ref of the 'before' functions (default: before memory.ts)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible conversations")
+    parser.add_argument("--every", type=int, default=5, help="print every Nth turn (all are in --json)")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the function's SUPABASE_URL)")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_STUB_PORT, help="port of the Groq stub")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report, args.every)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
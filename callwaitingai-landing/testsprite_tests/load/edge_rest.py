@@ -0,0 +1,300 @@
+"""Before/after latency of the edge functions' PostgREST access.
+
+Runs vapi-webhook, groq-chat, send-telegram-notification and
+create-vapi-assistant twice with Deno against the in-process Supabase
+stand-in: once as of ``--baseline-ref`` (by default the commit before
+``supabase/functions/_shared/postgrest.ts`` was added, when every function
+made its own sequential ``fetch`` calls) and once from the working tree. The
+stand-in's ``--latency-ms`` models the round trip to the project, which is
+what connection reuse and concurrent writes save::
+
+    python -m load.edge_rest --requests 200 --concurrency 8 --latency-ms 25
+
+Groq, Vapi and Telegram are answered by a local stub: the functions are run
+from a copy of ``supabase/functions`` in which their hard-coded API hosts
+point at it. Reports p50/p95 per endpoint for both versions and the REST
+requests each call made.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from harness.config import SUITE_DIR
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.stats import LatencyRecorder
+from load.vapi_events import make_calls
+from load.vapi_webhook import DEFAULT_STAND_IN_PORT, spawn_function, wait_for_port
+
+REPO_DIR = SUITE_DIR.parents[1]
+SHARED_MODULE = "supabase/functions/_shared/postgrest.ts"
+DEFAULT_STUB_PORT = 54332
+WARMUP_REQUESTS = 5
+
+# Hard-coded upstream hosts in the functions -> path prefix on the stub
+UPSTREAMS = {
+    "https://api.groq.com": "/groq",
+    "https://api.vapi.ai": "/vapi",
+    "https://api.telegram.org": "/telegram",
+}
+
+
+class UpstreamStub:
+    """Answers the Groq, Vapi and Telegram calls the functions make."""
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.url = None
+        self._runner = None
+
+    async def _answer(self, body):
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return web.json_response(body)
+
+    async def _groq(self, request):
+        await request.read()
+        return await self._answer({
+            "choices": [{"message": {"role": "assistant", "content": "Thanks! Someone will be in touch shortly."},
+                         "finish_reason": "stop"}],
+        })
+
+    async def _vapi(self, request):
+        await request.read()
+        return await self._answer({"id": f"asst_stub_{self.calls}"})
+
+    async def _telegram(self, request):
+        await request.read()
+        return await self._answer({"ok": True, "result": {"message_id": self.calls}})
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_STUB_PORT):
+        app = web.Application()
+        app.router.add_post("/groq/openai/v1/chat/completions", self._groq)
+        app.router.add_post("/vapi/assistant", self._vapi)
+        app.router.add_post("/telegram/{bot}/sendMessage", self._telegram)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def default_baseline_ref(module=SHARED_MODULE):
+    """Parent of the commit that introduced ``module`` (by default the shared client)."""
+    added = subprocess.run(
+        ["git", "log", "--diff-filter=A", "--format=%H", "-1", "--", module],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    if not added:
+        raise RuntimeError(f"{module} is not committed yet; pass --baseline-ref")
+    return f"{added}^"
+
+
+def checkout_functions(ref, dest, stub_url):
+    """Copy ``supabase/functions`` at ``ref`` (None: working tree) to ``dest``."""
+    if ref is None:
+        shutil.copytree(REPO_DIR / "supabase" / "functions", dest / "supabase" / "functions")
+    else:
+        archive = subprocess.run(
+            ["git", "archive", "--format=tar", ref, "supabase/functions"],
+            cwd=REPO_DIR, capture_output=True, check=True,
+        ).stdout
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(dest)
+    functions = dest / "supabase" / "functions"
+    for source in functions.rglob("*.ts"):
+        text = source.read_text(encoding="utf-8")
+        for host, prefix in UPSTREAMS.items():
+            text = text.replace(host, stub_url + prefix)
+        source.write_text(text, encoding="utf-8")
+    return functions
+
+
+def endpoints(requests, lead_id, version, seed=None):
+    """``(label, function, env, [request bodies])`` in the order they are run.
+
+    Each endpoint gets ``WARMUP_REQUESTS`` extra bodies to warm up with;
+    call and session ids differ per ``version``, so no run replays another's.
+    """
+    count = requests + WARMUP_REQUESTS
+    calls = make_calls(count, lead_ratio=0.3, seed=None if seed is None else f"{seed}-{version}")
+    chats = [
+        {
+            "sessionId": f"edge-rest-{version}-{seed}-{i}",
+            "messages": [{"role": "user", "content": f"Please call me back, I'm at caller{i}@example.com"}],
+        }
+        for i in range(count)
+    ]
+    return [
+        ("vapi-webhook call.started", "vapi-webhook", {}, [call.started() for call in calls]),
+        ("vapi-webhook call.ended", "vapi-webhook", {}, [call.ended() for call in calls]),
+        ("groq-chat", "groq-chat", {"GROQ_API_KEY": "stub"}, chats),
+        ("send-telegram-notification", "send-telegram-notification",
+         {"TELEGRAM_BOT_TOKEN": "stub", "TELEGRAM_CHAT_ID": "1"},
+         [{"leadId": lead_id, "type": "new_lead"}] * count),
+        ("create-vapi-assistant", "create-vapi-assistant", {"VAPI_PRIVATE_KEY": "stub"},
+         [{"business_name": f"Business {i}", "system_prompt": "You are a receptionist.",
+           "minimax_voice_id": "stub-voice"} for i in range(count)]),
+    ]
+
+
+async def post_all(session, url, bodies, concurrency, recorder, label):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(body, record):
+        async with semaphore:
+            started = time.perf_counter()
+            ok = False
+            try:
+                async with session.post(url, json=body) as response:
+                    await response.read()
+                    ok = response.status < 400
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            if record:
+                recorder.record(label, (time.perf_counter() - started) * 1000, ok)
+
+    # Warm the worker (module init, first connections) before measuring
+    await asyncio.gather(*(post(body, False) for body in bodies[:WARMUP_REQUESTS]))
+    await asyncio.gather(*(post(body, True) for body in bodies[WARMUP_REQUESTS:]))
+
+
+async def run_version(functions, standin, supabase_url, plan, concurrency):
+    """Serve each function in turn from ``functions`` and replay its requests."""
+    recorder = LatencyRecorder()
+    rest_requests = {}
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        by_function = {}
+        for label, function, env, bodies in plan:
+            by_function.setdefault(function, (env, []))[1].append((label, bodies))
+        for function, (env, groups) in by_function.items():
+            process, function_url = spawn_function(
+                functions / function / "index.ts", supabase_url, SERVICE_ROLE_KEY, env
+            )
+            try:
+                await wait_for_port(function_url)
+                for label, bodies in groups:
+                    before = len(standin.requests)
+                    await post_all(session, function_url, bodies, concurrency, recorder, label)
+                    made = standin.requests[before:]
+                    rest_requests[label] = round(
+                        sum(1 for r in made if r.kind in ("rest", "rpc")) / len(bodies), 2
+                    )
+            finally:
+                process.terminate()
+                process.wait()
+    return recorder.summary(), rest_requests
+
+
+async def run(args):
+    stub = UpstreamStub(args.upstream_latency_ms)
+    stub_url = await stub.serve(port=args.stub_port)
+    standin = PostgrestStandIn(args.latency_ms, args.jitter_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+    [lead] = standin.insert("leads", {
+        "full_name": "Benchmark Lead", "email": "lead@example.com", "source": "website", "status": "new",
+    })
+    baseline_ref = args.baseline_ref or default_baseline_ref()
+
+    versions = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="edge-rest-") as tmp:
+            for name, ref in (("before", baseline_ref), ("after", None)):
+                functions = checkout_functions(ref, Path(tmp) / name, stub_url)
+                plan = endpoints(args.requests, lead["id"], name, seed=args.seed)
+                latency, rest = await run_version(functions, standin, supabase_url, plan, args.concurrency)
+                versions[name] = {"ref": ref or "working tree", "latency": latency, "restPerRequest": rest}
+    finally:
+        await standin.close()
+        await stub.close()
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "standIn": {"latencyMs": args.latency_ms, "jitterMs": args.jitter_ms},
+        "endpoints": [label for label, *_ in plan],
+        **versions,
+    }
+
+
+def failures(report):
+    return [
+        f"{version}: {label} had {report[version]['latency'][label]['errors']} failed requests"
+        for version in ("before", "after")
+        for label in report["endpoints"]
+        if report[version]["latency"][label]["errors"]
+    ]
+
+
+def _change(before, after):
+    return "-" if not before else f"{(after - before) / before:+.0%}"
+
+
+def print_report(report):
+    print(f"before: {report['before']['ref']}\nafter:  {report['after']['ref']}")
+    print(f"{report['requests']} requests per endpoint, concurrency {report['concurrency']}, "
+          f"{report['standIn']['latencyMs']} ms stand-in latency\n")
+    header = (f"{'endpoint':<30}{'p50 before':>12}{'p50 after':>11}{'change':>8}"
+              f"{'p95 before':>12}{'p95 after':>11}{'REST/req':>11}")
+    print(header)
+    print("-" * len(header))
+    for label in report["endpoints"]:
+        before, after = report["before"]["latency"][label], report["after"]["latency"][label]
+        rest = f"{report['before']['restPerRequest'][label]:g}->{report['after']['restPerRequest'][label]:g}"
+        print(f"{label:<30}{before['p50Ms']:>12.1f}{after['p50Ms']:>11.1f}"
+              f"{_change(before['p50Ms'], after['p50Ms']):>8}"
+              f"{before['p95Ms']:>12.1f}{after['p95Ms']:>11.1f}{rest:>11}")
+    for problem in failures(report):
+        print(f"FAIL: {problem}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=25,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="random extra latency of up to this many ms")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0,
+                        help="latency of the Groq/Vapi/Telegram stub")
+    parser.add_argument("--baseline-ref", default=None,
+                        help="git ref of the 'before' functions (default: before the shared client)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the functions' SUPABASE_URL)")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_STUB_PORT, help="port of the upstream stub")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
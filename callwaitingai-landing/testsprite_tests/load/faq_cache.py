@@ -0,0 +1,387 @@
+"""Benchmark for the groq-chat FAQ answer cache.
+
+Replays the first messages of chat sessions against groq-chat and reports
+the cache hit rate, hit vs. miss latency and the Groq calls saved. The
+questions come from an anonymized ``chat_messages`` export (``--export``,
+JSON or CSV as downloaded from the Supabase table editor) or, without one,
+from paraphrases of the questions FAQ.tsx and Pricing.tsx answer plus a
+tail of one-off questions.
+
+Offline, with the function run by Deno against the Supabase stand-in and
+Groq replaced by a stub that answers after ``--groq-latency-ms``::
+
+    python -m load.faq_cache --spawn-function --export chat_messages.csv
+    python -m load.faq_cache --spawn-function --backend off      # baseline without the cache
+
+Against a served or deployed function::
+
+    python -m load.faq_cache --url https://<ref>.supabase.co/functions/v1/groq-chat --export chat_messages.csv
+
+``--simulate`` sends nothing and models the hit rate of the same traffic for
+several similarity thresholds (FAQ_CACHE_THRESHOLD), using a port of the
+matching in ``groq-chat/faq-cache.ts``. ``--write-questions`` saves the
+anonymized first-turn questions, which can be shared instead of the export.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import unicodedata
+from pathlib import Path
+
+import aiohttp
+
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.edge_rest import DEFAULT_STUB_PORT, UpstreamStub, checkout_functions
+from load.stats import LatencyRecorder, format_table
+from load.vapi_webhook import DEFAULT_STAND_IN_PORT, spawn_function, wait_for_port
+
+DEFAULT_URL = "http://localhost:54321/functions/v1/groq-chat"
+
+# As in faq-cache.ts
+MAX_ENTRIES = 500
+MAX_QUESTION_LENGTH = 200
+MAX_QUESTION_WORDS = 20
+FILLER = {
+    "a", "an", "the", "please", "hi", "hello", "hey", "so", "just", "um", "uh", "ok", "okay", "thanks",
+    "can", "could", "would", "you", "me", "tell", "i", "im", "my", "we", "our", "your", "to", "do",
+    "does", "is", "are", "it", "of", "for", "and", "there", "about", "know", "want",
+}
+CONTACT_DETAILS = re.compile(r"[\w.-]+@[\w.-]+\.\w+|\d{3}[-.\s]?\d{3}[-.\s]?\d{4}")
+
+# Opening questions the landing page already answers, by topic, most asked first
+TOPICS = {
+    "pricing": ["How much does it cost?", "What are your prices?", "how much is it", "What's the pricing?",
+                "How much do your plans cost?", "pricing?"],
+    "how it works": ["How does CallWaitingAI work?", "how does it work", "How does this work?",
+                     "What does CallWaitingAI do?", "what is callwaitingai"],
+    "trial": ["Can I try it before committing?", "Is there a free trial?", "do you have a free trial",
+              "Can I try it for free?"],
+    "setup": ["How long does setup take?", "how long does it take to set up", "How long is setup?",
+              "How long does the setup take?"],
+    "phone numbers": ["What phone numbers are supported?", "Which phone numbers do you support?",
+                      "What phone numbers do you support"],
+    "security": ["Is my data secure?", "Is my data safe?", "how secure is my data"],
+    "customize": ["Can I customize the AI responses?", "Can I customise the AI's responses?",
+                  "can i customize responses"],
+    "accuracy": ["How accurate is the AI?", "Is the AI accurate?", "how accurate is your AI"],
+}
+ONE_OFF_TEMPLATES = (
+    "We're a {business} in {city}. Can Marcy handle about {calls} calls a day?",
+    "Does it work with {tool}?",
+    "I run a {business}, would this help with after-hours calls?",
+    "Can the assistant speak {language}?",
+)
+BUSINESSES = ("dental clinic", "law firm", "plumbing company", "salon", "car dealership", "vet practice")
+CITIES = ("Lagos", "Austin", "Leeds", "Toronto", "Accra", "Denver")
+TOOLS = ("Calendly", "HubSpot", "Google Calendar", "Salesforce", "Zapier")
+LANGUAGES = ("Spanish", "French", "Yoruba", "German", "Portuguese")
+
+_NAME_INTRO = re.compile(r"\b(my name is|i am|i'm|this is)\s+[A-Z][a-z]+(\s+[A-Z][a-z]+)?")
+
+
+def anonymize(text):
+    """Message text without e-mail addresses, phone numbers, long numbers or introduced names."""
+    text = re.sub(r"[\w.+-]+@[\w.-]+\.\w+", "user@example.com", text)
+    text = re.sub(r"\+?\d[\d\s().-]{7,}\d", "555-010-0000", text)
+    text = re.sub(r"\b\d{5,}\b", "00000", text)
+    return _NAME_INTRO.sub(lambda match: f"{match[1]} Alex", text)
+
+
+def read_export(path):
+    """Rows of a ``chat_messages`` export (JSON array or CSV with a header row)."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as fh:
+            return list(csv.DictReader(fh))
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def first_turns(rows):
+    """``(session, question)`` of every session's first user message, in the order sessions started."""
+    first = {}
+    for row in rows:
+        if row.get("sender_type") != "user" or not row.get("message_text"):
+            continue
+        session = row.get("session_id")
+        if session not in first or row["created_at"] < first[session]["created_at"]:
+            first[session] = row
+    ordered = sorted(first.values(), key=lambda row: row["created_at"])
+    return [(hashlib.sha256(str(row["session_id"]).encode()).hexdigest()[:12], anonymize(row["message_text"]))
+            for row in ordered]
+
+
+def make_questions(count, unique_ratio=0.2, zipf_s=1.1, seed=None):
+    """``(topic, question)`` pairs: Zipf-distributed FAQ paraphrases plus one-offs (topic None)."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    weights = [1 / (rank ** zipf_s) for rank in range(1, len(topics) + 1)]
+    questions = []
+    for _ in range(count):
+        if rng.random() < unique_ratio:
+            questions.append((None, rng.choice(ONE_OFF_TEMPLATES).format(
+                business=rng.choice(BUSINESSES), city=rng.choice(CITIES), calls=rng.randint(20, 400),
+                tool=rng.choice(TOOLS), language=rng.choice(LANGUAGES),
+            )))
+        else:
+            topic = rng.choices(topics, weights)[0]
+            questions.append((topic, rng.choice(TOPICS[topic])))
+    return questions
+
+
+def _stem(word):
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and (word.endswith("ed") or word.endswith("es")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def normalize_question(text):
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not "\u0300" <= char <= "\u036f").lower().replace("'", "")
+    return " ".join(_stem(word) for word in re.sub(r"[^a-z0-9]+", " ", text).split(" ")
+                    if word and word not in FILLER)
+
+
+def embed(normalized):
+    vector = {}
+    for word in normalized.split(" "):
+        if not word:
+            continue
+        vector[f"w:{word}"] = vector.get(f"w:{word}", 0) + 1
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            vector[f"t:{padded[i:i + 3]}"] = vector.get(f"t:{padded[i:i + 3]}", 0) + 0.3
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {feature: weight / norm for feature, weight in vector.items()} if norm else vector
+
+
+def similarity(a, b):
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    return sum(weight * large.get(feature, 0) for feature, weight in small.items())
+
+
+def cacheable(text):
+    if len(text) > MAX_QUESTION_LENGTH or CONTACT_DETAILS.search(text):
+        return False
+    return 0 < len(normalize_question(text).split()) <= MAX_QUESTION_WORDS
+
+
+def simulate(questions, threshold):
+    """Hits, misses, bypasses and hits answered for another topic, at ``threshold`` (TTL ignored)."""
+    entries = {}  # normalized question -> (vector, topic), oldest first
+    counts = {"hit": 0, "miss": 0, "bypass": 0, "wrongTopic": 0}
+    for topic, text in questions:
+        if not cacheable(text):
+            counts["bypass"] += 1
+            continue
+        question = normalize_question(text)
+        vector = embed(question)
+        if question in entries:
+            best, score = entries[question], 1.0
+        else:
+            best, score = None, 0.0
+            for entry in entries.values():
+                candidate = similarity(vector, entry[0])
+                if candidate > score:
+                    best, score = entry, candidate
+        if best is not None and score >= threshold:
+            counts["hit"] += 1
+            if topic is not None and best[1] != topic:
+                counts["wrongTopic"] += 1
+            continue
+        counts["miss"] += 1
+        entries.pop(question, None)
+        entries[question] = (vector, topic)
+        while len(entries) > MAX_ENTRIES:
+            entries.pop(next(iter(entries)))
+    return counts
+
+
+async def replay(url, questions, concurrency, auth_key=None, timeout_s=60):
+    """Send each question as the first turn of its own session and return a report dict."""
+    headers = {"Content-Type": "application/json"}
+    if auth_key:
+        headers["Authorization"] = f"Bearer {auth_key}"
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=timeout_s)
+    run_id = int(time.time())
+
+    async def send(session, i, text):
+        body = {"message": text, "sessionId": f"faq-cache-{run_id}-{i}"}
+        async with semaphore:
+            started = time.perf_counter()
+            label, ok = "error", False
+            try:
+                async with session.post(url, json=body, headers=headers) as response:
+                    await response.read()
+                    ok = response.status == 200
+                    label = response.headers.get("X-Cache", "off") if ok else "error"
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            recorder.record(label, (time.perf_counter() - started) * 1000, ok)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(session, i, text) for i, (_, text) in enumerate(questions)))
+        elapsed_s = time.perf_counter() - started
+
+    return build_report(recorder, len(questions), elapsed_s)
+
+
+def build_report(recorder, count, elapsed_s):
+    latency = recorder.summary()
+    hits = latency.get("hit", {}).get("count", 0)
+    misses = latency.get("miss", {}).get("count", 0)
+    hit_ms = recorder.values("hit")
+    miss_ms = recorder.values("miss") or recorder.values("off")
+    report = {
+        "requests": count,
+        "elapsedS": round(elapsed_s, 2),
+        "hits": hits,
+        "misses": misses,
+        "hitRate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "errors": latency["all"]["errors"] if count else 0,
+        "latency": latency,
+        "savedMs": None,
+    }
+    if hit_ms and miss_ms:
+        # Every hit would otherwise have waited for Groq like a typical miss
+        report["savedMs"] = round((statistics.mean(miss_ms) - statistics.mean(hit_ms)) * hits, 1)
+    return report
+
+
+async def run_spawned(args, questions):
+    """Run groq-chat with `deno run` against the stand-in and a Groq stub."""
+    stub = UpstreamStub(args.groq_latency_ms)
+    stub_url = await stub.serve(port=args.stub_port)
+    standin = PostgrestStandIn(args.latency_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+    function = None
+    try:
+        with tempfile.TemporaryDirectory(prefix="faq-cache-") as tmp:
+            functions = checkout_functions(None, Path(tmp), stub_url)
+            env = {"GROQ_API_KEY": "stub", "FAQ_CACHE": "on" if args.backend == "memory" else "off"}
+            if args.threshold is not None:
+                env["FAQ_CACHE_THRESHOLD"] = str(args.threshold)
+            function, function_url = spawn_function(
+                functions / "groq-chat" / "index.ts", supabase_url, SERVICE_ROLE_KEY, env
+            )
+            await wait_for_port(function_url)
+            report = await replay(function_url, questions, args.concurrency)
+    finally:
+        if function is not None:
+            function.terminate()
+            function.wait()
+        await standin.close()
+        await stub.close()
+    report["groqCalls"] = stub.calls
+    return report
+
+
+def failures(report, max_hit_ms):
+    problems = []
+    if report["errors"]:
+        problems.append(f"{report['errors']} requests failed")
+    hit = report["latency"].get("hit")
+    if hit and hit["p50Ms"] > max_hit_ms:
+        problems.append(f"cache hits took {hit['p50Ms']:.1f} ms at p50 (budget {max_hit_ms:g} ms)")
+    return problems
+
+
+def print_report(report, max_hit_ms):
+    print(f"{report['requests']} first turns in {report['elapsedS']}s\n")
+    print(format_table(report["latency"]))
+    if report["hitRate"] is not None:
+        print(f"\nhit rate: {report['hitRate']:.1%} ({report['hits']} hits, {report['misses']} misses)")
+    if "groqCalls" in report:
+        print(f"Groq calls: {report['groqCalls']}")
+    if report["savedMs"] is not None:
+        print(f"saved: {report['savedMs'] / 1000:.1f}s of waiting for Groq")
+    for problem in failures(report, max_hit_ms):
+        print(f"FAIL: {problem}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL, help="groq-chat endpoint")
+    parser.add_argument("--export", help="chat_messages export (JSON or CSV) to take the first turns from")
+    parser.add_argument("--write-questions", help="save the anonymized first-turn questions to this JSON file")
+    parser.add_argument("--requests", type=int, default=500, help="number of first turns without --export")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--unique-ratio", type=float, default=0.2,
+                        help="fraction of one-off questions without --export")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of the topic popularity without --export")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--auth-key", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="Bearer token for the function (default: $SUPABASE_ANON_KEY)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="only model the hit rate for --thresholds, no requests are sent")
+    parser.add_argument("--thresholds", default="0.7,0.8,0.85,0.88,0.9,0.95",
+                        help="comma-separated similarity thresholds for --simulate")
+    parser.add_argument("--spawn-function", action="store_true",
+                        help="run groq-chat with `deno run` against the stand-in and a Groq stub")
+    parser.add_argument("--backend", default="memory", choices=("memory", "off"),
+                        help="FAQ cache of the spawned function (off = baseline)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="FAQ_CACHE_THRESHOLD of the spawned function")
+    parser.add_argument("--groq-latency-ms", type=float, default=600, help="time the Groq stub takes to answer")
+    parser.add_argument("--latency-ms", type=float, default=25,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--max-hit-ms", type=float, default=10, help="p50 budget of a cache hit")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the function's SUPABASE_URL)")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_STUB_PORT, help="port of the Groq stub")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.export:
+        questions = [(None, text) for _, text in first_turns(read_export(args.export))]
+    else:
+        questions = make_questions(args.requests, args.unique_ratio, args.zipf, seed=args.seed)
+    if args.write_questions:
+        with open(args.write_questions, "w", encoding="utf-8") as fh:
+            json.dump([text for _, text in questions], fh, indent=2)
+
+    if args.simulate:
+        distinct = len({normalize_question(text) for _, text in questions})
+        print(f"{len(questions)} first turns, {distinct} distinct normalized questions\n")
+        print(f"{'threshold':>10}{'hit rate':>10}{'bypassed':>10}{'wrong topic':>13}")
+        for threshold in (float(value) for value in args.thresholds.split(",")):
+            counts = simulate(questions, threshold)
+            lookups = counts["hit"] + counts["miss"]
+            wrong = "-" if args.export else f"{counts['wrongTopic']}"
+            print(f"{threshold:>10g}{counts['hit'] / lookups if lookups else 0:>10.1%}"
+                  f"{counts['bypass']:>10}{wrong:>13}")
+        return 0
+
+    if args.spawn_function:
+        report = asyncio.run(run_spawned(args, questions))
+    else:
+        report = asyncio.run(replay(args.url, questions, args.concurrency, args.auth_key))
+    print_report(report, args.max_hit_ms)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report, args.max_hit_ms) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
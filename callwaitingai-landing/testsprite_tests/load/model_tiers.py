@@ -0,0 +1,290 @@
+"""Latency of groq-chat per model tier against an OpenAI-compatible stub.
+
+Runs groq-chat from the working tree with Deno against the in-process
+Supabase stand-in and a local stand-in for Groq's chat completions API, then
+sends a mix of small talk, FAQ questions and longer requests::
+
+    python -m load.model_tiers --requests 300 --concurrency 8 --stream
+
+The stub answers each model with its own speed (time to first token plus time
+per token, with random spread) and honours ``max_tokens``, so the report
+shows what routing a turn to the fast tier saves. ``--fast-error-rate`` makes
+the fast model fail some calls, which groq-chat must retry on the full model.
+Requests carry the widget's generation settings, none at all, or values out
+of range; the stub checks every call it gets is within groq-chat's limits.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.edge_rest import DEFAULT_STUB_PORT, UpstreamStub, checkout_functions
+from load.stats import LatencyRecorder, format_table
+from load.vapi_webhook import DEFAULT_STAND_IN_PORT, spawn_function, wait_for_port
+
+# Speed of each model on the stub: (ms to first token, ms per further token),
+# roughly Groq's published throughput
+MODEL_PROFILES = {
+    "llama-3.1-8b-instant": (90, 1.3),
+    "llama-3.3-70b-versatile": (300, 3.6),
+}
+TIER_MODELS = {"fast": "llama-3.1-8b-instant", "full": "llama-3.3-70b-versatile"}
+# groq-chat's limits (routing.ts)
+MAX_TOKENS_RANGE = (16, 500)
+TEMPERATURE_RANGE = (0, 1)
+WARMUP_REQUESTS = 5
+
+TURNS = {
+    "small talk": ["Hi!", "Hello there", "Thanks, that helps", "Great, thank you!", "Good morning"],
+    "faq": [
+        "How much does the starter plan cost?",
+        "Is there a free trial?",
+        "What languages does Marcy speak?",
+        "What does CallWaitingAI do?",
+        "How do I sign up?",
+    ],
+    "complex": [
+        "We run three dental clinics with a shared front desk and overflow calls go to voicemail after six "
+        "rings. Could Marcy pick those up, book into our Dentrix calendar and text the patient a confirmation?",
+        "I was charged twice on my last invoice and need a refund for the duplicate payment.",
+        "Can you integrate with HubSpot through a webhook so every lead lands in our CRM pipeline?",
+        "Our receptionist quits next month. Walk me through what a typical week looks like with your "
+        "service handling calls for a busy plumbing company, including emergencies at night.",
+    ],
+}
+KIND_WEIGHTS = {"small talk": 0.3, "faq": 0.4, "complex": 0.3}
+
+# Generation settings clients send: the widget's, none, and out of range
+SETTINGS = [
+    {"max_tokens": 250, "temperature": 0.5},
+    {},
+    {"max_tokens": 5000, "temperature": 3},
+    {"max_tokens": 2, "temperature": -1},
+    {"max_tokens": "lots", "temperature": None},
+]
+
+
+class CompletionsStub(UpstreamStub):
+    """OpenAI-compatible ``/chat/completions`` with per-model speed."""
+
+    def __init__(self, fast_error_rate=0, seed=None):
+        super().__init__()
+        self.fast_error_rate = fast_error_rate
+        self.rng = random.Random(seed)
+        self.requests = []  # (model, max_tokens, temperature) of every call
+        self.injected_errors = 0
+
+    def _timing(self, model):
+        first_token_ms, per_token_ms = MODEL_PROFILES.get(model, MODEL_PROFILES["llama-3.3-70b-versatile"])
+        spread = self.rng.lognormvariate(0, 0.25)
+        return first_token_ms * spread, per_token_ms * spread
+
+    async def _groq(self, request):
+        payload = await request.json()
+        model = payload.get("model")
+        self.requests.append((model, payload.get("max_tokens"), payload.get("temperature")))
+        if model == TIER_MODELS["fast"] and self.rng.random() < self.fast_error_rate:
+            self.injected_errors += 1
+            return web.json_response({"error": {"message": "Service unavailable"}}, status=503)
+
+        tokens = min(int(payload.get("max_tokens") or MAX_TOKENS_RANGE[1]), self.rng.randint(40, 220))
+        first_token_ms, per_token_ms = self._timing(model)
+        await asyncio.sleep(first_token_ms / 1000)
+        if not payload.get("stream"):
+            await asyncio.sleep(per_token_ms * (tokens - 1) / 1000)
+            content = " ".join(["word"] * tokens)
+            return web.json_response({
+                "model": model,
+                "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": tokens},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i in range(tokens):
+            if i:
+                await asyncio.sleep(per_token_ms / 1000)
+            chunk = {"model": model, "choices": [{"delta": {"content": "word "}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        last = {"model": model, "choices": [{"delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(last)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def make_turns(count, seed=None):
+    """``(kind, body)`` pairs in a fixed random order."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(KIND_WEIGHTS), weights=list(KIND_WEIGHTS.values()), k=count)
+    return [
+        (kind, {"message": rng.choice(TURNS[kind]), "sessionId": f"model-tiers-{seed}-{i}",
+                **SETTINGS[i % len(SETTINGS)]})
+        for i, kind in enumerate(kinds)
+    ]
+
+
+def _within(value, bounds):
+    return isinstance(value, (int, float)) and bounds[0] <= value <= bounds[1]
+
+
+async def send(session, url, body, stream):
+    """Post one turn: ``(ok, tier, ms to first byte of the reply, total ms)``."""
+    started = time.perf_counter()
+    first_byte_ms = None
+    try:
+        headers = {"Accept": "text/event-stream"} if stream else {}
+        async with session.post(url, json={**body, "stream": stream}, headers=headers) as response:
+            if stream:
+                tier = response.headers.get("X-Model-Tier")
+                async for _ in response.content.iter_any():
+                    if first_byte_ms is None:
+                        first_byte_ms = (time.perf_counter() - started) * 1000
+            else:
+                data = await response.json(content_type=None)
+                tier = (data.get("data") or {}).get("tier")
+            ok = response.status < 400
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return False, None, None, (time.perf_counter() - started) * 1000
+    return ok, tier, first_byte_ms, (time.perf_counter() - started) * 1000
+
+
+async def run(args):
+    stub = CompletionsStub(args.fast_error_rate, seed=args.seed)
+    stub_url = await stub.serve(port=args.stub_port)
+    standin = PostgrestStandIn(args.latency_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+
+    total = LatencyRecorder()
+    first_token = LatencyRecorder()
+    routing = defaultdict(Counter)
+    errors = 0
+    turns = make_turns(args.requests + WARMUP_REQUESTS, args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def turn(kind, body, record):
+        nonlocal errors
+        async with semaphore:
+            ok, tier, first_byte_ms, total_ms = await send(session, function_url, body, args.stream)
+        if not record:
+            return
+        if not ok:
+            errors += 1
+            return
+        routing[kind][tier] += 1
+        total.record(tier, total_ms)
+        if first_byte_ms is not None:
+            first_token.record(tier, first_byte_ms)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="model-tiers-") as tmp:
+            functions = checkout_functions(None, Path(tmp), stub_url)
+            process, function_url = spawn_function(functions / "groq-chat" / "index.ts", supabase_url,
+                                                   SERVICE_ROLE_KEY, {"GROQ_API_KEY": "stub"})
+            try:
+                await wait_for_port(function_url)
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+                    # Warm the worker (module init, first connections) before measuring
+                    await asyncio.gather(*(turn(kind, body, False) for kind, body in turns[:WARMUP_REQUESTS]))
+                    await asyncio.gather(*(turn(kind, body, True) for kind, body in turns[WARMUP_REQUESTS:]))
+                    # Stored after the reply when streaming
+                    await asyncio.sleep(0.5)
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        await standin.close()
+        await stub.close()
+
+    replies = [row for row in standin.tables["chat_messages"] if row["sender_type"] == "assistant"]
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "stream": args.stream,
+        "fastErrorRate": args.fast_error_rate,
+        "errors": errors,
+        "latency": total.summary(),
+        "firstTokenLatency": first_token.summary() if args.stream else None,
+        "routing": {kind: dict(tiers) for kind, tiers in routing.items()},
+        "escalations": stub.injected_errors,
+        "upstreamCalls": dict(Counter(model for model, _, _ in stub.requests)),
+        "outOfRange": sorted({
+            f"max_tokens={max_tokens} temperature={temperature}"
+            for _, max_tokens, temperature in stub.requests
+            if not (_within(max_tokens, MAX_TOKENS_RANGE) and _within(temperature, TEMPERATURE_RANGE))
+        }),
+        "storedTiers": dict(Counter((row.get("metadata") or {}).get("tier") for row in replies)),
+    }
+
+
+def failures(report):
+    problems = []
+    if report["errors"]:
+        problems.append(f"{report['errors']} requests failed")
+    if report["outOfRange"]:
+        problems.append(f"Groq was called with settings outside groq-chat's limits: {report['outOfRange'][:3]}")
+    untagged = report["storedTiers"].get(None, 0)
+    if untagged:
+        problems.append(f"{untagged} stored replies have no tier in their metadata")
+    return problems
+
+
+def print_report(report):
+    mode = "streaming" if report["stream"] else "JSON"
+    print(f"{report['requests']} requests ({mode}), concurrency {report['concurrency']}, "
+          f"fast tier error rate {report['fastErrorRate']:g}\n")
+    print("Total latency per tier")
+    print(format_table(report["latency"]))
+    if report["firstTokenLatency"]:
+        print("\nFirst byte of the reply per tier")
+        print(format_table(report["firstTokenLatency"]))
+    print(f"\n{'turn kind':<14}{'fast':>8}{'full':>8}")
+    for kind in TURNS:
+        tiers = report["routing"].get(kind, {})
+        print(f"{kind:<14}{tiers.get('fast', 0):>8}{tiers.get('full', 0):>8}")
+    print(f"\nfast tier failures retried on the full model: {report['escalations']}")
+    print(f"Groq calls per model: {report['upstreamCalls']}")
+    print(f"stored replies per tier: {report['storedTiers']}")
+    for problem in failures(report):
+        print(f"FAIL: {problem}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="measured chat turns")
+    parser.add_argument("--concurrency", type=int, default=8, help="turns in flight at once")
+    parser.add_argument("--stream", action="store_true", help="request streamed replies, as the widget does")
+    parser.add_argument("--fast-error-rate", type=float, default=0.05,
+                        help="share of fast-model calls the stub fails with 503")
+    parser.add_argument("--latency-ms", type=float, default=25,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic and timings")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the function's SUPABASE_URL)")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_STUB_PORT, help="port of the completions stub")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""Small PostgREST helpers used by the load tools to inspect what was written."""
+
+
+def service_headers(service_key):
+    return {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+
+
+async def count_rows(session, supabase_url, service_key, table):
+    """Exact row count of ``table`` (HEAD + ``Prefer: count=exact``)."""
+    headers = {**service_headers(service_key), "Prefer": "count=exact", "Range": "0-0"}
+    async with session.head(f"{supabase_url}/rest/v1/{table}?select=*", headers=headers) as response:
+        if response.status >= 400:
+            raise RuntimeError(f"Counting {table} failed: HTTP {response.status}")
+        # Content-Range: "0-0/42" or "*/0"
+        total = response.headers.get("Content-Range", "*/0").rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else 0
+
+
+async def count_tables(session, supabase_url, service_key, tables):
+    return {
+        table: await count_rows(session, supabase_url, service_key, table)
+        for table in tables
+    }
+
+
+async def fetch_all(session, supabase_url, service_key, table, select="*", order="id", page_size=1000):
+    """Every row of ``table``, paged so PostgREST's max-rows limit does not truncate it."""
+    rows = []
+    while True:
+        params = {"select": select, "order": order, "limit": page_size, "offset": len(rows)}
+        async with session.get(f"{supabase_url}/rest/v1/{table}", params=params,
+                               headers=service_headers(service_key)) as response:
+            if response.status >= 400:
+                raise RuntimeError(f"Reading {table} failed: HTTP {response.status}")
+            page = await response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
@@ -0,0 +1,287 @@
+"""Stress test for the realtime merge on the Calls, Leads and Payments pages.
+
+Opens ``--clients`` signed-in browser contexts on the pages, fires bursts of
+Vapi webhook events, and counts the Supabase REST requests each client made
+while the changes streamed in over Realtime. Every page merges change
+payloads into its loaded rows, so a client should make at most one
+(debounced) reconcile request per burst instead of one full reload per
+event::
+
+    npm run dev   # the app under test, see TESTSPRITE_BASE_URL
+    python -m load.realtime_fanout --clients 6 --bursts 5 --burst-size 20
+
+Supabase REST, Auth and Realtime are all served by the in-process stand-in
+(harness/standin.py, harness/realtime.py). By default the events are applied
+by replaying the REST writes of vapi-webhook's direct mode in-process;
+``--spawn-function`` runs the real function with Deno against the stand-in
+instead.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import aiohttp
+
+from harness.auth import SessionCache
+from harness.pool import BrowserPool
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from harness.waits import open_app, settle
+from load.vapi_events import make_calls
+from load.vapi_webhook import (
+    DEFAULT_STAND_IN_PORT,
+    FUNCTION_PATH,
+    spawn_function,
+    wait_for_port,
+)
+
+DEFAULT_PAGES = ("/calls", "/leads", "/payments")
+CLIENT_PASSWORD = "FanoutClient123!"
+# Longer than the reconcile debounce of use-realtime-merge.tsx (5 s)
+DEFAULT_QUIET_MS = 7000
+
+# leadFromTranscript() in supabase/functions/vapi-webhook/index.ts
+_EMAIL = re.compile(r"[\w.-]+@[\w.-]+\.\w+")
+_PHONE = re.compile(r"\d{3}[-.]?\d{3}[-.]?\d{4}")
+
+
+def seed(standin, rows):
+    """Existing history, so the pages open on a full first page."""
+    newest = datetime.now(timezone.utc) - timedelta(minutes=5)
+    standin.load("call_logs", (
+        {
+            "caller_phone": f"+1555{i:07d}",
+            "call_status": "completed",
+            "duration_seconds": 60 + i % 300,
+            "created_at": (newest - timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(rows)
+    ))
+    standin.load("leads", (
+        {
+            "full_name": f"Lead {i:05d}",
+            "email": f"lead{i}@example.com",
+            "created_at": (newest - timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(rows)
+    ))
+    standin.load("payments", (
+        {
+            "amount": 49.99,
+            "payment_status": "successful",
+            "created_at": (newest - timedelta(hours=i)).isoformat(),
+        }
+        for i in range(min(rows, 50))
+    ))
+
+
+async def replay_in_process(standin, event):
+    """Issue the REST writes vapi-webhook's direct mode makes for ``event``."""
+    headers = {"apikey": SERVICE_ROLE_KEY, "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
+               "Prefer": "return=representation"}
+    rest = f"{standin.supabase_url}/rest/v1"
+    call = event["call"]
+    logged = await standin.handle("POST", f"{rest}/webhook_events", headers, json.dumps(
+        {"event_type": event["type"], "payload": event, "source": "vapi", "processed": False}
+    ))
+    if event["type"] == "call.started":
+        await standin.handle("POST", f"{rest}/call_logs", headers, json.dumps({
+            "vapi_call_id": call["id"],
+            "caller_phone": call["customer"]["number"],
+            "call_status": "in_progress",
+            "call_type": "inbound",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "metadata": event,
+        }))
+    else:
+        await standin.handle("PATCH", f"{rest}/call_logs?vapi_call_id=eq.{call['id']}", headers, json.dumps({
+            "call_status": "completed",
+            "duration_seconds": call["duration"],
+            "transcript": call["transcript"],
+            "ended_at": datetime.now(timezone.utc).isoformat(),
+        }))
+        email, phone = _EMAIL.search(call["transcript"]), _PHONE.search(call["transcript"])
+        if email or phone:
+            await standin.handle(
+                "POST", f"{rest}/leads?on_conflict=vapi_call_id",
+                {**headers, "Prefer": "resolution=ignore-duplicates,return=minimal"},
+                json.dumps([{
+                    "vapi_call_id": call["id"],
+                    "full_name": "Voice Call Lead",
+                    "email": email.group(0) if email else None,
+                    "phone_number": phone.group(0) if phone else None,
+                    "source": "voice_call",
+                    "status": "new",
+                    "message": call["transcript"][:500],
+                    "metadata": {"vapi_call_id": call["id"]},
+                }]),
+            )
+    [row] = json.loads(logged.body)
+    await standin.handle("PATCH", f"{rest}/webhook_events?id=eq.{row['id']}", headers, json.dumps(
+        {"processed": True, "processed_at": datetime.now(timezone.utc).isoformat()}
+    ))
+
+
+async def fire_bursts(deliver, calls, burst_size, burst_gap_s):
+    """Deliver ``call.started`` then ``call.ended`` for ``burst_size`` calls at a time."""
+    for first in range(0, len(calls), burst_size):
+        burst = calls[first:first + burst_size]
+        await asyncio.gather(*(deliver(call.started()) for call in burst))
+        await asyncio.gather(*(deliver(call.ended()) for call in burst))
+        await asyncio.sleep(burst_gap_s)
+
+
+async def open_clients(stack, pool, standin, pages):
+    """One signed-in context per page, each as its own user."""
+    users = {}
+    for i in range(len(pages)):
+        email = f"fanout{i}@example.com"
+        standin.add_user(email, CLIENT_PASSWORD, full_name=f"Fanout Client {i}")
+        users[f"client{i}"] = (email, CLIENT_PASSWORD)
+    sessions = SessionCache(state_dir=None, users=users, grant=standin.password_grant)
+
+    clients = []
+    for i, path in enumerate(pages):
+        role = f"client{i}"
+        context = await stack.enter_async_context(
+            pool.context(storage_state=await sessions.storage_state(role))
+        )
+        await standin.attach(context)
+        page = await context.new_page()
+        await open_app(page, path)
+        clients.append({"client": role, "page": path, "userId": standin.user_id(users[role][0]),
+                        "tab": page})
+    return clients
+
+
+async def run(args, calls):
+    standin = PostgrestStandIn(args.latency_ms, args.jitter_ms, seed=args.seed)
+    seed(standin, args.rows)
+    pages = [args.pages[i % len(args.pages)] for i in range(args.clients)]
+    function = None
+
+    async with contextlib.AsyncExitStack() as stack:
+        session = await stack.enter_async_context(aiohttp.ClientSession())
+        if args.spawn_function:
+            supabase_url = await standin.serve(port=args.stand_in_port)
+            stack.push_async_callback(standin.close)
+            function, function_url = spawn_function(Path(args.function_path), supabase_url, SERVICE_ROLE_KEY)
+            await wait_for_port(function_url)
+
+            async def deliver(event):
+                async with session.post(function_url, json=event) as response:
+                    await response.read()
+        else:
+            async def deliver(event):
+                await replay_in_process(standin, event)
+
+        try:
+            pool = await stack.enter_async_context(BrowserPool())
+            clients = await open_clients(stack, pool, standin, pages)
+            baseline = len(standin.requests)
+            sent = standin.realtime.messages_sent
+
+            await fire_bursts(deliver, calls, args.burst_size, args.burst_gap_ms / 1000)
+            await asyncio.sleep(args.quiet_ms / 1000)
+            for client in clients:
+                await settle(client["tab"])
+
+            newest = max(standin.tables["call_logs"], key=lambda row: row["created_at"])
+            for client in clients:
+                client["restRequests"] = sum(
+                    1 for r in standin.requests[baseline:]
+                    if r.client == client["userId"] and r.kind in ("rest", "rpc")
+                )
+                if client["page"] == "/calls":
+                    client["showsNewest"] = await client["tab"].locator(
+                        f"text={newest['caller_phone']}"
+                    ).count() > 0
+        finally:
+            if function is not None:
+                function.terminate()
+                function.wait()
+
+    bursts = -(-len(calls) // args.burst_size)
+    return {
+        "clients": [{k: v for k, v in client.items() if k not in ("tab", "userId")} for client in clients],
+        "calls": len(calls),
+        "events": 2 * len(calls),
+        "bursts": bursts,
+        "maxRequestsPerClient": args.max_requests if args.max_requests is not None else bursts,
+        "realtimeMessages": standin.realtime.messages_sent - sent,
+        "standIn": {"latencyMs": args.latency_ms, "jitterMs": args.jitter_ms},
+    }
+
+
+def failures(report):
+    limit = report["maxRequestsPerClient"]
+    problems = [
+        f"{c['client']} ({c['page']}) made {c['restRequests']} REST requests (limit {limit})"
+        for c in report["clients"] if c["restRequests"] > limit
+    ]
+    problems += [
+        f"{c['client']} ({c['page']}) does not show the newest call"
+        for c in report["clients"] if c.get("showsNewest") is False
+    ]
+    return problems
+
+
+def print_report(report):
+    print(f"{report['events']} events in {report['bursts']} bursts, "
+          f"{report['realtimeMessages']} realtime messages delivered\n")
+    print(f"{'client':<12}{'page':<12}{'REST requests':>15}")
+    for client in report["clients"]:
+        print(f"{client['client']:<12}{client['page']:<12}{client['restRequests']:>15}")
+    print(f"\nlimit: {report['maxRequestsPerClient']} requests per client")
+    for problem in failures(report):
+        print(f"FAIL: {problem}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=6, help="browser contexts kept open")
+    parser.add_argument("--pages", type=lambda value: value.split(","), default=list(DEFAULT_PAGES),
+                        help="comma-separated pages the clients cycle through")
+    parser.add_argument("--bursts", type=int, default=5, help="number of bursts")
+    parser.add_argument("--burst-size", type=int, default=20, help="calls per burst (two events each)")
+    parser.add_argument("--burst-gap-ms", type=int, default=1000, help="pause between bursts")
+    parser.add_argument("--quiet-ms", type=int, default=DEFAULT_QUIET_MS,
+                        help="wait after the last burst before counting")
+    parser.add_argument("--rows", type=int, default=500, help="existing calls and leads")
+    parser.add_argument("--max-requests", type=int, default=None,
+                        help="REST requests allowed per client (default: one per burst)")
+    parser.add_argument("--lead-ratio", type=float, default=0.3,
+                        help="share of calls whose transcript contains contact details")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="random extra latency of up to this many ms")
+    parser.add_argument("--spawn-function", action="store_true",
+                        help="deliver the events to vapi-webhook run by Deno against the stand-in")
+    parser.add_argument("--function-path", default=str(FUNCTION_PATH),
+                        help="vapi-webhook entry point for --spawn-function")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on with --spawn-function")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    calls = make_calls(args.bursts * args.burst_size, lead_ratio=args.lead_ratio, seed=args.seed)
+    report = asyncio.run(run(args, calls))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if failures(report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
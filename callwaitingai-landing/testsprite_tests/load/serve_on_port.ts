@@ -0,0 +1,22 @@
+// Run an edge function on a given port instead of Deno's default 8000, so
+// several can be served at once (load/vapi_webhook.py spawn_function):
+//
+//     deno run --allow-net --allow-env --allow-read serve_on_port.ts <port> <module url>
+//
+// Functions start their server with Deno.serve() or std's serve(), which
+// listens through Deno.listen(); both are pointed at the port before the
+// function module is imported.
+
+const port = Number(Deno.args[0]);
+const [, moduleUrl] = Deno.args;
+
+const serve = Deno.serve;
+// deno-lint-ignore no-explicit-any
+(Deno as any).serve = (first: any, ...rest: any[]) =>
+  typeof first === 'function' ? serve({ port }, first) : serve({ ...first, port }, ...rest);
+
+const listen = Deno.listen;
+// deno-lint-ignore no-explicit-any
+(Deno as any).listen = (options: any) => listen({ ...options, port });
+
+await import(moduleUrl);
@@ -0,0 +1,70 @@
+"""Latency bookkeeping shared by the load tools."""
+
+import math
+from collections import defaultdict
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyRecorder:
+    """Collects request latencies and failures, grouped by a label."""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+
+    def record(self, label, latency_ms, ok=True):
+        self._latencies[label].append(latency_ms)
+        if not ok:
+            self._errors[label] += 1
+
+    def values(self, label):
+        """Latencies recorded under ``label`` (in recording order)."""
+        return list(self._latencies.get(label, []))
+
+    def summary(self):
+        """``{label: {count, errors, errorRate, p50Ms, p95Ms, p99Ms, maxMs}}`` plus ``all``."""
+        groups = dict(self._latencies)
+        groups["all"] = [v for values in self._latencies.values() for v in values]
+        errors = dict(self._errors)
+        errors["all"] = sum(self._errors.values())
+        report = {}
+        for label, values in groups.items():
+            ordered = sorted(values)
+            count = len(ordered)
+            report[label] = {
+                "count": count,
+                "errors": errors.get(label, 0),
+                "errorRate": round(errors.get(label, 0) / count, 4) if count else 0.0,
+                "p50Ms": _round(percentile(ordered, 50)),
+                "p95Ms": _round(percentile(ordered, 95)),
+                "p99Ms": _round(percentile(ordered, 99)),
+                "maxMs": _round(ordered[-1] if ordered else None),
+            }
+        return report
+
+
+def format_table(summary):
+    """Render a ``LatencyRecorder.summary()`` as a fixed-width table."""
+    header = f"{'label':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for label, row in summary.items():
+        lines.append(
+            f"{label:<20}{row['count']:>8}{row['errors']:>8}"
+            + "".join(f"{_fmt(row[key]):>10}" for key in ("p50Ms", "p95Ms", "p99Ms", "maxMs"))
+        )
+    return "\n".join(lines)
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
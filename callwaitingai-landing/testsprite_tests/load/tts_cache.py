@@ -0,0 +1,315 @@
+"""Benchmark for the minimax-tts audio cache.
+
+Replays a realistic phrase distribution against minimax-tts: a handful of
+greetings and receptionist prompts that every call repeats (Zipf-distributed
+across the four MiniMax voices) plus a tail of one-off sentences. Reports the
+cache hit rate, hit vs. miss latency and the time the cache saved compared
+with sending every request to MiniMax.
+
+Offline, with the function run by Deno on the disk cache backend and MiniMax
+replaced by a local stub that answers after the recorded vendor latency::
+
+    python -m load.tts_cache --spawn-function --requests 500 --minimax-latency-ms 1800
+
+Against a served or deployed function (TTS_CACHE_BACKEND=storage)::
+
+    python -m load.tts_cache --url https://<ref>.supabase.co/functions/v1/minimax-tts
+
+``--simulate`` skips the network and only models the LRU hit rate of the same
+traffic for several cache sizes (TTS_CACHE_MAX_ENTRIES).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+from harness.config import SUITE_DIR
+from harness.fixtures import FIXTURES_DIR
+from load.stats import LatencyRecorder, format_table
+from load.vapi_webhook import free_port, spawn_function, wait_for_port
+
+DEFAULT_URL = "http://localhost:54321/functions/v1/minimax-tts"
+FUNCTION_PATH = SUITE_DIR.parents[1] / "supabase" / "functions" / "minimax-tts" / "index.ts"
+DEFAULT_STUB_PORT = 54340
+STUB_AUDIO = FIXTURES_DIR / "v1" / "audio" / "minimax-marcus-4s.mp3"
+
+# Voice ids of src/types/minimax.ts, most used first
+VOICES = (
+    "moss_audio_fdad4786-ab84-11f0-a816-023f15327f7a",  # Marcy
+    "moss_audio_a59cd561-ab87-11f0-a74c-2a7a0b4baedc",  # Marcus
+    "moss_audio_4e6eb029-ab89-11f0-a74c-2a7a0b4baedc",  # Odia
+    "moss_audio_141d8c4c-a6f8-11f0-84c1-0ec6fa858d82",  # Joslyn
+)
+
+# What a receptionist says on most calls, most frequent first
+COMMON_PHRASES = (
+    "Hi! I'm Marcy, your AI receptionist. How can I help you today?",
+    "Thank you for calling CallWaitingAI. How can I help you today?",
+    "Could I get your full name, please?",
+    "What is the best phone number to reach you?",
+    "Thank you! Someone from our team will call you back shortly.",
+    "Could you spell your email address for me?",
+    "Let me check that for you. One moment, please.",
+    "Is there anything else I can help you with?",
+    "We're open Monday to Friday, 9 AM to 6 PM.",
+    "I'd be happy to book an appointment for you.",
+    "Our plans start at $49 per month, and every plan includes 24/7 call answering.",
+    "Thanks for calling, have a great day!",
+)
+
+ONE_OFF_TEMPLATES = (
+    "Great, I have you down for {day} at {hour} o'clock.",
+    "Thanks {name}, I've noted that down.",
+    "I've sent the details to {name}@example.com.",
+    "Your reference number is {number}.",
+)
+NAMES = ("Ada", "Chidi", "Maria", "James", "Amaka", "Tunde", "Sarah", "Kofi")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+
+def make_requests(count, unique_ratio=0.15, zipf_s=1.1, seed=None):
+    """``count`` minimax-tts request bodies with a Zipf-shaped phrase mix."""
+    rng = random.Random(seed)
+    phrase_weights = [1 / (rank ** zipf_s) for rank in range(1, len(COMMON_PHRASES) + 1)]
+    voice_weights = [1 / (rank ** zipf_s) for rank in range(1, len(VOICES) + 1)]
+    requests = []
+    for _ in range(count):
+        if rng.random() < unique_ratio:
+            text = rng.choice(ONE_OFF_TEMPLATES).format(
+                day=rng.choice(DAYS), hour=rng.randint(8, 17), name=rng.choice(NAMES),
+                number=rng.randint(100000, 999999),
+            )
+        else:
+            text = rng.choices(COMMON_PHRASES, phrase_weights)[0]
+        requests.append({"text": text, "voiceId": rng.choices(VOICES, voice_weights)[0]})
+    return requests
+
+
+def simulate(requests, max_entries):
+    """Hit rate of an LRU cache of ``max_entries`` for ``requests`` (TTL ignored)."""
+    cache = OrderedDict()
+    hits = 0
+    for request in requests:
+        key = (request["text"], request["voiceId"])
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+        else:
+            cache[key] = True
+            if len(cache) > max_entries:
+                cache.popitem(last=False)
+    return hits / len(requests) if requests else 0.0
+
+
+class MiniMaxStub:
+    """Local stand-in for MiniMax's t2a_v2 endpoint with a configurable latency."""
+
+    def __init__(self, latency_ms=1800, jitter_ms=0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+        self.url = None
+        self._rng = random.Random(seed)
+        self._runner = None
+        self._audio = STUB_AUDIO.read_bytes()
+
+    async def _synthesize(self, request):
+        await request.read()
+        self.calls += 1
+        delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+        await asyncio.sleep(delay / 1000)
+        return web.json_response({
+            "data": {"audio": f"{self.url}/audio/{self.calls}.mp3"},
+            "extra_info": {"audio_format": "mp3"},
+            "base_resp": {"status_code": 0, "status_msg": "success"},
+        })
+
+    async def _audio_file(self, request):
+        return web.Response(body=self._audio, content_type="audio/mpeg")
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_STUB_PORT):
+        app = web.Application()
+        app.router.add_post("/v1/t2a_v2", self._synthesize)
+        app.router.add_get("/audio/{name}", self._audio_file)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def replay(url, requests, concurrency, auth_key=None, timeout_s=60):
+    """Send ``requests`` to minimax-tts and return a report dict."""
+    headers = {"Content-Type": "application/json"}
+    if auth_key:
+        headers["Authorization"] = f"Bearer {auth_key}"
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(total=timeout_s)
+
+    async def send(session, body):
+        async with semaphore:
+            started = time.perf_counter()
+            label, ok = "error", False
+            try:
+                async with session.post(url, json=body, headers=headers) as response:
+                    payload = await response.json(content_type=None)
+                    ok = response.status == 200
+                    label = payload.get("cache", "off") if ok else "error"
+            except (aiohttp.ClientError, asyncio.TimeoutError, json.JSONDecodeError):
+                pass
+            recorder.record(label, (time.perf_counter() - started) * 1000, ok)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(session, body) for body in requests))
+        elapsed_s = time.perf_counter() - started
+
+    return build_report(recorder, len(requests), elapsed_s)
+
+
+def build_report(recorder, count, elapsed_s):
+    latency = recorder.summary()
+    hits = latency.get("hit", {}).get("count", 0)
+    misses = latency.get("miss", {}).get("count", 0)
+    hit_ms = recorder.values("hit")
+    miss_ms = recorder.values("miss") or recorder.values("off")
+    report = {
+        "requests": count,
+        "elapsedS": round(elapsed_s, 2),
+        "hits": hits,
+        "misses": misses,
+        "hitRate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "latency": latency,
+        "savedMs": None,
+        "savedRatio": None,
+    }
+    if hit_ms and miss_ms:
+        # Every hit would otherwise have cost a typical miss
+        per_hit = statistics.mean(miss_ms) - statistics.mean(hit_ms)
+        uncached_ms = statistics.mean(miss_ms) * (hits + misses)
+        report["savedMs"] = round(per_hit * hits, 1)
+        report["savedRatio"] = round(per_hit * hits / uncached_ms, 3)
+    return report
+
+
+async def run_spawned(args, requests):
+    """Run minimax-tts with `deno run` on the disk cache against the MiniMax stub."""
+    stub = MiniMaxStub(args.minimax_latency_ms, args.minimax_jitter_ms, seed=args.seed)
+    stub_url = await stub.serve(port=args.stub_port)
+    print(f"MiniMax stub listening on {stub_url}", flush=True)
+    function = None
+    with tempfile.TemporaryDirectory(prefix="tts-cache-") as cache_dir:
+        try:
+            # The function hands out cache URLs on its own port, so pick it first
+            port = free_port()
+            function, function_url = spawn_function(
+                Path(args.function_path), "", "",
+                {
+                    "MINIMAX_API_URL": f"{stub_url}/v1/t2a_v2",
+                    "MINIMAX_API_KEY": "stub",
+                    "MINIMAX_GROUP_ID": "stub",
+                    "TTS_CACHE_BACKEND": args.backend,
+                    "TTS_CACHE_DIR": cache_dir,
+                    "TTS_CACHE_PUBLIC_URL": f"http://127.0.0.1:{port}/cache",
+                    "TTS_CACHE_MAX_ENTRIES": str(args.max_entries),
+                },
+                flags=("--allow-write",),
+                port=port,
+            )
+            await wait_for_port(function_url)
+            report = await replay(function_url, requests, args.concurrency)
+        finally:
+            if function is not None:
+                function.terminate()
+                function.wait()
+            await stub.close()
+    report["minimaxCalls"] = stub.calls
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsedS']}s\n")
+    print(format_table(report["latency"]))
+    if report["hitRate"] is not None:
+        print(f"\nhit rate: {report['hitRate']:.1%} ({report['hits']} hits, {report['misses']} misses)")
+    if "minimaxCalls" in report:
+        print(f"MiniMax calls: {report['minimaxCalls']}")
+    if report["savedMs"] is not None:
+        print(f"saved: {report['savedMs'] / 1000:.1f}s of synthesis wait "
+              f"({report['savedRatio']:.1%} of the uncached total)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL, help="minimax-tts endpoint")
+    parser.add_argument("--requests", type=int, default=500, help="number of TTS requests")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--unique-ratio", type=float, default=0.15,
+                        help="fraction of one-off sentences that can never hit")
+    parser.add_argument("--zipf", type=float, default=1.1, help="skew of the phrase and voice popularity")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--auth-key", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="Bearer token for the function (default: $SUPABASE_ANON_KEY)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="only model the LRU hit rate for --sizes, no requests are sent")
+    parser.add_argument("--sizes", default="10,25,50,100,1000",
+                        help="comma-separated cache sizes for --simulate")
+    parser.add_argument("--spawn-function", action="store_true",
+                        help="run the function with `deno run` against a local MiniMax stub")
+    parser.add_argument("--function-path", default=str(FUNCTION_PATH),
+                        help="entry point used by --spawn-function")
+    parser.add_argument("--backend", default="disk", choices=("disk", "off"),
+                        help="TTS_CACHE_BACKEND of the spawned function (off = baseline)")
+    parser.add_argument("--max-entries", type=int, default=5000,
+                        help="TTS_CACHE_MAX_ENTRIES of the spawned function")
+    parser.add_argument("--stub-port", type=int, default=DEFAULT_STUB_PORT,
+                        help="port of the MiniMax stub")
+    parser.add_argument("--minimax-latency-ms", type=float, default=1800,
+                        help="time the stub takes to synthesize")
+    parser.add_argument("--minimax-jitter-ms", type=float, default=400,
+                        help="extra random latency (0..N ms) of the stub")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    requests = make_requests(args.requests, args.unique_ratio, args.zipf, seed=args.seed)
+
+    if args.simulate:
+        distinct = len({(r["text"], r["voiceId"]) for r in requests})
+        print(f"{len(requests)} requests, {distinct} distinct phrase/voice pairs\n")
+        print(f"{'entries':>8}{'hit rate':>10}")
+        for size in (int(value) for value in args.sizes.split(",")):
+            print(f"{size:>8}{simulate(requests, size):>10.1%}")
+        return 0
+
+    if args.spawn_function:
+        report = asyncio.run(run_spawned(args, requests))
+    else:
+        report = asyncio.run(replay(args.url, requests, args.concurrency, args.auth_key))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report["latency"]["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
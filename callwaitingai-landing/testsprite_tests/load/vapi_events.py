@@ -0,0 +1,87 @@
+"""Synthetic Vapi webhook traffic.
+
+Payloads match what supabase/functions/vapi-webhook/index.ts reads:
+``type``, ``call.id``, ``call.customer.number``, ``call.duration`` and
+``call.transcript``.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass
+
+# Transcript fragments; the ones with contact details make vapi-webhook
+# create a lead (it looks for an e-mail address or a 10-digit phone number)
+_OPENERS = [
+    "Caller asked about business hours and whether appointments are available this week.",
+    "Caller wanted a quote for a kitchen renovation and asked how long it usually takes.",
+    "Caller was checking on the status of an existing order.",
+    "Caller asked if the clinic accepts new patients and which insurance plans are covered.",
+    "Caller asked for directions to the office and parking information.",
+]
+_CONTACTS = [
+    "You can reach me at {name}@example.com any time.",
+    "My number is {area}-555-{line}, please call me back.",
+    "Email {name}@example.com or call {area}.555.{line}.",
+]
+_CLOSERS = [
+    "Assistant confirmed the details and said someone will follow up shortly.",
+    "Assistant booked a tentative slot and sent a confirmation.",
+    "Assistant thanked the caller and ended the call.",
+]
+_NAMES = ["ada", "kemi", "marcus", "joslyn", "tunde", "grace", "li", "sam"]
+
+
+@dataclass
+class CallScript:
+    """One simulated call: the events to send and what they should write."""
+
+    call_id: str
+    caller: str
+    duration_s: int
+    transcript: str
+    has_contact: bool
+
+    def started(self):
+        return {
+            "type": "call.started",
+            "call": {"id": self.call_id, "customer": {"number": self.caller}},
+        }
+
+    def ended(self):
+        return {
+            "type": "call.ended",
+            "call": {
+                "id": self.call_id,
+                "customer": {"number": self.caller},
+                "duration": self.duration_s,
+                "transcript": self.transcript,
+            },
+        }
+
+
+def make_transcript(rng, with_contact, turns=6):
+    parts = [rng.choice(_OPENERS) for _ in range(max(turns - 1, 1))]
+    if with_contact:
+        parts.append(rng.choice(_CONTACTS).format(
+            name=rng.choice(_NAMES),
+            area=rng.randint(200, 989),
+            line=f"{rng.randint(0, 9999):04d}",
+        ))
+    parts.append(rng.choice(_CLOSERS))
+    return " ".join(parts)
+
+
+def make_calls(count, lead_ratio=0.3, seed=None):
+    """Generate ``count`` call scripts; ``lead_ratio`` of them leave contact details."""
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(count):
+        has_contact = rng.random() < lead_ratio
+        calls.append(CallScript(
+            call_id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            caller=f"+1{rng.randint(2000000000, 9899999999)}",
+            duration_s=int(rng.lognormvariate(4.5, 0.6)),
+            transcript=make_transcript(rng, has_contact, turns=rng.randint(3, 12)),
+            has_contact=has_contact,
+        ))
+    return calls
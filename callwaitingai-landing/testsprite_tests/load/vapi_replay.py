@@ -0,0 +1,295 @@
+"""Replay harness for vapi-webhook batch mode (VAPI_WEBHOOK_MODE=batch).
+
+Sends call.started / call.ended events in concurrent bursts, redelivering
+some (as Vapi does on retries) and swapping the order of others, while the
+queue is drained through ``.../vapi-webhook/drain`` as a cron job would.
+Once everything is drained it checks the database:
+
+* every delivery was queued and processed, in ``seq`` order;
+* one completed call_logs row per call, carrying its call.ended data;
+* exactly one lead per call whose transcript has contact details, none otherwise.
+
+Offline against the stand-in (the function is run with Deno)::
+
+    python -m load.vapi_replay --stand-in --spawn-function --calls 300 --burst 100
+
+Against a local stack::
+
+    VAPI_WEBHOOK_MODE=batch supabase functions serve vapi-webhook --no-verify-jwt
+    python -m load.vapi_replay --service-key "$SUPABASE_SERVICE_ROLE_KEY"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.postgrest import fetch_all
+from load.stats import LatencyRecorder, format_table
+from load.vapi_events import make_calls
+from load.vapi_webhook import (
+    DEFAULT_STAND_IN_PORT,
+    DEFAULT_SUPABASE_URL,
+    DEFAULT_URL,
+    FUNCTION_PATH,
+    spawn_function,
+    wait_for_port,
+)
+
+
+def build_deliveries(calls, duplicate_ratio, reorder_ratio, rng):
+    """Interleave the calls' events into one delivery stream.
+
+    A call's events keep their order unless it is picked for reordering;
+    redeliveries follow the original a little later.
+    """
+    timeline = []
+    for index, call in enumerate(calls):
+        start = index + rng.random()
+        events = [call.started(), call.ended()]
+        if rng.random() < reorder_ratio:
+            events.reverse()
+        times = [start, start + rng.uniform(1, 20)]
+        for at, event in zip(times, events):
+            timeline.append((at, event))
+            if rng.random() < duplicate_ratio:
+                timeline.append((at + rng.uniform(0.5, 5), event))
+    timeline.sort(key=lambda item: item[0])
+    return [event for _, event in timeline]
+
+
+async def deliver(session, url, headers, event, recorder):
+    started = time.perf_counter()
+    ok = False
+    try:
+        async with session.post(url, json=event, headers=headers) as response:
+            await response.read()
+            ok = response.status < 400
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    recorder.record(event["type"], (time.perf_counter() - started) * 1000, ok)
+
+
+async def drain_loop(session, drain_url, service_key, interval_s, stop, stats):
+    """Call the drain endpoint every ``interval_s`` until ``stop`` is set and the queue is empty."""
+    headers = {"Authorization": f"Bearer {service_key}"}
+    while True:
+        async with session.post(drain_url, headers=headers) as response:
+            body = await response.json(content_type=None)
+            if response.status >= 400:
+                raise RuntimeError(f"drain failed: HTTP {response.status} {body}")
+        stats["calls"] += 1
+        stats["events"] += body["events"]
+        stats["batches"] += body["batches"]
+        if stop.is_set() and body["events"] == 0:
+            return
+        if body["events"] == 0:
+            await asyncio.sleep(interval_s)
+
+
+def verify(calls, deliveries, events, call_logs, leads):
+    """List of violated expectations (empty when the run is correct)."""
+    problems = []
+    scripts = {call.call_id: call for call in calls}
+    events = [e for e in events if (e["payload"].get("call") or {}).get("id") in scripts]
+
+    if len(events) != len(deliveries):
+        problems.append(f"webhook_events: {len(events)} rows for {len(deliveries)} deliveries")
+    unprocessed = [e for e in events if not e["processed"]]
+    if unprocessed:
+        problems.append(f"webhook_events: {len(unprocessed)} events never processed")
+
+    by_seq = sorted((e for e in events if e.get("processed_at")), key=lambda e: e["seq"])
+    stamps = [datetime.fromisoformat(e["processed_at"].replace("Z", "+00:00")) for e in by_seq]
+    out_of_order = sum(later < earlier for earlier, later in zip(stamps, stamps[1:]))
+    if out_of_order:
+        problems.append(f"ordering: {out_of_order} events processed before an earlier seq")
+
+    # Calls whose first call.started was queued before their first call.ended
+    first_seq = {}
+    for event in sorted(events, key=lambda e: e["seq"]):
+        first_seq.setdefault((event["payload"]["call"]["id"], event["event_type"]), event["seq"])
+
+    rows = Counter(row["vapi_call_id"] for row in call_logs if row["vapi_call_id"] in scripts)
+    for call_id, call in scripts.items():
+        if rows[call_id] != 1:
+            problems.append(f"call_logs: {rows[call_id]} rows for call {call_id}")
+    for row in call_logs:
+        call = scripts.get(row["vapi_call_id"])
+        if call is None:
+            continue
+        if row["call_status"] != "completed":
+            problems.append(f"call_logs: call {call.call_id} is {row['call_status']!r}, expected 'completed'")
+        if row["duration_seconds"] != call.duration_s or row["transcript"] != call.transcript:
+            problems.append(f"call_logs: call {call.call_id} does not carry its call.ended data")
+        in_order = first_seq.get((call.call_id, "call.started"), 0) < first_seq.get((call.call_id, "call.ended"), 0)
+        if in_order and row["caller_phone"] != call.caller:
+            problems.append(f"call_logs: call {call.call_id} lost its caller number")
+
+    lead_counts = Counter(lead["vapi_call_id"] for lead in leads if lead["vapi_call_id"] in scripts)
+    for call_id, call in scripts.items():
+        expected = 1 if call.has_contact else 0
+        if lead_counts[call_id] != expected:
+            problems.append(f"leads: {lead_counts[call_id]} leads for call {call_id}, expected {expected}")
+    return problems
+
+
+async def replay(url, drain_url, calls, deliveries, burst, burst_gap_s, drain_interval_s,
+                 supabase_url, service_key, auth_key=None, timeout_s=30):
+    headers = {"Content-Type": "application/json"}
+    if auth_key:
+        headers["Authorization"] = f"Bearer {auth_key}"
+    recorder = LatencyRecorder()
+    drained = {"calls": 0, "events": 0, "batches": 0}
+    stop = asyncio.Event()
+    timeout = aiohttp.ClientTimeout(total=timeout_s)
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        started = time.perf_counter()
+        drainer = asyncio.create_task(
+            drain_loop(session, drain_url, service_key, drain_interval_s, stop, drained)
+        )
+        for offset in range(0, len(deliveries), burst):
+            await asyncio.gather(*(
+                deliver(session, url, headers, event, recorder)
+                for event in deliveries[offset:offset + burst]
+            ))
+            await asyncio.sleep(burst_gap_s)
+        ingest_s = time.perf_counter() - started
+        stop.set()
+        await drainer
+        elapsed = time.perf_counter() - started
+
+        events = await fetch_all(session, supabase_url, service_key, "webhook_events",
+                                 select="id,seq,event_type,payload,processed,processed_at", order="seq")
+        call_logs = await fetch_all(session, supabase_url, service_key, "call_logs",
+                                    select="vapi_call_id,caller_phone,call_status,duration_seconds,transcript")
+        leads = await fetch_all(session, supabase_url, service_key, "leads", select="id,vapi_call_id")
+
+    return {
+        "calls": len(calls),
+        "deliveries": len(deliveries),
+        "ingestS": round(ingest_s, 2),
+        "elapsedS": round(elapsed, 2),
+        "latency": recorder.summary(),
+        "drain": drained,
+        "problems": verify(calls, deliveries, events, call_logs, leads),
+    }
+
+
+async def run_with_stand_in(args, calls, deliveries):
+    standin = PostgrestStandIn(args.latency_ms, args.jitter_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+    print(f"Supabase stand-in listening on {supabase_url}", flush=True)
+    function = None
+    url = args.url
+    try:
+        if args.spawn_function:
+            function, function_url = spawn_function(Path(args.function_path), supabase_url, SERVICE_ROLE_KEY,
+                                                    {"VAPI_WEBHOOK_MODE": "batch"})
+            url = args.url if args.url != DEFAULT_URL else function_url
+            await wait_for_port(url)
+        return await replay(
+            url, args.drain_url or url.rstrip("/") + "/drain", calls, deliveries,
+            burst=args.burst,
+            burst_gap_s=args.burst_gap_ms / 1000,
+            drain_interval_s=args.drain_interval_ms / 1000,
+            supabase_url=supabase_url,
+            service_key=SERVICE_ROLE_KEY,
+            auth_key=args.auth_key,
+        )
+    finally:
+        if function is not None:
+            function.terminate()
+            function.wait()
+        await standin.close()
+
+
+def print_report(report):
+    print(f"{report['calls']} calls / {report['deliveries']} deliveries queued in {report['ingestS']}s, "
+          f"drained after {report['elapsedS']}s\n")
+    print(format_table(report["latency"]))
+    drain = report["drain"]
+    print(f"\ndrain: {drain['events']} events in {drain['batches']} batches over {drain['calls']} calls")
+    if report["problems"]:
+        print(f"\n{len(report['problems'])} problem(s):")
+        for problem in report["problems"][:50]:
+            print(f"  - {problem}")
+    else:
+        print("\nOK: ordered, every event processed, one call log and at most one lead per call")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL, help="vapi-webhook endpoint")
+    parser.add_argument("--drain-url", help="drain endpoint (default: <url>/drain)")
+    parser.add_argument("--calls", type=int, default=200, help="number of simulated calls")
+    parser.add_argument("--burst", type=int, default=50, help="deliveries sent concurrently per burst")
+    parser.add_argument("--burst-gap-ms", type=int, default=100, help="pause between bursts")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1,
+                        help="fraction of events delivered twice")
+    parser.add_argument("--reorder-ratio", type=float, default=0.05,
+                        help="fraction of calls whose call.ended is delivered first")
+    parser.add_argument("--lead-ratio", type=float, default=0.3,
+                        help="fraction of transcripts that contain contact details")
+    parser.add_argument("--drain-interval-ms", type=int, default=500,
+                        help="how often the drain endpoint is called while idle")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--auth-key", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="Bearer token for the webhook (default: $SUPABASE_ANON_KEY)")
+    parser.add_argument("--supabase-url", default=os.environ.get("SUPABASE_URL", DEFAULT_SUPABASE_URL),
+                        help="PostgREST base used to verify the result")
+    parser.add_argument("--service-key", default=os.environ.get("SUPABASE_SERVICE_ROLE_KEY"),
+                        help="service-role key for draining and verification")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="serve Supabase from the in-process stand-in instead of a real project")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the function's SUPABASE_URL)")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="extra random latency (0..N ms) the stand-in adds")
+    parser.add_argument("--spawn-function", action="store_true",
+                        help="with --stand-in: run the function in batch mode with `deno run`")
+    parser.add_argument("--function-path", default=str(FUNCTION_PATH),
+                        help="entry point used by --spawn-function")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.stand_in and not args.service_key:
+        raise SystemExit("--service-key (or $SUPABASE_SERVICE_ROLE_KEY) is required without --stand-in")
+    calls = make_calls(args.calls, lead_ratio=args.lead_ratio, seed=args.seed)
+    deliveries = build_deliveries(calls, args.duplicate_ratio, args.reorder_ratio, random.Random(args.seed))
+    if args.stand_in:
+        report = asyncio.run(run_with_stand_in(args, calls, deliveries))
+    else:
+        report = asyncio.run(replay(
+            args.url, args.drain_url or args.url.rstrip("/") + "/drain", calls, deliveries,
+            burst=args.burst,
+            burst_gap_s=args.burst_gap_ms / 1000,
+            drain_interval_s=args.drain_interval_ms / 1000,
+            supabase_url=args.supabase_url,
+            service_key=args.service_key,
+            auth_key=args.auth_key,
+        ))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report["problems"] or report["latency"]["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
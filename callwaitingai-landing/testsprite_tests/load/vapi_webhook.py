@@ -0,0 +1,262 @@
+"""Load generator for the vapi-webhook edge function.
+
+Replays ``call.started`` / ``call.ended`` pairs with realistic transcripts at a
+fixed arrival rate against a local ``supabase functions serve``::
+
+    supabase functions serve vapi-webhook --no-verify-jwt
+    python -m load.vapi_webhook --calls 500 --rate 50 --concurrency 32
+
+Reports p50/p95/p99 latency and error rate per event type, and, when a
+service-role key is available, how many rows each table gained compared with
+what the events should have written.
+
+Offline, against the in-process Supabase stand-in (harness/standin.py), with
+the function run directly by Deno so it talks to the stand-in::
+
+    python -m load.vapi_webhook --stand-in --spawn-function --latency-ms 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+
+from harness.config import SUITE_DIR
+from harness.standin import SERVICE_ROLE_KEY, PostgrestStandIn
+from load.postgrest import count_tables
+from load.stats import LatencyRecorder, format_table
+from load.vapi_events import make_calls
+
+DEFAULT_URL = "http://localhost:54321/functions/v1/vapi-webhook"
+DEFAULT_SUPABASE_URL = "http://localhost:54321"
+TABLES = ("webhook_events", "call_logs", "leads")
+
+FUNCTION_PATH = SUITE_DIR.parents[1] / "supabase" / "functions" / "vapi-webhook" / "index.ts"
+# Runs a function on the port spawn_function() picks (see the file)
+SERVE_ON_PORT = Path(__file__).with_name("serve_on_port.ts")
+DEFAULT_STAND_IN_PORT = 54330
+
+
+async def post_event(session, url, headers, payload, semaphore, recorder):
+    async with semaphore:
+        started = time.perf_counter()
+        ok = False
+        try:
+            async with session.post(url, json=payload, headers=headers) as response:
+                await response.read()
+                ok = response.status < 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        recorder.record(payload["type"], (time.perf_counter() - started) * 1000, ok)
+
+
+async def play_call(session, url, headers, call, call_length_s, semaphore, recorder):
+    await post_event(session, url, headers, call.started(), semaphore, recorder)
+    if call_length_s:
+        await asyncio.sleep(call_length_s)
+    await post_event(session, url, headers, call.ended(), semaphore, recorder)
+
+
+async def run_load(url, calls, rate, concurrency, call_length_s, auth_key=None,
+                   supabase_url=None, service_key=None, timeout_s=30):
+    """Drive ``calls`` against ``url`` and return a report dict."""
+    headers = {"Content-Type": "application/json"}
+    if auth_key:
+        headers["Authorization"] = f"Bearer {auth_key}"
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=timeout_s)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        before = await count_tables(session, supabase_url, service_key, TABLES) if service_key else None
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks = []
+        for index, call in enumerate(calls):
+            # Open-loop arrivals: a slow server does not slow down the senders
+            delay = started + index / rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(
+                play_call(session, url, headers, call, call_length_s, semaphore, recorder)
+            ))
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+        after = await count_tables(session, supabase_url, service_key, TABLES) if service_key else None
+
+    report = {
+        "calls": len(calls),
+        "events": 2 * len(calls),
+        "elapsedS": round(elapsed, 2),
+        "eventsPerS": round(2 * len(calls) / elapsed, 1) if elapsed else None,
+        "latency": recorder.summary(),
+    }
+    if before is not None:
+        report["rowsWritten"] = {table: after[table] - before[table] for table in TABLES}
+        report["rowsExpected"] = {
+            "webhook_events": 2 * len(calls),
+            "call_logs": len(calls),
+            "leads": sum(call.has_contact for call in calls),
+        }
+    return report
+
+
+def free_port():
+    """A local TCP port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_function(path, supabase_url, service_key, extra_env=None, flags=(), port=None):
+    """Start ``deno run`` on an edge function, pointed at ``supabase_url``.
+
+    The function listens on ``port`` (by default a free one) instead of
+    Deno's default 8000, so several can run at once. ``flags`` are extra Deno
+    permissions, e.g. ``("--allow-write",)``. Returns the process and the
+    function's URL.
+    """
+    port = port or free_port()
+    env = {**os.environ, "SUPABASE_URL": supabase_url, "SUPABASE_SERVICE_ROLE_KEY": service_key,
+           **(extra_env or {})}
+    process = subprocess.Popen(
+        ["deno", "run", "--allow-net", "--allow-env", "--allow-read", *flags,
+         str(SERVE_ON_PORT), str(port), Path(path).resolve().as_uri()],
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_for_port(url, timeout_s=30):
+    """Poll until something accepts connections at ``url``."""
+    host, port = url.split("//", 1)[1].split("/", 1)[0].split(":")
+    deadline = time.monotonic() + timeout_s
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, int(port))
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Nothing is listening on {url} after {timeout_s}s")
+            await asyncio.sleep(0.2)
+        else:
+            writer.close()
+            await writer.wait_closed()
+            return
+
+
+async def run_with_stand_in(args, calls):
+    """Run the load with Supabase replaced by the stand-in."""
+    standin = PostgrestStandIn(args.latency_ms, args.jitter_ms, seed=args.seed)
+    supabase_url = await standin.serve(port=args.stand_in_port)
+    print(f"Supabase stand-in listening on {supabase_url}", flush=True)
+    function = None
+    url = args.url
+    try:
+        if args.spawn_function:
+            function, function_url = spawn_function(Path(args.function_path), supabase_url, SERVICE_ROLE_KEY)
+            url = args.url if args.url != DEFAULT_URL else function_url
+            await wait_for_port(url)
+        report = await run_load(
+            url,
+            calls,
+            rate=args.rate,
+            concurrency=args.concurrency,
+            call_length_s=args.call_length_ms / 1000,
+            auth_key=args.auth_key,
+            supabase_url=supabase_url,
+            service_key=SERVICE_ROLE_KEY,
+        )
+    finally:
+        if function is not None:
+            function.terminate()
+            function.wait()
+        await standin.close()
+    report["standIn"] = {
+        "latencyMs": args.latency_ms,
+        "jitterMs": args.jitter_ms,
+        "restRequests": standin.request_count(kind="rest"),
+    }
+    return report
+
+
+def print_report(report):
+    print(f"{report['calls']} calls / {report['events']} events in {report['elapsedS']}s "
+          f"({report['eventsPerS']} events/s)\n")
+    print(format_table(report["latency"]))
+    if "rowsWritten" in report:
+        print(f"\n{'table':<20}{'written':>10}{'expected':>10}")
+        for table, written in report["rowsWritten"].items():
+            print(f"{table:<20}{written:>10}{report['rowsExpected'][table]:>10}")
+    if "standIn" in report:
+        print(f"\nstand-in: {report['standIn']['restRequests']} REST requests, "
+              f"{report['standIn']['latencyMs']} ms injected latency")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL, help="vapi-webhook endpoint")
+    parser.add_argument("--calls", type=int, default=200, help="number of simulated calls")
+    parser.add_argument("--rate", type=float, default=20, help="new calls per second")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum requests in flight")
+    parser.add_argument("--call-length-ms", type=int, default=200,
+                        help="delay between a call's started and ended events")
+    parser.add_argument("--lead-ratio", type=float, default=0.3,
+                        help="fraction of transcripts that contain contact details")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible traffic")
+    parser.add_argument("--auth-key", default=os.environ.get("SUPABASE_ANON_KEY"),
+                        help="Bearer token for the function (default: $SUPABASE_ANON_KEY)")
+    parser.add_argument("--supabase-url", default=os.environ.get("SUPABASE_URL", DEFAULT_SUPABASE_URL),
+                        help="PostgREST base used to count rows written")
+    parser.add_argument("--service-key", default=os.environ.get("SUPABASE_SERVICE_ROLE_KEY"),
+                        help="service-role key for row counts (default: $SUPABASE_SERVICE_ROLE_KEY)")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="serve Supabase from the in-process stand-in instead of a real project")
+    parser.add_argument("--stand-in-port", type=int, default=DEFAULT_STAND_IN_PORT,
+                        help="port the stand-in listens on (the function's SUPABASE_URL)")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="latency the stand-in adds to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0,
+                        help="extra random latency (0..N ms) the stand-in adds")
+    parser.add_argument("--spawn-function", action="store_true",
+                        help="with --stand-in: run the function with `deno run` against the stand-in")
+    parser.add_argument("--function-path", default=str(FUNCTION_PATH),
+                        help="entry point used by --spawn-function")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    calls = make_calls(args.calls, lead_ratio=args.lead_ratio, seed=args.seed)
+    if args.stand_in:
+        report = asyncio.run(run_with_stand_in(args, calls))
+    else:
+        report = asyncio.run(run_load(
+            args.url,
+            calls,
+            rate=args.rate,
+            concurrency=args.concurrency,
+            call_length_s=args.call_length_ms / 1000,
+            auth_key=args.auth_key,
+            supabase_url=args.supabase_url,
+            service_key=args.service_key,
+        ))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report["latency"]["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+// Shared PostgREST access for the edge functions.
+//
+// The Supabase URL, service role key and request headers are read once per
+// worker instead of on every request, and every call goes through one HTTP
+// client, so connections stay open between requests and independent calls
+// issued together (Promise.all) are multiplexed over HTTP/2 where the server
+// offers it. Each RestClient records how long its calls took, for the logs
+// and the Server-Timing header.
+
+const DEFAULT_TIMEOUT_MS = 10000;
+// Rows per request for bulk inserts; keeps bodies well under PostgREST's limit
+const BULK_CHUNK_SIZE = 500;
+
+export interface RestTiming {
+  label: string;
+  status: number;
+  ms: number;
+}
+
+export interface RestResult<T = any> {
+  ok: boolean;
+  status: number;
+  /** Parsed JSON body; null for empty bodies (return=minimal) and errors */
+  data: T | null;
+  /** Raw body of a failed request */
+  error: string | null;
+}
+
+interface RestConfig {
+  supabaseUrl: string;
+  serviceRoleKey: string;
+  headers: Readonly<Record<string, string>>;
+  httpClient?: Deno.HttpClient;
+}
+
+let sharedConfig: RestConfig | null = null;
+
+// Not every edge runtime exposes Deno.createHttpClient; plain fetch still
+// keeps connections alive within the worker
+function createHttpClient(): Deno.HttpClient | undefined {
+  const create = (Deno as any).createHttpClient;
+  if (typeof create !== 'function') return undefined;
+  try {
+    return create({ http2: true, poolIdleTimeout: 60000, poolMaxIdlePerHost: 32 });
+  } catch {
+    return undefined;
+  }
+}
+
+function restConfig(): RestConfig {
+  if (sharedConfig) return sharedConfig;
+  const supabaseUrl = Deno.env.get('SUPABASE_URL');
+  const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
+  if (!supabaseUrl || !serviceRoleKey) {
+    throw new Error('Missing Supabase configuration');
+  }
+  sharedConfig = {
+    supabaseUrl,
+    serviceRoleKey,
+    headers: Object.freeze({
+      'Authorization': `Bearer ${serviceRoleKey}`,
+      'apikey': serviceRoleKey,
+      'Content-Type': 'application/json',
+    }),
+    httpClient: createHttpClient(),
+  };
+  return sharedConfig;
+}
+
+/**
+ * Service-role PostgREST client. Cheap to create: make one per request so
+ * its timings cover that request only.
+ */
+export class RestClient {
+  readonly timings: RestTiming[] = [];
+  private readonly config: RestConfig;
+
+  constructor(private readonly timeoutMs = DEFAULT_TIMEOUT_MS) {
+    this.config = restConfig();
+  }
+
+  get supabaseUrl() {
+    return this.config.supabaseUrl;
+  }
+
+  get serviceRoleKey() {
+    return this.config.serviceRoleKey;
+  }
+
+  /** Any HTTP call through the shared connection pool, timed under `label` */
+  async fetch(label: string, url: string, init: RequestInit = {}): Promise<Response> {
+    const started = performance.now();
+    const { httpClient } = this.config;
+    try {
+      const response = await fetch(url, {
+        signal: AbortSignal.timeout(this.timeoutMs),
+        ...init,
+        ...(httpClient ? { client: httpClient } : {}),
+      } as RequestInit);
+      this.record(label, response.status, started);
+      return response;
+    } catch (error) {
+      this.record(label, 0, started);
+      throw error;
+    }
+  }
+
+  /** `path` is relative to /rest/v1, e.g. `leads?id=eq.1` */
+  async request<T = any>(
+    method: string,
+    path: string,
+    options: { body?: unknown; prefer?: string; label?: string } = {},
+  ): Promise<RestResult<T>> {
+    const { supabaseUrl, headers } = this.config;
+    const label = options.label || `${method} ${path.split('?')[0]}`;
+    const started = performance.now();
+    let status = 0;
+    try {
+      const response = await fetch(`${supabaseUrl}/rest/v1/${path}`, {
+        method,
+        headers: options.prefer ? { ...headers, 'Prefer': options.prefer } : headers,
+        body: options.body === undefined ? undefined : JSON.stringify(options.body),
+        signal: AbortSignal.timeout(this.timeoutMs),
+        ...(this.config.httpClient ? { client: this.config.httpClient } : {}),
+      } as RequestInit);
+      status = response.status;
+      // Always read the body, so the connection goes back to the pool
+      const text = await response.text();
+      if (!response.ok) {
+        return { ok: false, status, data: null, error: text };
+      }
+      return { ok: true, status, data: text ? JSON.parse(text) : null, error: null };
+    } finally {
+      this.record(label, status, started);
+    }
+  }
+
+  select<T = any>(path: string, label?: string) {
+    return this.request<T[]>('GET', path, { label });
+  }
+
+  /**
+   * Insert one row or many. Large arrays are split into chunks sent in
+   * parallel; the first failed chunk's result is returned. PostgREST needs
+   * the same keys in every object of a bulk insert.
+   */
+  async insert<T = any>(
+    table: string,
+    rows: unknown,
+    options: { prefer?: string; onConflict?: string; label?: string } = {},
+  ): Promise<RestResult<T>> {
+    const path = options.onConflict ? `${table}?on_conflict=${options.onConflict}` : table;
+    const send = (body: unknown) => this.request<T>('POST', path, {
+      body,
+      prefer: options.prefer || 'return=minimal',
+      label: options.label,
+    });
+    if (!Array.isArray(rows) || rows.length <= BULK_CHUNK_SIZE) {
+      return send(rows);
+    }
+    const chunks = [];
+    for (let i = 0; i < rows.length; i += BULK_CHUNK_SIZE) {
+      chunks.push(rows.slice(i, i + BULK_CHUNK_SIZE));
+    }
+    const results = await Promise.all(chunks.map(send));
+    const failed = results.find((result) => !result.ok);
+    if (failed) return failed;
+    const data = results.flatMap((result) => (Array.isArray(result.data) ? result.data : []));
+    return { ok: true, status: results[0].status, data: data as T, error: null };
+  }
+
+  update<T = any>(path: string, values: unknown, options: { prefer?: string; label?: string } = {}) {
+    return this.request<T>('PATCH', path, { body: values, ...options });
+  }
+
+  rpc<T = any>(name: string, args: unknown = {}) {
+    return this.request<T>('POST', `rpc/${name}`, { body: args, label: `rpc ${name}` });
+  }
+
+  /** Call another edge function with the service role key */
+  invoke(name: string, body: unknown) {
+    const { supabaseUrl, headers } = this.config;
+    return this.fetch(`function ${name}`, `${supabaseUrl}/functions/v1/${name}`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify(body),
+    });
+  }
+
+  /** Totals for structured logs */
+  summary() {
+    const ms = this.timings.reduce((total, timing) => total + timing.ms, 0);
+    return { rest_calls: this.timings.length, rest_ms: Math.round(ms * 10) / 10 };
+  }
+
+  /** `Server-Timing` header value, one entry per call */
+  serverTiming() {
+    return this.timings
+      .map((timing, i) => `rest${i};dur=${timing.ms};desc="${timing.label.replace(/"/g, "'")}"`)
+      .join(', ');
+  }
+
+  private record(label: string, status: number, started: number) {
+    this.timings.push({ label, status, ms: Math.round((performance.now() - started) * 10) / 10 });
+  }
+}
@@ -11,7 +11,9 @@ import { corsHeaders } from '../_shared/cors.ts';
 
 const VAPI_API_KEY = Deno.env.get('VAPI_PRIVATE_KEY');
 const VAPI_API_URL = 'https://api.vapi.ai/assistant';
-const MINIMAX_TTS_URL = Deno.env.get('VITE_SUPABASE_URL') + '/functions/v1/minimax-tts';
+// Where Vapi fetches speech from; injected by the edge runtime
+const SUPABASE_URL = Deno.env.get('SUPABASE_URL');
+const SUPABASE_SERVICE_ROLE_KEY = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
 
 interface CreateAssistantRequest {
   business_name: string;
@@ -63,8 +65,8 @@ serve(async (req) => {
       voice: {
         provider: 'custom-voice',
         server: {
-          url: MINIMAX_TTS_URL,
-          secret: Deno.env.get('SUPABASE_SERVICE_ROLE_KEY'),
+          url: `${SUPABASE_URL}/functions/v1/minimax-tts`,
+          secret: SUPABASE_SERVICE_ROLE_KEY,
         },
         // Pass voice ID in metadata that will be sent to our endpoint
         metadata: {
@@ -88,7 +90,8 @@ serve(async (req) => {
       voice_id: minimax_voice_id,
     });
 
-    // Call Vapi API to create assistant
+    // Call Vapi API to create assistant (timed for the Server-Timing header)
+    const started = performance.now();
     const response = await fetch(VAPI_API_URL, {
       method: 'POST',
       headers: {
@@ -98,6 +101,8 @@ serve(async (req) => {
       body: JSON.stringify(vapiAssistant),
     });
 
+    const vapiMs = Math.round((performance.now() - started) * 10) / 10;
+
     if (!response.ok) {
       const errorText = await response.text();
       console.error('Vapi API error:', errorText);
@@ -116,7 +121,7 @@ serve(async (req) => {
       }),
       {
         status: 200,
-        headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        headers: { ...corsHeaders, 'Content-Type': 'application/json', 'Server-Timing': `vapi;dur=${vapiMs};desc="vapi create assistant"` },
       }
     );
 
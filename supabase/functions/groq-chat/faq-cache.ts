@@ -0,0 +1,274 @@
+// ============================================================================
+// FAQ answer cache for groq-chat
+// ============================================================================
+//
+// Most first messages on the landing page are the same handful of pricing,
+// setup and "how does it work" questions. Answers to first-turn questions are
+// kept in worker memory and in faq_answer_cache (migration
+// 20250207000000_faq_answer_cache.sql), so a new worker starts warm. A
+// question matches a cached one when their normalized forms are equal or
+// close: word and character-trigram vectors with a cosine similarity of at
+// least FAQ_CACHE_THRESHOLD. Lookups never leave the worker, so hits are
+// answered without a Groq or database round trip.
+//
+// Entries are keyed by a fingerprint of the system prompt and the generation
+// settings (max_tokens, temperature) they were made with, so changing the
+// prompt invalidates every answer and a reply cut short for one client is
+// never served to another. Only replies Groq finished normally are stored. POST .../groq-chat/cache/invalidate (service
+// role key) expires them explicitly.
+//
+// FAQ_CACHE=off disables the cache; FAQ_CACHE_TTL_S (default one day) bounds
+// how long an answer is reused.
+
+import type { RestClient } from '../_shared/postgrest.ts';
+import type { GenerationSettings } from './routing.ts';
+
+const DEFAULT_TTL_S = 24 * 3600;
+const DEFAULT_THRESHOLD = 0.88;
+// Entries held per worker; the oldest go first
+const MAX_ENTRIES = 500;
+// How often a worker picks up answers stored (or expired) by other workers
+const REFRESH_MS = 60_000;
+const MAX_QUESTION_LENGTH = 200;
+const MAX_QUESTION_WORDS = 20;
+
+// Words that do not change what a question asks
+const FILLER = new Set([
+  'a', 'an', 'the', 'please', 'hi', 'hello', 'hey', 'so', 'just', 'um', 'uh', 'ok', 'okay', 'thanks',
+  'can', 'could', 'would', 'you', 'me', 'tell', 'i', 'im', 'my', 'we', 'our', 'your', 'to', 'do',
+  'does', 'is', 'are', 'it', 'of', 'for', 'and', 'there', 'about', 'know', 'want',
+]);
+
+// Messages with contact details are personal (and create leads); never cache them
+const CONTACT_DETAILS = /[\w.-]+@[\w.-]+\.\w+|\d{3}[-.\s]?\d{3}[-.\s]?\d{4}/;
+
+type Vector = Map<string, number>;
+
+interface Entry {
+  question: string;
+  vector: Vector;
+  answer: string;
+  tier: string;
+  createdAt: number;
+  expiresAt: number;
+}
+
+export interface CacheHit {
+  answer: string;
+  tier: string;
+  /** The cached question that matched, normalized */
+  question: string;
+  similarity: number;
+}
+
+const stem = (word: string) => {
+  if (word.length > 5 && word.endsWith('ing')) return word.slice(0, -3);
+  if (word.length > 4 && (word.endsWith('ed') || word.endsWith('es'))) return word.slice(0, -2);
+  if (word.length > 3 && word.endsWith('s') && !word.endsWith('ss')) return word.slice(0, -1);
+  return word;
+};
+
+/** Lowercased, accent- and punctuation-free words of a question, without filler, stemmed */
+export function normalizeQuestion(text: string): string {
+  return text
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase()
+    .replace(/'/g, '')
+    .replace(/[^a-z0-9]+/g, ' ')
+    .split(' ')
+    .filter((word) => word && !FILLER.has(word))
+    .map(stem)
+    .join(' ');
+}
+
+/** Unit-length bag of words and character trigrams */
+export function embed(normalized: string): Vector {
+  const vector: Vector = new Map();
+  const add = (feature: string, weight: number) => vector.set(feature, (vector.get(feature) || 0) + weight);
+  for (const word of normalized.split(' ')) {
+    if (!word) continue;
+    add(`w:${word}`, 1);
+    const padded = ` ${word} `;
+    for (let i = 0; i + 3 <= padded.length; i++) add(`t:${padded.slice(i, i + 3)}`, 0.3);
+  }
+  const norm = Math.sqrt([...vector.values()].reduce((sum, weight) => sum + weight * weight, 0));
+  if (norm > 0) for (const [feature, weight] of vector) vector.set(feature, weight / norm);
+  return vector;
+}
+
+export function similarity(a: Vector, b: Vector): number {
+  const [small, large] = a.size <= b.size ? [a, b] : [b, a];
+  let dot = 0;
+  for (const [feature, weight] of small) dot += weight * (large.get(feature) || 0);
+  return dot;
+}
+
+/** Whether a message may be answered from, or stored in, the cache */
+export function cacheable(message: string): boolean {
+  if (message.length > MAX_QUESTION_LENGTH || CONTACT_DETAILS.test(message)) return false;
+  const words = normalizeQuestion(message).split(' ').filter(Boolean).length;
+  return words > 0 && words <= MAX_QUESTION_WORDS;
+}
+
+/** Short hex SHA-256 of the system prompt; part of every cache key */
+export async function promptFingerprint(systemPrompt: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(systemPrompt));
+  return Array.from(new Uint8Array(digest).slice(0, 8), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+export class FaqCache {
+  readonly stats = { hits: 0, misses: 0, bypassed: 0 };
+  private entries = new Map<string, Entry>();
+  private loadedAt = 0;
+  private loading: Promise<void> | null = null;
+
+  constructor(
+    private fingerprint: string,
+    private ttlMs: number,
+    private threshold: number,
+  ) {}
+
+  /** Hit/miss counters for the structured logs */
+  counters() {
+    const lookups = this.stats.hits + this.stats.misses;
+    return {
+      cache_hits: this.stats.hits,
+      cache_misses: this.stats.misses,
+      cache_bypassed: this.stats.bypassed,
+      cache_hit_rate: lookups ? Number((this.stats.hits / lookups).toFixed(3)) : null,
+      cache_entries: this.entries.size,
+    };
+  }
+
+  /** Cached answer for a first-turn question, or null */
+  async lookup(db: RestClient, message: string): Promise<CacheHit | null> {
+    if (this.loadedAt === 0) {
+      await this.refresh(db);
+    } else if (Date.now() - this.loadedAt > REFRESH_MS) {
+      // Picked up by later requests; this one answers from what is loaded
+      this.refresh(db);
+    }
+
+    const question = normalizeQuestion(message);
+    const now = Date.now();
+    let best: Entry | null = null;
+    let bestSimilarity = 0;
+    const exact = this.entries.get(question);
+    if (exact && exact.expiresAt > now) {
+      best = exact;
+      bestSimilarity = 1;
+    } else {
+      const vector = embed(question);
+      for (const entry of this.entries.values()) {
+        if (entry.expiresAt <= now) continue;
+        const score = similarity(vector, entry.vector);
+        if (score > bestSimilarity) {
+          best = entry;
+          bestSimilarity = score;
+        }
+      }
+    }
+
+    if (!best || bestSimilarity < this.threshold) {
+      this.stats.misses += 1;
+      return null;
+    }
+    this.stats.hits += 1;
+    return {
+      answer: best.answer,
+      tier: best.tier,
+      question: best.question,
+      similarity: Number(bestSimilarity.toFixed(3)),
+    };
+  }
+
+  /** Keep the answer to a first-turn question, here and for other workers */
+  async store(db: RestClient, message: string, answer: string, tier: string) {
+    const question = normalizeQuestion(message);
+    const now = Date.now();
+    this.remember({ question, vector: embed(question), answer, tier, createdAt: now, expiresAt: now + this.ttlMs });
+
+    const stored = await db.insert('faq_answer_cache', {
+      fingerprint: this.fingerprint,
+      question,
+      answer,
+      tier,
+      created_at: new Date(now).toISOString(),
+      expires_at: new Date(now + this.ttlMs).toISOString(),
+    }, { onConflict: 'fingerprint,question', prefer: 'resolution=merge-duplicates,return=minimal' });
+    if (!stored.ok) {
+      console.error('Failed to store FAQ answer:', stored.status, stored.error);
+    }
+  }
+
+  /** Expire every stored answer; other workers drop theirs on their next refresh */
+  async invalidate(db: RestClient) {
+    const dropped = this.entries.size;
+    this.entries.clear();
+    const now = new Date().toISOString();
+    const expired = await db.update(`faq_answer_cache?expires_at=gt.${now}`, { expires_at: now }, {
+      prefer: 'return=minimal',
+    });
+    if (!expired.ok) {
+      throw new Error(`Failed to expire FAQ answers: HTTP ${expired.status}`);
+    }
+    return dropped;
+  }
+
+  private remember(entry: Entry) {
+    this.entries.delete(entry.question);
+    this.entries.set(entry.question, entry);
+    while (this.entries.size > MAX_ENTRIES) {
+      this.entries.delete(this.entries.keys().next().value!);
+    }
+  }
+
+  private refresh(db: RestClient) {
+    if (this.loading) return this.loading;
+    const started = Date.now();
+    this.loading = (async () => {
+      const rows = await db.select(
+        `faq_answer_cache?select=question,answer,tier,created_at,expires_at` +
+        `&fingerprint=eq.${this.fingerprint}&expires_at=gt.${new Date(started).toISOString()}` +
+        `&order=created_at.desc&limit=${MAX_ENTRIES}`,
+      );
+      if (!rows.ok) {
+        console.error('Failed to load FAQ answers:', rows.status, rows.error);
+        return;
+      }
+      // Answers stored by this worker while the rows were loading stay
+      const pending = [...this.entries.values()].filter((entry) => entry.createdAt >= started);
+      this.entries = new Map();
+      // Newest MAX_ENTRIES rows, remembered oldest first so the newest are evicted last
+      for (const row of [...(rows.data || [])].reverse()) {
+        this.remember({
+          question: row.question,
+          vector: embed(row.question),
+          answer: row.answer,
+          tier: row.tier,
+          createdAt: Date.parse(row.created_at),
+          expiresAt: Date.parse(row.expires_at),
+        });
+      }
+      for (const entry of pending) this.remember(entry);
+    })()
+      .catch((error) => console.error('Failed to load FAQ answers:', error))
+      .finally(() => {
+        this.loadedAt = Date.now();
+        this.loading = null;
+      });
+    return this.loading;
+  }
+}
+
+/**
+ * Build the cache for a system prompt and generation settings, or null when FAQ_CACHE=off
+ */
+export async function createFaqCache(systemPrompt: string, settings: GenerationSettings): Promise<FaqCache | null> {
+  if (Deno.env.get('FAQ_CACHE') === 'off') return null;
+  const ttlSeconds = Number(Deno.env.get('FAQ_CACHE_TTL_S') || DEFAULT_TTL_S);
+  const threshold = Number(Deno.env.get('FAQ_CACHE_THRESHOLD') || DEFAULT_THRESHOLD);
+  const fingerprint = await promptFingerprint(`${systemPrompt}\n${settings.maxTokens}:${settings.temperature}`);
+  return new FaqCache(fingerprint, ttlSeconds * 1000, threshold);
+}
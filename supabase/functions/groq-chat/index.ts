@@ -1,3 +1,12 @@
+import { RestClient } from '../_shared/postgrest.ts';
+import { contextMessages, loadMemory, saveTurn, updateSummary, type Memory } from './memory.ts';
+import {
+  chooseTier, generationSettings, MODEL_TIERS, tiersFrom, type GenerationSettings, type Tier,
+} from './routing.ts';
+import { cacheable, createFaqCache, type FaqCache } from './faq-cache.ts';
+
+const GROQ_API_KEY = Deno.env.get('GROQ_API_KEY');
+
 // Helper function to validate origin
 const getAllowedOrigin = (origin: string | null): string => {
   const allowedOrigins = [
@@ -13,6 +22,196 @@ const getAllowedOrigin = (origin: string | null): string => {
   return origin && allowedOrigins.includes(origin) ? origin : allowedOrigins[0];
 };
 
+// Available in the Supabase edge runtime; keeps the worker alive for
+// background work after the response has been sent
+declare const EdgeRuntime: { waitUntil(promise: Promise<unknown>): void } | undefined;
+
+const FALLBACK_REPLY = 'I apologize, but I encountered an error. Please try again.';
+
+const SYSTEM_PROMPT = 'You are Marcy, a professional and friendly AI assistant for CallWaitingAI. Your role is to help capture leads, answer questions about the platform, and provide excellent customer service. Be warm, professional, and efficient. When users show interest or ask questions, naturally ask for their contact information to better assist them.';
+
+// FAQ answer caches (faq-cache.ts), one per generation settings since the
+// answer depends on them; created on first use, null when disabled
+const faqCaches = new Map<string, Promise<FaqCache | null>>();
+// Clients use one or two settings; further ones go uncached rather than
+// growing the worker's memory without bound
+const MAX_FAQ_CACHES = 8;
+function getFaqCache(settings: GenerationSettings): Promise<FaqCache | null> {
+  const key = `${settings.maxTokens}:${settings.temperature}`;
+  let cache = faqCaches.get(key);
+  if (!cache) {
+    if (faqCaches.size >= MAX_FAQ_CACHES) return Promise.resolve(null);
+    cache = createFaqCache(SYSTEM_PROMPT, settings);
+    faqCaches.set(key, cache);
+  }
+  return cache;
+}
+
+// Run work that must not delay the response, logging its errors
+function inBackground(work: Promise<unknown>) {
+  const handled = work.catch((error) => console.error('Background work error:', error));
+  if (typeof EdgeRuntime !== 'undefined') EdgeRuntime.waitUntil(handled);
+}
+
+const sseEvent = (data: unknown) => `data: ${JSON.stringify(data)}\n\n`;
+
+// Re-emit the content deltas of Groq's SSE stream as they arrive
+// (`data: {"choices":[{"delta":{"content":"..."}}]}`, then `data: [DONE]`)
+// and hand the complete reply and Groq's finish_reason to onDone once the
+// client has it.
+function streamReply(
+  groqBody: ReadableStream<Uint8Array>,
+  onDone: (reply: string, finishReason: string | null) => Promise<void>,
+) {
+  const encoder = new TextEncoder();
+  const decoder = new TextDecoder();
+
+  return new ReadableStream<Uint8Array>({
+    async start(controller) {
+      const reader = groqBody.getReader();
+      let buffered = '';
+      let reply = '';
+      let finishReason: string | null = null;
+
+      try {
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+
+          const lines = buffered.split('\n');
+          buffered = lines.pop() || '';
+          for (const line of lines) {
+            if (!line.startsWith('data:')) continue;
+            const data = line.slice(5).trim();
+            if (!data || data === '[DONE]') continue;
+            const choice = JSON.parse(data).choices?.[0];
+            finishReason = choice?.finish_reason ?? finishReason;
+            const content = choice?.delta?.content;
+            if (!content) continue;
+            reply += content;
+            controller.enqueue(encoder.encode(sseEvent({ choices: [{ delta: { content } }] })));
+          }
+        }
+
+        if (!reply) {
+          reply = FALLBACK_REPLY;
+          controller.enqueue(encoder.encode(sseEvent({ choices: [{ delta: { content: reply } }] })));
+        }
+        controller.enqueue(encoder.encode('data: [DONE]\n\n'));
+        controller.close();
+      } catch (error) {
+        console.error('Groq stream error:', error);
+        controller.enqueue(encoder.encode(
+          `event: error\n${sseEvent({ error: { code: 'CHAT_ERROR', message: 'Stream interrupted' } })}`
+        ));
+        controller.close();
+        return;
+      }
+
+      await onDone(reply, finishReason);
+    }
+  });
+}
+
+type CacheStatus = 'hit' | 'miss' | 'bypass' | 'off';
+
+interface ReplyMetadata {
+  model: string;
+  tier: string;
+  max_tokens?: number;
+  temperature?: number;
+  cache: CacheStatus;
+}
+
+// A cached answer, in the shape the client asked for
+function cachedReply(answer: string, tier: string, wantsStream: boolean, corsHeaders: Record<string, string>) {
+  if (wantsStream) {
+    return new Response(sseEvent({ choices: [{ delta: { content: answer } }] }) + 'data: [DONE]\n\n', {
+      headers: {
+        ...corsHeaders,
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Model-Tier': tier,
+        'X-Cache': 'hit',
+      }
+    });
+  }
+  return new Response(JSON.stringify({
+    data: {
+      message: answer,
+      model: `groq-${MODEL_TIERS[tier as Tier]?.model || tier}`,
+      tier,
+      cache: 'hit'
+    }
+  }), {
+    headers: { ...corsHeaders, 'Content-Type': 'application/json', 'X-Cache': 'hit' }
+  });
+}
+
+// Store the turn, bring the session summary up to date in the background,
+// and create a lead when the user's message contains contact details
+async function persistConversation(
+  db: RestClient,
+  sessionId: string | undefined,
+  memory: Memory | null,
+  lastUserMessage: string,
+  assistantMessage: string,
+  receivedAt: Date,
+  metadata: ReplyMetadata,
+) {
+  if (!sessionId) return;
+
+  const saved = saveTurn(db, sessionId, lastUserMessage, assistantMessage, receivedAt, metadata);
+  if (memory && GROQ_API_KEY) {
+    inBackground(saved.then((turns) => updateSummary(db, GROQ_API_KEY, sessionId, memory, [...memory.turns, ...turns])));
+  }
+
+  // Attempt to extract lead information from conversation
+  const MAX_MESSAGE_LENGTH = 5000;
+
+  // Validate message length before regex to prevent ReDoS
+  if (lastUserMessage.length > MAX_MESSAGE_LENGTH) {
+    console.warn('Message too long for lead extraction, skipping');
+    await saved;
+    return;
+  }
+
+  // Use safer regex with bounded length substring
+  const safeMessageForEmail = lastUserMessage.substring(0, 500);
+  const safeMessageForPhone = lastUserMessage.substring(0, 100);
+
+  const emailMatch = safeMessageForEmail.match(/[\w.-]+@[\w.-]+\.\w+/);
+  const phoneMatch = safeMessageForPhone.match(/\d{3}[-.]?\d{3}[-.]?\d{4}/);
+
+  // If email or phone detected, check if we should create a lead
+  if (!emailMatch && !phoneMatch) {
+    await saved;
+    return;
+  }
+
+  // Check if lead already exists for this session, while the message is saved
+  const [, existingLeads] = await Promise.all([
+    saved,
+    db.select(`leads?select=id&metadata->>session_id=eq.${sessionId}&limit=1`),
+  ]);
+  if (existingLeads.data && existingLeads.data.length > 0) return;
+
+  // Create new lead from chat; the leads trigger queues its Telegram alert
+  await db.insert('leads', {
+    full_name: 'Chat Widget Lead',
+    email: emailMatch ? emailMatch[0] : null,
+    phone_number: phoneMatch ? phoneMatch[0] : null,
+    source: 'chat_widget',
+    status: 'new',
+    message: lastUserMessage.substring(0, 500),
+    metadata: {
+      session_id: sessionId,
+      ai_model: metadata.model
+    }
+  });
+}
+
 Deno.serve(async (req) => {
   const origin = req.headers.get('origin');
   const corsHeaders = {
@@ -28,6 +227,26 @@ Deno.serve(async (req) => {
   }
 
   try {
+    // POST .../groq-chat/cache/invalidate with the service role key, e.g. after
+    // changing what Marcy should say about pricing
+    if (new URL(req.url).pathname.endsWith('/cache/invalidate')) {
+      const db = new RestClient();
+      if (req.headers.get('Authorization') !== `Bearer ${db.serviceRoleKey}`) {
+        return new Response(JSON.stringify({ error: { code: 'UNAUTHORIZED', message: 'Service role key required' } }), {
+          status: 401,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+        });
+      }
+      let dropped = 0;
+      for (const cache of await Promise.all(faqCaches.values())) {
+        if (cache) dropped += await cache.invalidate(db);
+      }
+      console.log(JSON.stringify({ event: 'faq_cache_invalidate', dropped }));
+      return new Response(JSON.stringify({ data: { success: true, dropped } }), {
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      });
+    }
+
     const MAX_PAYLOAD_SIZE = 50000; // 50KB max payload
     const bodyText = await req.text();
 
@@ -43,153 +262,159 @@ Deno.serve(async (req) => {
       });
     }
 
-    const { messages, sessionId } = JSON.parse(bodyText);
+    const body = JSON.parse(bodyText);
+    const { message, messages, sessionId, stream } = body;
+    const settings = generationSettings(body);
+    const wantsStream = stream === true || (req.headers.get('accept') || '').includes('text/event-stream');
+    const receivedAt = new Date();
 
-    if (!messages || messages.length === 0) {
-      throw new Error('Messages are required');
+    // Current clients send only the new turn (`message`) and the history is
+    // rebuilt from the session; older ones still post the whole `messages` array
+    const userMessage: string = typeof message === 'string' ? message : messages?.[messages.length - 1]?.content;
+    if (!userMessage) {
+      throw new Error('Message is required');
     }
 
-    const groqApiKey = Deno.env.get('GROQ_API_KEY');
-    const supabaseUrl = Deno.env.get('SUPABASE_URL');
-    const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
-
-    if (!groqApiKey) {
+    if (!GROQ_API_KEY) {
       throw new Error('Groq API key not configured');
     }
 
-    if (!supabaseUrl || !serviceRoleKey) {
-      throw new Error('Missing Supabase configuration');
-    }
+    const db = new RestClient();
 
-    // Call Groq API for chat completion
-    const groqResponse = await fetch('https://api.groq.com/openai/v1/chat/completions', {
-      method: 'POST',
-      headers: {
-        'Authorization': `Bearer ${groqApiKey}`,
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        model: 'llama-3.3-70b-versatile',
-        messages: [
-          {
-            role: 'system',
-            content: 'You are Marcy, a professional and friendly AI assistant for CallWaitingAI. Your role is to help capture leads, answer questions about the platform, and provide excellent customer service. Be warm, professional, and efficient. When users show interest or ask questions, naturally ask for their contact information to better assist them.'
-          },
-          ...messages
-        ],
-        temperature: 0.7,
-        max_tokens: 500
-      })
-    });
+    const memory = typeof message === 'string' && sessionId ? await loadMemory(db, sessionId) : null;
 
-    if (!groqResponse.ok) {
-      const errorData = await groqResponse.text();
-      console.error('Groq API error:', errorData);
-      throw new Error('Failed to get AI response');
+    // First turns are answered from the FAQ cache when a close enough question
+    // was answered before. A turn is first when nothing is stored for the
+    // session yet (older clients: a one-message history); the client's say-so
+    // is not enough, since the reply is shared with every later visitor.
+    const cache = await getFaqCache(settings);
+    const firstTurn = typeof message === 'string'
+      ? !memory || (memory.turns.length === 0 && memory.summarizedMessages === 0)
+      : messages.length === 1;
+    let cacheStatus: CacheStatus = 'off';
+    if (cache && firstTurn && cacheable(userMessage)) {
+      const cached = await cache.lookup(db, userMessage);
+      cacheStatus = cached ? 'hit' : 'miss';
+      console.log(JSON.stringify({
+        event: 'faq_cache',
+        cache: cacheStatus,
+        similarity: cached?.similarity ?? null,
+        ...cache.counters(),
+      }));
+      if (cached) {
+        inBackground(persistConversation(db, sessionId, null, userMessage, cached.answer, receivedAt, {
+          model: MODEL_TIERS[cached.tier as Tier]?.label || cached.tier,
+          tier: cached.tier,
+          cache: 'hit',
+        }));
+        return cachedReply(cached.answer, cached.tier, wantsStream, corsHeaders);
+      }
+    } else if (cache) {
+      cache.stats.bypassed += 1;
+      cacheStatus = 'bypass';
     }
 
-    const groqData = await groqResponse.json();
-    const assistantMessage = groqData.choices[0]?.message?.content || 'I apologize, but I encountered an error. Please try again.';
+    const history = typeof message === 'string'
+      ? [...(memory ? contextMessages(memory) : []), { role: 'user', content: userMessage }]
+      : messages;
+
+    const groqMessages = [
+      {
+        role: 'system',
+        content: SYSTEM_PROMPT
+      },
+      ...history
+    ];
 
-    // Save assistant message to database
-    if (sessionId) {
-      await fetch(`${supabaseUrl}/rest/v1/chat_messages`, {
+    // Short FAQ-style turns go to the fast model; the full model answers the
+    // rest, and any turn the fast model fails on
+    let tier: Tier = 'full';
+    let groqResponse: Response | undefined;
+    for (const candidate of tiersFrom(chooseTier(userMessage))) {
+      tier = candidate;
+      groqResponse = await db.fetch(`groq chat ${tier}`, 'https://api.groq.com/openai/v1/chat/completions', {
         method: 'POST',
         headers: {
-          'Authorization': `Bearer ${serviceRoleKey}`,
-          'apikey': serviceRoleKey,
+          'Authorization': `Bearer ${GROQ_API_KEY}`,
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          session_id: sessionId,
-          sender_type: 'assistant',
-          message_text: assistantMessage,
-          message_type: 'text',
-          metadata: { model: 'groq-llama-3.3-70b' }
+          model: MODEL_TIERS[tier].model,
+          messages: groqMessages,
+          temperature: settings.temperature,
+          max_tokens: settings.maxTokens,
+          stream: wantsStream
         })
       });
+      if (groqResponse.ok) break;
+      console.error(`Groq API error (${tier} tier):`, await groqResponse.text());
+    }
+
+    if (!groqResponse?.ok) {
+      throw new Error('Failed to get AI response');
+    }
+
+    const metadata: ReplyMetadata = {
+      model: MODEL_TIERS[tier].label,
+      tier,
+      max_tokens: settings.maxTokens,
+      temperature: settings.temperature,
+      cache: cacheStatus,
+    };
+    // Answers to first-turn questions are kept for the next visitor who asks,
+    // unless Groq stopped early (max_tokens reached, content filter)
+    const remember = (assistantMessage: string, finishReason: string | null) => {
+      if (cache && cacheStatus === 'miss' && finishReason === 'stop' && assistantMessage !== FALLBACK_REPLY) {
+        inBackground(cache.store(db, userMessage, assistantMessage, tier));
+      }
+    };
+
+    if (wantsStream && groqResponse.body) {
+      const reply = streamReply(groqResponse.body, (assistantMessage, finishReason) => {
+        // Runs after the client has the whole reply
+        remember(assistantMessage, finishReason);
+        const persisted = persistConversation(
+          db, sessionId, memory, userMessage, assistantMessage, receivedAt, metadata,
+        )
+          .catch((error) => console.error('Chat persistence error:', error));
+        if (typeof EdgeRuntime !== 'undefined') {
+          EdgeRuntime.waitUntil(persisted);
+          return Promise.resolve();
+        }
+        return persisted;
+      });
 
-      // Attempt to extract lead information from conversation
-      const MAX_MESSAGE_LENGTH = 5000;
-      const lastUserMessage = messages[messages.length - 1]?.content || '';
-
-      // Validate message length before regex to prevent ReDoS
-      if (lastUserMessage.length > MAX_MESSAGE_LENGTH) {
-        console.warn('Message too long for lead extraction, skipping');
-      } else {
-        // Use safer regex with bounded length substring
-        const safeMessageForEmail = lastUserMessage.substring(0, 500);
-        const safeMessageForPhone = lastUserMessage.substring(0, 100);
-
-        const emailMatch = safeMessageForEmail.match(/[\w.-]+@[\w.-]+\.\w+/);
-        const phoneMatch = safeMessageForPhone.match(/\d{3}[-.]?\d{3}[-.]?\d{4}/);
-      
-      // If email or phone detected, check if we should create a lead
-      if (emailMatch || phoneMatch) {
-        // Check if lead already exists for this session
-        const existingLeadResponse = await fetch(
-          `${supabaseUrl}/rest/v1/leads?metadata->>session_id=eq.${sessionId}`,
-          {
-            headers: {
-              'Authorization': `Bearer ${serviceRoleKey}`,
-              'apikey': serviceRoleKey
-            }
-          }
-        );
-
-        const existingLeads = await existingLeadResponse.json();
-        
-        if (!existingLeads || existingLeads.length === 0) {
-          // Create new lead from chat
-          await fetch(`${supabaseUrl}/rest/v1/leads`, {
-            method: 'POST',
-            headers: {
-              'Authorization': `Bearer ${serviceRoleKey}`,
-              'apikey': serviceRoleKey,
-              'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-              full_name: 'Chat Widget Lead',
-              email: emailMatch ? emailMatch[0] : null,
-              phone_number: phoneMatch ? phoneMatch[0] : null,
-              source: 'chat_widget',
-              status: 'new',
-              message: lastUserMessage.substring(0, 500),
-              metadata: {
-                session_id: sessionId,
-                ai_model: 'groq-llama-3.3-70b'
-              }
-            })
-          });
-
-          // Send Telegram notification
-          try {
-            await fetch(`${supabaseUrl}/functions/v1/send-telegram-notification`, {
-              method: 'POST',
-              headers: {
-                'Authorization': `Bearer ${serviceRoleKey}`,
-                'Content-Type': 'application/json'
-              },
-              body: JSON.stringify({
-                message: `New Chat Lead\nEmail: ${emailMatch ? emailMatch[0] : 'N/A'}\nPhone: ${phoneMatch ? phoneMatch[0] : 'N/A'}\nMessage: ${lastUserMessage.substring(0, 200)}`,
-                type: 'new_lead'
-              })
-            });
-          } catch (notifError) {
-            console.error('Notification error:', notifError);
-          }
+      return new Response(reply, {
+        headers: {
+          ...corsHeaders,
+          'Content-Type': 'text/event-stream',
+          'Cache-Control': 'no-cache',
+          'X-Model-Tier': tier,
+          'X-Cache': cacheStatus,
         }
-      }
-      } // Close else block for message length check
+      });
     }
 
+    const groqData = await groqResponse.json();
+    const assistantMessage = groqData.choices[0]?.message?.content || FALLBACK_REPLY;
+
+    remember(assistantMessage, groqData.choices[0]?.finish_reason ?? null);
+    await persistConversation(db, sessionId, memory, userMessage, assistantMessage, receivedAt, metadata);
+
     return new Response(JSON.stringify({
       data: {
         message: assistantMessage,
-        model: 'groq-llama-3.3-70b-versatile'
+        model: `groq-${MODEL_TIERS[tier].model}`,
+        tier,
+        cache: cacheStatus
       }
     }), {
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      headers: {
+        ...corsHeaders,
+        'Content-Type': 'application/json',
+        'Server-Timing': db.serverTiming(),
+        'X-Cache': cacheStatus,
+      }
     });
 
   } catch (error) {
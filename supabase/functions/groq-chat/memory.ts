@@ -0,0 +1,192 @@
+// ============================================================================
+// Conversation memory for groq-chat
+// ============================================================================
+//
+// The widget sends only the new user turn. The context for Groq is rebuilt
+// from chat_messages: the session's latest messages verbatim, and everything
+// older as a rolling summary kept in chat_sessions (migration
+// 20250206000000_chat_memory.sql). Once SUMMARY_BATCH messages have fallen
+// out of the window, they are folded into the summary by a small model, after
+// the reply has been sent.
+
+import type { RestClient } from '../_shared/postgrest.ts';
+
+// Newest messages never folded into the summary. Older ones are folded
+// SUMMARY_BATCH at a time, so the prompt carries every unsummarized message:
+// WINDOW_MESSAGES up to WINDOW_MESSAGES + SUMMARY_BATCH - 1 of them, more
+// while summaries are failing
+const WINDOW_MESSAGES = 12;
+// Messages folded into the summary at a time
+const SUMMARY_BATCH = 8;
+// Unsummarized messages read per turn: the window plus what the summary may lag behind
+const HISTORY_LIMIT = WINDOW_MESSAGES + 2 * SUMMARY_BATCH;
+const SUMMARY_MODEL = 'llama-3.1-8b-instant';
+const SUMMARY_MAX_TOKENS = 300;
+
+export interface Turn {
+  role: 'user' | 'assistant';
+  content: string;
+}
+
+interface StoredTurn extends Turn {
+  createdAt: string;
+}
+
+export interface Memory {
+  summary: string;
+  summarizedUntil: string | null;
+  summarizedMessages: number;
+  /** Messages newer than the summary, oldest first */
+  turns: StoredTurn[];
+}
+
+/** Summary and unsummarized messages of a session, read in parallel */
+export async function loadMemory(db: RestClient, sessionId: string): Promise<Memory> {
+  const session = encodeURIComponent(sessionId);
+  const [sessions, messages] = await Promise.all([
+    db.select(`chat_sessions?select=summary,summarized_until,summarized_messages&session_id=eq.${session}`),
+    db.select(
+      `chat_messages?select=sender_type,message_text,created_at&session_id=eq.${session}` +
+      `&order=created_at.desc&limit=${HISTORY_LIMIT}`,
+    ),
+  ]);
+  const row = sessions.data?.[0];
+  const summarizedUntil: string | null = row?.summarized_until ?? null;
+  const turns = (messages.data || [])
+    .filter((message) => !summarizedUntil || Date.parse(message.created_at) > Date.parse(summarizedUntil))
+    .reverse()
+    .map((message) => ({
+      role: message.sender_type === 'assistant' ? 'assistant' as const : 'user' as const,
+      content: message.message_text,
+      createdAt: message.created_at,
+    }));
+  if (turns.length >= HISTORY_LIMIT) {
+    // Summaries have fallen behind; unsummarized messages older than these are
+    // neither in the prompt nor summarized
+    console.warn(JSON.stringify({ event: 'chat_memory_behind', session_id: sessionId, unsummarized_read: turns.length }));
+  }
+  return {
+    summary: row?.summary || '',
+    summarizedUntil,
+    summarizedMessages: row?.summarized_messages || 0,
+    turns,
+  };
+}
+
+/** Chat messages for Groq, without the system prompt */
+export function contextMessages(memory: Memory): { role: string; content: string }[] {
+  const context = memory.turns.map(({ role, content }) => ({ role, content }));
+  if (!memory.summary) return context;
+  return [{ role: 'system', content: `Summary of the conversation so far: ${memory.summary}` }, ...context];
+}
+
+/**
+ * Store both sides of a turn. The reply is stamped after the user message so
+ * the window reads them back in order.
+ */
+export async function saveTurn(
+  db: RestClient,
+  sessionId: string,
+  userMessage: string,
+  assistantMessage: string,
+  receivedAt: Date,
+  metadata: Record<string, unknown>,
+) {
+  const repliedAt = new Date(Math.max(Date.now(), receivedAt.getTime() + 1));
+  const saved = await db.insert('chat_messages', [
+    {
+      session_id: sessionId,
+      sender_type: 'user',
+      message_text: userMessage,
+      message_type: 'text',
+      metadata: {},
+      created_at: receivedAt.toISOString(),
+    },
+    {
+      session_id: sessionId,
+      sender_type: 'assistant',
+      message_text: assistantMessage,
+      message_type: 'text',
+      metadata,
+      created_at: repliedAt.toISOString(),
+    },
+  ]);
+  if (!saved.ok) {
+    console.error('Failed to store chat turn:', saved.status, saved.error);
+  }
+  return [
+    { role: 'user' as const, content: userMessage, createdAt: receivedAt.toISOString() },
+    { role: 'assistant' as const, content: assistantMessage, createdAt: repliedAt.toISOString() },
+  ];
+}
+
+/**
+ * Fold the messages that left the window into the session summary, once
+ * there are SUMMARY_BATCH of them. `turns` are the unsummarized messages
+ * including the turn just stored.
+ */
+export async function updateSummary(
+  db: RestClient,
+  groqApiKey: string,
+  sessionId: string,
+  memory: Memory,
+  turns: StoredTurn[],
+) {
+  const overflow = turns.length - WINDOW_MESSAGES;
+  if (overflow < SUMMARY_BATCH) return;
+  const folded = turns.slice(0, overflow);
+
+  const transcript = folded.map((turn) => `${turn.role === 'user' ? 'Visitor' : 'Marcy'}: ${turn.content}`).join('\n');
+  const response = await db.fetch('groq summary', 'https://api.groq.com/openai/v1/chat/completions', {
+    method: 'POST',
+    headers: {
+      'Authorization': `Bearer ${groqApiKey}`,
+      'Content-Type': 'application/json'
+    },
+    body: JSON.stringify({
+      model: SUMMARY_MODEL,
+      messages: [
+        {
+          role: 'system',
+          content: 'You maintain a running summary of a chat between a website visitor and Marcy, an AI receptionist. ' +
+            'Update the summary with the new messages. Keep every name, contact detail, request and promise; ' +
+            'drop small talk. Answer with the summary only, in at most 150 words.'
+        },
+        {
+          role: 'user',
+          content: `Current summary:\n${memory.summary || '(none)'}\n\nNew messages:\n${transcript}`
+        }
+      ],
+      temperature: 0.2,
+      max_tokens: SUMMARY_MAX_TOKENS,
+    })
+  });
+  if (!response.ok) {
+    console.error('Groq summary error:', await response.text());
+    return;
+  }
+  const summary = (await response.json()).choices?.[0]?.message?.content?.trim();
+  if (!summary) return;
+
+  // Summaries of the same session may finish out of order; one only replaces
+  // the stored summary if it reaches further, so the summary never goes back
+  const until = new Date(folded[folded.length - 1].createdAt).toISOString();
+  const values = {
+    summary,
+    summarized_until: until,
+    summarized_messages: memory.summarizedMessages + folded.length,
+    updated_at: new Date().toISOString(),
+  };
+  const stored = memory.summarizedUntil
+    ? await db.update(
+      `chat_sessions?session_id=eq.${encodeURIComponent(sessionId)}&summarized_until=lt.${encodeURIComponent(until)}`,
+      values,
+    )
+    : await db.insert('chat_sessions', { session_id: sessionId, ...values }, {
+      onConflict: 'session_id',
+      prefer: 'resolution=ignore-duplicates,return=minimal',
+    });
+  if (!stored.ok) {
+    console.error('Failed to store chat summary:', stored.status, stored.error);
+  }
+}
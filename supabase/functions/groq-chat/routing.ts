@@ -0,0 +1,55 @@
+// ============================================================================
+// Model tiers and generation settings for groq-chat
+// ============================================================================
+//
+// Short, FAQ-style turns (greetings, pricing, hours, what the product does)
+// are answered by a small model, which replies several times faster. Longer
+// or sensitive turns, and any turn the small model fails on, go to the 70B
+// model. Clients may ask for fewer tokens or a lower temperature; both are
+// clamped to what the server allows.
+
+export type Tier = 'fast' | 'full';
+
+export const MODEL_TIERS: Record<Tier, { model: string; label: string }> = {
+  fast: { model: 'llama-3.1-8b-instant', label: 'groq-llama-3.1-8b' },
+  full: { model: 'llama-3.3-70b-versatile', label: 'groq-llama-3.3-70b' },
+};
+
+const DEFAULT_MAX_TOKENS = 500;
+const MIN_MAX_TOKENS = 16;
+const DEFAULT_TEMPERATURE = 0.7;
+const MAX_TEMPERATURE = 1;
+
+// Longest message the fast tier answers
+const FAST_MAX_LENGTH = 160;
+
+const SMALL_TALK = /^(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you|ok(ay)?|great|cool|bye)\b/i;
+const FAQ = /\b(price|pricing|cost|plan|plans|trial|free|hours|open|language|languages|what is|what does|how does|how do i|who are|sign ?up|demo|features?|set ?up)\b/i;
+// Needs the larger model: complaints, money, contracts and anything technical
+const ESCALATE = /\b(refund|cancel|complain|complaint|angry|lawyer|legal|contract|invoice|charged|integrat\w*|api|webhook|crm|not working|broken|error|bug|human|manager|urgent)\b/i;
+
+export interface GenerationSettings {
+  maxTokens: number;
+  temperature: number;
+}
+
+const clamp = (value: unknown, min: number, max: number, fallback: number) =>
+  typeof value === 'number' && Number.isFinite(value) ? Math.min(max, Math.max(min, value)) : fallback;
+
+/** `max_tokens` and `temperature` of the request body, within the server's limits */
+export function generationSettings(body: { max_tokens?: unknown; temperature?: unknown }): GenerationSettings {
+  return {
+    maxTokens: Math.round(clamp(body.max_tokens, MIN_MAX_TOKENS, DEFAULT_MAX_TOKENS, DEFAULT_MAX_TOKENS)),
+    temperature: clamp(body.temperature, 0, MAX_TEMPERATURE, DEFAULT_TEMPERATURE),
+  };
+}
+
+/** Tier for a visitor message: fast for short small talk and FAQ questions */
+export function chooseTier(userMessage: string): Tier {
+  const text = userMessage.trim();
+  if (text.length > FAST_MAX_LENGTH || ESCALATE.test(text)) return 'full';
+  return SMALL_TALK.test(text) || FAQ.test(text) ? 'fast' : 'full';
+}
+
+/** Tiers to try in order: a failed fast turn is retried on the full model */
+export const tiersFrom = (tier: Tier): Tier[] => (tier === 'fast' ? ['fast', 'full'] : ['full']);
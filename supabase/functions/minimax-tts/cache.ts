@@ -0,0 +1,251 @@
+// ============================================================================
+// Content-addressed audio cache for minimax-tts
+// ============================================================================
+//
+// The voice demo and Vapi ask for the same phrases over and over, so synthesized
+// audio is cached under a SHA-256 of everything that changes the output.
+//
+// TTS_CACHE_BACKEND:
+// - storage (default): mp3 files in the public `tts-cache` bucket, with one
+//   `tts_cache` row per file for TTL and LRU bookkeeping (see migration
+//   20250202000000_tts_cache.sql).
+// - disk: mp3 files plus an index.json under TTS_CACHE_DIR, served by this
+//   function at TTS_CACHE_PUBLIC_URL/<key>.mp3 (local `deno run` setups).
+// - off: every request goes to MiniMax.
+
+const DEFAULT_TTL_S = 30 * 24 * 3600; // 30 days
+const DEFAULT_MAX_ENTRIES = 5000;
+const STORAGE_BUCKET = 'tts-cache';
+
+export const CACHE_PATH_PATTERN = /\/cache\/([a-f0-9]{64})\.mp3$/;
+
+export interface CacheKeyParts {
+  model: string;
+  text: string;
+  voiceId: string;
+  speed: number;
+  vol: number;
+  pitch: number;
+  sampleRate: number;
+  bitrate: number;
+}
+
+export interface AudioCache {
+  readonly backend: 'storage' | 'disk';
+  /** Public URL of the cached audio, or null on a miss or an expired entry */
+  get(key: string): Promise<string | null>;
+  put(key: string, audio: Uint8Array): Promise<void>;
+  /** Drop expired entries and the least recently used ones beyond the limit */
+  evict(): Promise<number>;
+}
+
+/**
+ * Cache key: hex SHA-256 over the model, text and every voice/audio setting
+ */
+export async function cacheKey(parts: CacheKeyParts): Promise<string> {
+  const material = JSON.stringify([
+    parts.model,
+    parts.text,
+    parts.voiceId,
+    parts.speed,
+    parts.vol,
+    parts.pitch,
+    parts.sampleRate,
+    parts.bitrate,
+  ]);
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(material));
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+class StorageCache implements AudioCache {
+  readonly backend = 'storage';
+
+  constructor(
+    private supabaseUrl: string,
+    private serviceRoleKey: string,
+    private ttlSeconds: number,
+    private maxEntries: number,
+  ) {}
+
+  private headers(extra: Record<string, string> = {}) {
+    return {
+      'Authorization': `Bearer ${this.serviceRoleKey}`,
+      'apikey': this.serviceRoleKey,
+      ...extra,
+    };
+  }
+
+  private rpc(name: string, args: Record<string, unknown>) {
+    return fetch(`${this.supabaseUrl}/rest/v1/rpc/${name}`, {
+      method: 'POST',
+      headers: this.headers({ 'Content-Type': 'application/json' }),
+      body: JSON.stringify(args),
+    });
+  }
+
+  async get(key: string) {
+    // One round trip: checks the TTL and marks the entry as recently used
+    const response = await this.rpc('tts_cache_hit', { cache_key: key, ttl_seconds: this.ttlSeconds });
+    if (!response.ok) {
+      throw new Error(`tts_cache_hit failed: HTTP ${response.status}`);
+    }
+    const hit = await response.json();
+    return hit === true ? `${this.supabaseUrl}/storage/v1/object/public/${STORAGE_BUCKET}/${key}.mp3` : null;
+  }
+
+  async put(key: string, audio: Uint8Array) {
+    const upload = await fetch(`${this.supabaseUrl}/storage/v1/object/${STORAGE_BUCKET}/${key}.mp3`, {
+      method: 'POST',
+      headers: this.headers({ 'Content-Type': 'audio/mpeg', 'x-upsert': 'true' }),
+      body: audio,
+    });
+    if (!upload.ok) {
+      throw new Error(`Storage upload failed: HTTP ${upload.status}`);
+    }
+    const row = await fetch(`${this.supabaseUrl}/rest/v1/tts_cache?on_conflict=key`, {
+      method: 'POST',
+      headers: this.headers({
+        'Content-Type': 'application/json',
+        'Prefer': 'resolution=merge-duplicates,return=minimal',
+      }),
+      body: JSON.stringify({
+        key,
+        bytes: audio.byteLength,
+        created_at: new Date().toISOString(),
+        last_hit_at: new Date().toISOString(),
+      }),
+    });
+    if (!row.ok) {
+      throw new Error(`tts_cache upsert failed: HTTP ${row.status}`);
+    }
+  }
+
+  async evict() {
+    const response = await this.rpc('evict_tts_cache', {
+      max_entries: this.maxEntries,
+      ttl_seconds: this.ttlSeconds,
+    });
+    if (!response.ok) {
+      throw new Error(`evict_tts_cache failed: HTTP ${response.status}`);
+    }
+    const keys: string[] = await response.json();
+    if (keys.length > 0) {
+      await fetch(`${this.supabaseUrl}/storage/v1/object/${STORAGE_BUCKET}`, {
+        method: 'DELETE',
+        headers: this.headers({ 'Content-Type': 'application/json' }),
+        body: JSON.stringify({ prefixes: keys.map((key) => `${key}.mp3`) }),
+      });
+    }
+    return keys.length;
+  }
+}
+
+interface DiskEntry {
+  bytes: number;
+  createdAt: number;
+  lastHitAt: number;
+}
+
+export class DiskCache implements AudioCache {
+  readonly backend = 'disk';
+  private index: Record<string, DiskEntry> | null = null;
+
+  constructor(
+    private dir: string,
+    private publicUrl: string,
+    private ttlSeconds: number,
+    private maxEntries: number,
+  ) {}
+
+  private async entries() {
+    if (this.index === null) {
+      try {
+        this.index = JSON.parse(await Deno.readTextFile(`${this.dir}/index.json`));
+      } catch {
+        this.index = {};
+      }
+    }
+    return this.index!;
+  }
+
+  private async save() {
+    // Write-and-rename so a concurrent reader never sees half an index
+    const temp = `${this.dir}/index.json.${crypto.randomUUID()}`;
+    await Deno.writeTextFile(temp, JSON.stringify(this.index));
+    await Deno.rename(temp, `${this.dir}/index.json`);
+  }
+
+  private expired(entry: DiskEntry, now: number) {
+    return now - entry.createdAt > this.ttlSeconds * 1000;
+  }
+
+  async get(key: string) {
+    const entries = await this.entries();
+    const entry = entries[key];
+    const now = Date.now();
+    if (!entry || this.expired(entry, now)) return null;
+    // Recency is persisted with the next put; losing it on restart is harmless
+    entry.lastHitAt = now;
+    return `${this.publicUrl}/${key}.mp3`;
+  }
+
+  async read(key: string) {
+    const entries = await this.entries();
+    if (!entries[key]) return null;
+    try {
+      return await Deno.readFile(`${this.dir}/${key}.mp3`);
+    } catch {
+      return null;
+    }
+  }
+
+  async put(key: string, audio: Uint8Array) {
+    const entries = await this.entries();
+    await Deno.mkdir(this.dir, { recursive: true });
+    await Deno.writeFile(`${this.dir}/${key}.mp3`, audio);
+    const now = Date.now();
+    entries[key] = { bytes: audio.byteLength, createdAt: now, lastHitAt: now };
+    await this.save();
+  }
+
+  async evict() {
+    const entries = await this.entries();
+    const now = Date.now();
+    const byRecency = Object.entries(entries).sort(([, a], [, b]) => b.lastHitAt - a.lastHitAt);
+    const doomed = byRecency
+      .filter(([, entry], position) => position >= this.maxEntries || this.expired(entry, now))
+      .map(([key]) => key);
+
+    for (const key of doomed) {
+      delete entries[key];
+      await Deno.remove(`${this.dir}/${key}.mp3`).catch(() => {});
+    }
+    if (doomed.length > 0) await this.save();
+    return doomed.length;
+  }
+}
+
+/**
+ * Build the configured cache, or null when caching is off or not configured
+ */
+export function createAudioCache(requestUrl: string): AudioCache | null {
+  const backend = Deno.env.get('TTS_CACHE_BACKEND') || 'storage';
+  const ttlSeconds = Number(Deno.env.get('TTS_CACHE_TTL_S') || DEFAULT_TTL_S);
+  const maxEntries = Number(Deno.env.get('TTS_CACHE_MAX_ENTRIES') || DEFAULT_MAX_ENTRIES);
+
+  if (backend === 'storage') {
+    const supabaseUrl = Deno.env.get('SUPABASE_URL');
+    const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
+    if (!supabaseUrl || !serviceRoleKey) return null;
+    return new StorageCache(supabaseUrl, serviceRoleKey, ttlSeconds, maxEntries);
+  }
+
+  if (backend === 'disk') {
+    const url = new URL(requestUrl);
+    const publicUrl = Deno.env.get('TTS_CACHE_PUBLIC_URL')
+      || `${url.origin}${url.pathname.replace(/\/$/, '')}/cache`;
+    return new DiskCache(Deno.env.get('TTS_CACHE_DIR') || '/tmp/tts-cache', publicUrl, ttlSeconds, maxEntries);
+  }
+
+  return null;
+}
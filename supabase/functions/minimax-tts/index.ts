@@ -1,5 +1,6 @@
 import { serve } from 'https://deno.land/std@0.168.0/http/server.ts';
 import { corsHeaders } from '../_shared/cors.ts';
+import { AudioCache, CACHE_PATH_PATTERN, DiskCache, cacheKey, createAudioCache } from './cache.ts';
 
 // ============================================================================
 // Configuration Constants
@@ -41,7 +42,7 @@ const VOICE_ID_PATTERN = /^(moss_audio_[a-f0-9-]{36}|[a-f0-9-]{36})$/i;
 const MINIMAX_API_KEY = Deno.env.get('MINIMAX_API_KEY');
 const MINIMAX_GROUP_ID = Deno.env.get('MINIMAX_GROUP_ID');
 const MINIMAX_MODEL = Deno.env.get('MINIMAX_MODEL') || DEFAULT_MINIMAX_MODEL;
-const MINIMAX_API_URL = 'https://api.minimax.io/v1/t2a_v2';
+const MINIMAX_API_URL = Deno.env.get('MINIMAX_API_URL') || 'https://api.minimax.io/v1/t2a_v2';
 const IS_PRODUCTION = Deno.env.get('DENO_ENV') === 'production' || Deno.env.get('ENVIRONMENT') === 'production';
 
 /**
@@ -54,6 +55,17 @@ const ALLOWED_ORIGINS = [
   'http://localhost:3000',
 ];
 
+// Available in the Supabase edge runtime; keeps the worker alive for
+// background work after the response has been sent
+declare const EdgeRuntime: { waitUntil(promise: Promise<unknown>): void } | undefined;
+
+/**
+ * Audio cache (cache.ts), created on the first request; null when disabled.
+ * Hit/miss counters are per worker and reported in the structured logs.
+ */
+let audioCache: AudioCache | null | undefined;
+const cacheStats = { hits: 0, misses: 0 };
+
 // ============================================================================
 // Type Definitions
 // ============================================================================
@@ -167,7 +179,8 @@ function createSuccessResponse(
   voiceId: string,
   textLength: number,
   extraData?: any,
-  requestId?: string
+  requestId?: string,
+  cacheStatus: 'hit' | 'miss' | 'off' = 'off'
 ): Response {
   const response: any = {
     success: true,
@@ -177,6 +190,7 @@ function createSuccessResponse(
     usage: extraData?.usage || {},
     voice_id: voiceId,
     text_length: textLength,
+    cache: cacheStatus,
   };
 
   if (requestId) {
@@ -244,6 +258,39 @@ function log(level: 'info' | 'warn' | 'error', event: string, data: any, request
   console.log(JSON.stringify(logEntry));
 }
 
+/**
+ * Cache counters of this worker, merged into the structured log entries
+ */
+function cacheCounters() {
+  const lookups = cacheStats.hits + cacheStats.misses;
+  return {
+    cache_hits: cacheStats.hits,
+    cache_misses: cacheStats.misses,
+    cache_hit_rate: lookups ? Number((cacheStats.hits / lookups).toFixed(3)) : null,
+  };
+}
+
+/**
+ * Copy the audio MiniMax generated into the cache and apply TTL/LRU eviction
+ */
+async function storeInCache(cache: AudioCache, key: string, audioUrl: string, requestId: string) {
+  const started = Date.now();
+  const audio = await fetch(audioUrl);
+  if (!audio.ok) {
+    throw new Error(`Audio download failed: HTTP ${audio.status}`);
+  }
+  const bytes = new Uint8Array(await audio.arrayBuffer());
+  await cache.put(key, bytes);
+  const evicted = await cache.evict();
+  log('info', 'tts_cache_store', {
+    backend: cache.backend,
+    key,
+    bytes: bytes.byteLength,
+    evicted,
+    duration_ms: Date.now() - started,
+  }, requestId);
+}
+
 // ============================================================================
 // Main Handler
 // ============================================================================
@@ -258,6 +305,26 @@ serve(async (req) => {
     return new Response('ok', { headers: getCorsHeaders(origin) });
   }
 
+  if (audioCache === undefined) {
+    audioCache = createAudioCache(req.url);
+  }
+
+  // The disk backend serves its own files
+  const cachedPath = new URL(req.url).pathname.match(CACHE_PATH_PATTERN);
+  if (req.method === 'GET' && cachedPath && audioCache instanceof DiskCache) {
+    const audio = await audioCache.read(cachedPath[1]);
+    if (!audio) {
+      return createErrorResponse('Not found', 404, undefined, requestId);
+    }
+    return new Response(audio, {
+      headers: {
+        ...getCorsHeaders(origin),
+        'Content-Type': 'audio/mpeg',
+        'Cache-Control': 'public, max-age=31536000, immutable',
+      },
+    });
+  }
+
   // Only allow POST requests
   if (req.method !== 'POST') {
     return createErrorResponse(
@@ -372,6 +439,43 @@ serve(async (req) => {
       text_length: sanitizedText.length,
     }, requestId);
 
+    // Serve repeated phrases from the audio cache
+    const cache = audioCache;
+    let key: string | null = null;
+    if (cache) {
+      key = await cacheKey({
+        model: MINIMAX_MODEL,
+        text: sanitizedText,
+        voiceId: finalVoiceId,
+        speed: clampedSpeed,
+        vol: clampedVolume,
+        pitch: clampedPitch,
+        sampleRate: clampedSampleRate,
+        bitrate: clampedBitrate,
+      });
+      let cachedUrl: string | null = null;
+      try {
+        cachedUrl = await cache.get(key);
+      } catch (cacheError) {
+        // A broken cache must not break synthesis
+        log('warn', 'tts_cache_error', { backend: cache.backend, error: String(cacheError) }, requestId);
+      }
+
+      if (cachedUrl) {
+        cacheStats.hits += 1;
+        log('info', 'tts_cache_hit', {
+          backend: cache.backend,
+          key,
+          voice_id: finalVoiceId,
+          text_length: sanitizedText.length,
+          duration_ms: Date.now() - requestStartTime,
+          ...cacheCounters(),
+        }, requestId);
+        return createSuccessResponse(cachedUrl, finalVoiceId, sanitizedText.length, undefined, requestId, 'hit');
+      }
+      cacheStats.misses += 1;
+    }
+
     // Prepare Minimax API request
     const minimaxRequest = {
       model: MINIMAX_MODEL,
@@ -532,14 +636,27 @@ serve(async (req) => {
       voice_id: finalVoiceId,
       text_length: sanitizedText.length,
       duration_ms: duration,
+      cache: cache ? 'miss' : 'off',
+      ...cacheCounters(),
     }, requestId);
 
+    // Fill the cache after responding; MiniMax URLs expire, cached copies don't
+    if (cache && key) {
+      const stored = storeInCache(cache, key, audioUrl, requestId).catch((cacheError) => {
+        log('warn', 'tts_cache_error', { backend: cache.backend, error: String(cacheError) }, requestId);
+      });
+      if (typeof EdgeRuntime !== 'undefined') {
+        EdgeRuntime.waitUntil(stored);
+      }
+    }
+
     return createSuccessResponse(
       audioUrl,
       finalVoiceId,
       sanitizedText.length,
       data,
-      requestId
+      requestId,
+      cache ? 'miss' : 'off'
     );
 
   } catch (error: any) {
@@ -574,6 +691,7 @@ serve(async (req) => {
  * - Structured logging
  * - Request size limits
  * - Audio URL validation
+ * - Content-addressed audio cache with TTL/LRU eviction (cache.ts)
  *
  * Usage:
  * POST https://your-project.supabase.co/functions/v1/minimax-tts
@@ -594,6 +712,7 @@ serve(async (req) => {
  *   "audio_file": "https://...",
  *   "voice_id": "...",
  *   "text_length": 123,
+ *   "cache": "hit" | "miss" | "off",
  *   "request_id": "..."
  * }
  *
@@ -0,0 +1,313 @@
+// ============================================================================
+// Outbox dispatcher for send-telegram-notification
+// ============================================================================
+//
+// Alerts are queued in notification_outbox (new leads by the leads trigger,
+// anything else through this function's POST endpoint) and delivered here,
+// see migration 20250205000000_notification_outbox.sql.
+//
+// Telegram limits bots to about one message per second in a private chat,
+// 20 per minute in a group (negative chat ids) and 30 per second overall.
+// Every alert claimed for a chat goes out in one message (split at Telegram's
+// 4096 characters), so a burst of leads costs one send, and sends to a chat
+// are spaced by its interval. The spacing is tracked per worker; a 429 that
+// still comes back is honoured through its retry_after.
+
+import type { RestClient } from '../_shared/postgrest.ts';
+
+const TELEGRAM_API_URL = Deno.env.get('TELEGRAM_API_URL') || 'https://api.telegram.org';
+const TELEGRAM_BOT_TOKEN = Deno.env.get('TELEGRAM_BOT_TOKEN');
+const TELEGRAM_CHAT_ID = Deno.env.get('TELEGRAM_CHAT_ID');
+
+const BATCH_SIZE = Number(Deno.env.get('TELEGRAM_DISPATCH_BATCH_SIZE') || 100);
+const DISPATCH_BUDGET_MS = 20000; // Stay well inside the edge function time limit
+const PRIVATE_CHAT_INTERVAL_MS = 1100;
+const GROUP_CHAT_INTERVAL_MS = 3100;
+const GLOBAL_SENDS_PER_SECOND = 30;
+const MAX_MESSAGE_LENGTH = 4096;
+const MAX_ATTEMPTS = 8;
+const BASE_BACKOFF_MS = 5000;
+const MAX_BACKOFF_MS = 10 * 60 * 1000;
+
+export interface OutboxRow {
+  id: number;
+  kind: string;
+  chat_id: string | null;
+  lead_id: string | null;
+  message: string | null;
+  attempts: number;
+  created_at: string;
+}
+
+interface Lead {
+  id: string;
+  full_name: string | null;
+  email: string | null;
+  phone_number: string | null;
+  source: string | null;
+  message: string | null;
+  created_at: string;
+}
+
+interface SendResult {
+  ok: boolean;
+  messageId?: number;
+  /** Set on 429: how long Telegram wants us to wait */
+  retryAfterMs?: number;
+  /** 400/403: the chat or message will never be accepted */
+  permanent?: boolean;
+  error?: string;
+}
+
+interface DispatchOutcome {
+  claimed: number;
+  sent: number;
+  messages: number;
+  retried: number;
+  failed: number;
+  rateLimited: number;
+  deliveryMs: number[];
+}
+
+// Pacing state, shared by the requests this worker serves
+const nextSendAt = new Map<string, number>();
+const chatQueues = new Map<string, Promise<unknown>>();
+const recentSends: number[] = [];
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export const telegramConfigured = () => Boolean(TELEGRAM_BOT_TOKEN && TELEGRAM_CHAT_ID);
+
+const chatInterval = (chatId: string) =>
+  chatId.startsWith('-') ? GROUP_CHAT_INTERVAL_MS : PRIVATE_CHAT_INTERVAL_MS;
+
+const escapeHtml = (text: string) =>
+  text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+
+async function globalSlot() {
+  for (;;) {
+    const now = Date.now();
+    while (recentSends.length > 0 && recentSends[0] <= now - 1000) recentSends.shift();
+    if (recentSends.length < GLOBAL_SENDS_PER_SECOND) {
+      recentSends.push(now);
+      return;
+    }
+    await sleep(recentSends[0] + 1000 - now);
+  }
+}
+
+/**
+ * Run `send` after every earlier send to `chatId` has finished and the
+ * chat's interval (or retry_after) has passed
+ */
+function paced(chatId: string, send: () => Promise<SendResult>): Promise<SendResult> {
+  const previous = chatQueues.get(chatId) || Promise.resolve();
+  const turn = previous.catch(() => undefined).then(async () => {
+    const wait = (nextSendAt.get(chatId) || 0) - Date.now();
+    if (wait > 0) await sleep(wait);
+    await globalSlot();
+    const result = await send();
+    nextSendAt.set(chatId, Date.now() + Math.max(chatInterval(chatId), result.retryAfterMs || 0));
+    return result;
+  });
+  chatQueues.set(chatId, turn);
+  return turn;
+}
+
+async function sendMessage(db: RestClient, chatId: string, text: string): Promise<SendResult> {
+  try {
+    const response = await db.fetch(
+      'telegram sendMessage',
+      `${TELEGRAM_API_URL}/bot${TELEGRAM_BOT_TOKEN}/sendMessage`,
+      {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ chat_id: chatId, text, parse_mode: 'HTML', disable_web_page_preview: true }),
+      },
+    );
+    const result = await response.json().catch(() => ({}));
+    if (response.ok && result.ok) {
+      return { ok: true, messageId: result.result?.message_id };
+    }
+    const error = result.description || `HTTP ${response.status}`;
+    if (response.status === 429) {
+      return { ok: false, retryAfterMs: (result.parameters?.retry_after || 1) * 1000, error };
+    }
+    return { ok: false, permanent: response.status === 400 || response.status === 403, error };
+  } catch (error) {
+    return { ok: false, error: error.message };
+  }
+}
+
+function leadAlert(lead: Lead) {
+  return `<b>New Lead Alert</b>\n\n` +
+    `Name: ${escapeHtml(lead.full_name || 'N/A')}\n` +
+    `Email: ${escapeHtml(lead.email || 'N/A')}\n` +
+    `Phone: ${escapeHtml(lead.phone_number || 'N/A')}\n` +
+    `Source: ${escapeHtml(lead.source || 'N/A')}\n` +
+    `Message: ${escapeHtml(lead.message || 'N/A')}\n\n` +
+    `Created: ${new Date(lead.created_at).toLocaleString()}`;
+}
+
+function leadLine(lead: Lead) {
+  const contact = [lead.email, lead.phone_number].filter(Boolean).join(' / ') || 'no contact details';
+  const message = lead.message ? `\n   ${escapeHtml(lead.message.substring(0, 200))}` : '';
+  return `<b>${escapeHtml(lead.full_name || 'New lead')}</b> (${escapeHtml(lead.source || 'N/A')}): ` +
+    `${escapeHtml(contact)}${message}`;
+}
+
+function rowText(row: OutboxRow, leads: Map<string, Lead>, single: boolean) {
+  const lead = row.lead_id ? leads.get(row.lead_id) : undefined;
+  if (lead) return single ? leadAlert(lead) : leadLine(lead);
+  return escapeHtml(row.message || 'New notification from CallWaitingAI');
+}
+
+/** One chat's claimed alerts as messages of at most MAX_MESSAGE_LENGTH */
+function coalesce(rows: OutboxRow[], leads: Map<string, Lead>) {
+  if (rows.length === 1) {
+    return [{ text: rowText(rows[0], leads, true).substring(0, MAX_MESSAGE_LENGTH), rows }];
+  }
+  const HEADER_LENGTH = 40; // `<b>N new alerts</b>`
+  const groups: { lines: string[]; length: number; rows: OutboxRow[] }[] = [];
+  for (const row of rows) {
+    const line = rowText(row, leads, false).substring(0, MAX_MESSAGE_LENGTH - HEADER_LENGTH - 2);
+    let current = groups[groups.length - 1];
+    if (!current || HEADER_LENGTH + current.length + line.length + 2 > MAX_MESSAGE_LENGTH) {
+      current = { lines: [], length: 0, rows: [] };
+      groups.push(current);
+    }
+    current.lines.push(line);
+    current.length += line.length + 2;
+    current.rows.push(row);
+  }
+  return groups.map((group) => ({
+    text: `<b>${group.rows.length} new alerts</b>\n\n${group.lines.join('\n\n')}`,
+    rows: group.rows,
+  }));
+}
+
+async function leadsById(db: RestClient, rows: OutboxRow[]) {
+  const ids = [...new Set(rows.map((row) => row.lead_id).filter(Boolean))];
+  const leads = new Map<string, Lead>();
+  if (ids.length === 0) return leads;
+  const result = await db.select<Lead>(
+    `leads?select=id,full_name,email,phone_number,source,message,created_at&id=in.(${ids.join(',')})`,
+  );
+  if (!result.ok) {
+    throw new Error(`Loading leads failed: HTTP ${result.status} ${result.error}`);
+  }
+  for (const lead of result.data || []) leads.set(lead.id, lead);
+  return leads;
+}
+
+async function markRows(db: RestClient, rows: OutboxRow[], values: Record<string, unknown>) {
+  const ids = rows.map((row) => row.id).join(',');
+  const marked = await db.update(`notification_outbox?id=in.(${ids})`, values);
+  if (!marked.ok) {
+    throw new Error(`Updating notification_outbox failed: HTTP ${marked.status} ${marked.error}`);
+  }
+}
+
+/** Record the outcome of one message on the outbox rows it carried */
+async function settle(db: RestClient, rows: OutboxRow[], result: SendResult, outcome: DispatchOutcome) {
+  const now = Date.now();
+  if (result.ok) {
+    outcome.sent += rows.length;
+    outcome.messages += 1;
+    for (const row of rows) outcome.deliveryMs.push(now - Date.parse(row.created_at));
+    await markRows(db, rows, {
+      sent_at: new Date(now).toISOString(),
+      telegram_message_id: result.messageId ?? null,
+      last_error: null,
+    });
+    return;
+  }
+
+  const attempts = Math.max(...rows.map((row) => row.attempts));
+  if (result.permanent || attempts >= MAX_ATTEMPTS) {
+    outcome.failed += rows.length;
+    await markRows(db, rows, { failed_at: new Date(now).toISOString(), last_error: result.error });
+    return;
+  }
+  // A 429 is not the alert's fault: retry as soon as Telegram allows
+  if (result.retryAfterMs) outcome.rateLimited += 1;
+  const delay = result.retryAfterMs ?? Math.min(BASE_BACKOFF_MS * 2 ** (attempts - 1), MAX_BACKOFF_MS);
+  outcome.retried += rows.length;
+  await markRows(db, rows, {
+    claimed_at: null,
+    next_attempt_at: new Date(now + delay).toISOString(),
+    last_error: result.error,
+  });
+}
+
+async function deliverChat(
+  db: RestClient,
+  chatId: string,
+  rows: OutboxRow[],
+  leads: Map<string, Lead>,
+  deadline: number,
+  outcome: DispatchOutcome,
+) {
+  for (const message of coalesce(rows, leads)) {
+    // Do not sit out a long retry_after here; the next dispatch picks these up
+    const blockedUntil = nextSendAt.get(chatId) || 0;
+    if (blockedUntil > deadline) {
+      outcome.retried += message.rows.length;
+      await markRows(db, message.rows, {
+        claimed_at: null,
+        next_attempt_at: new Date(blockedUntil).toISOString(),
+      });
+      continue;
+    }
+    const result = await paced(chatId, () => sendMessage(db, chatId, message.text));
+    await settle(db, message.rows, result, outcome);
+  }
+}
+
+const percentile = (sorted: number[], p: number) =>
+  sorted.length ? sorted[Math.min(sorted.length - 1, Math.ceil(p * sorted.length) - 1)] : null;
+
+/**
+ * Claim due alerts and deliver them, batch after batch, until the outbox is
+ * empty or the time budget is spent
+ */
+export async function dispatchOutbox(db: RestClient) {
+  const startedAt = Date.now();
+  const deadline = startedAt + DISPATCH_BUDGET_MS;
+  const outcome: DispatchOutcome = {
+    claimed: 0, sent: 0, messages: 0, retried: 0, failed: 0, rateLimited: 0, deliveryMs: [],
+  };
+
+  while (Date.now() < deadline) {
+    const claim = await db.rpc<OutboxRow[]>('claim_notifications', { batch_size: BATCH_SIZE });
+    if (!claim.ok) {
+      throw new Error(`claim_notifications failed: HTTP ${claim.status} ${claim.error}`);
+    }
+    const rows = claim.data || [];
+    if (rows.length === 0) break;
+    rows.sort((a, b) => a.id - b.id);
+    outcome.claimed += rows.length;
+
+    const leads = await leadsById(db, rows);
+    const byChat = new Map<string, OutboxRow[]>();
+    for (const row of rows) {
+      const chatId = row.chat_id || TELEGRAM_CHAT_ID!;
+      byChat.set(chatId, [...(byChat.get(chatId) || []), row]);
+    }
+    // Chats are paced independently, so they are served together
+    await Promise.all(
+      [...byChat].map(([chatId, chatRows]) => deliverChat(db, chatId, chatRows, leads, deadline, outcome)),
+    );
+
+    if (rows.length < BATCH_SIZE) break;
+  }
+
+  const { deliveryMs, ...counts } = outcome;
+  const sorted = [...deliveryMs].sort((a, b) => a - b);
+  return {
+    ...counts,
+    deliveryMsP50: percentile(sorted, 0.5),
+    deliveryMsMax: sorted.length ? sorted[sorted.length - 1] : null,
+    durationMs: Date.now() - startedAt,
+  };
+}
@@ -1,101 +1,95 @@
-Deno.serve(async (req) => {
-  const corsHeaders = {
-    'Access-Control-Allow-Origin': '*',
-    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
-    'Access-Control-Allow-Methods': 'POST, OPTIONS',
-    'Access-Control-Max-Age': '86400',
-  };
+// Telegram notifications
+//
+// POST queues an alert in notification_outbox, returns 202 right away and
+// delivers the queue after responding. New leads need no call at all: the
+// leads trigger queues their alert. Alerts go to TELEGRAM_CHAT_ID; only
+// service role callers may pass another `chatId`.
+// POST .../send-telegram-notification/dispatch with the service role key
+// delivers the queue, see dispatch.ts; the notification_outbox migration
+// schedules it every few seconds with pg_cron + pg_net.
+
+import { RestClient } from '../_shared/postgrest.ts';
+import { dispatchOutbox, telegramConfigured } from './dispatch.ts';
+
+// Available in the Supabase edge runtime; keeps the worker alive for
+// background work after the response has been sent
+declare const EdgeRuntime: { waitUntil(promise: Promise<unknown>): void } | undefined;
+
+const corsHeaders = {
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
+  'Access-Control-Allow-Methods': 'POST, OPTIONS',
+  'Access-Control-Max-Age': '86400',
+};
+
+function jsonResponse(body: unknown, status = 200, db?: RestClient) {
+  const headers: Record<string, string> = { ...corsHeaders, 'Content-Type': 'application/json' };
+  if (db?.timings.length) headers['Server-Timing'] = db.serverTiming();
+  return new Response(JSON.stringify(body), { status, headers });
+}
 
+Deno.serve(async (req) => {
   if (req.method === 'OPTIONS') {
     return new Response(null, { status: 200, headers: corsHeaders });
   }
 
   try {
-    const { leadId, message, type } = await req.json();
-
-    const telegramBotToken = Deno.env.get('TELEGRAM_BOT_TOKEN');
-    const telegramChatId = Deno.env.get('TELEGRAM_CHAT_ID');
-    const supabaseUrl = Deno.env.get('SUPABASE_URL');
-    const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
-
-    if (!supabaseUrl || !serviceRoleKey) {
-      throw new Error('Missing Supabase configuration');
-    }
+    const db = new RestClient();
 
-    // Fetch lead details if leadId provided
-    let leadDetails = null;
-    if (leadId) {
-      const leadResponse = await fetch(`${supabaseUrl}/rest/v1/leads?id=eq.${leadId}`, {
-        headers: {
-          'Authorization': `Bearer ${serviceRoleKey}`,
-          'apikey': serviceRoleKey
-        }
-      });
-
-      if (leadResponse.ok) {
-        const leads = await leadResponse.json();
-        leadDetails = leads[0];
+    if (new URL(req.url).pathname.endsWith('/dispatch')) {
+      if (req.headers.get('Authorization') !== `Bearer ${db.serviceRoleKey}`) {
+        return jsonResponse({ error: { code: 'UNAUTHORIZED', message: 'Service role key required' } }, 401);
+      }
+      // Leave the queue alone until there is somewhere to deliver it
+      if (!telegramConfigured()) {
+        console.log('Telegram not configured - dispatch skipped');
+        return jsonResponse({ data: { success: true, configured: false } });
       }
+      const dispatched = await dispatchOutbox(db);
+      console.log(JSON.stringify({ event: 'telegram_dispatch', ...dispatched, ...db.summary() }));
+      return jsonResponse({ data: { success: true, ...dispatched } }, 200, db);
     }
 
-    // Format notification message
-    let notificationText = '';
-    
-    if (type === 'new_lead' && leadDetails) {
-      notificationText = `New Lead Alert\n\n` +
-        `Name: ${leadDetails.full_name}\n` +
-        `Email: ${leadDetails.email || 'N/A'}\n` +
-        `Phone: ${leadDetails.phone_number || 'N/A'}\n` +
-        `Source: ${leadDetails.source}\n` +
-        `Message: ${leadDetails.message || 'N/A'}\n\n` +
-        `Created: ${new Date(leadDetails.created_at).toLocaleString()}`;
-    } else {
-      notificationText = message || 'New notification from CallWaitingAI';
-    }
+    const { leadId, message, type, chatId } = await req.json();
+    // This endpoint is public (anon key, any origin), so only service role
+    // callers may route an alert to another chat; the rest go to TELEGRAM_CHAT_ID
+    const serviceRole = req.headers.get('Authorization') === `Bearer ${db.serviceRoleKey}`;
 
-    // Send Telegram notification if configured
-    if (telegramBotToken && telegramChatId) {
-      const telegramUrl = `https://api.telegram.org/bot${telegramBotToken}/sendMessage`;
-      
-      const telegramResponse = await fetch(telegramUrl, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({
-          chat_id: telegramChatId,
-          text: notificationText,
-          parse_mode: 'HTML'
-        })
-      });
+    const queued = await db.insert('notification_outbox', {
+      kind: type || 'message',
+      lead_id: leadId || null,
+      message: message || null,
+      chat_id: serviceRole && chatId ? String(chatId) : null,
+    });
+    if (!queued.ok) {
+      throw new Error(`Failed to queue notification: HTTP ${queued.status}`);
+    }
 
-      if (!telegramResponse.ok) {
-        console.error('Failed to send Telegram notification');
-      }
-    } else {
-      console.log('Telegram not configured - notification skipped:', notificationText);
+    // Deliver without waiting for the next scheduled dispatch
+    if (telegramConfigured() && typeof EdgeRuntime !== 'undefined') {
+      EdgeRuntime.waitUntil(
+        dispatchOutbox(new RestClient())
+          .then((dispatched) => console.log(JSON.stringify({ event: 'telegram_dispatch', ...dispatched })))
+          .catch((error) => console.error('Telegram dispatch error:', error)),
+      );
     }
 
-    return new Response(JSON.stringify({
+    return jsonResponse({
       data: {
         success: true,
-        message: 'Notification processed'
+        queued: true,
+        message: 'Notification queued'
       }
-    }), {
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
-    });
+    }, 202, db);
 
   } catch (error) {
     console.error('Telegram notification error:', error);
-    
-    return new Response(JSON.stringify({
+
+    return jsonResponse({
       error: {
         code: 'NOTIFICATION_ERROR',
         message: error.message
       }
-    }), {
-      status: 500,
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
-    });
+    }, 500);
   }
 });
@@ -1,147 +1,273 @@
-Deno.serve(async (req) => {
-  const corsHeaders = {
-    'Access-Control-Allow-Origin': '*',
-    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
-    'Access-Control-Allow-Methods': 'POST, GET, OPTIONS',
-    'Access-Control-Max-Age': '86400',
+// Vapi webhook receiver
+//
+// VAPI_WEBHOOK_MODE=direct (default): each event is applied to call_logs/leads
+// before the callback returns.
+// VAPI_WEBHOOK_MODE=batch: the event is only appended to webhook_events and the
+// callback gets 202 right away. POST .../vapi-webhook/drain with the service
+// role key (e.g. every few seconds from pg_cron) claims unprocessed events in
+// arrival order (claim_webhook_events) and applies them with bulk upserts.
+//
+// Both modes create at most one lead per Vapi call (leads.vapi_call_id).
+
+import { RestClient } from '../_shared/postgrest.ts';
+
+const WEBHOOK_MODE = Deno.env.get('VAPI_WEBHOOK_MODE') || 'direct';
+const BATCH_SIZE = Number(Deno.env.get('VAPI_WEBHOOK_BATCH_SIZE') || 200);
+const DRAIN_BUDGET_MS = 20000; // Stay well inside the edge function time limit
+
+const corsHeaders = {
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
+  'Access-Control-Allow-Methods': 'POST, GET, OPTIONS',
+  'Access-Control-Max-Age': '86400',
+};
+
+function jsonResponse(body: unknown, status = 200, db?: RestClient) {
+  const headers: Record<string, string> = { ...corsHeaders, 'Content-Type': 'application/json' };
+  if (db?.timings.length) headers['Server-Timing'] = db.serverTiming();
+  return new Response(JSON.stringify(body), { status, headers });
+}
+
+const isCallStarted = (type: string) => type === 'call.started' || type === 'call-started';
+const isCallEnded = (type: string) => type === 'call.ended' || type === 'call-ended';
+const callIdOf = (payload: any) => payload.call?.id || payload.callId;
+
+// Basic extraction - can be enhanced with NLP
+function leadFromTranscript(callId: string, transcript: string) {
+  if (!transcript) return null;
+  const emailMatch = transcript.match(/[\w.-]+@[\w.-]+\.\w+/);
+  const phoneMatch = transcript.match(/\d{3}[-.]?\d{3}[-.]?\d{4}/);
+  if (!emailMatch && !phoneMatch) return null;
+  return {
+    vapi_call_id: callId,
+    full_name: 'Voice Call Lead',
+    email: emailMatch ? emailMatch[0] : null,
+    phone_number: phoneMatch ? phoneMatch[0] : null,
+    source: 'voice_call',
+    status: 'new',
+    message: transcript.substring(0, 500),
+    metadata: { vapi_call_id: callId },
   };
+}
 
-  if (req.method === 'OPTIONS') {
-    return new Response(null, { status: 200, headers: corsHeaders });
+function insertLeads(db: RestClient, leads: unknown[]) {
+  // Redelivered call.ended events hit the unique vapi_call_id and are skipped
+  return db.insert('leads', leads, {
+    onConflict: 'vapi_call_id',
+    prefer: 'resolution=ignore-duplicates,return=minimal',
+  });
+}
+
+// Apply the call_logs/leads writes of one event
+async function applyEvent(db: RestClient, eventType: string, payload: any) {
+  const callId = callIdOf(payload);
+
+  if (isCallStarted(eventType)) {
+    await db.insert('call_logs', {
+      vapi_call_id: callId,
+      caller_phone: payload.call?.customer?.number || payload.phoneNumber,
+      call_status: 'in_progress',
+      call_type: 'inbound',
+      started_at: new Date().toISOString(),
+      metadata: payload
+    });
   }
 
-  try {
-    const supabaseUrl = Deno.env.get('SUPABASE_URL');
-    const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
+  if (isCallEnded(eventType)) {
+    const transcript = payload.call?.transcript || payload.transcript || '';
+    // Extract lead information from transcript if available
+    const lead = leadFromTranscript(callId, transcript);
 
-    if (!supabaseUrl || !serviceRoleKey) {
-      throw new Error('Missing Supabase configuration');
-    }
+    // Independent writes, sent together
+    await Promise.all([
+      db.update(`call_logs?vapi_call_id=eq.${callId}`, {
+        call_status: 'completed',
+        duration_seconds: payload.call?.duration || payload.duration || 0,
+        transcript: transcript,
+        ended_at: new Date().toISOString()
+      }),
+      lead ? insertLeads(db, [lead]) : null,
+    ]);
+  }
+}
 
-    const payload = await req.json();
-    const eventType = payload.type || payload.event || 'unknown';
+async function processEvent(db: RestClient, eventType: string, payload: any) {
+  // Log the webhook event while the call is being written
+  const [logged] = await Promise.all([
+    db.insert<{ id: string }[]>('webhook_events', {
+      event_type: eventType,
+      payload: payload,
+      source: 'vapi',
+      processed: false
+    }, { prefer: 'return=representation' }),
+    applyEvent(db, eventType, payload),
+  ]);
+
+  if (!logged.ok) {
+    console.error('Failed to log webhook event');
+    return;
+  }
 
-    // Log webhook event
-    const webhookLogResponse = await fetch(`${supabaseUrl}/rest/v1/webhook_events`, {
-      method: 'POST',
-      headers: {
-        'Authorization': `Bearer ${serviceRoleKey}`,
-        'apikey': serviceRoleKey,
-        'Content-Type': 'application/json',
-        'Prefer': 'return=representation'
-      },
-      body: JSON.stringify({
-        event_type: eventType,
-        payload: payload,
-        source: 'vapi',
-        processed: false
-      })
+  // Mark webhook as processed (by primary key, not by a JSON path scan)
+  const eventId = logged.data?.[0]?.id;
+  if (eventId) {
+    await db.update(`webhook_events?id=eq.${eventId}`, {
+      processed: true,
+      processed_at: new Date().toISOString()
     });
+  }
+}
 
-    if (!webhookLogResponse.ok) {
-      console.error('Failed to log webhook event');
-    }
+async function enqueueEvent(db: RestClient, eventType: string, payload: any) {
+  const response = await db.insert('webhook_events', {
+    event_type: eventType,
+    payload: payload,
+    source: 'vapi',
+    processed: false
+  });
+  // Fail the callback so Vapi retries; the event must not be lost
+  if (!response.ok) {
+    throw new Error(`Failed to queue webhook event: HTTP ${response.status}`);
+  }
+}
+
+// Fold a claimed batch (sorted by seq) into one upsert per row shape.
+// PostgREST bulk inserts need identical keys in every object.
+async function applyBatch(db: RestClient, events: any[]) {
+  const started = new Map<string, Record<string, unknown>>();
+  const ended = new Map<string, Record<string, unknown>>();
+  const leads = new Map<string, Record<string, unknown>>();
 
-    // Process different event types
-    if (eventType === 'call.started' || eventType === 'call-started') {
-      const callId = payload.call?.id || payload.callId;
-      const callerPhone = payload.call?.customer?.number || payload.phoneNumber;
-      
-      await fetch(`${supabaseUrl}/rest/v1/call_logs`, {
-        method: 'POST',
-        headers: {
-          'Authorization': `Bearer ${serviceRoleKey}`,
-          'apikey': serviceRoleKey,
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({
-          vapi_call_id: callId,
-          caller_phone: callerPhone,
-          call_status: 'in_progress',
-          call_type: 'inbound',
-          started_at: new Date().toISOString(),
-          metadata: payload
-        })
+  for (const event of events) {
+    const payload = event.payload || {};
+    const callId = callIdOf(payload);
+    if (!callId) continue;
+
+    if (isCallStarted(event.event_type)) {
+      started.set(callId, {
+        vapi_call_id: callId,
+        caller_phone: payload.call?.customer?.number || payload.phoneNumber || null,
+        call_status: 'in_progress',
+        call_type: 'inbound',
+        started_at: event.created_at,
+        metadata: payload,
       });
     }
-
-    if (eventType === 'call.ended' || eventType === 'call-ended') {
-      const callId = payload.call?.id || payload.callId;
-      const duration = payload.call?.duration || payload.duration || 0;
+    if (isCallEnded(event.event_type)) {
       const transcript = payload.call?.transcript || payload.transcript || '';
-      
-      await fetch(`${supabaseUrl}/rest/v1/call_logs?vapi_call_id=eq.${callId}`, {
-        method: 'PATCH',
-        headers: {
-          'Authorization': `Bearer ${serviceRoleKey}`,
-          'apikey': serviceRoleKey,
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({
-          call_status: 'completed',
-          duration_seconds: duration,
-          transcript: transcript,
-          ended_at: new Date().toISOString()
-        })
+      ended.set(callId, {
+        vapi_call_id: callId,
+        call_status: 'completed',
+        duration_seconds: payload.call?.duration || payload.duration || 0,
+        transcript: transcript,
+        ended_at: event.created_at,
       });
+      const lead = leadFromTranscript(callId, transcript);
+      if (lead) leads.set(callId, lead);
+    }
+  }
 
-      // Extract lead information from transcript if available
-      if (transcript && transcript.length > 0) {
-        // Basic extraction - can be enhanced with NLP
-        const emailMatch = transcript.match(/[\w.-]+@[\w.-]+\.\w+/);
-        const phoneMatch = transcript.match(/\d{3}[-.]?\d{3}[-.]?\d{4}/);
-        
-        if (emailMatch || phoneMatch) {
-          await fetch(`${supabaseUrl}/rest/v1/leads`, {
-            method: 'POST',
-            headers: {
-              'Authorization': `Bearer ${serviceRoleKey}`,
-              'apikey': serviceRoleKey,
-              'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-              full_name: 'Voice Call Lead',
-              email: emailMatch ? emailMatch[0] : null,
-              phone_number: phoneMatch ? phoneMatch[0] : null,
-              source: 'voice_call',
-              status: 'new',
-              message: transcript.substring(0, 500),
-              metadata: { vapi_call_id: callId }
-            })
-          });
-        }
-      }
+  const startedOnly = [...started].filter(([id]) => !ended.has(id)).map(([, row]) => row);
+  const complete = [...ended].filter(([id]) => started.has(id)).map(([id, row]) => ({ ...started.get(id), ...row }));
+  const endedOnly = [...ended].filter(([id]) => !started.has(id)).map(([, row]) => row);
+
+  // The three call_logs groups hold different calls, so every write is
+  // independent and they are sent together
+  const upsertCalls = (rows: unknown[], resolution: string) => {
+    if (rows.length === 0) return null;
+    return db.insert('call_logs', rows, { onConflict: 'vapi_call_id', prefer: `${resolution},return=minimal` });
+  };
+  const [startedResult, completeResult, endedResult, leadsResult] = await Promise.all([
+    // A call.started arriving after its call.ended must not reopen the call
+    upsertCalls(startedOnly, 'resolution=ignore-duplicates'),
+    upsertCalls(complete, 'resolution=merge-duplicates'),
+    upsertCalls(endedOnly, 'resolution=merge-duplicates'),
+    leads.size > 0 ? insertLeads(db, [...leads.values()]) : null,
+  ]);
+
+  for (const result of [startedResult, completeResult, endedResult]) {
+    if (result && !result.ok) {
+      throw new Error(`call_logs upsert failed: HTTP ${result.status} ${result.error}`);
     }
+  }
+  if (leadsResult && !leadsResult.ok) {
+    throw new Error(`leads insert failed: HTTP ${leadsResult.status} ${leadsResult.error}`);
+  }
+}
 
-    // Mark webhook as processed
-    await fetch(`${supabaseUrl}/rest/v1/webhook_events?event_type=eq.${eventType}&payload->call->>id=eq.${payload.call?.id}`, {
-      method: 'PATCH',
-      headers: {
-        'Authorization': `Bearer ${serviceRoleKey}`,
-        'apikey': serviceRoleKey,
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({ processed: true })
-    });
+async function drainQueue(db: RestClient) {
+  const startedAt = Date.now();
+  let events = 0;
+  let batches = 0;
 
-    return new Response(JSON.stringify({ 
-      success: true, 
-      message: 'Webhook processed successfully' 
-    }), {
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+  while (Date.now() - startedAt < DRAIN_BUDGET_MS) {
+    const claim = await db.rpc<any[]>('claim_webhook_events', { batch_size: BATCH_SIZE });
+    if (!claim.ok) {
+      throw new Error(`claim_webhook_events failed: HTTP ${claim.status} ${claim.error}`);
+    }
+    const batch = claim.data || [];
+    if (batch.length === 0) break;
+    batch.sort((a, b) => a.seq - b.seq);
+
+    await applyBatch(db, batch);
+
+    const ids = batch.map((event) => event.id).join(',');
+    const marked = await db.update(`webhook_events?id=in.(${ids})`, {
+      processed: true,
+      processed_at: new Date().toISOString(),
     });
+    if (!marked.ok) {
+      throw new Error(`Marking events processed failed: HTTP ${marked.status}`);
+    }
+
+    events += batch.length;
+    batches += 1;
+    if (batch.length < BATCH_SIZE) break;
+  }
+
+  return { events, batches, durationMs: Date.now() - startedAt };
+}
+
+Deno.serve(async (req) => {
+  if (req.method === 'OPTIONS') {
+    return new Response(null, { status: 200, headers: corsHeaders });
+  }
+
+  try {
+    const db = new RestClient();
+
+    if (new URL(req.url).pathname.endsWith('/drain')) {
+      if (req.headers.get('Authorization') !== `Bearer ${db.serviceRoleKey}`) {
+        return jsonResponse({ error: { code: 'UNAUTHORIZED', message: 'Service role key required' } }, 401);
+      }
+      const drained = await drainQueue(db);
+      console.log(JSON.stringify({ event: 'vapi_webhook_drain', ...drained, ...db.summary() }));
+      return jsonResponse({ success: true, ...drained }, 200, db);
+    }
+
+    const payload = await req.json();
+    const eventType = payload.type || payload.event || 'unknown';
+
+    if (WEBHOOK_MODE === 'batch') {
+      await enqueueEvent(db, eventType, payload);
+      return jsonResponse({ success: true, queued: true }, 202, db);
+    }
+
+    await processEvent(db, eventType, payload);
+
+    return jsonResponse({
+      success: true,
+      message: 'Webhook processed successfully'
+    }, 200, db);
 
   } catch (error) {
     console.error('Vapi webhook error:', error);
-    
-    return new Response(JSON.stringify({
+
+    return jsonResponse({
       error: {
         code: 'WEBHOOK_PROCESSING_ERROR',
         message: error.message
       }
-    }), {
-      status: 500,
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
-    });
+    }, 500);
   }
 });
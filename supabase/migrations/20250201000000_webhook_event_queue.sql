@@ -0,0 +1,113 @@
+-- Webhook event queue for vapi-webhook batch mode
+-- Purpose: let vapi-webhook append an event and return immediately, and let
+-- the drain endpoint claim unprocessed events in arrival order and apply them
+-- with bulk upserts. Also makes lead creation idempotent per Vapi call.
+
+-- Arrival order (created_at ties under bursts) and claim bookkeeping
+ALTER TABLE public.webhook_events
+ADD COLUMN IF NOT EXISTS seq BIGINT GENERATED BY DEFAULT AS IDENTITY,
+ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE,
+ADD COLUMN IF NOT EXISTS processed_at TIMESTAMP WITH TIME ZONE;
+
+-- Only the backlog is indexed, so it stays small as the table grows
+CREATE INDEX IF NOT EXISTS idx_webhook_events_pending
+ON public.webhook_events (seq)
+WHERE processed = false;
+
+-- One lead per Vapi call, however often the call.ended event is delivered
+ALTER TABLE public.leads
+ADD COLUMN IF NOT EXISTS vapi_call_id TEXT;
+
+UPDATE public.leads
+SET vapi_call_id = metadata->>'vapi_call_id'
+WHERE id IN (
+  SELECT DISTINCT ON (metadata->>'vapi_call_id') id
+  FROM public.leads
+  WHERE metadata ? 'vapi_call_id' AND vapi_call_id IS NULL
+  ORDER BY metadata->>'vapi_call_id', created_at
+);
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'leads_vapi_call_id_key'
+  ) THEN
+    ALTER TABLE public.leads ADD CONSTRAINT leads_vapi_call_id_key UNIQUE (vapi_call_id);
+  END IF;
+END $$;
+
+-- One call log per Vapi call: the drain upserts call_logs on vapi_call_id.
+-- Only the old/ schemas declared it UNIQUE, and databases that just have an
+-- index may already hold duplicates, so keep the newest row of each call
+-- (rows without created_at count as oldest) before adding the constraint.
+-- The removed rows are kept in call_logs_duplicates_backup; copy them back
+-- with INSERT INTO public.call_logs SELECT * FROM ... after dropping the
+-- constraint, if ever needed.
+DO $$
+DECLARE
+  removed INTEGER;
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'call_logs_vapi_call_id_key'
+  ) THEN
+    CREATE TABLE IF NOT EXISTS public.call_logs_duplicates_backup (LIKE public.call_logs);
+    ALTER TABLE public.call_logs_duplicates_backup ENABLE ROW LEVEL SECURITY;
+
+    WITH ranked AS (
+      SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY vapi_call_id
+        ORDER BY COALESCE(created_at, '-infinity') DESC, id DESC
+      ) AS rank
+      FROM public.call_logs
+      WHERE vapi_call_id IS NOT NULL
+    ),
+    removed_rows AS (
+      DELETE FROM public.call_logs c
+      USING ranked
+      WHERE c.id = ranked.id AND ranked.rank > 1
+      RETURNING c.*
+    )
+    INSERT INTO public.call_logs_duplicates_backup
+    SELECT * FROM removed_rows;
+    GET DIAGNOSTICS removed = ROW_COUNT;
+
+    IF removed > 0 THEN
+      RAISE NOTICE 'Removed % duplicate call_logs rows (same vapi_call_id); they are kept in public.call_logs_duplicates_backup', removed;
+    END IF;
+    ALTER TABLE public.call_logs ADD CONSTRAINT call_logs_vapi_call_id_key UNIQUE (vapi_call_id);
+  END IF;
+END $$;
+
+-- Claim up to batch_size unprocessed Vapi events, oldest first. Claims of a
+-- drain that died expire after five minutes, so its events are retried; the
+-- upserts they trigger are idempotent.
+CREATE OR REPLACE FUNCTION public.claim_webhook_events(batch_size INTEGER DEFAULT 200)
+RETURNS SETOF public.webhook_events
+LANGUAGE sql
+AS $$
+  UPDATE public.webhook_events
+  SET claimed_at = NOW()
+  WHERE id IN (
+    SELECT id
+    FROM public.webhook_events
+    WHERE processed = false
+      AND source = 'vapi'
+      AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '5 minutes')
+    ORDER BY seq
+    LIMIT batch_size
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+REVOKE ALL ON FUNCTION public.claim_webhook_events(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_webhook_events(INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.claim_webhook_events(INTEGER) IS 'Used by the vapi-webhook drain endpoint (VAPI_WEBHOOK_MODE=batch).';
+
+-- VERIFICATION: pending backlog, duplicate leads and call logs (should be 0)
+SELECT COUNT(*) AS pending_events FROM public.webhook_events WHERE processed = false;
+SELECT COUNT(*) - COUNT(DISTINCT vapi_call_id) AS duplicate_call_leads
+FROM public.leads WHERE vapi_call_id IS NOT NULL;
+SELECT COUNT(*) - COUNT(DISTINCT vapi_call_id) AS duplicate_call_logs
+FROM public.call_logs WHERE vapi_call_id IS NOT NULL;
@@ -0,0 +1,62 @@
+-- Audio cache for minimax-tts
+-- Purpose: keep synthesized audio in the public tts-cache bucket, keyed by a
+-- SHA-256 of the text and voice settings, so repeated phrases skip MiniMax.
+-- One row per cached file drives TTL and LRU eviction.
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('tts-cache', 'tts-cache', true)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS public.tts_cache (
+  key TEXT PRIMARY KEY,
+  bytes INTEGER NOT NULL,
+  hits INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  last_hit_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Only the service role (the edge function) touches the cache
+ALTER TABLE public.tts_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS idx_tts_cache_last_hit_at
+ON public.tts_cache (last_hit_at DESC);
+
+-- Look up a key and mark it as recently used in one round trip.
+-- Returns true for a live entry, NULL for a miss or an expired one.
+CREATE OR REPLACE FUNCTION public.tts_cache_hit(cache_key TEXT, ttl_seconds INTEGER)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  UPDATE public.tts_cache
+  SET last_hit_at = NOW(), hits = hits + 1
+  WHERE key = cache_key
+    AND created_at > NOW() - make_interval(secs => ttl_seconds)
+  RETURNING true;
+$$;
+
+-- Delete expired entries and everything beyond the max_entries most recently
+-- used ones; returns the deleted keys so the caller can remove their files.
+CREATE OR REPLACE FUNCTION public.evict_tts_cache(max_entries INTEGER, ttl_seconds INTEGER)
+RETURNS SETOF TEXT
+LANGUAGE sql
+AS $$
+  DELETE FROM public.tts_cache
+  WHERE created_at <= NOW() - make_interval(secs => ttl_seconds)
+     OR key IN (
+       SELECT key FROM public.tts_cache
+       ORDER BY last_hit_at DESC
+       OFFSET max_entries
+     )
+  RETURNING key;
+$$;
+
+REVOKE ALL ON FUNCTION public.tts_cache_hit(TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.evict_tts_cache(INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.tts_cache_hit(TEXT, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.evict_tts_cache(INTEGER, INTEGER) TO service_role;
+
+COMMENT ON TABLE public.tts_cache IS 'Index of the tts-cache bucket, used by minimax-tts (TTS_CACHE_BACKEND=storage).';
+
+-- VERIFICATION: cache size and hit counts
+SELECT COUNT(*) AS entries, COALESCE(SUM(bytes), 0) AS bytes, COALESCE(SUM(hits), 0) AS hits
+FROM public.tts_cache;
@@ -0,0 +1,177 @@
+-- Dashboard aggregates
+-- Purpose: the Dashboard used to count a .limit(10) fetch and sum every
+-- successful payment in the browser. Counts and revenue are now kept per month
+-- in dashboard_stats by triggers, and get_dashboard_stats() returns the stat
+-- cards plus the recent calls and leads in a single call, whatever the history size.
+-- call_logs and leads have no owner column, so the stats cover the whole project.
+-- Each month is spread over 16 slot rows, picked by the writer's backend, so
+-- concurrent inserts (webhook drain, chat widget) do not all queue on one row
+-- lock; get_dashboard_stats() sums the slots.
+
+CREATE TABLE IF NOT EXISTS public.dashboard_stats (
+  month DATE NOT NULL, -- first day of the month, UTC
+  slot SMALLINT NOT NULL DEFAULT 0,
+  calls INTEGER NOT NULL DEFAULT 0,
+  leads INTEGER NOT NULL DEFAULT 0,
+  revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  CONSTRAINT dashboard_stats_pkey PRIMARY KEY (month, slot)
+);
+
+-- Tables created by an earlier version of this migration had one row per month
+ALTER TABLE public.dashboard_stats ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0;
+DO $$
+BEGIN
+  IF (SELECT array_length(conkey, 1) FROM pg_constraint WHERE conname = 'dashboard_stats_pkey') = 1 THEN
+    ALTER TABLE public.dashboard_stats DROP CONSTRAINT dashboard_stats_pkey;
+    ALTER TABLE public.dashboard_stats ADD CONSTRAINT dashboard_stats_pkey PRIMARY KEY (month, slot);
+  END IF;
+END $$;
+
+-- Only the triggers and get_dashboard_stats() (security definer) touch it
+ALTER TABLE public.dashboard_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.bump_dashboard_stats(
+  happened_at TIMESTAMP WITH TIME ZONE,
+  call_delta INTEGER,
+  lead_delta INTEGER,
+  revenue_delta NUMERIC
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  INSERT INTO public.dashboard_stats (month, slot, calls, leads, revenue)
+  VALUES (
+    date_trunc('month', COALESCE(happened_at, NOW()) AT TIME ZONE 'UTC')::date,
+    pg_backend_pid() % 16,
+    call_delta,
+    lead_delta,
+    revenue_delta
+  )
+  ON CONFLICT (month, slot) DO UPDATE
+  SET calls = dashboard_stats.calls + EXCLUDED.calls,
+      leads = dashboard_stats.leads + EXCLUDED.leads,
+      revenue = dashboard_stats.revenue + EXCLUDED.revenue,
+      updated_at = NOW();
+$$;
+
+-- Revenue a payment row contributes. Deployed projects name the column either
+-- payment_status or status, so read it from the row as JSON.
+CREATE OR REPLACE FUNCTION public.payment_revenue(payment JSONB)
+RETURNS NUMERIC
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN COALESCE(payment->>'payment_status', payment->>'status') = 'successful'
+      THEN COALESCE((payment->>'amount')::numeric, 0)
+    ELSE 0
+  END;
+$$;
+
+-- Security definer: the rows are written by anon and service_role clients,
+-- which cannot write dashboard_stats themselves
+CREATE OR REPLACE FUNCTION public.track_dashboard_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  calls INTEGER := CASE WHEN TG_TABLE_NAME = 'call_logs' THEN 1 ELSE 0 END;
+  leads INTEGER := CASE WHEN TG_TABLE_NAME = 'leads' THEN 1 ELSE 0 END;
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.bump_dashboard_stats(
+      OLD.created_at,
+      -calls,
+      -leads,
+      CASE WHEN TG_TABLE_NAME = 'payments' THEN -public.payment_revenue(to_jsonb(OLD)) ELSE 0 END
+    );
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.bump_dashboard_stats(
+      NEW.created_at,
+      calls,
+      leads,
+      CASE WHEN TG_TABLE_NAME = 'payments' THEN public.payment_revenue(to_jsonb(NEW)) ELSE 0 END
+    );
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Calls and leads only change the counts when rows come or go; a payment
+-- moves revenue whenever its status or amount changes
+DROP TRIGGER IF EXISTS call_logs_dashboard_stats ON public.call_logs;
+CREATE TRIGGER call_logs_dashboard_stats
+AFTER INSERT OR DELETE ON public.call_logs
+FOR EACH ROW EXECUTE FUNCTION public.track_dashboard_stats();
+
+DROP TRIGGER IF EXISTS leads_dashboard_stats ON public.leads;
+CREATE TRIGGER leads_dashboard_stats
+AFTER INSERT OR DELETE ON public.leads
+FOR EACH ROW EXECUTE FUNCTION public.track_dashboard_stats();
+
+DROP TRIGGER IF EXISTS payments_dashboard_stats ON public.payments;
+CREATE TRIGGER payments_dashboard_stats
+AFTER INSERT OR UPDATE OR DELETE ON public.payments
+FOR EACH ROW EXECUTE FUNCTION public.track_dashboard_stats();
+
+-- Backfill from the existing history
+TRUNCATE public.dashboard_stats;
+INSERT INTO public.dashboard_stats (month, calls, leads, revenue)
+SELECT month, SUM(calls), SUM(leads), SUM(revenue)
+FROM (
+  SELECT date_trunc('month', created_at AT TIME ZONE 'UTC')::date AS month, 1 AS calls, 0 AS leads, 0::numeric AS revenue
+  FROM public.call_logs
+  UNION ALL
+  SELECT date_trunc('month', created_at AT TIME ZONE 'UTC')::date, 0, 1, 0
+  FROM public.leads
+  UNION ALL
+  SELECT date_trunc('month', p.created_at AT TIME ZONE 'UTC')::date, 0, 0, public.payment_revenue(to_jsonb(p))
+  FROM public.payments p
+) AS history
+GROUP BY month;
+
+-- Everything the Dashboard shows, in one round trip
+CREATE OR REPLACE FUNCTION public.get_dashboard_stats(recent_limit INTEGER DEFAULT 5)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT jsonb_build_object(
+    'totalCalls', COALESCE((SELECT SUM(calls) FROM dashboard_stats), 0),
+    'totalLeads', COALESCE((SELECT SUM(leads) FROM dashboard_stats), 0),
+    'totalRevenue', COALESCE((SELECT SUM(revenue) FROM dashboard_stats), 0),
+    'callsThisMonth', COALESCE((
+      SELECT SUM(calls) FROM dashboard_stats
+      WHERE month = date_trunc('month', NOW() AT TIME ZONE 'UTC')::date
+    ), 0),
+    'recentCalls', COALESCE((
+      SELECT jsonb_agg(c) FROM (
+        SELECT id, caller_phone, call_status, created_at
+        FROM call_logs ORDER BY created_at DESC LIMIT recent_limit
+      ) c
+    ), '[]'::jsonb),
+    'recentLeads', COALESCE((
+      SELECT jsonb_agg(l) FROM (
+        SELECT id, full_name, email, phone_number, status, created_at
+        FROM leads ORDER BY created_at DESC LIMIT recent_limit
+      ) l
+    ), '[]'::jsonb)
+  );
+$$;
+
+REVOKE ALL ON FUNCTION public.bump_dashboard_stats(TIMESTAMP WITH TIME ZONE, INTEGER, INTEGER, NUMERIC) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_dashboard_stats(INTEGER) TO anon, authenticated, service_role;
+
+COMMENT ON TABLE public.dashboard_stats IS 'Per-month call, lead and revenue totals kept by triggers, split over slot rows; read through get_dashboard_stats().';
+
+-- VERIFICATION: the maintained totals match a full count
+SELECT
+  (SELECT SUM(calls) FROM public.dashboard_stats) = (SELECT COUNT(*) FROM public.call_logs) AS calls_match,
+  (SELECT SUM(leads) FROM public.dashboard_stats) = (SELECT COUNT(*) FROM public.leads) AS leads_match,
+  public.get_dashboard_stats() AS dashboard;
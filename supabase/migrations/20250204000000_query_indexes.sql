@@ -0,0 +1,60 @@
+-- Indexes for the hot PostgREST filters
+-- Purpose: every query the edge functions and dashboard pages issue should be
+-- answered from an index. Checked against production-like volumes with
+-- callwaitingai-landing/testsprite_tests/load/query_plans.py, which fails on
+-- any sequential scan.
+
+-- groq-chat: leads?metadata->>session_id=eq.<session> before creating a chat
+-- lead. Only chat leads carry a session id, so the index skips the rest.
+CREATE INDEX IF NOT EXISTS idx_leads_session_id
+ON public.leads ((metadata->>'session_id'))
+WHERE (metadata->>'session_id') IS NOT NULL;
+
+-- vapi-webhook: call_logs?vapi_call_id=eq.<call> on call.ended. The UNIQUE
+-- constraint from 20250201000000_webhook_event_queue.sql (or the old/
+-- schemas' idx_call_logs_vapi_call_id) already indexes it; add one where
+-- neither exists.
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE i.indrelid = 'public.call_logs'::regclass
+      AND a.attname = 'vapi_call_id'
+  ) THEN
+    CREATE INDEX idx_call_logs_vapi_call_id ON public.call_logs (vapi_call_id);
+  END IF;
+END $$;
+
+-- Calls and Leads pages: newest first with a (created_at, id) cursor, and
+-- the Dashboard's recent calls and leads
+CREATE INDEX IF NOT EXISTS idx_call_logs_created_at_id
+ON public.call_logs (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_call_logs_status_created_at_id
+ON public.call_logs (call_status, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_leads_created_at_id
+ON public.leads (created_at DESC, id DESC);
+
+-- The single-column created_at indexes are covered by the ones above
+DROP INDEX IF EXISTS public.idx_call_logs_created_at;
+DROP INDEX IF EXISTS public.idx_leads_created_at;
+
+-- Payments page and getUserTier(): a user's payments, newest first
+CREATE INDEX IF NOT EXISTS idx_payments_user_id_created_at
+ON public.payments (user_id, created_at DESC);
+
+DROP INDEX IF EXISTS public.idx_payments_user_id;
+
+-- AgentSetup and the chat widget load the signed-in user's assistant
+CREATE INDEX IF NOT EXISTS idx_assistants_user_id
+ON public.assistants (user_id);
+
+-- VERIFICATION: indexes on the audited tables
+SELECT tablename, indexname, indexdef
+FROM pg_indexes
+WHERE schemaname = 'public'
+  AND tablename IN ('call_logs', 'leads', 'payments', 'assistants', 'webhook_events')
+ORDER BY tablename, indexname;
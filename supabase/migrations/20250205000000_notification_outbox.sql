@@ -0,0 +1,131 @@
+-- Telegram notification outbox
+-- Purpose: lead alerts no longer hold up the request that created the lead.
+-- Every new lead queues an alert in notification_outbox inside the same
+-- transaction; POST .../send-telegram-notification/dispatch (scheduled every
+-- five seconds at the end of this migration) claims pending alerts, coalesces
+-- each chat's burst into one message, paces sends to Telegram's rate limits
+-- and records when every alert was delivered.
+
+CREATE TABLE IF NOT EXISTS public.notification_outbox (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  kind TEXT NOT NULL DEFAULT 'new_lead',
+  -- NULL: the function's TELEGRAM_CHAT_ID (set only by service role callers)
+  chat_id TEXT,
+  lead_id UUID REFERENCES public.leads(id) ON DELETE CASCADE,
+  -- Text of alerts that are not about a lead
+  message TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  claimed_at TIMESTAMP WITH TIME ZONE,
+  sent_at TIMESTAMP WITH TIME ZONE,
+  failed_at TIMESTAMP WITH TIME ZONE,
+  last_error TEXT,
+  telegram_message_id BIGINT,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  delivery_ms INTEGER GENERATED ALWAYS AS (
+    (EXTRACT(EPOCH FROM (sent_at - created_at)) * 1000)::INTEGER
+  ) STORED
+);
+
+-- Only the backlog is indexed, so it stays small as the table grows
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+ON public.notification_outbox (next_attempt_at)
+WHERE sent_at IS NULL AND failed_at IS NULL;
+
+-- Written by the service role only
+ALTER TABLE public.notification_outbox ENABLE ROW LEVEL SECURITY;
+
+-- Queue an alert for every new lead, whichever path created it (chat widget,
+-- voice calls, manual entry). Rows skipped by ON CONFLICT DO NOTHING fire no
+-- trigger, so redelivered Vapi events do not alert twice.
+CREATE OR REPLACE FUNCTION public.queue_lead_alert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO public.notification_outbox (kind, lead_id) VALUES ('new_lead', NEW.id);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS leads_queue_alert ON public.leads;
+CREATE TRIGGER leads_queue_alert
+AFTER INSERT ON public.leads
+FOR EACH ROW EXECUTE FUNCTION public.queue_lead_alert();
+
+-- Claim up to batch_size due alerts, oldest first, counting the attempt.
+-- Claims of a dispatcher that died expire after two minutes.
+CREATE OR REPLACE FUNCTION public.claim_notifications(batch_size INTEGER DEFAULT 100)
+RETURNS SETOF public.notification_outbox
+LANGUAGE sql
+AS $$
+  UPDATE public.notification_outbox
+  SET claimed_at = NOW(), attempts = attempts + 1
+  WHERE id IN (
+    SELECT id
+    FROM public.notification_outbox
+    WHERE sent_at IS NULL
+      AND failed_at IS NULL
+      AND next_attempt_at <= NOW()
+      AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL '2 minutes')
+    ORDER BY id
+    LIMIT batch_size
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING *;
+$$;
+
+REVOKE ALL ON FUNCTION public.claim_notifications(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_notifications(INTEGER) TO service_role;
+REVOKE ALL ON FUNCTION public.queue_lead_alert() FROM PUBLIC, anon, authenticated;
+
+COMMENT ON FUNCTION public.claim_notifications(INTEGER) IS 'Used by the send-telegram-notification dispatch endpoint.';
+
+-- Deliver the queue every five seconds. The job reads the project URL and the
+-- service role key from Vault (secrets project_url and service_role_key, see
+-- README.md) and only calls the function while alerts are due. Without
+-- pg_cron and pg_net nothing is scheduled; enable both and run this block
+-- again, or schedule the dispatch endpoint some other way.
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron')
+     AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_net') THEN
+    PERFORM cron.schedule(
+      'dispatch-telegram-notifications',
+      '5 seconds',
+      $job$
+      SELECT net.http_post(
+        url := (SELECT decrypted_secret FROM vault.decrypted_secrets WHERE name = 'project_url')
+          || '/functions/v1/send-telegram-notification/dispatch',
+        headers := jsonb_build_object(
+          'Content-Type', 'application/json',
+          'Authorization', 'Bearer ' || (
+            SELECT decrypted_secret FROM vault.decrypted_secrets WHERE name = 'service_role_key'
+          )
+        ),
+        body := '{}'::jsonb
+      )
+      WHERE EXISTS (
+        SELECT 1 FROM public.notification_outbox
+        WHERE sent_at IS NULL AND failed_at IS NULL AND next_attempt_at <= NOW()
+      );
+      $job$
+    );
+  ELSE
+    RAISE NOTICE 'pg_cron or pg_net is not enabled: lead alerts stay queued until POST .../send-telegram-notification/dispatch is scheduled';
+  END IF;
+END $$;
+
+-- VERIFICATION: backlog and delivery latency over the last day (the schedule
+-- is listed in cron.job as dispatch-telegram-notifications)
+SELECT COUNT(*) AS pending_alerts
+FROM public.notification_outbox
+WHERE sent_at IS NULL AND failed_at IS NULL;
+SELECT
+  COUNT(*) AS delivered,
+  PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY delivery_ms) AS p95_delivery_ms,
+  MAX(delivery_ms) AS max_delivery_ms
+FROM public.notification_outbox
+WHERE sent_at > NOW() - INTERVAL '1 day';
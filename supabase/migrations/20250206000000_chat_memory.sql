@@ -0,0 +1,42 @@
+-- Server-side conversation memory for groq-chat
+-- Purpose: the chat widget sends only the new user turn. groq-chat rebuilds
+-- the context from chat_messages (the session's latest messages) and a
+-- rolling summary of everything older, kept in chat_sessions.
+
+-- Widget session ids look like landing-<timestamp>-<random>, not UUIDs;
+-- inserts into the UUID column have been failing since the widget shipped
+ALTER TABLE public.chat_messages
+ALTER COLUMN session_id TYPE TEXT USING session_id::TEXT;
+
+-- Each turn reads the newest messages of one session
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_created_at
+ON public.chat_messages (session_id, created_at DESC);
+
+-- Covered by the index above
+DROP INDEX IF EXISTS public.idx_chat_messages_session_id;
+
+CREATE TABLE IF NOT EXISTS public.chat_sessions (
+  session_id TEXT PRIMARY KEY,
+  -- Summary of every message up to and including summarized_until
+  summary TEXT NOT NULL DEFAULT '',
+  summarized_until TIMESTAMP WITH TIME ZONE,
+  summarized_messages INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Written by the service role only
+ALTER TABLE public.chat_sessions ENABLE ROW LEVEL SECURITY;
+
+-- VERIFICATION: summary sizes, and the history query uses the new index
+SELECT
+  COUNT(*) AS sessions,
+  PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY summarized_messages) AS p95_summarized_messages,
+  MAX(LENGTH(summary)) AS longest_summary_chars
+FROM public.chat_sessions;
+EXPLAIN
+SELECT sender_type, message_text, created_at
+FROM public.chat_messages
+WHERE session_id = 'landing-0-verification'
+ORDER BY created_at DESC
+LIMIT 28;
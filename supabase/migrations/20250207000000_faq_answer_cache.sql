@@ -0,0 +1,35 @@
+-- FAQ answer cache for groq-chat
+-- Purpose: answers to common first-turn questions (pricing, setup, "how does
+-- it work") are reused instead of paying a Groq round trip every time. Each
+-- groq-chat worker keeps the cache in memory and loads it from this table on
+-- start, so answers stored by one worker reach the others.
+
+CREATE TABLE IF NOT EXISTS public.faq_answer_cache (
+  -- Hash of the system prompt the answer was generated with; changing the
+  -- prompt leaves old answers unused
+  fingerprint TEXT NOT NULL,
+  -- Normalized question (lowercase, no punctuation or filler words, stemmed)
+  question TEXT NOT NULL,
+  answer TEXT NOT NULL,
+  -- Model tier that generated the answer (fast / full)
+  tier TEXT NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  PRIMARY KEY (fingerprint, question)
+);
+
+-- Workers load the live answers of their prompt, oldest first
+CREATE INDEX IF NOT EXISTS idx_faq_answer_cache_fingerprint_expires_at
+ON public.faq_answer_cache (fingerprint, expires_at);
+
+-- Written by the service role only
+ALTER TABLE public.faq_answer_cache ENABLE ROW LEVEL SECURITY;
+
+-- VERIFICATION: live answers per prompt version
+SELECT
+  fingerprint,
+  COUNT(*) AS live_answers,
+  MAX(created_at) AS newest_answer
+FROM public.faq_answer_cache
+WHERE expires_at > NOW()
+GROUP BY fingerprint;
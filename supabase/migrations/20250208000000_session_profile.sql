@@ -0,0 +1,56 @@
+-- Session profile in one call
+-- Purpose: after sign in the app fetched the users row (from several places
+-- in AuthContext) and scanned payments for the subscription tier separately,
+-- so protected pages waited on sequential round trips. get_session_profile()
+-- returns the signed-in user's profile and tier together; the client caches
+-- the result for the browser session.
+
+-- Tier a successful payment amount buys; keep in sync with the pricing page
+CREATE OR REPLACE FUNCTION public.payment_tier(amount NUMERIC)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN amount >= 180 THEN 'promax'
+    WHEN amount >= 80 THEN 'pro'
+    WHEN amount >= 49 THEN 'professional'
+    ELSE 'free'
+  END;
+$$;
+
+-- Profile and tier of auth.uid(); takes no user id, so callers only ever see
+-- their own row. The latest successful payment is found through
+-- idx_payments_user_id_created_at (20250204000000_query_indexes.sql).
+CREATE OR REPLACE FUNCTION public.get_session_profile()
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT jsonb_build_object(
+    'profile', (SELECT to_jsonb(u) FROM users u WHERE u.id = auth.uid()),
+    'tier', COALESCE((
+      -- Deployed projects name the column payment_status or status (see payment_revenue())
+      SELECT public.payment_tier((to_jsonb(p)->>'amount')::numeric)
+      FROM payments p
+      WHERE p.user_id = auth.uid()
+        AND COALESCE(to_jsonb(p)->>'payment_status', to_jsonb(p)->>'status') = 'successful'
+      ORDER BY p.created_at DESC
+      LIMIT 1
+    ), 'free')
+  );
+$$;
+
+REVOKE ALL ON FUNCTION public.get_session_profile() FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.get_session_profile() TO authenticated;
+
+-- VERIFICATION: tiers of the users with a successful payment
+SELECT
+  u.email,
+  public.payment_tier(MAX(p.amount)) AS best_tier
+FROM public.users u
+JOIN public.payments p ON p.user_id = u.id
+WHERE COALESCE(to_jsonb(p)->>'payment_status', to_jsonb(p)->>'status') = 'successful'
+GROUP BY u.email;